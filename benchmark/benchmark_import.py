@@ -0,0 +1,129 @@
+"""
+Benchmark of the TradingMate import time.
+
+Imports each module in a fresh interpreter with -X importtime and records
+the cumulative import time and the heavy optional dependencies (Tk, requests)
+that the import pulled in. The model, storage and pricing layers must be
+importable without them. Results are written as json so that runs of
+different versions can be compared with the --compare option.
+
+Usage:
+    python3 benchmark/benchmark_import.py [--output results.json]
+                                          [--compare baseline.json]
+"""
+import os
+import sys
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+srcdir = os.path.join(parentdir, 'src')
+
+# Modules to import, from the smallest layer to the whole application
+DEFAULT_MODULES = [
+    'Utils.Utils',
+    'Utils.Trade',
+    'Utils.ConfigurationManager',
+    'Model.DatabaseHandler',
+    'Model.StockPriceGetter',
+    'Model.Portfolio',
+    'Model.TradeImporter',
+    'Model.PortfolioLoader',
+    'TradingMate',
+]
+# Dependencies that are expected to be loaded only when actually used
+HEAVY_MODULES = ['tkinter', 'requests', 'urllib3', 'http.server', 'concurrent.futures', 'numpy']
+
+
+def parse_importtime(stderr):
+    """
+    Parse the -X importtime output into a dict {"module": (self us, cumulative us)}
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        timings[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return timings
+
+
+def measure_import(module, repeat):
+    """
+    Import the module in a new interpreter the requested number of times and
+    return the statistics of its cumulative import time in seconds and the
+    heavy modules it loaded
+    """
+    script = 'import sys; sys.path.insert(0, {!r}); import {}'.format(srcdir, module)
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1]}
+        modules = parse_importtime(result.stderr)
+        timings.append(modules[module][1] / 1e6)
+        loaded = [m for m in HEAVY_MODULES if m in modules]
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'runs': repeat,
+        'heavy_modules': loaded
+    }
+
+
+def compare(baseline, current):
+    """
+    Print the relative change of the median import times against a baseline run
+    """
+    for module, stats in current['results'].items():
+        base = baseline['results'].get(module)
+        if base is None or 'median' not in base or 'median' not in stats:
+            continue
+        ratio = stats['median'] / base['median'] if base['median'] > 0 else 0
+        print('    {:<32} {:>10.4f}s {:>8.2f}x'.format(module, stats['median'], ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TradingMate import time benchmark')
+    parser.add_argument('--modules', nargs='+', help='Modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions of each measure')
+    parser.add_argument('--output', help='Write the json results into this file')
+    parser.add_argument('--compare', help='Json results of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules or DEFAULT_MODULES:
+        print('Benchmarking import of {}...'.format(module), file=sys.stderr)
+        results[module] = measure_import(module, args.repeat)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
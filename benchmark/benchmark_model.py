@@ -0,0 +1,373 @@
+"""
+Benchmark of the TradingMate model hot paths.
+
+Generates synthetic trade logs of increasing size, times the main operations
+of DatabaseHandler and Portfolio and records the memory usage. Results are
+written as json so that runs of different versions can be compared with the
+--compare option.
+
+The Monte Carlo risk simulation is benchmarked separately on synthetic
+returns, scaling the number of paths and symbols, in a single process and
+in the process pool (skipped with --no-risk).
+
+Usage:
+    python3 benchmark/benchmark_model.py [--full] [--output results.json]
+                                         [--compare baseline.json] [--no-risk]
+"""
+import os
+import sys
+import argparse
+import datetime
+import json
+import platform
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+sys.path.insert(0, currentdir)
+
+from Model.AlertsEngine import AlertsEngine
+from Model.DatabaseHandler import DatabaseHandler
+from Model.Portfolio import Portfolio
+from Model.PortfolioHistory import PortfolioHistory
+from Model.Rebalancer import Rebalancer
+from Model.TradeIndex import TradeIndex
+from Utils.Trade import Trade
+from Utils.Utils import Callbacks, Utils
+from common.TradeLogGenerator import TradeLogGenerator
+
+# Default grid, quick enough to run on every change
+DEFAULT_TRADES = [1000, 10000, 100000]
+DEFAULT_SYMBOLS = [10, 500]
+# Full grid, as required to spot scalability issues
+FULL_TRADES = [1000, 10000, 100000, 1000000]
+FULL_SYMBOLS = [10, 500, 5000]
+# Risk simulation grids
+DEFAULT_RISK_PATHS = [10000, 100000]
+DEFAULT_RISK_SYMBOLS = [10, 100]
+FULL_RISK_PATHS = [10000, 100000, 1000000]
+FULL_RISK_SYMBOLS = [10, 100, 1000]
+RISK_DAYS = 500
+RISK_HORIZON = 10
+
+
+class BenchmarkConfiguration():
+    """
+    Minimal configuration used to build the model components
+    """
+    def __init__(self, db_filepath):
+        self.db_filepath = db_filepath
+
+    def get_trading_database_path(self):
+        return self.db_filepath
+
+    def get_price_cache_filepath(self):
+        return os.path.join(os.path.dirname(self.db_filepath), 'price_cache.json')
+
+    def get_watchlist_filepath(self):
+        return os.path.join(os.path.dirname(self.db_filepath), 'watchlist.json')
+
+    def get_alerts_filepath(self):
+        return os.path.join(os.path.dirname(self.db_filepath), 'alerts.json')
+
+    def get_bar_store_filepath(self):
+        return os.path.join(os.path.dirname(self.db_filepath), 'bars.db')
+
+    def get_alpha_vantage_api_key(self):
+        return ''
+
+    def get_alpha_vantage_base_url(self):
+        return ''
+
+    def get_alpha_vantage_polling_period(self):
+        return 1
+
+    def get_fx_ttl(self):
+        return 3600
+
+    def get_intraday_history_size(self):
+        return 500
+
+
+def measure(func, repeat):
+    """
+    Run the function the requested number of times and return the timings
+    statistics in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'runs': repeat
+    }
+
+
+def measure_per_call(func, args_list, repeat):
+    """
+    Run the function once for each item of args_list and return the
+    statistics of the average time of a single call in seconds
+    """
+    def run():
+        for args in args_list:
+            func(*args)
+    result = measure(run, repeat)
+    calls = max(len(args_list), 1)
+    result['min'] /= calls
+    result['median'] /= calls
+    result['calls'] = calls
+    return result
+
+
+def measure_memory(func):
+    """
+    Return the peak of memory allocated by the function in bytes
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_case(trades_count, symbols_count, repeat, seed, workdir):
+    """
+    Run all the benchmarks against a synthetic log and return the results
+    """
+    generator = TradeLogGenerator(seed)
+    db_filepath = os.path.join(workdir, 'log_{}_{}.json'.format(trades_count, symbols_count))
+    Utils.write_json_file(db_filepath, generator.generate(trades_count, symbols_count))
+
+    config = BenchmarkConfiguration(db_filepath)
+    db = DatabaseHandler(config)
+    portfolio = Portfolio('benchmark', config)
+    portfolio.set_callback(Callbacks.UPDATE_LIVE_PRICES, lambda: None)
+
+    timings = {}
+    memory = {}
+    timings['read_data'] = measure(db.read_data, repeat)
+    memory['read_data_peak'] = measure_memory(db.read_data)
+    trades = db.get_trades_list()
+    memory['trades_list_size'] = len(trades)
+
+    write_filepath = os.path.join(workdir, 'write_{}_{}.json'.format(trades_count, symbols_count))
+    timings['write_data'] = measure(lambda: db.write_data(write_filepath), repeat)
+
+    timings['reload'] = measure(lambda: portfolio.reload(trades), repeat)
+    timings['reload_indexed'] = measure(lambda: portfolio.reload(trades, db.get_trade_index()), repeat)
+    memory['reload_peak'] = measure_memory(lambda: portfolio.reload(trades))
+
+    if len(trades) > 0:
+        # Replace a recent trade with an equal one, as an edit from the UI
+        position = len(trades) * 9 // 10
+        def edit_trade():
+            old_trade = db.update_trade(position, Trade.from_dict(trades[position].to_dict()))
+            portfolio.apply_history_change(position, trades, db.get_trade_index(), [old_trade.symbol])
+        portfolio.reload(trades, db.get_trade_index())
+        timings['edit_trade'] = measure(edit_trade, repeat)
+
+    symbols = portfolio.get_holding_symbols()
+    # Limit the number of calls for the biggest portfolios
+    sample = [(s, trades) for s in symbols[:50]]
+    timings['compute_avg_holding_open_price'] = measure_per_call(
+        portfolio.compute_avg_holding_open_price, sample, repeat)
+    index = db.get_trade_index()
+    timings['compute_avg_holding_open_price_indexed'] = measure_per_call(
+        portfolio.compute_avg_holding_open_price, [s + (index,) for s in sample], repeat)
+
+    history = PortfolioHistory()
+    def history_build():
+        history.invalidate()
+        history.update(trades)
+    timings['portfolio_history_build'] = measure(history_build, repeat)
+    timings['portfolio_history_cached'] = measure(lambda: history.update(trades), repeat)
+
+    timings['trade_index_build'] = measure(lambda: TradeIndex(trades).get_trades_between(), repeat)
+    if len(trades) > 0:
+        # Build the date index before the measure
+        db.get_trades_by_date()
+        first = trades[0].date
+        year = [(s, first, first + datetime.timedelta(days=365)) for s in symbols[:50]]
+        timings['get_trades_by_symbol_and_date'] = measure_per_call(
+            lambda *args: len(db.get_trades_by_symbol(*args)), year, repeat)
+
+    candidates = [
+        Trade.from_dict({'date': '01/01/2030', 'action': 'BUY', 'quantity': 10, 'symbol': 'LSE:S0000',
+                         'price': 100.0, 'fee': 6.0, 'stamp_duty': 0.5}),
+        Trade.from_dict({'date': '01/01/2030', 'action': 'WITHDRAW', 'quantity': 10, 'symbol': '',
+                         'price': 0.0, 'fee': 0.0, 'stamp_duty': 0.0}),
+    ]
+    if len(symbols) > 0:
+        candidates.append(Trade.from_dict({'date': '01/01/2030', 'action': 'SELL', 'quantity': 1,
+                                           'symbol': symbols[0], 'price': 100.0, 'fee': 6.0,
+                                           'stamp_duty': 0.0}))
+    timings['is_trade_valid'] = measure_per_call(
+        portfolio.is_trade_valid, [(t,) for t in candidates] * 100, repeat)
+
+    # Feed a price for every holding so that the aggregates can be computed
+    portfolio.price_getter.lastData = {s: 100.0 + i for i, s in enumerate(symbols)}
+    timings['on_new_price_data'] = measure(portfolio.on_new_price_data, repeat)
+
+    if len(symbols) > 0:
+        # Equal weights of the holdings, as a periodic rebalance
+        rebalancer = Rebalancer(portfolio, fee=6.0, stamp_duty={'LSE': 0.5})
+        targets = {s: 1 / len(symbols) for s in symbols}
+        timings['rebalance'] = measure(lambda: rebalancer.propose(targets), repeat)
+
+    # Alert rules of every holding far from the prices, a tick crosses none of them
+    alerts = AlertsEngine(config.get_alerts_filepath())
+    for s, price in portfolio.price_getter.lastData.items():
+        for i in range(1, 11):
+            alerts.add_rule(s, 'ABOVE', price * (1 + i))
+            alerts.add_rule(s, 'MOVE', i, reference=price)
+    memory['alert_rules'] = len(alerts.get_rules())
+    timings['alerts_on_prices'] = measure(
+        lambda: alerts.on_prices(portfolio.price_getter.lastData), repeat)
+
+    def aggregates():
+        portfolio.get_holdings_value()
+        portfolio.get_total_value()
+        portfolio.get_portfolio_pl()
+        portfolio.get_portfolio_pl_perc()
+        portfolio.get_open_positions_pl()
+        portfolio.get_open_positions_pl_perc()
+    timings['aggregate_getters'] = measure(aggregates, repeat)
+    timings['get_holding_list'] = measure(portfolio.get_holding_list, repeat)
+
+    memory['log_file_bytes'] = os.path.getsize(db_filepath)
+    os.remove(db_filepath)
+    if os.path.exists(db.get_journal_filepath()):
+        os.remove(db.get_journal_filepath())
+    if os.path.exists(write_filepath):
+        os.remove(write_filepath)
+
+    return {
+        'trades': trades_count,
+        'symbols': symbols_count,
+        'holdings': len(symbols),
+        'timings': timings,
+        'memory': memory
+    }
+
+
+def benchmark_risk(paths_count, symbols_count, repeat, seed):
+    """
+    Time the risk simulation of synthetic returns in a single process and
+    in the process pool
+    """
+    import numpy as np
+    from Model.RiskSimulator import RiskSimulator
+    rng = np.random.RandomState(seed)
+    returns = rng.normal(0, 0.02, size=(RISK_DAYS, symbols_count))
+    values = rng.uniform(100, 10000, size=symbols_count)
+    timings = {}
+    for name, workers in [('risk_single_process', 1), ('risk_process_pool', None)]:
+        simulator = RiskSimulator(None, max_workers=workers)
+        timings[name] = measure(lambda: simulator.simulate(
+            returns, values, paths=paths_count, horizon=RISK_HORIZON, seed=seed), repeat)
+    return {
+        'paths': paths_count,
+        'symbols': symbols_count,
+        'workers': os.cpu_count(),
+        'timings': timings
+    }
+
+
+def compare(baseline, current):
+    """
+    Print the relative change of the median timings against a baseline run
+    """
+    base_cases = {(r['trades'], r['symbols']): r for r in baseline['results']}
+    for result in current['results']:
+        key = (result['trades'], result['symbols'])
+        if key not in base_cases:
+            continue
+        print('trades={} symbols={}'.format(*key))
+        for op, stats in sorted(result['timings'].items()):
+            base = base_cases[key]['timings'].get(op)
+            if base is None or base['median'] == 0:
+                continue
+            ratio = stats['median'] / base['median']
+            print('    {:<32} {:>12.6f}s {:>8.2f}x'.format(op, stats['median'], ratio))
+    base_risk = {(r['paths'], r['symbols']): r for r in baseline.get('risk', [])}
+    for result in current.get('risk', []):
+        key = (result['paths'], result['symbols'])
+        if key not in base_risk:
+            continue
+        print('paths={} symbols={}'.format(*key))
+        for op, stats in sorted(result['timings'].items()):
+            base = base_risk[key]['timings'].get(op)
+            if base is None or base['median'] == 0:
+                continue
+            ratio = stats['median'] / base['median']
+            print('    {:<32} {:>12.6f}s {:>8.2f}x'.format(op, stats['median'], ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TradingMate model benchmark')
+    parser.add_argument('--full', action='store_true',
+                        help='Run the full grid (up to 10^6 trades and 5000 symbols)')
+    parser.add_argument('--trades', type=int, nargs='+', help='Trade log sizes to benchmark')
+    parser.add_argument('--symbols', type=int, nargs='+', help='Number of symbols to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of each measure')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic logs')
+    parser.add_argument('--output', help='Write the json results into this file')
+    parser.add_argument('--compare', help='Json results of a previous run to compare with')
+    parser.add_argument('--risk-paths', type=int, nargs='+', help='Simulated paths to benchmark')
+    parser.add_argument('--risk-symbols', type=int, nargs='+', help='Simulated symbols to benchmark')
+    parser.add_argument('--no-risk', action='store_true', help='Skip the risk simulation benchmark')
+    args = parser.parse_args(argv)
+
+    trades_grid = args.trades or (FULL_TRADES if args.full else DEFAULT_TRADES)
+    symbols_grid = args.symbols or (FULL_SYMBOLS if args.full else DEFAULT_SYMBOLS)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for trades_count in trades_grid:
+            for symbols_count in symbols_grid:
+                print('Benchmarking {} trades, {} symbols...'.format(trades_count, symbols_count),
+                      file=sys.stderr)
+                results.append(benchmark_case(trades_count, symbols_count,
+                                              args.repeat, args.seed, workdir))
+    risk = []
+    if not args.no_risk:
+        paths_grid = args.risk_paths or (FULL_RISK_PATHS if args.full else DEFAULT_RISK_PATHS)
+        risk_symbols_grid = args.risk_symbols or (FULL_RISK_SYMBOLS if args.full else DEFAULT_RISK_SYMBOLS)
+        for paths_count in paths_grid:
+            for symbols_count in risk_symbols_grid:
+                print('Benchmarking risk of {} paths, {} symbols...'.format(paths_count, symbols_count),
+                      file=sys.stderr)
+                risk.append(benchmark_risk(paths_count, symbols_count, args.repeat, args.seed))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        },
+        'results': results,
+        'risk': risk
+    }
+    if args.output is not None:
+        Utils.write_json_file(args.output, report)
+    else:
+        print(json.dumps(report, indent=4))
+    if args.compare is not None:
+        compare(Utils.load_json_file(args.compare), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import random
+import datetime
+
+class TradeLogGenerator():
+    """
+    Generate synthetic but consistent trade logs to be used by the benchmarks.
+    Every generated log can be replayed by the Portfolio without errors: sells
+    never exceed the held quantity and the cash balance never goes negative.
+    The same seed always produces the same log.
+    """
+
+    START_DATE = datetime.datetime(2000, 1, 3)
+    INITIAL_DEPOSIT = 10000000.0
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def get_symbols(self, symbols_count):
+        """
+        Return the list of synthetic symbols used for the given count
+        """
+        return ['LSE:S{:04d}'.format(i) for i in range(symbols_count)]
+
+    def generate(self, trades_count, symbols_count):
+        """
+        Return a dictionary with the same format of the trading log json file
+
+            - **trades_count**: number of trades in the log
+            - **symbols_count**: number of distinct symbols traded
+        """
+        rnd = random.Random('{}-{}-{}'.format(self.seed, trades_count, symbols_count))
+        symbols = self.get_symbols(symbols_count)
+        # Spread the trades over ~20 years of trading days
+        days_span = 20 * 365
+        holdings = {}
+        held_symbols = []
+        cash = self.INITIAL_DEPOSIT
+        trades = [self._make_item(self.START_DATE, 'DEPOSIT', cash)]
+        for i in range(1, trades_count):
+            date = self.START_DATE + datetime.timedelta(days=(i * days_span) // trades_count)
+            dice = rnd.random()
+            if dice < 0.03:
+                amount = float(rnd.randint(100, 5000))
+                cash += amount
+                trades.append(self._make_item(date, 'DEPOSIT', amount))
+            elif dice < 0.05 and held_symbols:
+                amount = float(rnd.randint(1, 200))
+                cash += amount
+                trades.append(self._make_item(date, 'DIVIDEND', amount, rnd.choice(held_symbols)))
+            elif dice < 0.06 and cash > 1000:
+                amount = float(rnd.randint(1, 1000))
+                cash -= amount
+                trades.append(self._make_item(date, 'WITHDRAW', amount))
+            elif dice < 0.40 and held_symbols:
+                symbol = rnd.choice(held_symbols)
+                quantity = float(rnd.randint(1, int(holdings[symbol])))
+                price = round(rnd.uniform(10, 5000), 2)
+                holdings[symbol] -= quantity
+                if holdings[symbol] < 1:
+                    del holdings[symbol]
+                    held_symbols.remove(symbol)
+                cash += ((price / 100) * quantity) - 6.0
+                trades.append(self._make_item(date, 'SELL', quantity, symbol, price, 6.0, 0.0))
+            else:
+                symbol = rnd.choice(symbols)
+                quantity = float(rnd.randint(1, 500))
+                price = round(rnd.uniform(10, 5000), 2)
+                cost = (price / 100) * quantity
+                total = cost + ((0.5 * cost) / 100) + 6.0
+                if total > cash:
+                    cash += self.INITIAL_DEPOSIT
+                    trades.append(self._make_item(date, 'DEPOSIT', self.INITIAL_DEPOSIT))
+                    continue
+                if symbol not in holdings:
+                    holdings[symbol] = 0
+                    held_symbols.append(symbol)
+                holdings[symbol] += quantity
+                cash -= total
+                trades.append(self._make_item(date, 'BUY', quantity, symbol, price, 6.0, 0.5))
+        return {'trades': trades}
+
+    def _make_item(self, date, action, quantity, symbol='', price=0.0, fee=0.0, sdr=0.0):
+        return {
+            'date': date.strftime('%d/%m/%Y'),
+            'action': action,
+            'quantity': quantity,
+            'symbol': symbol,
+            'price': price,
+            'fee': fee,
+            'stamp_duty': sdr
+        }
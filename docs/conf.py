@@ -45,6 +45,9 @@ extensions = [
     'm2r'
 ]
 
+# Optional dependencies mocked so that the docs build without them
+autodoc_mock_imports = ['numpy']
+
 # Add any paths that contain templates here, relative to this directory.
 templates_path = ['_templates']
 
@@ -0,0 +1,317 @@
+import os
+import sys
+import queue
+import bisect
+import logging
+import threading
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+from Utils.Instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AlertsEngine():
+    """
+    Price alerts evaluated on each price update. Supported rules:
+
+        - **ABOVE**: the price rises to or above the given level
+        - **BELOW**: the price falls to or below the given level
+        - **MOVE**: the price moves by the given percentage from the reference
+          price, the rule is then armed again around the new price
+        - **STOP_LOSS**: the price falls by the given percentage below the
+          reference price (e.g. the open price of a holding)
+
+    The trigger levels of each symbol are kept in two sorted lists, levels
+    to be crossed upwards and downwards, so that an update only visits the
+    rules whose level has been crossed. Triggered alerts are notified and the
+    rules saved by a dispatcher thread, not to block the price updates.
+    """
+    KINDS = ['ABOVE', 'BELOW', 'MOVE', 'STOP_LOSS']
+
+    def __init__(self, filepath, notify=None):
+        """
+        Initialise
+
+            - **filepath**: the file storing the rules, supports the {home} placeholder
+            - **notify**: optional, function called by the dispatcher thread with
+              each triggered alert (see on_prices)
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        self.notify = notify
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._dispatcher = None
+        self._save_pending = False
+        self._clear()
+
+    def _clear(self):
+        # Rules by id: {"id": rule dict}
+        self._rules = {}
+        self._next_id = 1
+        # Trigger levels of each symbol: {"symbol": ([level], [rule id])}
+        self._above = {}
+        self._below = {}
+
+    def start(self):
+        """
+        Start the dispatcher thread
+        """
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name='AlertsDispatcher')
+            self._dispatcher.daemon = True
+            self._dispatcher.start()
+
+    def stop(self):
+        """
+        Dispatch the pending alerts and stop the dispatcher thread
+        """
+        if self._dispatcher is not None:
+            self._queue.put(None)
+            self._dispatcher.join()
+            self._dispatcher = None
+
+    def load(self):
+        """
+        Read the rules from the file, no rule is loaded if the file does not
+        exist or can't be read
+        """
+        with self._lock:
+            self._clear()
+            if not os.path.isfile(self.filepath):
+                return
+            data = Utils.load_json_file(self.filepath)
+            if data is None or not isinstance(data.get('rules'), list):
+                logger.error('AlertsEngine - unable to read {}'.format(self.filepath))
+                return
+            for rule in data['rules']:
+                try:
+                    self._add_rule(rule['symbol'], rule['kind'], rule['value'], rule.get('reference'))
+                except (KeyError, ValueError, TypeError) as e:
+                    logger.error('AlertsEngine - invalid rule {}: {}'.format(rule, e))
+        logger.info('AlertsEngine - loaded {} rules'.format(len(self._rules)))
+
+    def save(self):
+        """
+        Write the rules to the file, return True if succeeded
+        """
+        with self._lock:
+            rules = [{k: r[k] for k in ('symbol', 'kind', 'value', 'reference')}
+                     for r in self._rules.values()]
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        if not Utils.write_json_file(self.filepath, {'rules': rules}):
+            logger.error('AlertsEngine - unable to write {}'.format(self.filepath))
+            return False
+        return True
+
+    def add_rule(self, symbol, kind, value, reference=None):
+        """
+        Add an alert rule and return its id. Raise ValueError if the rule is not valid
+
+            - **symbol**: the symbol of the prices to check
+            - **kind**: one of KINDS
+            - **value**: the price level for ABOVE and BELOW, the percentage for
+              MOVE and STOP_LOSS
+            - **reference**: the reference price of MOVE and STOP_LOSS
+        """
+        with self._lock:
+            rule_id = self._add_rule(symbol, kind, value, reference)
+        self._request_save()
+        return rule_id
+
+    def remove_rule(self, rule_id):
+        """
+        Remove the rule with the given id, return False if it does not exist
+        """
+        with self._lock:
+            if rule_id not in self._rules:
+                return False
+            self._remove_levels(self._rules.pop(rule_id))
+        self._request_save()
+        return True
+
+    def get_queue_size(self):
+        """
+        Return the number of notifications and saves waiting to be dispatched
+        """
+        return self._queue.qsize()
+
+    def get_rules(self, symbol=None):
+        """
+        Return the list of rules, optionally of a symbol only, as dict
+        {"id", "symbol", "kind", "value", "reference", "above", "below"} where
+        above and below are the trigger levels of the rule or None
+        """
+        with self._lock:
+            return [dict(r) for r in self._rules.values() if symbol is None or r['symbol'] == symbol]
+
+    @metrics.timed('alerts_on_prices')
+    def on_prices(self, prices):
+        """
+        Check the rules against the new prices {"symbol": price} and return the
+        list of triggered alerts as dict {"rule", "price", "message"}. The
+        alerts are notified by the dispatcher thread. ABOVE, BELOW and
+        STOP_LOSS rules are removed once triggered
+        """
+        alerts = []
+        with self._lock:
+            for symbol, price in prices.items():
+                if price is None or (symbol not in self._above and symbol not in self._below):
+                    continue
+                triggered = self._pop_above(symbol, price) + self._pop_below(symbol, price)
+                for rule_id in triggered:
+                    rule = self._rules[rule_id]
+                    alerts.append({'rule': dict(rule), 'price': price,
+                                   'message': self._get_message(rule, price)})
+                    # Remove the other level of MOVE rules
+                    self._remove_levels(rule)
+                    if rule['kind'] == 'MOVE':
+                        # Arm the rule again around the new price
+                        rule['reference'] = price
+                        self._add_levels(rule)
+                    else:
+                        del self._rules[rule_id]
+        if len(alerts) > 0:
+            metrics.increment('alerts_triggered', len(alerts))
+            for alert in alerts:
+                self._queue.put(('notify', alert))
+            self._request_save()
+        return alerts
+
+    def _request_save(self):
+        """
+        Schedule the save of the rules in the dispatcher thread, unless already scheduled
+        """
+        with self._lock:
+            if self._save_pending:
+                return
+            self._save_pending = True
+        self._queue.put(('save', None))
+
+    def _dispatch(self):
+        """
+        Notify the triggered alerts and save the changed rules, executed by
+        the dispatcher thread
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            action, alert = item
+            try:
+                if action == 'notify':
+                    logger.info('AlertsEngine - {}'.format(alert['message']))
+                    if self.notify is not None:
+                        self.notify(alert)
+                else:
+                    with self._lock:
+                        self._save_pending = False
+                    self.save()
+            except Exception as e:
+                logger.error('AlertsEngine - unable to dispatch {}: {}'.format(action, e))
+
+    def _add_rule(self, symbol, kind, value, reference):
+        if kind not in self.KINDS:
+            raise ValueError('Invalid alert kind {}'.format(kind))
+        if not isinstance(symbol, str) or len(symbol) == 0:
+            raise ValueError('Invalid symbol {}'.format(symbol))
+        value = float(value)
+        if value <= 0 or (kind == 'STOP_LOSS' and value >= 100):
+            raise ValueError('Invalid alert value {}'.format(value))
+        if kind in ('MOVE', 'STOP_LOSS'):
+            if reference is None or float(reference) <= 0:
+                raise ValueError('A reference price is required by {} alerts'.format(kind))
+            reference = float(reference)
+        else:
+            reference = None
+        rule = {'id': self._next_id, 'symbol': symbol, 'kind': kind, 'value': value,
+                'reference': reference, 'above': None, 'below': None}
+        self._next_id += 1
+        self._rules[rule['id']] = rule
+        self._add_levels(rule)
+        return rule['id']
+
+    def _add_levels(self, rule):
+        """
+        Compute the trigger levels of the rule and insert them in the sorted lists
+        """
+        kind = rule['kind']
+        if kind == 'ABOVE':
+            rule['above'] = rule['value']
+        elif kind == 'BELOW':
+            rule['below'] = rule['value']
+        elif kind == 'MOVE':
+            rule['above'] = rule['reference'] * (1 + rule['value'] / 100)
+            rule['below'] = rule['reference'] * (1 - rule['value'] / 100)
+        else:
+            rule['below'] = rule['reference'] * (1 - rule['value'] / 100)
+        for level, levels in ((rule['above'], self._above), (rule['below'], self._below)):
+            if level is not None:
+                keys, ids = levels.setdefault(rule['symbol'], ([], []))
+                index = bisect.bisect_right(keys, level)
+                keys.insert(index, level)
+                ids.insert(index, rule['id'])
+
+    def _remove_levels(self, rule):
+        """
+        Remove the trigger levels of the rule still in the sorted lists
+        """
+        for level, levels in ((rule['above'], self._above), (rule['below'], self._below)):
+            if level is None or rule['symbol'] not in levels:
+                continue
+            keys, ids = levels[rule['symbol']]
+            index = bisect.bisect_left(keys, level)
+            while index < len(keys) and keys[index] == level:
+                if ids[index] == rule['id']:
+                    del keys[index]
+                    del ids[index]
+                    break
+                index += 1
+            if len(keys) == 0:
+                del levels[rule['symbol']]
+
+    def _pop_above(self, symbol, price):
+        """
+        Remove and return the ids of the rules with an upward level crossed by the price
+        """
+        if symbol not in self._above:
+            return []
+        keys, ids = self._above[symbol]
+        count = bisect.bisect_right(keys, price)
+        triggered = ids[:count]
+        del keys[:count]
+        del ids[:count]
+        if len(keys) == 0:
+            del self._above[symbol]
+        return triggered
+
+    def _pop_below(self, symbol, price):
+        """
+        Remove and return the ids of the rules with a downward level crossed by the price
+        """
+        if symbol not in self._below:
+            return []
+        keys, ids = self._below[symbol]
+        start = bisect.bisect_left(keys, price)
+        triggered = ids[start:]
+        del keys[start:]
+        del ids[start:]
+        if len(keys) == 0:
+            del self._below[symbol]
+        return triggered
+
+    @staticmethod
+    def _get_message(rule, price):
+        symbol = rule['symbol']
+        if rule['kind'] == 'ABOVE':
+            return '{} rose to {:.2f}, above {:.2f}'.format(symbol, price, rule['value'])
+        if rule['kind'] == 'BELOW':
+            return '{} fell to {:.2f}, below {:.2f}'.format(symbol, price, rule['value'])
+        if rule['kind'] == 'MOVE':
+            change = (price - rule['reference']) / rule['reference'] * 100
+            return '{} moved {:+.2f}% to {:.2f}'.format(symbol, change, price)
+        return '{} fell to {:.2f}, stop loss at {:.2f}'.format(symbol, price, rule['below'])
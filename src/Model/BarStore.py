@@ -0,0 +1,168 @@
+import os
+import sys
+import logging
+import sqlite3
+import datetime
+import threading
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+
+logger = logging.getLogger(__name__)
+
+
+class BarStore():
+    """
+    Local store of the daily bars (open, high, low, close, volume) of each
+    symbol in a SQLite database. The bars are clustered by symbol and date
+    so that the history of a symbol is read with a single range scan, and
+    only bars from the last stored date are appended so that a
+    refresh downloads the compact output unless the gap is too wide.
+    """
+    COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+    # Calendar days surely covered by the compact output (100 trading days)
+    COMPACT_DAYS = 100
+
+    def __init__(self, filepath):
+        """
+        Initialise
+
+            - **filepath**: the database file, supports the {home} placeholder
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        self._lock = threading.Lock()
+        self._connection = None
+        # Last stored date of each symbol, read once from the database
+        self._last_dates = None
+
+    def _connect(self):
+        """
+        Open the database creating the tables if required, called with the lock held
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            connection = sqlite3.connect(self.filepath, check_same_thread=False)
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL, date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, date)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY, last_date TEXT NOT NULL);
+            ''')
+            self._last_dates = {s: d for s, d in connection.execute(
+                'SELECT symbol, last_date FROM symbols')}
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        """
+        Close the database, it's opened again on the next access
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_symbols(self):
+        """
+        Return the sorted list of the symbols with stored bars
+        """
+        with self._lock:
+            self._connect()
+            return sorted(self._last_dates)
+
+    def get_last_date(self, symbol):
+        """
+        Return the date of the last stored bar of the symbol or None
+        """
+        with self._lock:
+            self._connect()
+            last = self._last_dates.get(symbol)
+        return None if last is None else datetime.datetime.strptime(last, '%Y-%m-%d').date()
+
+    def get_output_size(self, symbol, today=None):
+        """
+        Return the AlphaVantage output size required to fill the gap since
+        the last stored bar of the symbol: "compact" or "full"
+        """
+        last = self.get_last_date(symbol)
+        today = datetime.date.today() if today is None else today
+        if last is None or (today - last).days > self.COMPACT_DAYS:
+            return 'full'
+        return 'compact'
+
+    def append(self, symbol, bars):
+        """
+        Store the bars of the symbol from the last stored date on and return
+        the number of bars stored. The bar of the last stored date is replaced
+        since it may be the partial bar of a session not closed yet
+
+            - **bars**: list of tuples (date, open, high, low, close, volume) in any order
+        """
+        with self._lock:
+            connection = self._connect()
+            last = self._last_dates.get(symbol, '')
+            rows = sorted((b[0].isoformat(),) + tuple(b[1:]) for b in bars if b[0].isoformat() >= last)
+            if len(rows) == 0:
+                return 0
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        [(symbol,) + r for r in rows])
+                    connection.execute('INSERT OR REPLACE INTO symbols VALUES (?, ?)',
+                                       (symbol, rows[-1][0]))
+            except sqlite3.Error as e:
+                logger.error('BarStore - unable to store {} bars: {}'.format(symbol, e))
+                return 0
+            self._last_dates[symbol] = rows[-1][0]
+        logger.info('BarStore - stored {} bars of {}'.format(len(rows), symbol))
+        return len(rows)
+
+    def get_bars(self, symbol, start=None, end=None, corporate_actions=None):
+        """
+        Return the list of bars (date, open, high, low, close, volume) of the
+        symbol sorted by date, optionally between the start and end dates included.
+        The stored bars are never rewritten, if the CorporateActions are given
+        the bars read are adjusted by the actions effective after each of them
+        """
+        query = 'SELECT date, open, high, low, close, volume FROM bars WHERE symbol = ?'
+        params = [symbol]
+        if start is not None:
+            query += ' AND date >= ?'
+            params.append(start.isoformat())
+        if end is not None:
+            query += ' AND date <= ?'
+            params.append(end.isoformat())
+        with self._lock:
+            rows = self._connect().execute(query + ' ORDER BY date', params).fetchall()
+        bars = [(datetime.datetime.strptime(r[0], '%Y-%m-%d').date(),) + tuple(r[1:]) for r in rows]
+        if corporate_actions is not None:
+            bars = corporate_actions.adjust_bars(symbol, bars)
+        return bars
+
+    def get_closes(self, symbol, start=None, end=None, corporate_actions=None):
+        """
+        Return the list of tuples (date, close) of the symbol sorted by date,
+        optionally adjusted by the CorporateActions (see get_bars)
+        """
+        return [(b[0], b[4]) for b in self.get_bars(symbol, start, end, corporate_actions)]
+
+    @staticmethod
+    def parse_daily_series(data):
+        """
+        Return the list of bars of an AlphaVantage TIME_SERIES_DAILY response
+        sorted by date. Raise KeyError or ValueError if the data are not valid
+        """
+        bars = []
+        for date, values in data['Time Series (Daily)'].items():
+            bars.append((datetime.datetime.strptime(date, '%Y-%m-%d').date(),
+                         float(values['1. open']), float(values['2. high']),
+                         float(values['3. low']), float(values['4. close']),
+                         float(values['5. volume'])))
+        bars.sort()
+        return bars
@@ -0,0 +1,222 @@
+import os
+import sys
+import bisect
+import logging
+import datetime
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+
+logger = logging.getLogger(__name__)
+
+
+class CorporateActions():
+    """
+    Persistent corporate actions changing the shares of a symbol:
+
+        - **SPLIT**: each share becomes ratio shares, ratio greater than 1
+        - **CONSOLIDATION**: each share becomes ratio shares, ratio less than 1,
+          fractions of share are dropped
+        - **SYMBOL_CHANGE**: the shares are moved to the new symbol
+
+    An action is effective from the start of its date, before the trades of
+    the same day. The actions are indexed by effective date so that the ones
+    applying after a trade are found by bisection. The trades and the stored
+    daily bars are never rewritten, quantities and prices are adjusted when
+    the history is replayed or the bars are read
+    """
+    TYPES = ['SPLIT', 'CONSOLIDATION', 'SYMBOL_CHANGE']
+    DATE_FORMAT = '%d/%m/%Y'
+
+    def __init__(self, filepath):
+        """
+        Initialise
+
+            - **filepath**: the file storing the actions, supports the {home} placeholder
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        # Actions sorted by effective date, in insertion order within a date
+        self._actions = []
+        self._dates = []
+
+    def __len__(self):
+        return len(self._actions)
+
+    def load(self):
+        """
+        Read the actions from the file, no action is loaded if the file does
+        not exist or can't be read
+        """
+        self._actions = []
+        self._dates = []
+        if not os.path.isfile(self.filepath):
+            return
+        data = Utils.load_json_file(self.filepath)
+        if data is None or not isinstance(data.get('actions'), list):
+            logger.error('CorporateActions - unable to read %s', self.filepath)
+            return
+        for item in data['actions']:
+            try:
+                self._insert(self.build_action(
+                    datetime.datetime.strptime(item['date'], self.DATE_FORMAT).date(),
+                    item['type'], item['symbol'], item.get('ratio'), item.get('new_symbol')))
+            except (KeyError, ValueError, TypeError) as e:
+                logger.error('CorporateActions - invalid action %s: %s', item, e)
+        logger.info('CorporateActions - loaded %s actions', len(self._actions))
+
+    def save(self):
+        """
+        Write the actions to the file, return True if succeeded
+        """
+        actions = [dict(a, date=a['date'].strftime(self.DATE_FORMAT)) for a in self._actions]
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        if not Utils.write_json_file(self.filepath, {'actions': actions}):
+            logger.error('CorporateActions - unable to write %s', self.filepath)
+            return False
+        return True
+
+    def add(self, date, kind, symbol, ratio=None, new_symbol=None):
+        """
+        Add an action and save the actions, return the action dict. Raise
+        ValueError if the action is not valid and RuntimeError if the actions
+        can't be saved. A Portfolio replaying the actions must be reloaded
+
+            - **date**: the effective date
+            - **kind**: one of TYPES
+            - **symbol**: the symbol of the shares
+            - **ratio**: new shares for each share of SPLIT and CONSOLIDATION
+            - **new_symbol**: the symbol of the shares after a SYMBOL_CHANGE
+        """
+        action = self.build_action(date, kind, symbol, ratio, new_symbol)
+        position = self._insert(action)
+        if not self.save():
+            del self._actions[position]
+            del self._dates[position]
+            raise RuntimeError('Unable to save the corporate actions')
+        logger.info('CorporateActions - added %s of %s', kind, symbol)
+        return action
+
+    def remove(self, position):
+        """
+        Remove the action at the given position and save the actions. Raise
+        IndexError if the position is not valid and RuntimeError if the
+        actions can't be saved
+        """
+        action = self._actions.pop(position)
+        del self._dates[position]
+        if not self.save():
+            self._insert(action)
+            raise RuntimeError('Unable to save the corporate actions')
+        logger.info('CorporateActions - removed %s of %s', action['type'], action['symbol'])
+        return action
+
+    @classmethod
+    def build_action(cls, date, kind, symbol, ratio=None, new_symbol=None):
+        """
+        Return the dict of a valid action, raise ValueError otherwise
+        """
+        if kind not in cls.TYPES:
+            raise ValueError('Invalid corporate action {}'.format(kind))
+        if not isinstance(symbol, str) or len(symbol) == 0:
+            raise ValueError('Invalid symbol {}'.format(symbol))
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        if kind == 'SYMBOL_CHANGE':
+            if not isinstance(new_symbol, str) or len(new_symbol) == 0 or new_symbol == symbol:
+                raise ValueError('Invalid new symbol {}'.format(new_symbol))
+            return {'date': date, 'type': kind, 'symbol': symbol, 'new_symbol': new_symbol}
+        ratio = float(ratio)
+        if kind == 'SPLIT' and not ratio > 1 or kind == 'CONSOLIDATION' and not 0 < ratio < 1:
+            raise ValueError('Invalid {} ratio {}'.format(kind.lower(), ratio))
+        return {'date': date, 'type': kind, 'symbol': symbol, 'ratio': ratio}
+
+    def _insert(self, action):
+        position = bisect.bisect_right(self._dates, action['date'])
+        self._dates.insert(position, action['date'])
+        self._actions.insert(position, action)
+        return position
+
+    def get_position(self, date):
+        """
+        Return the number of actions effective on or before the date
+        """
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        return bisect.bisect_right(self._dates, date)
+
+    def get_actions(self, start=0, end=None):
+        """
+        Return the list of the actions sorted by effective date, optionally
+        from position start to position end excluded (see get_position)
+        """
+        return self._actions[start:end]
+
+    def get_former_symbols(self, symbol, end=None):
+        """
+        Return the list of the symbols whose shares were moved to the symbol
+        by the actions before position end, the most recent first
+        """
+        symbols = []
+        targets = {symbol}
+        for action in reversed(self._actions[:end]):
+            if action['type'] == 'SYMBOL_CHANGE' and action['new_symbol'] in targets:
+                targets.add(action['symbol'])
+                symbols.append(action['symbol'])
+        return symbols
+
+    def get_factor(self, symbol, date, end=None):
+        """
+        Return a tuple (factor, symbol) with the number of shares and the
+        symbol that one share of the symbol held on the date becomes after
+        the actions effective later, up to position end excluded
+        """
+        factor = 1.0
+        for action in self._actions[self.get_position(date):end]:
+            if action['symbol'] != symbol:
+                continue
+            if action['type'] == 'SYMBOL_CHANGE':
+                symbol = action['new_symbol']
+            else:
+                factor *= action['ratio']
+        return factor, symbol
+
+    def adjust_lot(self, symbol, date, quantity, price, end=None):
+        """
+        Return the tuple (quantity, price) of a lot bought on the date adjusted
+        by the actions effective later, up to position end excluded. The cost
+        of the lot does not change
+        """
+        factor, _ = self.get_factor(symbol, date, end)
+        return quantity * factor, price / factor
+
+    def adjust_bars(self, symbol, bars):
+        """
+        Return the daily bars (date, open, high, low, close, volume) sorted by
+        date adjusted by the actions effective after each bar, so that the
+        prices are comparable to the current ones
+        """
+        adjusted = []
+        # The factor changes only across the effective dates
+        factors = {}
+        for bar in bars:
+            position = self.get_position(bar[0])
+            if position not in factors:
+                factors[position] = self.get_factor(symbol, bar[0])[0]
+            factor = factors[position]
+            if factor == 1.0:
+                adjusted.append(bar)
+            else:
+                adjusted.append((bar[0],) + tuple(p / factor if p is not None else None for p in bar[1:5])
+                                + (bar[5] * factor if bar[5] is not None else None,))
+        return adjusted
+
+    @staticmethod
+    def adjust_quantity(quantity, ratio):
+        """
+        Return the whole shares held after a SPLIT or CONSOLIDATION
+        """
+        # Tolerance of the floating point ratios, e.g. 30 * (1 / 3)
+        return int(quantity * ratio + 1e-9)
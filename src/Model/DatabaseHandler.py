@@ -1,20 +1,32 @@
 import os
 import sys
-import inspect
+import json
 import logging
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from Utils.Utils import Utils
 from Utils.Trade import Trade
+from Utils.Instrumentation import metrics
+from .TradeIndex import TradeIndex
+
+logger = logging.getLogger(__name__)
 
 class DatabaseHandler():
     """
-    Handles the IO operation with the database to handle persistent data
+    Handles the IO operation with the database to handle persistent data.
+    Changes to the trade history are appended to a journal file next to the
+    database, one json record per line, so that a change persists only the
+    changed trade. The journal is merged into the database when the whole
+    database is written
     """
+    # Extension of the journal file appended to the database filepath
+    JOURNAL_SUFFIX = '.journal'
+    # Number of journal records that triggers the rewrite of the database
+    JOURNAL_COMPACT_SIZE = 1000
+
     def __init__(self, config):
         """
         Initialise
@@ -25,33 +37,134 @@ class DatabaseHandler():
         os.makedirs(os.path.dirname(self.db_filepath), exist_ok=True)
         # Create an empty list to store trades from database
         self.trading_history = []
-        logging.info('DatabaseHandler initialised')
+        # Symbol and date indexes of the trading history
+        self.trade_index = TradeIndex(self.trading_history)
+        # Number of records in the journal of the database
+        self.journal_size = 0
+        logger.info('DatabaseHandler initialised')
+
+    # Number of trades notified at a time while reading the database
+    READ_CHUNK_SIZE = 500
 
-    def read_data(self, filepath=None):
+    @metrics.timed('db_read_data')
+    def read_data(self, filepath=None, on_trades=None):
         """
-        Read the trade history from the json database and return the list of trades
+        Read the trade history from the json database and return the list of trades.
+        The file is parsed incrementally and the trades can be notified while parsed.
+        The changes recorded in the journal are applied to the trades read.
+        A missing database gives an empty history, raise IOError or ValueError
+        if the database can't be read
 
             - **filepath**: optional, if not set the configured path will be used
+            - **on_trades**: optional, function called with each chunk of parsed trades
         """
         path = filepath.replace('{home}', Utils.get_home_path()) if filepath is not None else self.db_filepath
-        logging.info('DatabaseHandler - reading data from {}'.format(path))
+        logger.info('DatabaseHandler - reading data from {}'.format(path))
         self.db_filepath = path
-        json_obj = Utils.load_json_file(path)
+        self.journal_size = 0
         self.trading_history.clear()
-        if json_obj is not None:
+        self.trade_index = TradeIndex(self.trading_history)
+        if not os.path.isfile(path):
+            logger.info('DatabaseHandler - {} not found, the trade history is empty'.format(path))
+            return
+        chunk = []
+        try:
             # Create a list of all the trades in the json file
-            for item in json_obj['trades']:
-                trade = Trade.from_dict(item)
+            for trade in self.iter_trades(path):
                 # Store the list internally
                 self.trading_history.append(trade)
+                if on_trades is not None:
+                    chunk.append(trade)
+                    if len(chunk) >= self.READ_CHUNK_SIZE:
+                        on_trades(chunk)
+                        chunk = []
+        except (IOError, ValueError) as e:
+            logger.error('DatabaseHandler - unable to read {}: {}'.format(path, e))
+            self.trading_history.clear()
+            self.trade_index = TradeIndex(self.trading_history)
+            raise
+        self.trade_index = TradeIndex(self.trading_history)
+        if on_trades is not None and len(chunk) > 0:
+            on_trades(chunk)
+
+    def iter_trades(self, filepath=None):
+        """
+        Yield one at a time the trades of the json database without storing
+        them, so that huge trading logs can be processed in constant memory.
+        If the database has a journal the trades are loaded in memory to apply
+        the recorded changes. Raise IOError or ValueError if the database can't be read
+
+            - **filepath**: optional, if not set the configured path will be used
+        """
+        path = filepath.replace('{home}', Utils.get_home_path()) if filepath is not None else self.db_filepath
+        trades = (Trade.from_dict(item) for item in Utils.iter_json_array(path, 'trades'))
+        journal_path = self.get_journal_filepath(path)
+        if not os.path.isfile(journal_path):
+            yield from trades
+            return
+        trades = list(trades)
+        count = self._replay_journal(journal_path, trades)
+        if path == self.db_filepath:
+            self.journal_size = count
+        yield from trades
+
+    def _replay_journal(self, journal_path, trades):
+        """
+        Apply the changes recorded in the journal to the trade list and return
+        the number of records applied. A truncated or invalid record, e.g. of
+        an interrupted write, ends the replay
+        """
+        count = 0
+        with open(journal_path, 'r') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    index = record['index']
+                    if record['op'] == 'insert':
+                        if index < 0 or index > len(trades):
+                            raise IndexError('index {} out of range'.format(index))
+                        trades.insert(index, Trade.from_dict(record['trade']))
+                    elif record['op'] == 'update':
+                        trades[index] = Trade.from_dict(record['trade'])
+                    elif record['op'] == 'delete':
+                        del trades[index]
+                    else:
+                        raise ValueError('unknown operation {}'.format(record['op']))
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    logger.error('DatabaseHandler - invalid journal record {} of {}: {}'.format(
+                        count + 1, journal_path, e))
+                    break
+                count += 1
+        logger.info('DatabaseHandler - applied {} journal records'.format(count))
+        return count
 
+    def _append_journal(self, record):
+        """
+        Append a change record to the journal of the database, the whole database
+        is written instead when the journal is too long. Raise RuntimeError if
+        the change can't be persisted
+        """
+        if self.journal_size + 1 >= self.JOURNAL_COMPACT_SIZE:
+            # The change is already applied to the history
+            if not self.write_data():
+                raise RuntimeError('Unable to write the database')
+            return
+        try:
+            with open(self.get_journal_filepath(), 'a') as file:
+                file.write(json.dumps(record) + '\n')
+            self.journal_size += 1
+        except IOError as e:
+            logger.error('DatabaseHandler - unable to write the journal: {}'.format(e))
+            raise RuntimeError('Unable to write the database journal')
 
+    @metrics.timed('db_write_data')
     def write_data(self, filepath=None):
         """
-        Write the trade history to the database
+        Write the trade history to the database, the journal of the written
+        file is removed
         """
         path = filepath.replace('{home}', Utils.get_home_path()) if filepath is not None else self.db_filepath
-        logging.info('DatabaseHandler - writing data to {}'.format(path))
+        logger.info('DatabaseHandler - writing data to {}'.format(path))
         # Create a json object and store the trade history into it
         json_obj = {
             'trades': []
@@ -59,7 +172,15 @@ class DatabaseHandler():
         for t in self.trading_history:
             json_obj['trades'].append(t.to_dict())
         # Write to file
-        return Utils.write_json_file(path, json_obj)
+        if not Utils.write_json_file(path, json_obj):
+            return False
+        # The journal of the file is superseded by the written history
+        journal_path = self.get_journal_filepath(path)
+        if os.path.isfile(journal_path):
+            os.remove(journal_path)
+        if path == self.db_filepath:
+            self.journal_size = 0
+        return True
 
     def get_db_filepath(self):
         """
@@ -67,30 +188,131 @@ class DatabaseHandler():
         """
         return self.db_filepath
 
+    def get_journal_filepath(self, filepath=None):
+        """
+        Return the filepath of the journal of the given database, default the configured one
+        """
+        return '{}{}'.format(filepath if filepath is not None else self.db_filepath,
+                             self.JOURNAL_SUFFIX)
+
     def get_trades_list(self):
         """
         Return the list of trades stored in the db
         """
         return self.trading_history
 
+    def get_trade_index(self):
+        """
+        Return the TradeIndex of the trades stored in the db
+        """
+        return self.trade_index
+
+    def get_trades_by_symbol(self, symbol, start=None, end=None):
+        """
+        Return a TradeSlice of the trades of the given symbol. If a date range
+        is given the trades are sorted by date, otherwise they are in the
+        history order
+
+            - **symbol**: the symbol of the trades
+            - **start**: optional, first date of the range (included)
+            - **end**: optional, last date of the range (included)
+        """
+        if start is None and end is None:
+            return self.trade_index.get_symbol_trades(symbol)
+        return self.trade_index.get_trades_between(start, end, symbol)
+
+    def get_trades_by_date(self, start=None, end=None):
+        """
+        Return a TradeSlice of the trades with date in the given range sorted by date
+
+            - **start**: optional, first date of the range (included)
+            - **end**: optional, last date of the range (included)
+        """
+        return self.trade_index.get_trades_between(start, end)
+
     def add_trade(self, trade):
         """
-        Add a trade to the database
+        Add a trade at the end of the database
         """
+        self.insert_trade(len(self.trading_history), trade)
+
+    def insert_trade(self, index, trade):
+        """
+        Insert a trade in the database at the given position of the history
+        """
+        if index < 0 or index > len(self.trading_history):
+            raise RuntimeError('Invalid trade position {}'.format(index))
         try:
-            self.trading_history.append(trade)
-            logging.info('DatabaseHandler - adding trade {}'.format(trade))
+            self.trading_history.insert(index, trade)
+            self.trade_index.insert(index)
+            logger.info('DatabaseHandler - adding trade %s at %s', trade, index)
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
             raise RuntimeError('Unable to add trade to the database')
+        try:
+            self._append_journal({'op': 'insert', 'index': index, 'trade': trade.to_dict()})
+        except RuntimeError:
+            self.trade_index.remove(index)
+            del self.trading_history[index]
+            raise
+
+    def update_trade(self, index, trade):
+        """
+        Replace the trade at the given position of the history and return the old one
+        """
+        if index < 0 or index >= len(self.trading_history):
+            raise RuntimeError('Invalid trade position {}'.format(index))
+        old_trade = self.trading_history[index]
+        self.trading_history[index] = trade
+        self.trade_index.replace(index, old_trade)
+        try:
+            self._append_journal({'op': 'update', 'index': index, 'trade': trade.to_dict()})
+        except RuntimeError:
+            self.trading_history[index] = old_trade
+            self.trade_index.replace(index, trade)
+            raise
+        logger.info('DatabaseHandler - updated trade at %s with %s', index, trade)
+        return old_trade
+
+    def delete_trade(self, index):
+        """
+        Remove the trade at the given position of the history and return it
+        """
+        if index < 0 or index >= len(self.trading_history):
+            raise RuntimeError('Invalid trade position {}'.format(index))
+        trade = self.trading_history[index]
+        self.trade_index.remove(index)
+        del self.trading_history[index]
+        try:
+            self._append_journal({'op': 'delete', 'index': index})
+        except RuntimeError:
+            self.trading_history.insert(index, trade)
+            self.trade_index.insert(index)
+            raise
+        logger.info('DatabaseHandler - removed trade at %s', index)
+        return trade
+
+    def add_trades(self, trades):
+        """
+        Add a batch of trades to the database and write it in a single
+        transaction: if the database can't be written none of the trades is added
+        """
+        size = len(self.trading_history)
+        self.trading_history.extend(trades)
+        self.trade_index.extend(len(trades))
+        if not self.write_data():
+            for _ in range(len(trades)):
+                self.trade_index.pop()
+            del self.trading_history[size:]
+            logger.error('DatabaseHandler - unable to commit {} trades'.format(len(trades)))
+            raise RuntimeError('Unable to add trades to the database')
+        logger.info('DatabaseHandler - added %s trades', len(trades))
 
     def remove_last_trade(self):
         """
         Remove the last trade from the trade history
         """
-        try:
-            del self.trading_history[-1]
-            logging.info('DatabaseHandler - removed last trade')
-        except Exception as e:
-            logging.error(e)
+        if len(self.trading_history) == 0:
+            logger.error('DatabaseHandler - the trade history is empty')
             raise RuntimeError('Unable to delete last trade')
+        self.delete_trade(len(self.trading_history) - 1)
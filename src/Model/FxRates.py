@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import threading
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import BASE_CURRENCY
+
+
+class FxRates():
+    """
+    Cache of the exchange rates to the base currency. Each rate expires after
+    the configured time to live, expired rates are still served until they
+    are fetched again.
+    """
+    # Prefix of the exchange rates stored in the PriceCache
+    CACHE_PREFIX = 'FX:'
+
+    def __init__(self, ttl):
+        """
+        Initialise
+
+            - **ttl**: time to live of the rates in seconds
+        """
+        self.ttl = ttl
+        # Cached rates: {"currency": (rate, timestamp)}
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def get_rate(self, currency):
+        """
+        Return the rate of the currency or None if not available
+        """
+        if currency == BASE_CURRENCY:
+            return 1.0
+        with self._lock:
+            entry = self._rates.get(currency)
+        return entry[0] if entry is not None else None
+
+    def get_rates(self):
+        """
+        Return all the available rates as dict {"currency": rate}
+        """
+        with self._lock:
+            rates = {c: e[0] for c, e in self._rates.items()}
+        rates[BASE_CURRENCY] = 1.0
+        return rates
+
+    def set_rate(self, currency, rate, timestamp=None):
+        """
+        Store the rate of the currency, fetched at the given time (default now)
+        """
+        with self._lock:
+            self._rates[currency] = (rate, time.time() if timestamp is None else timestamp)
+
+    def get_expired(self, currencies):
+        """
+        Return the list of the given currencies whose rate is missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            return [c for c in sorted(set(currencies)) if c != BASE_CURRENCY and
+                    (c not in self._rates or now - self._rates[c][1] >= self.ttl)]
+
+    def load_cache_entries(self, entries):
+        """
+        Store the rates found in the PriceCache entries keeping their timestamps
+        """
+        for key, entry in entries.items():
+            if key.startswith(self.CACHE_PREFIX):
+                self.set_rate(key[len(self.CACHE_PREFIX):], entry['price'], entry['timestamp'])
+
+    def to_cache_prices(self, currencies):
+        """
+        Return the rates of the given currencies as PriceCache prices
+        """
+        rates = self.get_rates()
+        return {self.CACHE_PREFIX + c: rates[c] for c in currencies if c in rates}
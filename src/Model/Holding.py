@@ -1,76 +1,88 @@
 import os
-import inspect
 import sys
 import logging
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+logger = logging.getLogger(__name__)
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
 class Holding():
+    """
+    View on a row of a HoldingsTable. A Holding created directly is stored in
+    a private table, Holdings of a Portfolio share the Portfolio table.
+    """
+    __slots__ = ('_table', '_symbol')
 
     def __init__(self, symbol, quantity, open_price=None):
         if quantity is None or quantity < 1:
-            logging.error('Holding - init: Invalid quantity')
+            logger.error('Holding - init: Invalid quantity')
             raise ValueError("Invalid quantity")
         if open_price is not None and open_price < 0:
-            logging.error('Holding - init: Invalid open_price')
+            logger.error('Holding - init: Invalid open_price')
             raise ValueError('Invalid open_price')
+        from .HoldingsTable import HoldingsTable
+        self._table = HoldingsTable()
+        self._table.insert(symbol, quantity, open_price)
         self._symbol = symbol
-        self._quantity = quantity
-        self._openPrice = open_price
-        self._lastPrice = None
-        self._lastPriceValid = False
 
     def set_last_price(self, price):
         if price is None or price < 0:
-            logging.error('Holding - set_last_price: Invalid price')
+            logger.error('Holding - set_last_price: Invalid price')
             raise ValueError("Invalid price")
-        self._lastPrice = price
-        self._lastPriceValid = True
+        self._table.set_last_price(self._symbol, price)
 
     def set_open_price(self, price):
         if price is None or price < 0:
-            logging.error('Holding - set_open_price: Invalid price')
+            logger.error('Holding - set_open_price: Invalid price')
             raise ValueError("Invalid price")
-        self._openPrice = price
+        self._table.set_open_price(self._symbol, price)
 
     def set_quantity(self, value):
         if value is None or value < 1:
-            logging.error('Holding - set_quantity: Invalid quantity')
+            logger.error('Holding - set_quantity: Invalid quantity')
             raise ValueError("Invalid quantity")
-        self._quantity = value
+        self._table.set_quantity(self._symbol, value)
 
     def add_quantity(self, value):
         """
         Add or subtract (if value is negative) the value to the holding quantity
         """
-        self._quantity += value
+        self._table.set_quantity(self._symbol, self._table.get_quantity(self._symbol) + value)
 
     def set_last_price_invalid(self):
-        self._lastPriceValid = False
+        self._table.set_last_price_invalid(self._symbol)
 
     def get_symbol(self):
         return self._symbol
 
     def get_last_price(self):
-        return self._lastPrice
+        return self._table.get_last_price(self._symbol)
 
     def get_open_price(self):
-        return self._openPrice
+        return self._table.get_open_price(self._symbol)
 
     def get_quantity(self):
-        return self._quantity
+        return self._table.get_quantity(self._symbol)
+
+    def get_currency(self):
+        """Return the currency of the holding prices"""
+        return self._table.get_currency(self._symbol)
 
     def get_cost(self):
-        if self._openPrice is None:
+        open_price = self.get_open_price()
+        divisor = self._table.get_divisor(self._symbol)
+        if open_price is None or divisor is None:
             return None
-        return self._quantity * (self._openPrice/100) # £
+        return self.get_quantity() * (open_price/divisor) # £
 
     def get_value(self):
-        if self._lastPrice is None:
+        last_price = self.get_last_price()
+        divisor = self._table.get_divisor(self._symbol)
+        if last_price is None or divisor is None:
             return None
-        return self._quantity * (self._lastPrice/100) # £
+        return self.get_quantity() * (last_price/divisor) # £
 
     def get_profit_loss(self):
         value = self.get_value()
@@ -84,7 +96,7 @@ class Holding():
         cost = self.get_cost()
         if pl is None or cost is None:
             return None
-        return (self.get_profit_loss() / self.get_cost()) * 100
+        return (pl / cost) * 100
 
     def get_last_price_valid(self):
-        return self._lastPriceValid
+        return self._table.get_last_price_valid(self._symbol)
@@ -0,0 +1,303 @@
+import os
+import sys
+import math
+import bisect
+import operator
+import threading
+from array import array
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from .Holding import Holding
+from Utils.Utils import Utils, BASE_CURRENCY
+
+NAN = float('nan')
+
+class HoldingsTable():
+    """
+    Compact storage of holdings as a struct of arrays. Each holding is a row
+    of the arrays, rows are not ordered and removal moves the last row in the
+    freed slot. A sorted index of the symbols is maintained on insert and
+    delete so the holdings can be listed alphabetically without sorting.
+    Holding instances returned by the table are views on its rows.
+    Prices are in the units of the market of each symbol, costs and values
+    are converted in the base currency dividing by the divisor of each row:
+    the price units per currency unit over the exchange rate of the currency.
+    The rows are inserted and removed under a lock shared with the bulk updates
+    of the prices and exchange rates, which may run on the price update thread.
+    """
+
+    def __init__(self, fx_rates=None):
+        self._lock = threading.RLock()
+        # Exchange rates to the base currency: {"currency": rate}
+        self._fx_rates = {BASE_CURRENCY: 1.0}
+        if fx_rates is not None:
+            self._fx_rates.update(fx_rates)
+        self._init_rows()
+
+    def _init_rows(self):
+        # Symbols sorted alphabetically
+        self._sorted_symbols = []
+        # Row index of each symbol: {"symbol": row}
+        self._rows = {}
+        # Columns of the table
+        self._symbols = []
+        self._quantities = array('d')
+        self._open_prices = array('d')  # NaN if not available
+        self._last_prices = array('d')  # NaN if not available
+        self._last_valid = array('b')
+        self._currencies = []
+        self._divisors = array('d')  # NaN if the exchange rate is not available
+        self._views = []
+        # Number of rows with missing open or last price
+        self._missing_open = 0
+        self._missing_last = 0
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def __getitem__(self, symbol):
+        return self._views[self._rows[symbol]]
+
+    def __delitem__(self, symbol):
+        self.remove(symbol)
+
+    def insert(self, symbol, quantity, open_price=None):
+        """
+        Add a new row to the table and return the Holding view on it
+        """
+        view = Holding.__new__(Holding)
+        view._table = self
+        view._symbol = symbol
+        currency, scale = Utils.get_symbol_currency(symbol)
+        with self._lock:
+            if symbol in self._rows:
+                raise ValueError('Holding already exists')
+            self._rows[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+            self._quantities.append(quantity)
+            self._open_prices.append(NAN if open_price is None else open_price)
+            self._last_prices.append(NAN)
+            self._last_valid.append(0)
+            self._currencies.append(currency)
+            self._divisors.append(self._get_divisor(currency, scale))
+            self._views.append(view)
+            if open_price is None:
+                self._missing_open += 1
+            self._missing_last += 1
+            bisect.insort(self._sorted_symbols, symbol)
+        return view
+
+    def remove(self, symbol):
+        """
+        Remove the row of the given symbol
+        """
+        with self._lock:
+            row = self._rows.pop(symbol)
+            if self._open_prices[row] != self._open_prices[row]:
+                self._missing_open -= 1
+            if self._last_prices[row] != self._last_prices[row]:
+                self._missing_last -= 1
+            last = len(self._symbols) - 1
+            if row != last:
+                # Move the last row in the freed slot
+                moved = self._symbols[last]
+                self._symbols[row] = moved
+                self._quantities[row] = self._quantities[last]
+                self._open_prices[row] = self._open_prices[last]
+                self._last_prices[row] = self._last_prices[last]
+                self._last_valid[row] = self._last_valid[last]
+                self._currencies[row] = self._currencies[last]
+                self._divisors[row] = self._divisors[last]
+                self._views[row] = self._views[last]
+                self._rows[moved] = row
+            self._symbols.pop()
+            self._quantities.pop()
+            self._open_prices.pop()
+            self._last_prices.pop()
+            self._last_valid.pop()
+            self._currencies.pop()
+            self._divisors.pop()
+            self._views.pop()
+            del self._sorted_symbols[bisect.bisect_left(self._sorted_symbols, symbol)]
+
+    def clear(self):
+        """
+        Remove all the rows, the exchange rates are kept
+        """
+        with self._lock:
+            self._init_rows()
+
+    def keys(self):
+        """
+        Return the symbols sorted alphabetically
+        """
+        return list(self._sorted_symbols)
+
+    def values(self):
+        """
+        Return the Holding views sorted by symbol
+        """
+        with self._lock:
+            return [self._views[self._rows[s]] for s in self._sorted_symbols]
+
+    def get_quantity(self, symbol):
+        with self._lock:
+            value = self._quantities[self._rows[symbol]]
+        # Whole share quantities are returned as int as they were given
+        return int(value) if value.is_integer() else value
+
+    def set_quantity(self, symbol, value):
+        with self._lock:
+            self._quantities[self._rows[symbol]] = value
+
+    def get_open_price(self, symbol):
+        with self._lock:
+            value = self._open_prices[self._rows[symbol]]
+        return None if value != value else value
+
+    def set_open_price(self, symbol, value):
+        with self._lock:
+            row = self._rows[symbol]
+            if self._open_prices[row] != self._open_prices[row]:
+                self._missing_open -= 1
+            self._open_prices[row] = value
+
+    def get_last_price(self, symbol):
+        with self._lock:
+            value = self._last_prices[self._rows[symbol]]
+        return None if value != value else value
+
+    def set_last_price(self, symbol, value):
+        with self._lock:
+            row = self._rows[symbol]
+            if self._last_prices[row] != self._last_prices[row]:
+                self._missing_last -= 1
+            self._last_prices[row] = value
+            self._last_valid[row] = 1
+
+    def set_last_prices(self, prices):
+        """
+        Set the last price of the holdings in the given dictionary {"symbol": price}
+        ignoring the symbols not in the table. Return the list of updated symbols
+        """
+        updated = []
+        with self._lock:
+            for symbol, price in prices.items():
+                row = self._rows.get(symbol)
+                if row is None:
+                    continue
+                if price is None or price < 0:
+                    raise ValueError("Invalid price")
+                if self._last_prices[row] != self._last_prices[row]:
+                    self._missing_last -= 1
+                self._last_prices[row] = price
+                self._last_valid[row] = 1
+                updated.append(symbol)
+        return updated
+
+    def get_currency(self, symbol):
+        with self._lock:
+            return self._currencies[self._rows[symbol]]
+
+    def get_divisor(self, symbol):
+        with self._lock:
+            value = self._divisors[self._rows[symbol]]
+        return None if value != value else value
+
+    def get_fx_rates(self):
+        """
+        Return the exchange rates to the base currency {"currency": rate}
+        """
+        return dict(self._fx_rates)
+
+    def set_fx_rates(self, rates):
+        """
+        Update the exchange rates to the base currency {"currency": rate} and
+        recompute the divisors of all the rows in a single pass.
+        Return the list of symbols whose divisor changed
+        """
+        with self._lock:
+            if all(self._fx_rates.get(c) == r for c, r in rates.items()):
+                return []
+            self._fx_rates.update(rates)
+            self._fx_rates[BASE_CURRENCY] = 1.0
+            # Divisor of each market, computed once
+            divisors = {}
+            updated = []
+            for row, symbol in enumerate(self._symbols):
+                market = symbol.split(':')[0]
+                if market not in divisors:
+                    divisors[market] = self._get_divisor(*Utils.get_symbol_currency(symbol))
+                divisor = divisors[market]
+                old = self._divisors[row]
+                if divisor != old and not (divisor != divisor and old != old):
+                    self._divisors[row] = divisor
+                    updated.append(self._symbols[row])
+        return updated
+
+    def _get_divisor(self, currency, scale):
+        rate = self._fx_rates.get(currency)
+        if rate is None or rate <= 0:
+            return NAN
+        return scale / rate
+
+    def get_last_price_valid(self, symbol):
+        with self._lock:
+            return bool(self._last_valid[self._rows[symbol]])
+
+    def set_last_price_invalid(self, symbol):
+        with self._lock:
+            self._last_valid[self._rows[symbol]] = 0
+
+    def get_total_value(self):
+        """
+        Return the value of all the holdings in £ or None if a price or an
+        exchange rate is missing
+        """
+        if self._missing_last > 0:
+            return None
+        with self._lock:
+            total = math.fsum(map(operator.truediv, map(operator.mul, self._quantities, self._last_prices),
+                                  self._divisors))
+        return None if total != total else total
+
+    def get_total_cost(self):
+        """
+        Return the cost of all the holdings in £, at the current exchange rates,
+        or None if an open price or an exchange rate is missing
+        """
+        if self._missing_open > 0:
+            return None
+        with self._lock:
+            total = math.fsum(map(operator.truediv, map(operator.mul, self._quantities, self._open_prices),
+                                  self._divisors))
+        return None if total != total else total
+
+    def get_valuation(self, symbol):
+        """
+        Return a tuple (value, cost) in £ of the holding where missing data is None
+        """
+        with self._lock:
+            row = self._rows[symbol]
+            value = (self._quantities[row] * self._last_prices[row]) / self._divisors[row]
+            cost = (self._quantities[row] * self._open_prices[row]) / self._divisors[row]
+        return (None if value != value else value, None if cost != cost else cost)
+
+    def get_valuations(self):
+        """
+        Return a dictionary with the value and cost in £ of each holding:
+        {"symbol": (value, cost)} where missing data is None
+        """
+        with self._lock:
+            values = map(operator.truediv, map(operator.mul, self._quantities, self._last_prices),
+                         self._divisors)
+            costs = map(operator.truediv, map(operator.mul, self._quantities, self._open_prices),
+                        self._divisors)
+            return {s: (None if v != v else v, None if c != c else c)
+                    for s, v, c in zip(self._symbols, values, costs)}
@@ -0,0 +1,93 @@
+import os
+import sys
+import logging
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from .PriceHistory import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+
+class OfflinePriceGetter():
+    """
+    Drop-in replacement of StockPriceGetter that never accesses the network
+    and serves a fixed set of prices. Used when the Portfolio is built for
+    reporting or batch processing and the live prices thread is not needed.
+    """
+
+    def __init__(self, prices=None, fx_rates=None, history_size=1, bar_store=None):
+        """
+        Initialise
+
+            - **prices**: optional, dict of prices {"symbol": price}
+            - **fx_rates**: optional, dict of exchange rates to the base currency {"currency": rate}
+            - **history_size**: optional, the number of prices stored for each symbol
+            - **bar_store**: optional, BarStore of the daily bars
+        """
+        self.lastData = dict(prices) if prices is not None else {}
+        self.priceHistory = PriceHistory(history_size)
+        self.priceHistory.append_prices(self.lastData)
+        self.barStore = bar_store
+        self.fxRates = dict(fx_rates) if fx_rates is not None else {}
+        self.symbolList = []
+        self.watchList = []
+        logger.info('OfflinePriceGetter initialised')
+
+    def start(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def join(self):
+        pass
+
+    def enable(self, enabled):
+        pass
+
+    def is_enabled(self):
+        return False
+
+    def cancel_timeout(self):
+        pass
+
+    def force_single_run(self):
+        pass
+
+    def apply_configuration(self):
+        pass
+
+    def get_last_data(self):
+        return self.lastData
+
+    def get_cached_data(self):
+        return {}
+
+    def get_fx_rates(self):
+        return self.fxRates
+
+    def get_last_fetch_time(self):
+        return None
+
+    def get_price_history(self):
+        return self.priceHistory
+
+    def get_bar_store(self):
+        return self.barStore
+
+    def set_last_data(self, prices):
+        self.lastData = dict(prices)
+        self.priceHistory.append_prices(self.lastData)
+
+    def set_symbol_list(self, aList):
+        self.symbolList = aList
+
+    def set_watchlist(self, aList):
+        self.watchList = aList
+
+    def reset(self):
+        # Prices are not discarded since they can't be fetched again
+        self.symbolList = []
@@ -1,44 +1,87 @@
 import os
-import inspect
 import sys
 import logging
+import math
+import bisect
+import datetime
+import itertools
+import collections
+import threading
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
-from .Holding import Holding
+from .HoldingsTable import HoldingsTable
+from .TradeValidator import TradeValidator
+from .CorporateActions import CorporateActions
 from Utils.Utils import Actions, Messages, Callbacks
-from .StockPriceGetter import StockPriceGetter
+from Utils.Instrumentation import metrics
+
+logger = logging.getLogger(__name__)
 
 class Portfolio():
-    def __init__(self, name, config):
+    # Number of trades of the history between two checkpoints
+    CHECKPOINT_INTERVAL = 1000
+
+    def __init__(self, name, config, price_getter=None):
         # Portfolio name
         self._name = name
         # Amount of free cash available
         self._cash_available = 0
         # Overall amount of cash deposited - withdrawed
         self._cash_deposited = 0
-        # Data structure to store stock holdings: {"symbol": Holding}
-        self._holdings = {}
+        # Table storing the stock holdings, indexed by symbol
+        self._holdings = HoldingsTable()
+        # Cached aggregates of the holdings, updated only for the dirty symbols
+        # Contribution of each holding to the aggregates: {"symbol": (value, cost)}
+        self._contributions = {}
+        self._value_sum = 0
+        self._cost_sum = 0
+        # Number of holdings without a valid value or cost
+        self._missing_values = 0
+        self._missing_costs = 0
+        self._dirty_symbols = set()
+        self._aggregates_lock = threading.Lock()
+        # Snapshots of the balances taken every CHECKPOINT_INTERVAL trades of the
+        # history so that a change in the history is replayed from the nearest
+        # one: positions in the history and (cash available, cash deposited,
+        # {"symbol": quantity}, corporate actions applied) before the trade at
+        # each position
+        self._checkpoint_positions = [0]
+        self._checkpoints = [(0, 0, {}, 0)]
+        # Optional CorporateActions replayed along with the trades and number
+        # of them applied to the holdings
+        self.corporate_actions = None
+        self._actions_applied = 0
         # DataStruct containing the callbacks
         self.callbacks = {}
-        # Work thread that fetches stocks live prices
-        self.price_getter = StockPriceGetter(config, self.on_new_price_data)
-        logging.info('Portfolio initialised')
+        # Work thread that fetches stocks live prices, unless an alternative
+        # price source is provided (e.g. OfflinePriceGetter)
+        if price_getter is None:
+            # Imported here so that headless users don't load the http stack
+            from .StockPriceGetter import StockPriceGetter
+            price_getter = StockPriceGetter(config, self.on_new_price_data)
+        self.price_getter = price_getter
+        # Prices stored by the previous fetches, served until the live ones
+        self._cached_prices = {}
+        # Optional AlertsEngine checked on each price update
+        self.alerts = None
+        logger.info('Portfolio initialised')
 
     def set_callback(self, id, callback):
         self.callbacks[id] = callback
 
-    def start(self, trades_list):
-        self.reload(trades_list)
+    def start(self, trades_list, trade_index=None):
+        self.reload(trades_list, trade_index)
+        self.load_cached_prices()
         self.price_getter.start()
-        logging.info('Portfolio started')
+        logger.info('Portfolio started')
 
     def stop(self):
         self.price_getter.shutdown()
         self.price_getter.join()
-        logging.info('Portfolio stopped')
+        logger.info('Portfolio stopped')
 
 # GETTERS
 
@@ -56,11 +99,11 @@ class Portfolio():
 
     def get_holding_list(self):
         """Return a list of Holding instances held in the portfolio sorted alphabetically"""
-        return [self._holdings[k] for k in sorted(self._holdings)]
+        return self._holdings.values()
 
     def get_holding_symbols(self):
         """Return a list containing the holding symbols as [string] sorted alphabetically"""
-        return list(sorted(self._holdings.keys()))
+        return self._holdings.keys()
 
     def get_holding_quantity(self, symbol):
         """Return the quantity held for the given symbol"""
@@ -81,6 +124,10 @@ class Portfolio():
             raise ValueError('Invalid symbol')
         return self._holdings[symbol].get_open_price()
 
+    def get_fx_rate(self, currency):
+        """Return the exchange rate of the currency to £ or None if not available"""
+        return self.price_getter.get_fx_rates().get(currency)
+
     def get_total_value(self):
         """Return the value of the whole portfolio as cash + holdings"""
         value = self.get_holdings_value()
@@ -91,13 +138,10 @@ class Portfolio():
 
     def get_holdings_value(self):
         """Return the value of the holdings held in the portfolio"""
-        holdingsValue = 0
-        for holding in self._holdings.values():
-            if holding.get_value() is not None:
-                holdingsValue += holding.get_value()
-            else:
-                return None
-        return holdingsValue
+        self._update_aggregates()
+        if self._missing_values > 0:
+            return None
+        return self._value_sum
 
     def get_portfolio_pl(self):
         """
@@ -124,15 +168,12 @@ class Portfolio():
         Return the sum profit/loss in £ of the current open positions
         """
         try:
-            sum = 0
-            for holding in self._holdings.values():
-                pl = holding.get_profit_loss()
-                if pl is None:
-                    return None
-                sum += pl
-            return sum
+            self._update_aggregates()
+            if self._missing_values > 0 or self._missing_costs > 0:
+                return None
+            return self._value_sum - self._cost_sum
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
             raise RuntimeError('Unable to compute holgings profit/loss')
 
     def get_open_positions_pl_perc(self):
@@ -140,20 +181,14 @@ class Portfolio():
         Return the sum profit/loss in % of the current open positions
         """
         try:
-            costSum = 0
-            valueSum = 0
-            for holding in self._holdings.values():
-                cost = holding.get_cost()
-                value = holding.get_value()
-                if cost is None or value is None:
-                    return None
-                costSum += cost
-                valueSum += value
-            if costSum < 1:
+            self._update_aggregates()
+            if self._missing_values > 0 or self._missing_costs > 0:
+                return None
+            if self._cost_sum < 1:
                 return None
-            return ((valueSum - costSum) / costSum) * 100
+            return ((self._value_sum - self._cost_sum) / self._cost_sum) * 100
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
             raise RuntimeError('Unable to compute holdings profit/loss percentage')
 
 # FUNCTIONS
@@ -165,68 +200,431 @@ class Portfolio():
         self._cash_available = 0
         self._cash_deposited = 0
         self._holdings.clear()
+        self._clear_aggregates()
+        self._actions_applied = 0
+        self._checkpoint_positions = []
+        self._checkpoints = []
+        self._add_checkpoint(0)
         self.price_getter.reset()
-        logging.info('Portfolio cleared')
+        logger.info('Portfolio cleared')
 
-    def reload(self, trades_list):
+    @metrics.timed('portfolio_reload')
+    def reload(self, trades_list, trade_index=None):
         """
         Load the portfolio from the given trade list
+
+            - **trades_list**: the trade history
+            - **trade_index**: optional, TradeIndex of trades_list
         """
         try:
             # Reset the portfolio
             self.clear()
             # Scan the trades list and build the portfolio
-            for trade in trades_list:
-                if trade.action == Actions.DEPOSIT or trade.action == Actions.DIVIDEND:
-                    self._cash_available += trade.quantity
-                    if trade.action == Actions.DEPOSIT:
-                        self._cash_deposited += trade.quantity
-                elif trade.action == Actions.WITHDRAW:
-                    self._cash_available -= trade.quantity
-                    self._cash_deposited -= trade.quantity
-                elif trade.action == Actions.BUY:
-                    if trade.symbol not in self._holdings:
-                        self._holdings[trade.symbol] = Holding(trade.symbol, trade.quantity)
-                    else:
-                        self._holdings[trade.symbol].add_quantity(trade.quantity)
-                    cost = (trade.price/100) * trade.quantity
-                    tax = (trade.sdr * cost) / 100
-                    totalCost = cost + tax + trade.fee
-                    self._cash_available -= totalCost
-                elif trade.action == Actions.SELL:
-                    self._holdings[trade.symbol].add_quantity(-trade.quantity) # negative
-                    if self._holdings[trade.symbol].get_quantity() < 1:
-                        del self._holdings[trade.symbol]
-                    profit = ((trade.price/100) * trade.quantity) - trade.fee
-                    self._cash_available += profit
+            for position, trade in enumerate(trades_list):
+                if position % self.CHECKPOINT_INTERVAL == 0 and position > 0:
+                    self._add_checkpoint(position)
+                self._apply_corporate_actions(trade.date)
+                self._process_trade(trade)
+            self._apply_corporate_actions(datetime.date.today())
+            self.price_getter.set_symbol_list(self.get_holding_symbols())
+            for symbol in self._holdings.keys():
+                self._holdings[symbol].set_open_price(
+                    self.compute_avg_holding_open_price(symbol, trades_list, trade_index))
+            self._holdings.set_last_prices(self.price_getter.get_last_data())
+            self._holdings.set_fx_rates(self.price_getter.get_fx_rates())
+            self._rebuild_aggregates()
+            logger.info('Portfolio reloaded successfully')
+        except Exception as e:
+            logger.error(e)
+            raise RuntimeError('Unable to reload the portfolio')
+
+    @metrics.timed('portfolio_reload_stream')
+    def reload_stream(self, trades):
+        """
+        Load the portfolio from an iterable of trades, consuming it only once
+        and without keeping the whole history in memory. Only the BUY trades
+        that can still contribute to the open price of a holding are retained.
+
+            - **trades**: iterable of Trade in chronological order
+        """
+        try:
+            self.clear()
+            # Recent BUY trades of each symbol as deque of (quantity, price)
+            lots = {}
+            # Total quantity of the lots of each symbol
+            lots_quantity = {}
+            for trade in trades:
+                self._adjust_lots(self._apply_corporate_actions(trade.date), lots, lots_quantity)
+                self._process_trade(trade)
+                if trade.action not in (Actions.BUY, Actions.SELL):
+                    continue
+                symbol, quantity, factor = self._get_holding_change(trade)
+                symbol_lots = lots.setdefault(symbol, collections.deque())
+                if trade.action == Actions.BUY:
+                    symbol_lots.append((trade.quantity * factor, trade.price / factor))
+                    lots_quantity[symbol] = lots_quantity.get(symbol, 0) + trade.quantity * factor
+                # The oldest lot is not needed anymore when the following lots
+                # already cover the held quantity, since future BUY trades only
+                # add lots after it and future SELL trades reduce the quantity
+                held = self.get_holding_quantity(symbol)
+                while len(symbol_lots) > 0 and lots_quantity[symbol] - symbol_lots[0][0] >= held:
+                    lots_quantity[symbol] -= symbol_lots.popleft()[0]
+            self._adjust_lots(self._apply_corporate_actions(datetime.date.today()), lots, lots_quantity)
             self.price_getter.set_symbol_list(self.get_holding_symbols())
             for symbol in self._holdings.keys():
-                self._holdings[symbol].set_open_price(self.compute_avg_holding_open_price(symbol, trades_list))
-            for symbol, price in self.price_getter.get_last_data().items():
-                self._holdings[symbol].set_last_price(price)
-            logging.info('Portfolio reloaded successfully')
+                self._holdings[symbol].set_open_price(
+                    self._compute_avg_open_price(self.get_holding_quantity(symbol), reversed(lots[symbol])))
+            self._holdings.set_last_prices(self.price_getter.get_last_data())
+            self._holdings.set_fx_rates(self.price_getter.get_fx_rates())
+            self._rebuild_aggregates()
+            logger.info('Portfolio reloaded successfully from stream')
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
             raise RuntimeError('Unable to reload the portfolio')
 
-    def compute_avg_holding_open_price(self, symbol, trades_list):
+    def apply_trade(self, trade, trades_list, trade_index=None):
+        """
+        Update the portfolio with a new trade without reloading the whole history.
+        Only the holding of the trade symbol is recomputed.
+
+            - **trade**: the new Trade, already appended at the end of trades_list
+            - **trades_list**: the whole trade history
+            - **trade_index**: optional, TradeIndex of trades_list
+        """
+        try:
+            position = len(trades_list) - 1
+            if position % self.CHECKPOINT_INTERVAL == 0 and position > 0:
+                self._add_checkpoint(position)
+            touched = self._get_action_symbols(self._apply_corporate_actions(trade.date))
+            self._process_trade(trade)
+            if trade.action in (Actions.BUY, Actions.SELL):
+                touched.add(self._get_holding_change(trade)[0])
+            if len(touched) > 0:
+                last_data = self.price_getter.get_last_data()
+                for symbol in touched:
+                    if symbol in self._holdings:
+                        holding = self._holdings[symbol]
+                        holding.set_open_price(
+                            self.compute_avg_holding_open_price(symbol, trades_list, trade_index))
+                        if holding.get_last_price() is None and symbol in last_data:
+                            holding.set_last_price(last_data[symbol])
+                self.price_getter.set_symbol_list(self.get_holding_symbols())
+                self._mark_dirty(touched)
+            logger.info('Portfolio - trade applied')
+        except Exception as e:
+            logger.error(e)
+            raise RuntimeError('Unable to apply the trade to the portfolio')
+
+    @metrics.timed('portfolio_apply_history_change')
+    def apply_history_change(self, position, trades_list, trade_index=None, symbols=()):
+        """
+        Update the portfolio after a trade of the history has been edited,
+        inserted or removed. The trades are replayed from the nearest checkpoint
+        before the change and only the holdings of the replayed trades are updated
+
+            - **position**: position in trades_list of the changed trade
+            - **trades_list**: the whole trade history, already changed
+            - **trade_index**: optional, TradeIndex of trades_list
+            - **symbols**: symbols of the trades replaced or removed
+        """
+        try:
+            # Discard the checkpoints after the change
+            count = bisect.bisect_right(self._checkpoint_positions, position)
+            del self._checkpoint_positions[count:]
+            del self._checkpoints[count:]
+            start = self._checkpoint_positions[-1]
+            cash_available, cash_deposited, quantities, actions_applied = self._checkpoints[-1]
+            # Restore the balances of the checkpoint
+            touched = set(symbols)
+            for trade in itertools.islice(trades_list, start, None):
+                if trade.action in (Actions.BUY, Actions.SELL):
+                    touched.add(trade.symbol)
+                    touched.add(self._get_holding_change(trade)[0])
+            if self.corporate_actions is not None:
+                touched.update(self._get_action_symbols(
+                    self.corporate_actions.get_actions(actions_applied, self._actions_applied)))
+            self._cash_available = cash_available
+            self._cash_deposited = cash_deposited
+            self._actions_applied = actions_applied
+            for symbol in touched:
+                quantity = quantities.get(symbol, 0)
+                if symbol in self._holdings:
+                    if quantity > 0:
+                        self._holdings[symbol].set_quantity(quantity)
+                    else:
+                        del self._holdings[symbol]
+                elif quantity > 0:
+                    self._holdings.insert(symbol, quantity)
+            # Replay the trades after the checkpoint
+            for position, trade in enumerate(itertools.islice(trades_list, start, None), start):
+                if position % self.CHECKPOINT_INTERVAL == 0 and position > start:
+                    self._add_checkpoint(position)
+                self._apply_corporate_actions(trade.date)
+                self._process_trade(trade)
+            self._apply_corporate_actions(datetime.date.today())
+            last_data = self.price_getter.get_last_data()
+            for symbol in touched:
+                if symbol in self._holdings:
+                    holding = self._holdings[symbol]
+                    holding.set_open_price(
+                        self.compute_avg_holding_open_price(symbol, trades_list, trade_index))
+                    if holding.get_last_price() is None and symbol in last_data:
+                        holding.set_last_price(last_data[symbol])
+            self.price_getter.set_symbol_list(self.get_holding_symbols())
+            self._mark_dirty(touched)
+            logger.info('Portfolio - replayed {} trades from {}'.format(len(trades_list) - start, start))
+        except Exception as e:
+            logger.error(e)
+            raise RuntimeError('Unable to update the portfolio')
+
+    def validate_history_change(self, position, trades_list, suffix):
+        """
+        Validate a change of the trade history and return the list of violations
+        (see TradeValidator.validate) with the position of the invalid trades in
+        the changed history. The balances are projected from the nearest checkpoint
+
+            - **position**: position in trades_list of the changed trade
+            - **trades_list**: the current trade history
+            - **suffix**: iterable of the trades of the changed history from position onwards
+        """
+        count = bisect.bisect_right(self._checkpoint_positions, position)
+        start = self._checkpoint_positions[count - 1]
+        cash_available, _, quantities, actions_applied = self._checkpoints[count - 1]
+        validator = TradeValidator(cash_available, lambda symbol: quantities.get(symbol, 0),
+                                   self.corporate_actions, actions_applied)
+        trades = itertools.chain(itertools.islice(trades_list, start, position), suffix)
+        violations = validator.validate(trades)
+        for violation in violations:
+            violation['index'] += start
+        return violations
+
+    def _add_checkpoint(self, position):
+        """
+        Store the balances before the trade at the given position of the history
+        """
+        self._checkpoint_positions.append(position)
+        quantities = {s: self._holdings.get_quantity(s) for s in self._holdings.keys()}
+        self._checkpoints.append((self._cash_available, self._cash_deposited, quantities,
+                                  self._actions_applied))
+
+    def _apply_corporate_actions(self, date):
+        """
+        Apply to the holdings the corporate actions effective on or before the
+        date not applied yet and return the list of the actions that changed
+        a holding
+        """
+        if self.corporate_actions is None:
+            return []
+        end = self.corporate_actions.get_position(date)
+        if end <= self._actions_applied:
+            return []
+        applied = []
+        for action in self.corporate_actions.get_actions(self._actions_applied, end):
+            symbol = action['symbol']
+            if symbol not in self._holdings:
+                continue
+            quantity = self._holdings.get_quantity(symbol)
+            if action['type'] == 'SYMBOL_CHANGE':
+                del self._holdings[symbol]
+                if action['new_symbol'] in self._holdings:
+                    self._holdings[action['new_symbol']].add_quantity(quantity)
+                else:
+                    self._holdings.insert(action['new_symbol'], quantity)
+            else:
+                quantity = CorporateActions.adjust_quantity(quantity, action['ratio'])
+                if quantity > 0:
+                    self._holdings.set_quantity(symbol, quantity)
+                else:
+                    del self._holdings[symbol]
+            applied.append(action)
+        self._actions_applied = end
+        return applied
+
+    @staticmethod
+    def _get_action_symbols(actions):
+        """
+        Return the set of the symbols changed by the corporate actions
+        """
+        symbols = set()
+        for action in actions:
+            symbols.add(action['symbol'])
+            if action['type'] == 'SYMBOL_CHANGE':
+                symbols.add(action['new_symbol'])
+        return symbols
+
+    @staticmethod
+    def _adjust_lots(actions, lots, lots_quantity):
+        """
+        Adjust the lots of reload_stream, as deques of (quantity, price) of
+        each symbol, with the corporate actions applied to the holdings
+        """
+        for action in actions:
+            symbol = action['symbol']
+            if symbol not in lots:
+                continue
+            if action['type'] == 'SYMBOL_CHANGE':
+                # The lots of the former symbol are older than the ones of the new one
+                moved = lots.pop(symbol)
+                moved.extend(lots.get(action['new_symbol'], ()))
+                lots[action['new_symbol']] = moved
+                lots_quantity[action['new_symbol']] = (lots_quantity.pop(symbol) +
+                                                       lots_quantity.get(action['new_symbol'], 0))
+            else:
+                ratio = action['ratio']
+                lots[symbol] = collections.deque((q * ratio, p / ratio) for q, p in lots[symbol])
+                lots_quantity[symbol] *= ratio
+
+    def _process_trade(self, trade):
+        """
+        Update cash and holdings quantities with the given trade
+        """
+        if trade.action == Actions.DEPOSIT or trade.action == Actions.DIVIDEND:
+            self._cash_available += trade.quantity
+            if trade.action == Actions.DEPOSIT:
+                self._cash_deposited += trade.quantity
+        elif trade.action == Actions.WITHDRAW:
+            self._cash_available -= trade.quantity
+            self._cash_deposited -= trade.quantity
+        elif trade.action == Actions.BUY:
+            symbol, quantity, _ = self._get_holding_change(trade)
+            if symbol not in self._holdings:
+                self._holdings.insert(symbol, quantity)
+            else:
+                self._holdings[symbol].add_quantity(quantity)
+            cost = (trade.price/trade.scale) * trade.quantity * trade.fx_rate
+            tax = (trade.sdr * cost) / 100
+            totalCost = cost + tax + trade.fee
+            self._cash_available -= totalCost
+        elif trade.action == Actions.SELL:
+            symbol, quantity, _ = self._get_holding_change(trade)
+            self._holdings[symbol].add_quantity(-quantity) # negative
+            if self._holdings[symbol].get_quantity() < 1:
+                del self._holdings[symbol]
+            profit = ((trade.price/trade.scale) * trade.quantity * trade.fx_rate) - trade.fee
+            self._cash_available += profit
+
+    def _get_holding_change(self, trade):
+        """
+        Return a tuple (symbol, quantity, factor) of the holding changed by a
+        BUY or SELL trade. A trade dated before corporate actions already
+        applied to the holdings (e.g. added or edited out of date order) is
+        adjusted by them, factor is the number of shares each traded share became
+        """
+        if self.corporate_actions is None or \
+                self.corporate_actions.get_position(trade.date) >= self._actions_applied:
+            return trade.symbol, trade.quantity, 1.0
+        factor, symbol = self.corporate_actions.get_factor(trade.symbol, trade.date, self._actions_applied)
+        return symbol, CorporateActions.adjust_quantity(trade.quantity, factor), factor
+
+    def _mark_dirty(self, symbols):
+        """
+        Flag the holdings of the given symbols to be recomputed in the aggregates
+        """
+        with self._aggregates_lock:
+            self._dirty_symbols.update(symbols)
+
+    def _clear_aggregates(self):
+        """
+        Reset the cached aggregates
+        """
+        with self._aggregates_lock:
+            self._contributions.clear()
+            self._dirty_symbols.clear()
+            self._value_sum = 0
+            self._cost_sum = 0
+            self._missing_values = 0
+            self._missing_costs = 0
+
+    def _rebuild_aggregates(self):
+        """
+        Recompute the cached aggregates of all the holdings in a single pass
+        over the holdings table
+        """
+        with self._aggregates_lock:
+            self._contributions = self._holdings.get_valuations()
+            self._dirty_symbols.clear()
+            value = self._holdings.get_total_value()
+            cost = self._holdings.get_total_cost()
+            self._value_sum = value if value is not None else math.fsum(
+                v for v, _ in self._contributions.values() if v is not None)
+            self._cost_sum = cost if cost is not None else math.fsum(
+                c for _, c in self._contributions.values() if c is not None)
+            self._missing_values = sum(1 for v, _ in self._contributions.values() if v is None)
+            self._missing_costs = sum(1 for _, c in self._contributions.values() if c is None)
+
+    def _update_aggregates(self):
+        """
+        Update the cached aggregates replacing the contribution of the dirty holdings
+        """
+        with self._aggregates_lock:
+            for symbol in self._dirty_symbols:
+                if symbol in self._contributions:
+                    value, cost = self._contributions.pop(symbol)
+                    if value is None:
+                        self._missing_values -= 1
+                    else:
+                        self._value_sum -= value
+                    if cost is None:
+                        self._missing_costs -= 1
+                    else:
+                        self._cost_sum -= cost
+                if symbol in self._holdings:
+                    value, cost = self._holdings.get_valuation(symbol)
+                    if value is None:
+                        self._missing_values += 1
+                    else:
+                        self._value_sum += value
+                    if cost is None:
+                        self._missing_costs += 1
+                    else:
+                        self._cost_sum += cost
+                    self._contributions[symbol] = (value, cost)
+            self._dirty_symbols.clear()
+
+    def compute_avg_holding_open_price(self, symbol, trades_list, trade_index=None):
         """
         Return the average price paid to open the current positon of the requested stock.
         Starting from the end of the history log, find the BUY transaction that led to
-        to have the current quantity, compute then the average price of these transactions
+        to have the current quantity, compute then the average price of these transactions.
+        If the TradeIndex of the history is given only the trades of the symbol are scanned.
+        The BUY trades before a corporate action are adjusted by it and the ones of the
+        former symbols of the holding are included
+        """
+        target = self.get_holding_quantity(symbol)
+        if self.corporate_actions is None:
+            if trade_index is not None:
+                trades_list = trade_index.get_symbol_trades(symbol)
+            buys = ((t.quantity, t.price) for t in reversed(trades_list)
+                    if t.symbol == symbol and t.action == Actions.BUY)
+            return self._compute_avg_open_price(target, buys)
+        symbols = [symbol] + self.corporate_actions.get_former_symbols(symbol, self._actions_applied)
+        if trade_index is not None:
+            offsets = [o for s in symbols for o in trade_index.get_symbol_trades(s).get_offsets()]
+        else:
+            offsets = [o for o, t in enumerate(trades_list) if t.symbol in symbols]
+        # Trades of different symbols, possibly inserted out of date order, are
+        # taken by date and the ones of the same day in list order
+        offsets.sort(key=lambda o: (trades_list[o].date, o))
+        buys = (self.corporate_actions.adjust_lot(t.symbol, t.date, t.quantity, t.price,
+                                                  self._actions_applied)
+                for t in (trades_list[o] for o in reversed(offsets)) if t.action == Actions.BUY)
+        return self._compute_avg_open_price(target, buys)
+
+    def _compute_avg_open_price(self, target, buys):
+        """
+        Return the average price of the BUY trades, given as (quantity, price)
+        from the most recent, that led to hold the target quantity
         """
         sum = 0
         count = 0
-        target = self.get_holding_quantity(symbol)
         if target == 0:
             return None
-        for trade in trades_list[::-1]:  # reverse order
-            if trade.symbol == symbol and trade.action == Actions.BUY:
-                target -= trade.quantity
-                sum += trade.price * trade.quantity
-                count += trade.quantity
-                if target <= 0:
-                    break
+        for quantity, price in buys:
+            target -= quantity
+            sum += price * quantity
+            count += quantity
+            if target <= 0:
+                break
         avg = sum / count
         return round(avg, 4)
 
@@ -234,42 +632,131 @@ class Portfolio():
         """
         Validate the new Trade request against the current Portfolio
         """
-        if newTrade.action == Actions.WITHDRAW:
-            if newTrade.quantity > self.get_cash_available():
-                logging.warning(Messages.INSUF_FUNDING.value)
-                raise RuntimeError(Messages.INSUF_FUNDING.value)
-        elif newTrade.action == Actions.BUY:
-            cost = (newTrade.price * newTrade.quantity) / 100  # in £
-            fee = newTrade.fee
-            tax = (newTrade.sdr * cost) / 100
-            totalCost = cost + fee + tax
-            if totalCost > self.get_cash_available():
-                logging.warning(Messages.INSUF_FUNDING.value)
-                raise RuntimeError(Messages.INSUF_FUNDING.value)
-        elif newTrade.action == Actions.SELL:
-            if newTrade.quantity > self.get_holding_quantity(newTrade.symbol):
-                logging.warning(Messages.INSUF_HOLDINGS.value)
-                raise RuntimeError(Messages.INSUF_HOLDINGS.value)
-        logging.info('Portfolio - trade validated')
+        message = self.get_trade_validator().check_trade(newTrade)
+        if message is not None:
+            logger.warning(message)
+            raise RuntimeError(message)
+        logger.info('Portfolio - trade validated')
         return True
 
+    def get_trade_validator(self):
+        """
+        Return a TradeValidator projecting the balances of the current Portfolio
+        """
+        return TradeValidator(self._cash_available, self.get_holding_quantity,
+                              self.corporate_actions, self._actions_applied)
+
+    def validate_trades(self, trades):
+        """
+        Validate a batch of pending trades, in order, against the current Portfolio
+        and return the list of violations (see TradeValidator.validate)
+        """
+        return self.get_trade_validator().validate(trades)
+
 # PRICE GETTER WORK THREAD
 
+    @metrics.timed('portfolio_on_new_price_data')
     def on_new_price_data(self):
-        logging.info('Portfolio - new live price available')
+        logger.info('Portfolio - new live price available')
         priceDict = self.price_getter.get_last_data()
-        for symbol, price in priceDict.items():
-            if symbol in self._holdings:
-                self._holdings[symbol].set_last_price(price)
+        self._mark_dirty(self._holdings.set_fx_rates(self.price_getter.get_fx_rates()))
+        self._mark_dirty(self._holdings.set_last_prices(priceDict))
+        if self.alerts is not None:
+            self.alerts.on_prices(priceDict)
         self.callbacks[Callbacks.UPDATE_LIVE_PRICES]()
 
+    def load_cached_prices(self):
+        """
+        Set the cached prices on the holdings without a live price. The cached
+        prices are flagged as not valid until the first live fetch
+        """
+        try:
+            cached = self.price_getter.get_cached_data()
+        except Exception as e:
+            logger.error('Portfolio - unable to load cached prices: {}'.format(e))
+            return
+        self._cached_prices = cached
+        self._mark_dirty(self._holdings.set_fx_rates(self.price_getter.get_fx_rates()))
+        stale = {s: p for s, p in cached.items()
+                 if s in self._holdings and self._holdings[s].get_last_price() is None}
+        for symbol in self._holdings.set_last_prices(stale):
+            self._holdings[symbol].set_last_price_invalid()
+        self._mark_dirty(stale.keys())
+        logger.info('Portfolio - loaded {} cached prices'.format(len(stale)))
+
+    def set_watchlist(self, symbols):
+        """
+        Set the watchlist symbols whose prices are fetched along with the holdings
+        """
+        self.price_getter.set_watchlist(list(symbols))
+
+    def get_price_history(self):
+        """
+        Return the PriceHistory of the intraday prices of the holdings and watchlist symbols
+        """
+        return self.price_getter.get_price_history()
+
+    def apply_price_configuration(self):
+        """
+        Apply the changed settings of the live prices (polling period, API
+        key, stores) without reloading the portfolio
+        """
+        self.price_getter.apply_configuration()
+
+    def get_bar_store(self):
+        """
+        Return the BarStore of the daily bars of the fetched symbols or None
+        """
+        return self.price_getter.get_bar_store()
+
+    def get_price_getter(self):
+        """
+        Return the source of the live prices, a TaskThread unless an offline
+        price getter was provided
+        """
+        return self.price_getter
+
+    def get_last_fetch_time(self):
+        """
+        Return the time in seconds since the epoch of the last successful
+        fetch of the live prices, None if none yet
+        """
+        return self.price_getter.get_last_fetch_time()
+
+    def set_alerts_engine(self, engine):
+        """
+        Set the AlertsEngine whose rules are checked against each price update
+        """
+        self.alerts = engine
+
+    def set_corporate_actions(self, actions):
+        """
+        Set the CorporateActions replayed along with the trades, applied on
+        the next reload
+        """
+        self.corporate_actions = actions
+
+    def get_last_prices(self, symbols):
+        """
+        Return the last prices of the given symbols as dict {"symbol": (price, valid)}.
+        Symbols without a live price get the cached one, not valid, or None
+        """
+        last_data = self.price_getter.get_last_data()
+        prices = {}
+        for symbol in symbols:
+            if symbol in last_data:
+                prices[symbol] = (last_data[symbol], True)
+            else:
+                prices[symbol] = (self._cached_prices.get(symbol), False)
+        return prices
+
     def on_manual_refresh_live_data(self):
-        logging.info('Portfolio - manual refresh live price')
+        logger.info('Portfolio - manual refresh live price')
         if self.price_getter.is_enabled():
             self.price_getter.cancel_timeout()
         else:
             self.price_getter.force_single_run()
 
     def set_auto_refresh(self, enabled):
-        logging.info('Portfolio - live price auto refresh: {}'.format(enabled))
+        logger.info('Portfolio - live price auto refresh: {}'.format(enabled))
         self.price_getter.enable(enabled)
@@ -0,0 +1,239 @@
+import os
+import sys
+import logging
+import itertools
+import datetime
+import threading
+from array import array
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Actions, Utils
+from Utils.Instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioHistory():
+    """
+    Daily series of the portfolio value, profit/loss and value of each
+    holding, computed replaying the trades against the daily closes of the
+    BarStore. The series are cached: new daily bars only extend them and
+    they are computed again only when the trades change.
+    The value of a symbol without a stored close is the price of its last
+    trade, converted with the exchange rate of that trade.
+    The corporate actions are applied to the quantities on their effective
+    date, so that the stored closes are used as they are.
+    """
+
+    def __init__(self, bar_store=None, corporate_actions=None):
+        """
+        Initialise
+
+            - **bar_store**: optional, BarStore of the daily closes
+            - **corporate_actions**: optional, CorporateActions of the held symbols
+        """
+        self.bar_store = bar_store
+        self.corporate_actions = corporate_actions
+        self._lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discard the cached series, they are computed again on the next update
+        """
+        self._trades_count = None
+        self._position = 0
+        self._actions_applied = 0
+        self._cash_available = 0
+        self._cash_deposited = 0
+        self._quantities = {}
+        # Last known price and exchange rate of each traded symbol
+        self._prices = {}
+        self._fx_rates = {}
+        # Current value of each traded symbol and their sum
+        self._symbol_values = {}
+        self._holdings_value = 0
+        self._dates = []
+        self._values = array('d')
+        self._pl = array('d')
+        # Changes of the value of each symbol, stored only when the value
+        # changes: {"symbol": (indices of the dates, values)}
+        self._holdings = {}
+
+    @metrics.timed('portfolio_history_update')
+    def update(self, trades):
+        """
+        Bring the series up to date with the trades and the stored closes.
+        The series are computed from scratch only if the number of trades
+        changed since the last update (see also invalidate). Return True if
+        the series changed
+
+            - **trades**: the trade history sorted by date
+        """
+        with self._lock:
+            if len(trades) != self._trades_count:
+                self.invalidate()
+                self._trades_count = len(trades)
+            if len(trades) == 0:
+                return False
+            first = trades[0].date.date()
+            last = self._dates[-1] if len(self._dates) > 0 else first - datetime.timedelta(days=1)
+            # Closes of the traded symbols after the last computed date: {date: [(symbol, close)]}
+            closes = {}
+            if self.bar_store is not None:
+                symbols = set(t.symbol for t in trades if t.action in (Actions.BUY, Actions.SELL))
+                if self.corporate_actions is not None:
+                    for action in self.corporate_actions.get_actions():
+                        if action['type'] == 'SYMBOL_CHANGE' and action['symbol'] in symbols:
+                            symbols.add(action['new_symbol'])
+                for symbol in symbols:
+                    for date, close in self.bar_store.get_closes(symbol, start=last + datetime.timedelta(days=1)):
+                        closes.setdefault(date, []).append((symbol, close))
+            dates = set(closes)
+            dates.update(t.date.date() for t in itertools.islice(trades, self._position, None))
+            dates = sorted(d for d in dates if d > last)
+            for date in dates:
+                self._add_date(date, trades, closes.get(date, ()))
+        if len(dates) > 0:
+            logger.info('PortfolioHistory - computed {} days'.format(len(dates)))
+        return len(dates) > 0
+
+    def _add_date(self, date, trades, closes):
+        """
+        Apply the trades and closes of the date and append the values. Only
+        the values of the symbols traded or closed in the date are computed
+        """
+        touched = self._apply_corporate_actions(date)
+        while self._position < len(trades) and trades[self._position].date.date() <= date:
+            trade = trades[self._position]
+            self._process_trade(trade)
+            if trade.action in (Actions.BUY, Actions.SELL):
+                touched.add(trade.symbol)
+            self._position += 1
+        for symbol, close in closes:
+            self._prices[symbol] = close
+            touched.add(symbol)
+        index = len(self._dates)
+        self._dates.append(date)
+        for symbol in touched:
+            value = self._get_value(symbol, self._quantities.get(symbol, 0))
+            old = self._symbol_values.get(symbol)
+            if old == value:
+                continue
+            self._holdings_value += value - (old or 0)
+            self._symbol_values[symbol] = value
+            indices, values = self._holdings.setdefault(symbol, (array('l'), array('d')))
+            indices.append(index)
+            values.append(value)
+        total = self._cash_available + self._holdings_value
+        self._values.append(total)
+        self._pl.append(total - self._cash_deposited)
+
+    def _apply_corporate_actions(self, date):
+        """
+        Apply the corporate actions effective on or before the date not
+        applied yet and return the set of the symbols changed
+        """
+        touched = set()
+        if self.corporate_actions is None:
+            return touched
+        end = self.corporate_actions.get_position(date)
+        for action in self.corporate_actions.get_actions(self._actions_applied, end):
+            symbol = action['symbol']
+            if symbol not in self._prices:
+                continue
+            touched.add(symbol)
+            quantity = self._quantities.pop(symbol, 0)
+            if action['type'] == 'SYMBOL_CHANGE':
+                new_symbol = action['new_symbol']
+                touched.add(new_symbol)
+                if quantity > 0:
+                    self._quantities[new_symbol] = self._quantities.get(new_symbol, 0) + quantity
+                self._prices.setdefault(new_symbol, self._prices[symbol])
+                self._fx_rates.setdefault(new_symbol, self._fx_rates.get(symbol, 1.0))
+            else:
+                quantity = self.corporate_actions.adjust_quantity(quantity, action['ratio'])
+                if quantity > 0:
+                    self._quantities[symbol] = quantity
+                # The last trade price is the fallback value until the next close
+                self._prices[symbol] /= action['ratio']
+        self._actions_applied = max(end, self._actions_applied)
+        return touched
+
+    def _get_value(self, symbol, quantity):
+        _, scale = Utils.get_symbol_currency(symbol)
+        return quantity * self._prices.get(symbol, 0) / scale * self._fx_rates.get(symbol, 1.0)
+
+    def _process_trade(self, trade):
+        """
+        Update cash and quantities with the trade, as Portfolio does
+        """
+        if trade.action == Actions.DEPOSIT or trade.action == Actions.DIVIDEND:
+            self._cash_available += trade.quantity
+            if trade.action == Actions.DEPOSIT:
+                self._cash_deposited += trade.quantity
+        elif trade.action == Actions.WITHDRAW:
+            self._cash_available -= trade.quantity
+            self._cash_deposited -= trade.quantity
+        elif trade.action in (Actions.BUY, Actions.SELL):
+            cost = (trade.price / trade.scale) * trade.quantity * trade.fx_rate
+            quantity = self._quantities.get(trade.symbol, 0)
+            if trade.action == Actions.BUY:
+                quantity += trade.quantity
+                self._cash_available -= cost + (trade.sdr * cost) / 100 + trade.fee
+            else:
+                quantity -= trade.quantity
+                self._cash_available += cost - trade.fee
+            if quantity > 0:
+                self._quantities[trade.symbol] = quantity
+            else:
+                self._quantities.pop(trade.symbol, None)
+            self._prices[trade.symbol] = trade.price
+            self._fx_rates[trade.symbol] = trade.fx_rate
+
+    def get_dates(self):
+        """
+        Return the list of dates of the series
+        """
+        with self._lock:
+            return list(self._dates)
+
+    def get_values(self):
+        """
+        Return the list of the portfolio total values (cash and holdings) in £
+        """
+        with self._lock:
+            return self._values.tolist()
+
+    def get_profit_loss(self):
+        """
+        Return the list of the portfolio profit/loss in £, the total value
+        less the deposited cash
+        """
+        with self._lock:
+            return self._pl.tolist()
+
+    def get_symbols(self):
+        """
+        Return the sorted list of the symbols held at any date
+        """
+        with self._lock:
+            return sorted(self._holdings)
+
+    def get_holding_values(self, symbol):
+        """
+        Return a tuple (dates, values in £) of the holding of the symbol from
+        the date it was first bought, the value is 0 while not held
+        """
+        with self._lock:
+            if symbol not in self._holdings:
+                return [], []
+            indices, changes = self._holdings[symbol]
+            values = []
+            for i in range(len(indices)):
+                end = indices[i + 1] if i + 1 < len(indices) else len(self._dates)
+                values.extend([changes[i]] * (end - indices[i]))
+            return self._dates[indices[0]:], values
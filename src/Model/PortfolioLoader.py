@@ -0,0 +1,136 @@
+import os
+import sys
+import logging
+import itertools
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils, BASE_CURRENCY
+from Utils.Trade import Trade
+from Model.Portfolio import Portfolio
+from Model.OfflinePriceGetter import OfflinePriceGetter
+
+logger = logging.getLogger(__name__)
+
+
+def load_portfolio_summary(filepath, fx_rates=None):
+    """
+    Parse and replay a trading log file returning a compact summary of the
+    resulting portfolio. Errors are reported in the summary instead of being
+    raised so that a broken file does not abort a whole batch.
+    Module level function so that it can be executed in a process pool.
+
+        - **filepath**: the trading log file
+        - **fx_rates**: optional, exchange rates to £ {"currency": rate} of the
+          costs of the holdings in foreign currencies (e.g. the cached ones)
+    """
+    summary = {
+        'filepath': filepath,
+        'trades': 0,
+        'cash_available': 0,
+        'cash_deposited': 0,
+        'holdings': {},
+        'error': None
+    }
+    try:
+        path = filepath.replace('{home}', Utils.get_home_path())
+        json_obj = Utils.load_json_file(path)
+        if json_obj is None:
+            raise RuntimeError('Unable to read {}'.format(path))
+        trades = [Trade.from_dict(item) for item in json_obj['trades']]
+        portfolio = Portfolio(os.path.basename(path), None, OfflinePriceGetter(None, fx_rates))
+        portfolio.reload(trades)
+        summary['trades'] = len(trades)
+        summary['cash_available'] = portfolio.get_cash_available()
+        summary['cash_deposited'] = portfolio.get_cash_deposited()
+        for holding in portfolio.get_holding_list():
+            currency = holding.get_currency()
+            summary['holdings'][holding.get_symbol()] = {
+                'quantity': holding.get_quantity(),
+                'open_price': holding.get_open_price(),
+                'cost': holding.get_cost(),
+                'fx_rate': 1.0 if currency == BASE_CURRENCY else portfolio.get_fx_rate(currency)
+            }
+    except Exception as e:
+        logger.error('PortfolioLoader - {}: {}'.format(filepath, e))
+        summary['error'] = str(e)
+    return summary
+
+
+class PortfolioLoader():
+    """
+    Load many trading log files in parallel with a process pool and merge
+    the resulting portfolios into a consolidated report
+    """
+
+    def __init__(self, max_workers=None, fx_rates=None):
+        """
+        Initialise
+
+            - **max_workers**: optional, number of worker processes, default is the number of cpus
+            - **fx_rates**: optional, exchange rates to £ {"currency": rate} of the
+              holdings in foreign currencies, see load_portfolio_summary
+        """
+        self.max_workers = max_workers
+        self.fx_rates = fx_rates
+
+    def load(self, filepaths):
+        """
+        Return the list of portfolio summaries of the given files, in the same order
+        """
+        filepaths = list(filepaths)
+        if len(filepaths) < 2:
+            return [load_portfolio_summary(f, self.fx_rates) for f in filepaths]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            summaries = list(executor.map(load_portfolio_summary, filepaths,
+                                          itertools.repeat(self.fx_rates)))
+        logger.info('PortfolioLoader - loaded {} files'.format(len(summaries)))
+        return summaries
+
+    def load_consolidated(self, filepaths):
+        """
+        Load the given files and return the consolidated report
+        """
+        return self.merge(self.load(filepaths))
+
+    @staticmethod
+    def merge(summaries):
+        """
+        Merge a list of portfolio summaries into a consolidated report with the
+        same format of a summary plus the list of files and errors.
+        Holdings of the same symbol are summed and their open price is the
+        average weighted by quantity, in the currency of the symbol
+        """
+        report = {
+            'files': [],
+            'errors': {},
+            'trades': 0,
+            'cash_available': 0,
+            'cash_deposited': 0,
+            'holdings': {}
+        }
+        for summary in summaries:
+            report['files'].append(summary['filepath'])
+            if summary['error'] is not None:
+                report['errors'][summary['filepath']] = summary['error']
+                continue
+            report['trades'] += summary['trades']
+            report['cash_available'] += summary['cash_available']
+            report['cash_deposited'] += summary['cash_deposited']
+            for symbol, holding in summary['holdings'].items():
+                merged = report['holdings'].setdefault(symbol, {'quantity': 0, 'open_price': None, 'cost': 0,
+                                                                'fx_rate': holding['fx_rate']})
+                merged['quantity'] += holding['quantity']
+                if merged['cost'] is None or holding['cost'] is None:
+                    merged['cost'] = None
+                else:
+                    merged['cost'] += holding['cost']
+        for symbol, holding in report['holdings'].items():
+            if holding['cost'] is not None and holding['quantity'] > 0 and holding['fx_rate']:
+                _, scale = Utils.get_symbol_currency(symbol)
+                holding['open_price'] = round(
+                    (holding['cost'] * scale) / (holding['quantity'] * holding['fx_rate']), 4)
+        return report
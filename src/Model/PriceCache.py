@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import logging
+import threading
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+
+logger = logging.getLogger(__name__)
+
+
+class PriceCache():
+    """
+    Persistent cache of the last known price of each symbol, used to show
+    prices before the first live fetch completes
+    """
+
+    def __init__(self, filepath):
+        """
+        Initialise
+
+            - **filepath**: the cache file, supports the {home} placeholder
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Return the cached prices as a dict {"symbol": price}
+        """
+        return {s: e['price'] for s, e in self.load_entries().items()}
+
+    def load_entries(self):
+        """
+        Return the cache entries as a dict {"symbol": {"price": float, "timestamp": float}}
+        """
+        if not os.path.isfile(self.filepath):
+            return {}
+        data = Utils.load_json_file(self.filepath)
+        if data is None:
+            return {}
+        return data
+
+    def update(self, prices):
+        """
+        Store the given prices {"symbol": price} in the cache, keeping the
+        entries of the other symbols
+        """
+        if len(prices) == 0:
+            return True
+        with self._lock:
+            entries = self.load_entries()
+            now = time.time()
+            for symbol, price in prices.items():
+                entries[symbol] = {'price': price, 'timestamp': now}
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            if not Utils.write_json_file(self.filepath, entries):
+                logger.error('PriceCache - unable to write {}'.format(self.filepath))
+                return False
+        return True
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import threading
+from array import array
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+
+class PriceHistory():
+    """
+    Intraday prices of each symbol stored in fixed size ring buffers. Each
+    symbol takes two arrays of doubles, prices and timestamps, allocated once
+    so that the memory is bounded by the configured size. Once a buffer is
+    full each new price overwrites the oldest one.
+    """
+
+    def __init__(self, size):
+        """
+        Initialise
+
+            - **size**: the number of prices stored for each symbol
+        """
+        if int(size) < 1:
+            raise ValueError('Invalid price history size {}'.format(size))
+        self.size = int(size)
+        self._lock = threading.Lock()
+        # Buffers of each symbol: {"symbol": [prices, timestamps, count]}
+        # where count is the number of prices ever appended
+        self._buffers = {}
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def __contains__(self, symbol):
+        return symbol in self._buffers
+
+    def append(self, symbol, price, timestamp=None):
+        """
+        Append the price of the symbol, timestamp defaults to now
+        """
+        self.append_prices({symbol: price}, timestamp)
+
+    def append_prices(self, prices, timestamp=None):
+        """
+        Append the prices {"symbol": price} fetched at the same time
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for symbol, price in prices.items():
+                if price is None:
+                    continue
+                buffer = self._buffers.get(symbol)
+                if buffer is None:
+                    buffer = [array('d', [0.0]) * self.size, array('d', [0.0]) * self.size, 0]
+                    self._buffers[symbol] = buffer
+                index = buffer[2] % self.size
+                buffer[0][index] = price
+                buffer[1][index] = timestamp
+                buffer[2] += 1
+
+    def get_count(self, symbol):
+        """
+        Return the number of prices ever appended for the symbol
+        """
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            return 0 if buffer is None else buffer[2]
+
+    def get_values(self, symbol):
+        """
+        Return the stored prices of the symbol, the oldest first
+        """
+        return self.get_values_since(symbol, 0)[0]
+
+    def get_values_since(self, symbol, count):
+        """
+        Return a tuple (prices, count) of the prices appended after the first
+        count ones, the oldest first, and the number of prices ever appended.
+        The returned count can be passed to the next call to read only the
+        newer prices. Only the last size prices are available
+        """
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                return [], 0
+            return self._read(buffer[0], buffer[2], count), buffer[2]
+
+    def get_timestamps(self, symbol):
+        """
+        Return the timestamps of the stored prices of the symbol, the oldest first
+        """
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                return []
+            return self._read(buffer[1], buffer[2], 0)
+
+    def retain(self, symbols):
+        """
+        Discard the buffers of the symbols not in the list
+        """
+        symbols = set(symbols)
+        with self._lock:
+            for symbol in [s for s in self._buffers if s not in symbols]:
+                del self._buffers[symbol]
+
+    def _read(self, values, total, count):
+        start = max(count, total - self.size, 0)
+        if start >= total:
+            return []
+        first = start % self.size
+        last = total % self.size
+        if first < last:
+            return values[first:last].tolist()
+        return values[first:].tolist() + values[:last].tolist()
@@ -0,0 +1,387 @@
+import os
+import sys
+import math
+import bisect
+import logging
+import datetime
+import itertools
+import collections
+from array import array
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Actions
+
+logger = logging.getLogger(__name__)
+
+
+class RealizedGains():
+    """
+    Compute the realized gains matching the SELL trades against the BUY lots
+    of the same symbol, in a single pass over the trade history.
+    Supported matching methods:
+
+        - **FIFO**: the oldest shares are sold first
+        - **AVERAGE**: shares are sold at the average cost of the holding
+        - **UK**: HMRC share identification rules, shares bought on the same day
+          first, then shares bought in the following 30 days, then the section
+          104 pool at average cost
+
+    Costs include fees and stamp duty, proceeds are net of fees. Amounts are in
+    the base currency (£) converted with the exchange rate of each trade.
+    Splits and consolidations scale the quantities of the lots, the pools and
+    the trading days not finalised yet keeping their cost, symbol changes move
+    them to the new symbol
+    """
+    METHODS = ['FIFO', 'AVERAGE', 'UK']
+    # First day (month, day) of the tax year
+    TAX_YEAR_START = (4, 6)
+    # Window of the UK bed and breakfast rule
+    MATCHING_WINDOW = datetime.timedelta(days=30)
+
+    def __init__(self, method='UK', corporate_actions=None):
+        """
+        Initialise
+
+            - **method**: the matching method, one of METHODS
+            - **corporate_actions**: optional, CorporateActions of the traded symbols
+        """
+        if method not in self.METHODS:
+            raise ValueError('Invalid matching method {}'.format(method))
+        self.method = method
+        self.corporate_actions = corporate_actions
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all the processed trades
+        """
+        # FIFO lots of each symbol as cumulative quantity and cost arrays
+        # so that the lots consumed by a SELL are found by bisection
+        self._lots = {}
+        # Average cost pools of each symbol as [quantity, cost]
+        self._pools = {}
+        # UK trading days not finalised yet, in chronological order, and
+        # the same days indexed by symbol
+        self._pending = collections.deque()
+        self._days = {}
+        self._last_date = None
+        self._disposals = []
+        self._tax_years = {}
+        # Number of corporate actions applied
+        self._actions_applied = 0
+
+    def process(self, trades):
+        """
+        Process an iterable of trades in chronological order and return the
+        list of disposals (see get_disposals)
+        """
+        for trade in trades:
+            self.add_trade(trade)
+        self.flush()
+        logger.info('RealizedGains - processed {} disposals'.format(len(self._disposals)))
+        return self._disposals
+
+    def add_trade(self, trade):
+        """
+        Process the next trade of the history. With the UK method the
+        disposals are computed only when the 30 days window is complete,
+        call flush at the end of the history
+        """
+        if trade.action not in (Actions.BUY, Actions.SELL):
+            return
+        if self._last_date is not None and trade.date < self._last_date:
+            raise ValueError('Trades must be in chronological order')
+        self._last_date = trade.date
+        if self.corporate_actions is not None:
+            self._apply_corporate_actions(trade.date)
+        if self.method == 'FIFO':
+            self._add_trade_fifo(trade)
+        elif self.method == 'AVERAGE':
+            self._add_trade_average(trade)
+        else:
+            self._add_trade_uk(trade)
+
+    def flush(self):
+        """
+        Compute the disposals still waiting for the end of their matching window
+        """
+        while len(self._pending) > 0:
+            self._finalise_day(self._pending.popleft())
+
+    def get_disposals(self):
+        """
+        Return the list of disposals in chronological order as dict
+        {"date", "symbol", "quantity", "proceeds", "cost", "gain", "matches"}
+        where matches is the list of the acquisitions matched as dict
+        {"rule", "quantity", "cost", "acquired"}
+        """
+        return self._disposals
+
+    def get_tax_year_reports(self):
+        """
+        Return a list with the summary of each tax year as dict
+        {"tax_year", "disposals", "proceeds", "cost", "gains", "losses", "net"}
+        """
+        return [self._tax_years[year] for year in sorted(self._tax_years)]
+
+    @classmethod
+    def get_tax_year(cls, date):
+        """
+        Return the label of the tax year including the date, e.g. "2019/20"
+        """
+        year = date.year
+        if (date.month, date.day) < cls.TAX_YEAR_START:
+            year -= 1
+        return '{}/{:02d}'.format(year, (year + 1) % 100)
+
+    def _apply_corporate_actions(self, date):
+        """
+        Apply the corporate actions effective on or before the date not applied yet
+        """
+        end = self.corporate_actions.get_position(date)
+        for action in self.corporate_actions.get_actions(self._actions_applied, end):
+            if action['type'] == 'SYMBOL_CHANGE':
+                self._rename_symbol(action['symbol'], action['new_symbol'])
+            else:
+                self._scale_symbol(action['symbol'], action['ratio'])
+        self._actions_applied = max(end, self._actions_applied)
+
+    def _scale_symbol(self, symbol, ratio):
+        """
+        Multiply the quantities of the symbol by the ratio, costs are unchanged
+        """
+        lots = self._lots.get(symbol)
+        if lots is not None:
+            lots['quantity'] = array('d', (q * ratio for q in lots['quantity']))
+            lots['consumed'] *= ratio
+        if symbol in self._pools:
+            self._pools[symbol][0] *= ratio
+        days = self._days.get(symbol)
+        if days is not None:
+            for record in itertools.islice(days['records'], days['start'], None):
+                for key in ('bought', 'sold', 'claimed'):
+                    record[key] *= ratio
+
+    def _rename_symbol(self, symbol, new_symbol):
+        """
+        Move the lots, the pool and the trading days of the symbol to the new symbol
+        """
+        if symbol in self._lots:
+            lots = self._lots.pop(symbol)
+            if new_symbol in self._lots:
+                lots = self._merge_lots(lots, self._lots[new_symbol])
+            self._lots[new_symbol] = lots
+        if symbol in self._pools:
+            quantity, cost = self._pools.pop(symbol)
+            pool = self._pools.setdefault(new_symbol, [0, 0])
+            pool[0] += quantity
+            pool[1] += cost
+        if symbol in self._days:
+            days = self._days.pop(symbol)
+            records = days['records'][days['start']:]
+            if new_symbol in self._days:
+                other = self._days[new_symbol]
+                records = sorted(records + other['records'][other['start']:], key=lambda r: r['date'])
+            for record in records:
+                record['symbol'] = new_symbol
+            self._days[new_symbol] = {'dates': [r['date'] for r in records], 'records': records, 'start': 0}
+
+    @staticmethod
+    def _merge_lots(lots, other):
+        """
+        Return the FIFO lots with the shares not sold yet of both, sorted by date
+        """
+        items = []
+        for source in (lots, other):
+            quantity, cost = source['consumed'], RealizedGains._get_lots_cost(source, source['consumed'])
+            for index in range(bisect.bisect_right(source['quantity'], quantity), len(source['dates'])):
+                items.append((source['dates'][index], source['quantity'][index] - quantity,
+                              source['cost'][index] - cost))
+                quantity, cost = source['quantity'][index], source['cost'][index]
+        items.sort(key=lambda item: item[0])
+        merged = {'quantity': array('d'), 'cost': array('d'), 'dates': [], 'consumed': 0}
+        total_quantity = total_cost = 0
+        for date, quantity, cost in items:
+            total_quantity += quantity
+            total_cost += cost
+            merged['quantity'].append(total_quantity)
+            merged['cost'].append(total_cost)
+            merged['dates'].append(date)
+        return merged
+
+    @staticmethod
+    def _get_cost(trade):
+        return (trade.price / trade.scale) * trade.quantity * trade.fx_rate * (1 + trade.sdr / 100) + trade.fee
+
+    @staticmethod
+    def _get_proceeds(trade):
+        return (trade.price / trade.scale) * trade.quantity * trade.fx_rate - trade.fee
+
+    def _add_disposal(self, date, symbol, quantity, proceeds, matches):
+        cost = math.fsum(m['cost'] for m in matches)
+        gain = proceeds - cost
+        self._disposals.append({
+            'date': date,
+            'symbol': symbol,
+            'quantity': quantity,
+            'proceeds': proceeds,
+            'cost': cost,
+            'gain': gain,
+            'matches': matches
+        })
+        label = self.get_tax_year(date)
+        if label not in self._tax_years:
+            self._tax_years[label] = {'tax_year': label, 'disposals': 0, 'proceeds': 0,
+                                      'cost': 0, 'gains': 0, 'losses': 0, 'net': 0}
+        report = self._tax_years[label]
+        report['disposals'] += 1
+        report['proceeds'] += proceeds
+        report['cost'] += cost
+        if gain >= 0:
+            report['gains'] += gain
+        else:
+            report['losses'] -= gain
+        report['net'] += gain
+
+    def _pool_disposal(self, symbol, quantity, date):
+        """
+        Remove the quantity from the average cost pool and return its cost
+        """
+        pool = self._pools.get(symbol)
+        if pool is None or pool[0] < quantity:
+            raise ValueError('Not enough {} shares to match the disposal of {}'.format(
+                symbol, date.strftime('%d/%m/%Y')))
+        cost = pool[1] * quantity / pool[0]
+        pool[0] -= quantity
+        pool[1] -= cost
+        if pool[0] <= 0:
+            del self._pools[symbol]
+        return cost
+
+    def _add_trade_average(self, trade):
+        if trade.action == Actions.BUY:
+            pool = self._pools.setdefault(trade.symbol, [0, 0])
+            pool[0] += trade.quantity
+            pool[1] += self._get_cost(trade)
+        else:
+            cost = self._pool_disposal(trade.symbol, trade.quantity, trade.date)
+            self._add_disposal(trade.date, trade.symbol, trade.quantity, self._get_proceeds(trade),
+                               [{'rule': 'AVERAGE', 'quantity': trade.quantity, 'cost': cost,
+                                 'acquired': None}])
+
+    def _add_trade_fifo(self, trade):
+        if trade.action == Actions.BUY:
+            if trade.symbol not in self._lots:
+                self._lots[trade.symbol] = {'quantity': array('d'), 'cost': array('d'),
+                                            'dates': [], 'consumed': 0}
+            lots = self._lots[trade.symbol]
+            total_quantity = lots['quantity'][-1] if len(lots['dates']) > 0 else 0
+            total_cost = lots['cost'][-1] if len(lots['dates']) > 0 else 0
+            lots['quantity'].append(total_quantity + trade.quantity)
+            lots['cost'].append(total_cost + self._get_cost(trade))
+            lots['dates'].append(trade.date)
+            return
+        lots = self._lots.get(trade.symbol)
+        start = lots['consumed'] if lots is not None else 0
+        end = start + trade.quantity
+        if lots is None or end > lots['quantity'][-1]:
+            raise ValueError('Not enough {} shares to match the disposal of {}'.format(
+                trade.symbol, trade.date.strftime('%d/%m/%Y')))
+        cost = self._get_lots_cost(lots, end) - self._get_lots_cost(lots, start)
+        acquired = lots['dates'][bisect.bisect_right(lots['quantity'], start)]
+        self._add_disposal(trade.date, trade.symbol, trade.quantity, self._get_proceeds(trade),
+                           [{'rule': 'FIFO', 'quantity': trade.quantity, 'cost': cost,
+                             'acquired': acquired}])
+        if end >= lots['quantity'][-1]:
+            # All the lots have been sold
+            del self._lots[trade.symbol]
+        else:
+            lots['consumed'] = end
+
+    @staticmethod
+    def _get_lots_cost(lots, quantity):
+        """
+        Return the cost of the first quantity shares of the lots
+        """
+        if quantity <= 0:
+            return 0
+        index = bisect.bisect_left(lots['quantity'], quantity)
+        prev_quantity = lots['quantity'][index - 1] if index > 0 else 0
+        prev_cost = lots['cost'][index - 1] if index > 0 else 0
+        unit_cost = (lots['cost'][index] - prev_cost) / (lots['quantity'][index] - prev_quantity)
+        return prev_cost + (quantity - prev_quantity) * unit_cost
+
+    def _add_trade_uk(self, trade):
+        # Days whose 30 days window is complete can be finalised
+        while len(self._pending) > 0 and self._pending[0]['date'] + self.MATCHING_WINDOW < trade.date:
+            self._finalise_day(self._pending.popleft())
+        if trade.symbol not in self._days:
+            self._days[trade.symbol] = {'dates': [], 'records': [], 'start': 0}
+        days = self._days[trade.symbol]
+        if len(days['dates']) > days['start'] and days['dates'][-1] == trade.date:
+            record = days['records'][-1]
+        else:
+            record = {'symbol': trade.symbol, 'date': trade.date, 'bought': 0, 'cost': 0,
+                      'sold': 0, 'proceeds': 0, 'claimed': 0}
+            days['dates'].append(trade.date)
+            days['records'].append(record)
+            self._pending.append(record)
+        if trade.action == Actions.BUY:
+            record['bought'] += trade.quantity
+            record['cost'] += self._get_cost(trade)
+        else:
+            record['sold'] += trade.quantity
+            record['proceeds'] += self._get_proceeds(trade)
+
+    def _finalise_day(self, record):
+        """
+        Match the shares sold by the symbol in the trading day and add the
+        remaining shares bought to the section 104 pool
+        """
+        symbol = record['symbol']
+        date = record['date']
+        days = self._days[symbol]
+        same_day = min(record['bought'], record['sold'])
+        if record['sold'] > 0:
+            matches = []
+            if same_day > 0:
+                matches.append({'rule': 'SAME_DAY', 'quantity': same_day,
+                                'cost': record['cost'] * same_day / record['bought'],
+                                'acquired': date})
+            remaining = record['sold'] - same_day
+            # Shares bought in the following 30 days, earliest first
+            first = bisect.bisect_right(days['dates'], date, lo=days['start'])
+            last = bisect.bisect_right(days['dates'], date + self.MATCHING_WINDOW, lo=first)
+            for index in range(first, last):
+                if remaining <= 0:
+                    break
+                other = days['records'][index]
+                available = other['bought'] - min(other['bought'], other['sold']) - other['claimed']
+                quantity = min(remaining, available)
+                if quantity > 0:
+                    other['claimed'] += quantity
+                    remaining -= quantity
+                    matches.append({'rule': 'BED_AND_BREAKFAST', 'quantity': quantity,
+                                    'cost': other['cost'] * quantity / other['bought'],
+                                    'acquired': other['date']})
+            if remaining > 0:
+                matches.append({'rule': 'SECTION_104', 'quantity': remaining,
+                                'cost': self._pool_disposal(symbol, remaining, date),
+                                'acquired': None})
+            self._add_disposal(date, symbol, record['sold'], record['proceeds'], matches)
+        leftover = record['bought'] - same_day - record['claimed']
+        if leftover > 0:
+            pool = self._pools.setdefault(symbol, [0, 0])
+            pool[0] += leftover
+            pool[1] += record['cost'] * leftover / record['bought']
+        # Days are finalised in chronological order, the first one is this record
+        days['start'] += 1
+        if days['start'] == len(days['dates']):
+            del self._days[symbol]
+        elif days['start'] > 1024 and days['start'] * 2 > len(days['dates']):
+            del days['dates'][:days['start']]
+            del days['records'][:days['start']]
+            days['start'] = 0
@@ -0,0 +1,208 @@
+import os
+import sys
+import heapq
+import logging
+import datetime
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Trade import Trade
+from Utils.Utils import Actions, Markets, Utils, BASE_CURRENCY
+from Utils.Instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Rebalancer():
+    """
+    Propose the BUY and SELL trades bringing the holdings of a Portfolio to
+    target weights of its total value. Only the symbols drifted from their
+    target by more than the tolerance are traded, with a single trade each,
+    and quantities are whole shares. Cash flows are computed as the
+    Portfolio and the TradeValidator do: a BUY costs value + fee + stamp
+    duty on the value, a SELL returns value - fee. Sells are proposed first
+    so that their proceeds fund the buys, which are scaled down if the cash
+    is not enough and never leave less cash than the target one.
+    """
+    # Iterations of the bisection of the buys scale factor
+    SCALE_ITERATIONS = 50
+    # Cash in £ left unspent to absorb the rounding of the validation sums
+    BUDGET_MARGIN = 1e-6
+
+    def __init__(self, portfolio, fee=0.0, stamp_duty=None, tolerance=0.0):
+        """
+        Initialise
+
+            - **portfolio**: the Portfolio to rebalance, with prices
+            - **fee**: fee in £ of each proposed trade
+            - **stamp_duty**: optional, stamp duty % of the buys of each market
+              name (e.g. {"LSE": 0.5}), symbols without a known market are LSE ones
+            - **tolerance**: symbols whose weight differs from the target by
+              less than this fraction of the total value are not traded
+        """
+        self.portfolio = portfolio
+        self.fee = fee
+        self.stamp_duty = stamp_duty if stamp_duty is not None else {}
+        self.tolerance = tolerance
+
+    def get_stamp_duty(self, symbol):
+        """
+        Return the stamp duty % of the buys of the symbol
+        """
+        market = str(symbol).split(':')[0]
+        if market not in Markets.__members__:
+            market = Markets.LSE.name
+        return self.stamp_duty.get(market, 0.0)
+
+    def _get_unit_values(self, symbols, prices):
+        """
+        Return {"symbol": (price, scale, fx_rate)} of the symbols, raise
+        RuntimeError if a price or an exchange rate is not available
+        """
+        last = self.portfolio.get_last_prices([s for s in symbols if s not in prices])
+        units = {}
+        for symbol in symbols:
+            price = prices[symbol] if symbol in prices else last[symbol][0]
+            if price is None or price <= 0:
+                raise RuntimeError('Price of {} not available'.format(symbol))
+            currency, scale = Utils.get_symbol_currency(symbol)
+            fx_rate = 1.0 if currency == BASE_CURRENCY else self.portfolio.get_fx_rate(currency)
+            if fx_rate is None:
+                raise RuntimeError('Exchange rate of {} not available'.format(currency))
+            units[symbol] = (price, scale, fx_rate)
+        return units
+
+    @staticmethod
+    def _buy_cost(price, quantity, scale, fx_rate, fee, sdr):
+        # Same expression of TradeValidator, so that the result is identical
+        cost = (price * quantity) / scale * fx_rate
+        return cost + fee + (sdr * cost) / 100
+
+    @staticmethod
+    def _sell_proceeds(price, quantity, scale, fx_rate, fee):
+        return ((price / scale) * quantity * fx_rate) - fee
+
+    @metrics.timed('rebalance')
+    def propose(self, targets, prices=None, date=None):
+        """
+        Return a dict with the proposed "trades", sells first, the projected
+        "cash", the "weights" {"symbol": (current, target, after)} and the
+        "violations" of the batch validation of the trades against the
+        Portfolio, empty unless the prices changed the balances meanwhile
+
+            - **targets**: {"symbol": weight} with weights summing up to at
+              most 1, the rest is the target cash. Held symbols not in the
+              targets are sold
+            - **prices**: optional, {"symbol": price} overriding the last prices
+            - **date**: optional, date of the trades, default is today
+        """
+        if any(w < 0 for w in targets.values()) or sum(targets.values()) > 1 + 1e-9:
+            raise ValueError('Target weights must be positive and sum up to at most 1')
+        prices = prices if prices is not None else {}
+        date = (date or datetime.date.today()).strftime('%d/%m/%Y')
+        held = {h.get_symbol(): h.get_quantity() for h in self.portfolio.get_holding_list()}
+        symbols = sorted(set(held) | set(s for s, w in targets.items() if w > 0))
+        units = self._get_unit_values(symbols, prices)
+        value = {s: (units[s][0] / units[s][1]) * units[s][2] for s in symbols}
+        cash = self.portfolio.get_cash_available()
+        total = cash + sum(held.get(s, 0) * value[s] for s in symbols)
+        if total <= 0:
+            raise RuntimeError('Portfolio has no value to rebalance')
+        cash_target = (1 - sum(targets.values())) * total
+
+        # Desired change of quantity of each symbol out of the tolerance band
+        changes = {}
+        for symbol in symbols:
+            quantity = held.get(symbol, 0)
+            target = targets.get(symbol, 0) * total
+            if abs(quantity * value[symbol] - target) <= self.tolerance * total and target > 0:
+                continue
+            desired = target / value[symbol]
+            # Sells round to the nearest share, buys are whole shares not exceeding the target,
+            # a fraction of share held is sold only with the whole holding
+            if target == 0:
+                change = -quantity
+            elif desired < quantity:
+                change = int(round(desired - quantity))
+            else:
+                change = int(desired - quantity)
+            if change != 0:
+                changes[symbol] = change
+
+        trades = []
+        for symbol, change in sorted(changes.items()):
+            if change < 0:
+                price, scale, fx_rate = units[symbol]
+                cash += self._sell_proceeds(price, -change, scale, fx_rate, self.fee)
+                trades.append(Trade(date, Actions.SELL, -change, symbol, price, self.fee, 0.0, fx_rate))
+        buys = self._fit_buys({s: c for s, c in changes.items() if c > 0}, units,
+                              max(cash - max(cash_target, 0) - self.BUDGET_MARGIN, 0))
+        for symbol, quantity in sorted(buys.items()):
+            price, scale, fx_rate = units[symbol]
+            trades.append(Trade(date, Actions.BUY, quantity, symbol, price, self.fee,
+                                self.get_stamp_duty(symbol), fx_rate))
+
+        validator = self.portfolio.get_trade_validator()
+        violations = validator.validate(trades)
+        after = {s: validator.get_projected_quantity(s) * value[s] / total for s in symbols}
+        logger.info('Rebalancer - proposed %s trades for %s symbols', len(trades), len(symbols))
+        return {
+            'trades': trades,
+            'cash': validator.get_projected_cash(),
+            'weights': {s: (held.get(s, 0) * value[s] / total, targets.get(s, 0), after[s])
+                        for s in symbols},
+            'violations': violations
+        }
+
+    def _fit_buys(self, wanted, units, budget):
+        """
+        Return {"symbol": quantity} of the buys fitting the budget. The wanted
+        quantities are scaled down by the largest common factor fitting the
+        budget, then the cash left buys single shares of the symbols farthest
+        from their wanted value
+        """
+        def cost(symbol, quantity):
+            if quantity == 0:
+                return 0
+            price, scale, fx_rate = units[symbol]
+            return self._buy_cost(price, quantity, scale, fx_rate, self.fee, self.get_stamp_duty(symbol))
+
+        def scaled(factor):
+            return {s: int(q * factor) for s, q in wanted.items()}
+
+        def total_cost(quantities):
+            return sum(cost(s, q) for s, q in quantities.items())
+
+        if total_cost(wanted) <= budget:
+            return wanted
+        low, high = 0.0, 1.0
+        for _ in range(self.SCALE_ITERATIONS):
+            middle = (low + high) / 2
+            if total_cost(scaled(middle)) <= budget:
+                low = middle
+            else:
+                high = middle
+        quantities = scaled(low)
+        budget -= total_cost(quantities)
+        # Shares still wanted, the farthest from the wanted value first
+        heap = []
+        for symbol, quantity in quantities.items():
+            if quantity < wanted[symbol]:
+                price, scale, fx_rate = units[symbol]
+                missing = (wanted[symbol] - quantity) * (price / scale) * fx_rate
+                heapq.heappush(heap, (-missing, symbol))
+        while len(heap) > 0:
+            _, symbol = heapq.heappop(heap)
+            quantity = quantities[symbol]
+            extra = cost(symbol, quantity + 1) - cost(symbol, quantity)
+            if extra > budget:
+                continue
+            budget -= extra
+            quantities[symbol] = quantity + 1
+            if quantity + 1 < wanted[symbol]:
+                price, scale, fx_rate = units[symbol]
+                missing = (wanted[symbol] - quantity - 1) * (price / scale) * fx_rate
+                heapq.heappush(heap, (-missing, symbol))
+        return {s: q for s, q in quantities.items() if q > 0}
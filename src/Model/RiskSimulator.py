@@ -0,0 +1,223 @@
+import os
+import sys
+import shutil
+import logging
+import tempfile
+
+import numpy as np
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+# Paths simulated by each task, fixed so that the results of a seed do not
+# depend on the number of workers
+CHUNK_PATHS = 20000
+# Maximum number of bootstrapped returns held in memory by a task
+BATCH_ELEMENTS = 4000000
+
+
+def simulate_chunk(returns_path, shape, output_path, total_paths, start, count,
+                   values, horizon, seed):
+    """
+    Simulate count paths writing their profit/loss in the output file from
+    the given start. The returns matrix and the output are memory mapped
+    files so that they are never copied to the workers. Module level
+    function so that it can be executed in a process pool.
+    """
+    returns = np.memmap(returns_path, dtype=np.float64, mode='r', shape=shape)
+    output = np.memmap(output_path, dtype=np.float64, mode='r+', shape=(total_paths,))
+    output[start:start + count] = simulate_paths(returns, np.asarray(values), horizon,
+                                                 count, np.random.RandomState(seed))
+    output.flush()
+    del returns, output
+    return count
+
+
+def simulate_paths(returns, values, horizon, paths, rng):
+    """
+    Return the profit/loss of each path, bootstrapping whole days of the
+    log returns so that the correlation between the symbols is preserved
+
+        - **returns**: matrix of daily log returns (days x symbols)
+        - **values**: array of the current value of each symbol
+        - **horizon**: number of days of each path
+        - **paths**: number of paths
+        - **rng**: numpy RandomState
+    """
+    days, symbols = returns.shape
+    pnl = np.empty(paths)
+    batch = max(BATCH_ELEMENTS // max(horizon * symbols, 1), 1)
+    for start in range(0, paths, batch):
+        size = min(batch, paths - start)
+        days_drawn = rng.randint(0, days, size=(size, horizon))
+        # Sum of the log returns of each path: (size x symbols)
+        total = returns[days_drawn].sum(axis=1)
+        pnl[start:start + size] = np.dot(np.expm1(total), values)
+    return pnl
+
+
+class RiskSimulator():
+    """
+    Monte Carlo estimate of the value at risk of the portfolio holdings.
+    Paths are generated bootstrapping the daily returns of the stored daily
+    bars, vectorised with numpy and spread across a process pool sharing
+    the returns matrix and the results through memory mapped files.
+    Returns are in the currency of each symbol, the exchange rates are
+    considered constant. The closes are adjusted by the corporate actions
+    so that a split is not taken as a loss.
+    """
+    # Minimum number of daily returns to bootstrap from
+    MIN_OBSERVATIONS = 20
+    PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+    HISTOGRAM_BINS = 50
+
+    def __init__(self, bar_store, max_workers=None, corporate_actions=None):
+        """
+        Initialise
+
+            - **bar_store**: BarStore of the daily closes
+            - **max_workers**: optional, number of worker processes, default is
+              the number of cpus, 1 to simulate in this process
+            - **corporate_actions**: optional, CorporateActions adjusting the closes
+        """
+        self.bar_store = bar_store
+        self.max_workers = max_workers
+        self.corporate_actions = corporate_actions
+
+    def get_returns(self, symbols, start=None):
+        """
+        Return a tuple (dates, symbols, returns) of the daily log returns of
+        the symbols having stored closes, on the dates all of them have a
+        close. returns is a matrix (days x symbols)
+
+            - **symbols**: list of symbols
+            - **start**: optional, first date of the closes used
+        """
+        closes = {}
+        for symbol in symbols:
+            series = dict(self.bar_store.get_closes(symbol, start=start,
+                                                    corporate_actions=self.corporate_actions))
+            if len(series) > self.MIN_OBSERVATIONS:
+                closes[symbol] = series
+        if len(closes) == 0:
+            return [], [], np.empty((0, 0))
+        dates = sorted(set.intersection(*(set(s) for s in closes.values())))
+        kept = sorted(closes)
+        prices = np.array([[closes[s][d] for s in kept] for d in dates], dtype=np.float64)
+        if len(dates) < 2 or np.any(prices <= 0):
+            return [], [], np.empty((0, 0))
+        return dates[1:], kept, np.diff(np.log(prices), axis=0)
+
+    def simulate_portfolio(self, portfolio, **kwargs):
+        """
+        Simulate the holdings of the portfolio at their current value, see
+        simulate. Holdings without a price or without enough stored closes
+        are reported as excluded
+        """
+        values = {}
+        excluded = []
+        for holding in portfolio.get_holding_list():
+            value = holding.get_value()
+            if value is None:
+                excluded.append(holding.get_symbol())
+            else:
+                values[holding.get_symbol()] = value
+        start = kwargs.pop('start', None)
+        dates, symbols, returns = self.get_returns(sorted(values), start)
+        excluded.extend(s for s in values if s not in symbols)
+        if len(dates) < self.MIN_OBSERVATIONS:
+            raise RuntimeError('Not enough daily bars stored to simulate the holdings')
+        result = self.simulate(returns, [values[s] for s in symbols], **kwargs)
+        result['symbols'] = symbols
+        result['excluded'] = sorted(excluded)
+        result['first_date'] = dates[0]
+        result['last_date'] = dates[-1]
+        return result
+
+    @metrics.timed('risk_simulation')
+    def simulate(self, returns, values, paths=10000, horizon=1, confidence=0.95, seed=None):
+        """
+        Simulate the profit/loss of the holdings over the horizon and return
+        a dict with value at risk, conditional value at risk (expected
+        shortfall), statistics, percentiles and histogram of the scenarios.
+        Losses are positive values at risk
+
+            - **returns**: matrix of daily log returns (days x symbols)
+            - **values**: current value of each symbol
+            - **paths**: number of simulated paths
+            - **horizon**: number of days of each path
+            - **confidence**: confidence level of VaR and CVaR, e.g. 0.99
+            - **seed**: optional, seed of the random generator
+        """
+        returns = np.ascontiguousarray(returns, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if returns.ndim != 2 or 0 in returns.shape or returns.shape[1] != len(values):
+            raise ValueError('Returns matrix does not match the values')
+        if paths < 1 or horizon < 1 or not 0 < confidence < 1:
+            raise ValueError('Invalid simulation parameters')
+        chunks = [(start, min(CHUNK_PATHS, paths - start)) for start in range(0, paths, CHUNK_PATHS)]
+        # Seed of each chunk drawn from the seed of the simulation
+        seeds = np.random.RandomState(seed).randint(0, 2 ** 31 - 1, size=len(chunks)).tolist()
+        workers = self.max_workers if self.max_workers is not None else os.cpu_count() or 1
+        if workers < 2 or len(chunks) < 2:
+            pnl = np.concatenate([simulate_paths(returns, values, horizon, count, np.random.RandomState(s))
+                                  for (_, count), s in zip(chunks, seeds)])
+        else:
+            pnl = self._simulate_pool(returns, values, horizon, paths, chunks, seeds, workers)
+        result = self.summarise(pnl, confidence)
+        result.update({'paths': paths, 'horizon': horizon, 'value': float(values.sum()),
+                       'observations': returns.shape[0]})
+        logger.info('RiskSimulator - simulated %s paths of %s symbols', paths, len(values))
+        return result
+
+    def _simulate_pool(self, returns, values, horizon, paths, chunks, seeds, workers):
+        """
+        Simulate the chunks of paths in a process pool, return the profit/loss of each path
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        directory = tempfile.mkdtemp(prefix='tradingmate_risk_')
+        try:
+            returns_path = os.path.join(directory, 'returns.dat')
+            output_path = os.path.join(directory, 'pnl.dat')
+            shared = np.memmap(returns_path, dtype=np.float64, mode='w+', shape=returns.shape)
+            shared[:] = returns
+            shared.flush()
+            output = np.memmap(output_path, dtype=np.float64, mode='w+', shape=(paths,))
+            output.flush()
+            del shared, output
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                futures = [executor.submit(simulate_chunk, returns_path, returns.shape,
+                                           output_path, paths, start, count,
+                                           values.tolist(), horizon, s)
+                           for (start, count), s in zip(chunks, seeds)]
+                for future in futures:
+                    future.result()
+            output = np.memmap(output_path, dtype=np.float64, mode='r', shape=(paths,))
+            pnl = np.array(output)
+            del output
+            return pnl
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @classmethod
+    def summarise(cls, pnl, confidence):
+        """
+        Return the risk measures of the simulated profit/loss of each path
+        """
+        var = -float(np.percentile(pnl, 100 * (1 - confidence)))
+        tail = pnl[pnl <= -var]
+        counts, edges = np.histogram(pnl, bins=cls.HISTOGRAM_BINS)
+        return {
+            'confidence': confidence,
+            'var': var,
+            'cvar': -float(tail.mean()) if len(tail) > 0 else var,
+            'mean': float(pnl.mean()),
+            'std': float(pnl.std()),
+            'percentiles': {p: float(v) for p, v in zip(cls.PERCENTILES, np.percentile(pnl, cls.PERCENTILES))},
+            'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()}
+        }
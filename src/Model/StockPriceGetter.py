@@ -1,18 +1,23 @@
 import os
 import sys
-import inspect
-import requests
 import json
+import time
 import logging
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from Utils.TaskThread import TaskThread
 from Utils.ConfigurationManager import ConfigurationManager
-from Utils.Utils import Markets
+from Utils.Utils import Markets, Utils, BASE_CURRENCY
+from Utils.Instrumentation import metrics
+from .PriceCache import PriceCache
+from .FxRates import FxRates
+from .PriceHistory import PriceHistory
+from .BarStore import BarStore
+
+logger = logging.getLogger(__name__)
 
 
 class StockPriceGetter(TaskThread):
@@ -21,56 +26,142 @@ class StockPriceGetter(TaskThread):
         TaskThread.__init__(self)
         self.config = config
         self.onNewPriceDataCallback = onNewPriceDataCallback
+        self.price_cache = PriceCache(config.get_price_cache_filepath())
+        # Exchange rates of the holdings currencies, fetched when expired
+        self.fx_rates = FxRates(config.get_fx_ttl())
+        self._fx_cache_loaded = False
+        # Symbols of the watchlist, kept across the resets of the holdings
+        self.watchList = []
+        # Prices of each fetch, kept across the resets of the holdings
+        self.price_history = PriceHistory(config.get_intraday_history_size())
+        # Daily bars of the fetched symbols, only the new ones are downloaded
+        self.bar_store = BarStore(config.get_bar_store_filepath())
+        # Time of the last fetch returning at least a price
+        self.last_fetch_time = None
         self.reset()
-        logging.info('StockPriceGetter initialised')
+        logger.info('StockPriceGetter initialised')
 
     def _read_configuration(self):
         # Override the parent class default value
         self._interval = self.config.get_alpha_vantage_polling_period()
 
+    def apply_configuration(self):
+        """
+        Apply the changed settings without discarding the fetched prices. A
+        new fetch is started if enabled, so that a new API key or base URI
+        is used straight away
+        """
+        self._read_configuration()
+        price_cache = PriceCache(self.config.get_price_cache_filepath())
+        if price_cache.filepath != self.price_cache.filepath:
+            self.price_cache = price_cache
+        bar_store = BarStore(self.config.get_bar_store_filepath())
+        if bar_store.filepath != self.bar_store.filepath:
+            self.bar_store.close()
+            self.bar_store = bar_store
+        if self.config.get_intraday_history_size() != self.price_history.size:
+            self.price_history = PriceHistory(self.config.get_intraday_history_size())
+        if self.is_enabled():
+            self.cancel_timeout()
+        logger.info('StockPriceGetter - configuration applied')
+
+    @metrics.timed('price_getter_task')
     def task(self):
         priceDict = {}
-        for symbol in self.symbolList:
+        for symbol in self.get_symbol_list():
             if not self._finished.isSet():
+                self.beat()
                 value = self._fetch_price_data(symbol)
                 # Wait as suggested by AlphaVantage support
                 self._timeout.wait(2)
                 if value is not None:
                     priceDict[symbol] = value
+        # Exchange rates share the same rate limit of the prices
+        self._load_cached_fx_rates()
+        currencies = [Utils.get_symbol_currency(s)[0] for s in self.symbolList]
+        fetched = []
+        for currency in self.fx_rates.get_expired(currencies):
+            if not self._finished.isSet():
+                self.beat()
+                rate = self._fetch_fx_rate(currency)
+                self._timeout.wait(2)
+                if rate is not None:
+                    self.fx_rates.set_rate(currency, rate)
+                    fetched.append(currency)
         if not self._finished.isSet():
             self.lastData = priceDict  # Store internally
+            if len(priceDict) > 0:
+                self.last_fetch_time = time.time()
+            self.price_history.append_prices(priceDict)
+            self.price_history.retain(self.get_symbol_list())
+            cached = dict(priceDict)
+            cached.update(self.fx_rates.to_cache_prices(fetched))
+            self.price_cache.update(cached)
             self.onNewPriceDataCallback()  # Notify the model
 
+    @metrics.timed('price_fetch')
     def _fetch_price_data(self, symbol):
         try:
             url = self._build_url("TIME_SERIES_DAILY",
-                                  symbol, "5min", self.config.get_alpha_vantage_api_key())
+                                  symbol, "5min", self.config.get_alpha_vantage_api_key(),
+                                  self.bar_store.get_output_size(symbol))
         except Exception as e:
-            logging.error(e)
-            logging.error(
+            logger.error(e)
+            logger.error(
                 'StockPriceGetter - Unable to build url for {}'.format(symbol))
             return None
+        import requests
         try:
             response = requests.get(url)
             if response.status_code != 200:
-                logging.error('StockPriceGetter - Request for {} returned code {}'.format(
+                logger.error('StockPriceGetter - Request for {} returned code {}'.format(
                     url.split('apikey')[0], response.status_code))
+                metrics.increment('price_fetch_errors')
                 return None
-            data = json.loads(response.text)
-            timeSerie = data["Time Series (Daily)"]
-            last = next(iter(timeSerie.values()))
-            value = float(last["4. close"])
+            bars = BarStore.parse_daily_series(json.loads(response.text))
+            value = bars[-1][4]
+            self.bar_store.append(symbol, bars)
         except Exception:
-            logging.error(
+            logger.error(
                 'StockPriceGetter - Unable to fetch data from {}'.format(url.split('apikey')[0]))
+            metrics.increment('price_fetch_errors')
             value = None
         return value
 
-    def _build_url(self, aLength, aSymbol, anInterval, anApiKey):
+    @metrics.timed('fx_fetch')
+    def _fetch_fx_rate(self, currency):
+        url = '{}?function=CURRENCY_EXCHANGE_RATE&from_currency={}&to_currency={}&apikey={}'.format(
+            self.config.get_alpha_vantage_base_url(), currency, BASE_CURRENCY,
+            self.config.get_alpha_vantage_api_key())
+        import requests
+        try:
+            response = requests.get(url)
+            if response.status_code != 200:
+                logger.error('StockPriceGetter - FX request for {} returned code {}'.format(
+                    currency, response.status_code))
+                metrics.increment('fx_fetch_errors')
+                return None
+            data = json.loads(response.text)
+            return float(data["Realtime Currency Exchange Rate"]["5. Exchange Rate"])
+        except Exception:
+            logger.error('StockPriceGetter - Unable to fetch {} exchange rate'.format(currency))
+            metrics.increment('fx_fetch_errors')
+            return None
+
+    def _load_cached_fx_rates(self):
+        """
+        Load the exchange rates stored in the cache, once
+        """
+        if not self._fx_cache_loaded:
+            self._fx_cache_loaded = True
+            self.fx_rates.load_cache_entries(self.price_cache.load_entries())
+
+    def _build_url(self, aLength, aSymbol, anInterval, anApiKey, outputSize='compact'):
         function = "function={}".format(aLength)
         symbol = "symbol={}".format(self.convert_market_to_alphavantage(aSymbol))
         apiKey = "apikey={}".format(anApiKey)
-        return '{}?{}&{}&{}'.format(self.config.get_alpha_vantage_base_url(), function, symbol, apiKey)
+        return '{}?{}&{}&{}&outputsize={}'.format(
+            self.config.get_alpha_vantage_base_url(), function, symbol, apiKey, outputSize)
 
     def convert_market_to_alphavantage(self, symbol):
         """
@@ -85,9 +176,53 @@ class StockPriceGetter(TaskThread):
     def get_last_data(self):
         return self.lastData
 
+    def get_cached_data(self):
+        """
+        Return the prices stored in the cache by the previous fetches
+        """
+        self._load_cached_fx_rates()
+        return {s: p for s, p in self.price_cache.load().items()
+                if not s.startswith(FxRates.CACHE_PREFIX)}
+
+    def get_last_fetch_time(self):
+        """
+        Return the time in seconds since the epoch of the last fetch
+        returning at least a price, None if none yet
+        """
+        return self.last_fetch_time
+
+    def get_fx_rates(self):
+        """
+        Return the exchange rates to the base currency {"currency": rate}
+        """
+        return self.fx_rates.get_rates()
+
+    def get_price_history(self):
+        """
+        Return the PriceHistory of the fetched prices
+        """
+        return self.price_history
+
+    def get_bar_store(self):
+        """
+        Return the BarStore of the daily bars of the fetched symbols
+        """
+        return self.bar_store
+
     def set_symbol_list(self, aList):
         self.symbolList = aList
 
+    def set_watchlist(self, aList):
+        self.watchList = aList
+
+    def get_symbol_list(self):
+        """
+        Return the symbols to fetch: the holdings followed by the watchlist
+        symbols not held, so that each symbol is fetched once
+        """
+        held = set(self.symbolList)
+        return list(self.symbolList) + [s for s in self.watchList if s not in held]
+
     def reset(self):
         self._read_configuration()
         self.lastData = {}
@@ -0,0 +1,118 @@
+import os
+import sys
+import csv
+import json
+import logging
+import datetime
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from Utils.Utils import Actions
+from Utils.Trade import Trade
+
+logger = logging.getLogger(__name__)
+
+class TradeImporter():
+    """
+    Parse broker statements exported as CSV or JSON lines into Trade instances.
+    Files are read one record at a time and each record is mapped to the Trade
+    fields through a configurable columns mapping.
+    """
+    # Default mapping {"trade field": "column name"}
+    DEFAULT_COLUMNS = {
+        'date': 'date',
+        'action': 'action',
+        'quantity': 'quantity',
+        'symbol': 'symbol',
+        'price': 'price',
+        'fee': 'fee',
+        'stamp_duty': 'stamp_duty',
+        'fx_rate': 'fx_rate'
+    }
+    # Fields that can be missing from a record
+    OPTIONAL_FIELDS = {'symbol': '', 'price': 0.0, 'fee': 0.0, 'stamp_duty': 0.0, 'fx_rate': 1.0}
+
+    def __init__(self, columns=None, date_format='%d/%m/%Y', actions=None):
+        """
+        Initialise
+
+            - **columns**: optional, dict mapping Trade fields to the file columns
+            - **date_format**: format of the dates in the file
+            - **actions**: optional, dict mapping the file action names to Actions names
+        """
+        self.columns = dict(self.DEFAULT_COLUMNS)
+        if columns is not None:
+            self.columns.update(columns)
+        self.date_format = date_format
+        self.actions = {k.upper(): v for k, v in (actions or {}).items()}
+
+    def iter_records(self, filepath):
+        """
+        Yield a tuple (line number, record) for each record of the file.
+        CSV files are detected by the .csv extension and records are dicts,
+        any other file is read as JSON lines and records are the raw lines
+        """
+        with open(filepath, 'r', newline='') as f:
+            if filepath.lower().endswith('.csv'):
+                reader = csv.DictReader(f)
+                for record in reader:
+                    yield reader.line_num, record
+            else:
+                for line_number, line in enumerate(f, start=1):
+                    if len(line.strip()) > 0:
+                        yield line_number, line
+
+    def to_trade(self, record):
+        """
+        Map a record of the file into a Trade
+        """
+        if isinstance(record, str):
+            record = json.loads(record)
+        item = {}
+        for field, column in self.columns.items():
+            value = record.get(column)
+            if value is None or (isinstance(value, str) and len(value.strip()) == 0):
+                if field not in self.OPTIONAL_FIELDS:
+                    raise ValueError('Missing column {}'.format(column))
+                value = self.OPTIONAL_FIELDS[field]
+            item[field] = value.strip() if isinstance(value, str) else value
+        date = datetime.datetime.strptime(item['date'], self.date_format)
+        item['date'] = date.strftime('%d/%m/%Y')
+        action = str(item['action']).upper()
+        item['action'] = self.actions.get(action, action)
+        if item['action'] not in Actions.__members__:
+            raise ValueError('Invalid action {}'.format(item['action']))
+        item['quantity'] = float(item['quantity'])
+        return Trade.from_dict(item)
+
+    def iter_trades(self, filepath):
+        """
+        Yield a tuple (line number, Trade, error) for each record of the file
+        where either Trade or error message is None
+        """
+        for line_number, record in self.iter_records(filepath):
+            try:
+                yield line_number, self.to_trade(record), None
+            except Exception as e:
+                yield line_number, None, str(e)
+
+    def parse(self, filepath):
+        """
+        Parse the whole file and return a tuple of three lists: the parsed
+        trades, the line number of each trade and the parsing errors as
+        dictionaries {"line": int, "message": string}
+        """
+        trades = []
+        lines = []
+        errors = []
+        for line_number, trade, error in self.iter_trades(filepath):
+            if error is not None:
+                errors.append({'line': line_number, 'message': error})
+            else:
+                trades.append(trade)
+                lines.append(line_number)
+        logger.info('TradeImporter - parsed {} trades and {} errors from {}'.format(
+            len(trades), len(errors), filepath))
+        return trades, lines, errors
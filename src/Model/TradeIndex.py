@@ -0,0 +1,236 @@
+import os
+import sys
+import bisect
+import logging
+from array import array
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from .TradeSlice import TradeSlice, OFFSET_BITS, OFFSET_MASK
+
+logger = logging.getLogger(__name__)
+
+class TradeIndex():
+    """
+    Secondary indexes over a trade list, stored alongside it as arrays of
+    offsets: the offsets of the trades of each symbol in list order and the
+    offsets of the trades sorted by date, globally and per symbol. Date entries
+    are the date ordinal shifted by OFFSET_BITS plus the offset, so that a
+    date range is found by bisection and trades of the same day keep the
+    list order. The date indexes are built on the first date query.
+    The index must be updated after each change of the trade list.
+    """
+
+    def __init__(self, trades):
+        """
+        Initialise
+
+            - **trades**: the trade list, it is referenced and not copied
+        """
+        self._trades = trades
+        self.rebuild()
+
+    def __len__(self):
+        return self._size
+
+    def rebuild(self):
+        """
+        Index again the whole trade list
+        """
+        self._size = 0
+        # Offsets of each symbol in list order: {"symbol": array}
+        self._symbol_offsets = {}
+        # Date entries, None until requested
+        self._date_entries = None
+        self._symbol_date_entries = None
+        self.extend(len(self._trades))
+        logger.info('TradeIndex - indexed {} trades'.format(self._size))
+
+    def append(self):
+        """
+        Index the trade appended at the end of the trade list
+        """
+        self.extend(1)
+
+    def extend(self, count):
+        """
+        Index the given number of trades appended at the end of the trade list
+        """
+        for offset in range(self._size, self._size + count):
+            trade = self._trades[offset]
+            if trade.symbol not in self._symbol_offsets:
+                self._symbol_offsets[trade.symbol] = array('q')
+            self._symbol_offsets[trade.symbol].append(offset)
+            if self._date_entries is not None:
+                self._add_date_entry(trade, offset)
+        self._size += count
+
+    def insert(self, offset):
+        """
+        Index the trade inserted in the trade list at the given offset, the
+        offsets of the following trades are shifted
+        """
+        if offset == self._size:
+            self.append()
+            return
+        self._shift_offsets(offset, 1)
+        trade = self._trades[offset]
+        if trade.symbol not in self._symbol_offsets:
+            self._symbol_offsets[trade.symbol] = array('q')
+        offsets = self._symbol_offsets[trade.symbol]
+        offsets.insert(bisect.bisect_left(offsets, offset), offset)
+        if self._date_entries is not None:
+            self._add_date_entry(trade, offset)
+        self._size += 1
+
+    def remove(self, offset):
+        """
+        Remove the index entries of the trade at the given offset, to be called
+        before the trade is removed from the list
+        """
+        if offset == self._size - 1:
+            self.pop()
+            return
+        trade = self._trades[offset]
+        offsets = self._symbol_offsets[trade.symbol]
+        del offsets[bisect.bisect_left(offsets, offset)]
+        if len(offsets) == 0:
+            del self._symbol_offsets[trade.symbol]
+        if self._date_entries is not None:
+            self._remove_date_entry(trade, offset)
+        self._shift_offsets(offset + 1, -1)
+        self._size -= 1
+
+    def replace(self, offset, old_trade):
+        """
+        Update the index entries of the trade at the given offset, to be called
+        after the trade has been replaced in the list
+
+            - **offset**: offset of the trade in the list
+            - **old_trade**: the trade replaced
+        """
+        trade = self._trades[offset]
+        if trade.symbol != old_trade.symbol:
+            offsets = self._symbol_offsets[old_trade.symbol]
+            del offsets[bisect.bisect_left(offsets, offset)]
+            if len(offsets) == 0:
+                del self._symbol_offsets[old_trade.symbol]
+            if trade.symbol not in self._symbol_offsets:
+                self._symbol_offsets[trade.symbol] = array('q')
+            offsets = self._symbol_offsets[trade.symbol]
+            offsets.insert(bisect.bisect_left(offsets, offset), offset)
+        if self._date_entries is not None:
+            self._remove_date_entry(old_trade, offset)
+            self._add_date_entry(trade, offset)
+
+    def pop(self):
+        """
+        Remove the index entries of the last trade, to be called before the
+        trade is removed from the list
+        """
+        if self._size == 0:
+            raise IndexError('Pop from empty index')
+        offset = self._size - 1
+        trade = self._trades[offset]
+        offsets = self._symbol_offsets[trade.symbol]
+        offsets.pop()
+        if len(offsets) == 0:
+            del self._symbol_offsets[trade.symbol]
+        if self._date_entries is not None:
+            self._remove_date_entry(trade, offset)
+        self._size -= 1
+
+    def get_symbols(self):
+        """
+        Return the list of indexed symbols
+        """
+        return list(self._symbol_offsets.keys())
+
+    def get_symbol_trades(self, symbol):
+        """
+        Return a TradeSlice of the trades of the symbol in list order
+        """
+        offsets = self._symbol_offsets.get(symbol, array('q'))
+        return TradeSlice(self._trades, offsets)
+
+    def get_trades_between(self, start=None, end=None, symbol=None):
+        """
+        Return a TradeSlice of the trades, optionally of a single symbol,
+        with date in the given range, sorted by date
+
+            - **start**: optional, first date of the range (included)
+            - **end**: optional, last date of the range (included)
+            - **symbol**: optional, select only the trades of this symbol
+        """
+        if self._date_entries is None:
+            self._build_date_entries()
+        if symbol is None:
+            entries = self._date_entries
+        else:
+            entries = self._symbol_date_entries.get(symbol, array('q'))
+        lo = 0
+        hi = len(entries)
+        if start is not None:
+            lo = bisect.bisect_left(entries, start.toordinal() << OFFSET_BITS)
+        if end is not None:
+            hi = bisect.bisect_left(entries, (end.toordinal() + 1) << OFFSET_BITS, lo)
+        return TradeSlice(self._trades, entries, lo, hi)
+
+    def _build_date_entries(self):
+        entries = sorted(self._get_entry(self._trades[o], o) for o in range(self._size))
+        self._date_entries = array('q', entries)
+        self._symbol_date_entries = {}
+        for entry in entries:
+            symbol = self._trades[entry & OFFSET_MASK].symbol
+            if symbol not in self._symbol_date_entries:
+                self._symbol_date_entries[symbol] = array('q')
+            self._symbol_date_entries[symbol].append(entry)
+
+    def _add_date_entry(self, trade, offset):
+        entry = self._get_entry(trade, offset)
+        self._insert_entry(self._date_entries, entry)
+        if trade.symbol not in self._symbol_date_entries:
+            self._symbol_date_entries[trade.symbol] = array('q')
+        self._insert_entry(self._symbol_date_entries[trade.symbol], entry)
+
+    def _remove_date_entry(self, trade, offset):
+        entry = self._get_entry(trade, offset)
+        self._remove_entry(self._date_entries, entry)
+        entries = self._symbol_date_entries[trade.symbol]
+        self._remove_entry(entries, entry)
+        if len(entries) == 0:
+            del self._symbol_date_entries[trade.symbol]
+
+    def _shift_offsets(self, start, delta):
+        """
+        Add delta to all the offsets from start onwards. The order of the
+        entries does not change since all the following offsets are shifted
+        """
+        for offsets in self._symbol_offsets.values():
+            index = bisect.bisect_left(offsets, start)
+            if index < len(offsets):
+                offsets[index:] = array('q', [o + delta for o in offsets[index:]])
+        if self._date_entries is not None:
+            for entries in [self._date_entries] + list(self._symbol_date_entries.values()):
+                entries[:] = array('q', [e + delta if e & OFFSET_MASK >= start else e for e in entries])
+
+    @staticmethod
+    def _get_entry(trade, offset):
+        return (trade.date.toordinal() << OFFSET_BITS) | offset
+
+    @staticmethod
+    def _insert_entry(entries, entry):
+        # Trades are usually appended in chronological order
+        if len(entries) == 0 or entries[-1] < entry:
+            entries.append(entry)
+        else:
+            entries.insert(bisect.bisect_left(entries, entry), entry)
+
+    @staticmethod
+    def _remove_entry(entries, entry):
+        if entries[-1] == entry:
+            entries.pop()
+        else:
+            del entries[bisect.bisect_left(entries, entry)]
@@ -0,0 +1,66 @@
+import os
+import sys
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+# Bits of an index entry holding the offset in the trade list
+OFFSET_BITS = 32
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+class TradeSlice():
+    """
+    Read only sequence of trades selected by a TradeIndex. The slice refers to
+    the trade list and to a range of the index entries so that no trade or
+    list is copied. The slice is valid until the trade list is modified.
+    """
+
+    def __init__(self, trades, entries, start=0, stop=None):
+        """
+        Initialise
+
+            - **trades**: the trade list
+            - **entries**: array of index entries, the lowest OFFSET_BITS of each
+              entry are the offset of the trade in the list
+            - **start**: first entry of the slice
+            - **stop**: optional, entry after the last one of the slice
+        """
+        self._trades = trades
+        self._entries = entries
+        self._start = start
+        self._stop = len(entries) if stop is None else stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError('Slice step not supported')
+            return TradeSlice(self._trades, self._entries, self._start + start,
+                              self._start + max(start, stop))
+        if item < 0:
+            item += len(self)
+        if item < 0 or item >= len(self):
+            raise IndexError('TradeSlice index out of range')
+        return self._trades[self._entries[self._start + item] & OFFSET_MASK]
+
+    def __iter__(self):
+        trades = self._trades
+        entries = self._entries
+        for i in range(self._start, self._stop):
+            yield trades[entries[i] & OFFSET_MASK]
+
+    def __reversed__(self):
+        trades = self._trades
+        entries = self._entries
+        for i in range(self._stop - 1, self._start - 1, -1):
+            yield trades[entries[i] & OFFSET_MASK]
+
+    def get_offsets(self):
+        """
+        Return the list of offsets in the trade list of the trades of the slice
+        """
+        return [self._entries[i] & OFFSET_MASK for i in range(self._start, self._stop)]
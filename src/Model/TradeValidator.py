@@ -0,0 +1,128 @@
+import os
+import sys
+import logging
+import datetime
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from Utils.Utils import Actions, Messages
+
+logger = logging.getLogger(__name__)
+
+class TradeValidator():
+    """
+    Validate pending trades against projected cash and holdings balances.
+    Each valid trade updates the projected balances so a batch of trades can
+    be validated in a single pass without applying them to the Portfolio.
+    Invalid trades do not affect the projection.
+    """
+
+    def __init__(self, cash_available, quantity_getter, corporate_actions=None, actions_applied=None):
+        """
+        Initialise
+
+            - **cash_available**: the cash available before the pending trades
+            - **quantity_getter**: function returning the held quantity of a symbol
+              before the pending trades
+            - **corporate_actions**: optional, CorporateActions applied to the
+              projected quantities before the trades dated on or after them
+            - **actions_applied**: number of corporate actions already applied to
+              the quantities of quantity_getter, default is the ones effective today
+        """
+        self._cash = cash_available
+        self._quantity_getter = quantity_getter
+        # Projected quantity of the symbols touched by the pending trades
+        self._quantities = {}
+        self._corporate_actions = corporate_actions
+        if corporate_actions is not None and actions_applied is None:
+            actions_applied = corporate_actions.get_position(datetime.date.today())
+        self._actions_applied = actions_applied
+
+    def get_projected_cash(self):
+        """
+        Return the cash available after the validated trades
+        """
+        return self._cash
+
+    def get_projected_quantity(self, symbol):
+        """
+        Return the quantity of the symbol held after the validated trades
+        """
+        if symbol in self._quantities:
+            return self._quantities[symbol]
+        return self._quantity_getter(symbol)
+
+    def check_trade(self, trade):
+        """
+        Return the error message if the trade is not valid against the
+        projected balances, None otherwise. Valid trades are applied to
+        the projected balances
+        """
+        symbol, shares = trade.symbol, trade.quantity
+        if self._corporate_actions is not None:
+            self._apply_corporate_actions(trade.date)
+            if self._corporate_actions.get_position(trade.date) < self._actions_applied:
+                # Trade dated before actions already applied to the quantities
+                factor, symbol = self._corporate_actions.get_factor(
+                    trade.symbol, trade.date, self._actions_applied)
+                shares = self._corporate_actions.adjust_quantity(trade.quantity, factor)
+        if trade.action == Actions.WITHDRAW:
+            if trade.quantity > self._cash:
+                return Messages.INSUF_FUNDING.value
+            self._cash -= trade.quantity
+        elif trade.action == Actions.DEPOSIT or trade.action == Actions.DIVIDEND:
+            self._cash += trade.quantity
+        elif trade.action == Actions.BUY:
+            cost = (trade.price * trade.quantity) / trade.scale * trade.fx_rate  # in £
+            tax = (trade.sdr * cost) / 100
+            totalCost = cost + trade.fee + tax
+            if totalCost > self._cash:
+                return Messages.INSUF_FUNDING.value
+            self._cash -= totalCost
+            self._quantities[symbol] = self.get_projected_quantity(symbol) + shares
+        elif trade.action == Actions.SELL:
+            quantity = self.get_projected_quantity(symbol)
+            if shares > quantity:
+                return Messages.INSUF_HOLDINGS.value
+            self._quantities[symbol] = quantity - shares
+            self._cash += ((trade.price/trade.scale) * trade.quantity * trade.fx_rate) - trade.fee
+        return None
+
+    def _apply_corporate_actions(self, date):
+        """
+        Apply to the projected quantities the corporate actions effective on
+        or before the date not applied yet
+        """
+        end = self._corporate_actions.get_position(date)
+        for action in self._corporate_actions.get_actions(self._actions_applied, end):
+            quantity = self.get_projected_quantity(action['symbol'])
+            if quantity == 0:
+                continue
+            if action['type'] == 'SYMBOL_CHANGE':
+                self._quantities[action['symbol']] = 0
+                self._quantities[action['new_symbol']] = (
+                    self.get_projected_quantity(action['new_symbol']) + quantity)
+            else:
+                self._quantities[action['symbol']] = self._corporate_actions.adjust_quantity(
+                    quantity, action['ratio'])
+        self._actions_applied = max(end, self._actions_applied)
+
+    def validate(self, trades):
+        """
+        Validate an iterable of trades in order and return the list of violations
+        as dictionaries {"index": int, "trade": Trade, "message": string}.
+        An empty list means that the whole batch is valid
+        """
+        violations = []
+        count = 0
+        for index, trade in enumerate(trades):
+            message = self.check_trade(trade)
+            if message is not None:
+                violations.append({'index': index, 'trade': trade, 'message': message})
+            count += 1
+        if len(violations) > 0:
+            logger.warning('TradeValidator - {} invalid trades out of {}'.format(
+                len(violations), count))
+        return violations
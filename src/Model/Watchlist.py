@@ -0,0 +1,108 @@
+import os
+import sys
+import bisect
+import logging
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Markets, Utils
+
+logger = logging.getLogger(__name__)
+
+
+class Watchlist():
+    """
+    Persistent list of the symbols whose prices are tracked without holding
+    them. The symbols are kept sorted and each change is written to the file
+    """
+
+    def __init__(self, filepath):
+        """
+        Initialise
+
+            - **filepath**: the watchlist file, supports the {home} placeholder
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        self._symbols = []
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, symbol):
+        index = bisect.bisect_left(self._symbols, symbol)
+        return index < len(self._symbols) and self._symbols[index] == symbol
+
+    def load(self):
+        """
+        Read the symbols from the file, the watchlist is empty if the file
+        does not exist or can't be read
+        """
+        self._symbols = []
+        if not os.path.isfile(self.filepath):
+            return
+        data = Utils.load_json_file(self.filepath)
+        if data is None or not isinstance(data.get('symbols'), list):
+            logger.error('Watchlist - unable to read {}'.format(self.filepath))
+            return
+        self._symbols = sorted(set(s for s in data['symbols'] if self.is_symbol_valid(s)))
+        logger.info('Watchlist - loaded {} symbols'.format(len(self._symbols)))
+
+    def save(self):
+        """
+        Write the symbols to the file, return True if succeeded
+        """
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        if not Utils.write_json_file(self.filepath, {'symbols': self._symbols}):
+            logger.error('Watchlist - unable to write {}'.format(self.filepath))
+            return False
+        return True
+
+    def get_symbols(self):
+        """
+        Return the list of symbols sorted alphabetically
+        """
+        return list(self._symbols)
+
+    def add(self, symbol):
+        """
+        Add the symbol, in the form MARKET:SYMBOL, and save the watchlist.
+        Return False if the symbol is already in the watchlist. Raise
+        ValueError if the symbol is not valid and RuntimeError if the
+        watchlist can't be saved
+        """
+        if not self.is_symbol_valid(symbol):
+            raise ValueError('Invalid symbol {}'.format(symbol))
+        if symbol in self:
+            return False
+        bisect.insort(self._symbols, symbol)
+        if not self.save():
+            self._symbols.remove(symbol)
+            raise RuntimeError('Unable to save the watchlist')
+        logger.info('Watchlist - added {}'.format(symbol))
+        return True
+
+    def remove(self, symbol):
+        """
+        Remove the symbol and save the watchlist. Return False if the symbol
+        is not in the watchlist. Raise RuntimeError if the watchlist can't be saved
+        """
+        if symbol not in self:
+            return False
+        self._symbols.remove(symbol)
+        if not self.save():
+            bisect.insort(self._symbols, symbol)
+            raise RuntimeError('Unable to save the watchlist')
+        logger.info('Watchlist - removed {}'.format(symbol))
+        return True
+
+    @staticmethod
+    def is_symbol_valid(symbol):
+        """
+        Return True if the symbol is in the form MARKET:SYMBOL of a supported market
+        """
+        if not isinstance(symbol, str) or ':' not in symbol:
+            return False
+        market, code = symbol.split(':', 1)
+        return market in Markets.__members__ and len(code) > 0
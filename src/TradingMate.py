@@ -1,20 +1,27 @@
 import os
 import sys
-import inspect
 import logging
-import datetime as dt
+import threading
+import itertools
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from Model.DatabaseHandler import DatabaseHandler
-from Utils.Utils import Callbacks, Actions, Messages
-from UI.View import View
+from Utils.Utils import Callbacks, Actions, Messages, BASE_CURRENCY
 from Model.Portfolio import Portfolio
+from Model.TradeImporter import TradeImporter
+from Model.Watchlist import Watchlist
+from Model.AlertsEngine import AlertsEngine
+from Model.PortfolioHistory import PortfolioHistory
+from Model.CorporateActions import CorporateActions
 from Utils.ConfigurationManager import ConfigurationManager
-from Utils.Utils import Utils
+from Utils.Instrumentation import metrics
+from Utils.LogPipeline import LogPipeline
+from Utils.HealthMonitor import HealthMonitor
+
+logger = logging.getLogger('TradingMate')
 
 
 class TradingMate():
@@ -22,34 +29,87 @@ class TradingMate():
     Main class that handles the interaction between the User Interface and the
     underlying business logic of the whole application
     """
-    LOG_FILEPATH = '{home}/.TradingMate/log/trading_mate_{timestamp}.log'
+    LOG_FILEPATH = '{home}/.TradingMate/log/trading_mate.log'
 
     def __init__(self):
-        self.setup_logging()
+        # Logs are written in background, the configuration can't be read
+        # before the logging is started so the default file is used until then
+        self.logPipeline = LogPipeline()
+        self.logPipeline.configure(self.LOG_FILEPATH)
         # Init the configuration manager
         self.configurationManager = ConfigurationManager()
+        self.setup_logging()
+        # Setup the runtime metrics collection
+        self.setup_instrumentation()
         # Database handler
         self.db_handler = DatabaseHandler(self.configurationManager)
         # Init the portfolio
         self.portfolio = Portfolio("Portfolio1", self.configurationManager)
-        # Init the view
+        # Symbols tracked without holding them
+        self.watchlist = Watchlist(self.configurationManager.get_watchlist_filepath())
+        # Price alerts, triggered alerts are shown in the UI thread
+        self.alerts = AlertsEngine(self.configurationManager.get_alerts_filepath(),
+                                   notify=self._on_price_alert)
+        self.portfolio.set_alerts_engine(self.alerts)
+        # Splits, consolidations and symbol changes replayed with the trades
+        self.corporateActions = CorporateActions(
+            self.configurationManager.get_corporate_actions_filepath())
+        self.portfolio.set_corporate_actions(self.corporateActions)
+        # Daily series of the charts, computed when the charts are shown
+        self.portfolioHistory = PortfolioHistory(self.portfolio.get_bar_store(), self.corporateActions)
+        # Init the view, Tk is imported only when the UI is actually created
+        from UI.View import View
         self.view = View()
+        # Flag set while the trading log is loaded in background
+        self.loading = False
+        # Flag set when the trading log can't be read, the log is never overwritten
+        self.load_failed = False
+        # Watchdog of the background threads writing the health status file
+        self.setup_health_monitor()
         # Register callbacks
         self.register_callbacks()
-        logging.info('TradingMate initialised')
+        self.subscribe_configuration()
+        logger.info('TradingMate initialised')
 
     def setup_logging(self):
         """
-        Setup the global logging settings
+        Apply the configured logging settings
+        """
+        config = self.configurationManager
+        self.logPipeline.configure(config.get_log_filepath(),
+                                   max_bytes=config.get_log_max_bytes(),
+                                   backup_count=config.get_log_backup_count(),
+                                   level=config.get_log_level(),
+                                   levels=config.get_log_levels(),
+                                   json_format=config.get_log_format() == 'json')
+
+    def setup_health_monitor(self):
+        """
+        Create the HealthMonitor watching the live prices thread and
+        reporting the depth of the queues between threads
         """
-        time_str = dt.datetime.now().isoformat()
-        time_suffix = time_str.replace(':', '_').replace('.', '_')
-        log_filename = self.LOG_FILEPATH.replace(
-            '{timestamp}', time_suffix).replace('{home}', Utils.get_home_path())
-        os.makedirs(os.path.dirname(log_filename), exist_ok=True)
-        logging.basicConfig(filename=log_filename,
-                            level=logging.INFO,
-                            format="[%(asctime)s] %(levelname)s: %(message)s")
+        config = self.configurationManager
+        self.healthMonitor = HealthMonitor(config.get_health_status_filepath(),
+                                           config.get_health_period(),
+                                           config.get_health_stall_timeout())
+        self.healthMonitor.watch('prices', self.portfolio.get_price_getter())
+        self.healthMonitor.add_probe('last_fetch_time', self.portfolio.get_last_fetch_time)
+        self.healthMonitor.add_probe('loading', lambda: self.loading)
+        self.healthMonitor.add_probe('ui_queue', self.view.get_scheduled_count)
+        self.healthMonitor.add_probe('alerts_queue', lambda: self.alerts.get_queue_size())
+        self.healthMonitor.add_probe('log_queue', self.logPipeline.get_queue_size)
+
+    def setup_instrumentation(self):
+        """
+        Enable the runtime metrics collection if configured
+        """
+        metrics.enable(self.configurationManager.get_instrumentation_enabled())
+        port = self.configurationManager.get_instrumentation_http_port()
+        if metrics.enabled and port:
+            try:
+                metrics.start_http_server(port)
+            except OSError as e:
+                logger.error('TradingMate - unable to serve metrics: {}'.format(e))
 
     def register_callbacks(self):
         """
@@ -72,28 +132,130 @@ class TradingMate():
             Callbacks.ON_SAVE_LOG_FILE_EVENT, self.on_save_portfolio_event)
         self.view.set_callback(
             Callbacks.ON_DELETE_LAST_TRADE_EVENT, self.on_delete_last_trade_event)
+        self.view.set_callback(
+            Callbacks.ON_EDIT_TRADE_EVENT, self.on_edit_trade_event)
+        self.view.set_callback(
+            Callbacks.ON_INSERT_TRADE_EVENT, self.on_insert_trade_event)
+        self.view.set_callback(
+            Callbacks.ON_DELETE_TRADE_EVENT, self.on_delete_trade_event)
+        self.view.set_callback(
+            Callbacks.ON_IMPORT_TRADES_EVENT, self.on_import_trades_event)
+        self.view.set_callback(
+            Callbacks.ON_ADD_WATCHLIST_SYMBOL_EVENT, self.on_add_watchlist_symbol_event)
+        self.view.set_callback(
+            Callbacks.ON_REMOVE_WATCHLIST_SYMBOL_EVENT, self.on_remove_watchlist_symbol_event)
+        self.view.set_callback(
+            Callbacks.ON_ADD_ALERT_EVENT, self.on_add_alert_event)
+        self.view.set_callback(
+            Callbacks.ON_REMOVE_ALERTS_EVENT, self.on_remove_alerts_event)
+        self.view.set_callback(
+            Callbacks.ON_SHOW_CHARTS_EVENT, self.on_show_charts_event)
         self.view.set_callback(
             Callbacks.ON_SHOW_SETTINGS_EVENT, self.on_show_settings_event)
         self.view.set_callback(
             Callbacks.ON_SAVE_SETTINGS_EVENT, self.on_save_settings_event)
-        logging.info('TradingMate - callbacks registered')
+        logger.info('TradingMate - callbacks registered')
+
+    def subscribe_configuration(self):
+        """
+        Register the handlers of the settings changes, each component is
+        reloaded only when its settings change
+        """
+        self.configurationManager.subscribe(
+            ['alpha_vantage', 'credentials', 'general/price_cache_filepath', 'general/bar_store_filepath'],
+            self.on_price_settings_changed)
+        self.configurationManager.subscribe(
+            'general/watchlist_filepath', self.on_watchlist_settings_changed)
+        self.configurationManager.subscribe(
+            'general/alerts_filepath', self.on_alerts_settings_changed)
+        self.configurationManager.subscribe(
+            'general/trading_log_path', self.on_trading_log_settings_changed)
+        self.configurationManager.subscribe(
+            'general/corporate_actions_filepath', self.on_corporate_actions_settings_changed)
+        self.configurationManager.subscribe(
+            'logging', self.on_logging_settings_changed)
+        self.configurationManager.subscribe(
+            'health', self.on_health_settings_changed)
+        logger.info('TradingMate - configuration subscribed')
 
     def start(self):
         """
         Start the application
         """
-        logging.info('TradingMate start')
-        # Read the configured database
-        self.db_handler.read_data()
-        # Start portfolio
-        self.portfolio.start(self.db_handler.get_trades_list())
-        # Update the UI
-        self._update_share_trading_view(updateHistory=True)
+        logger.info('TradingMate start')
+        # Load the data in background while the UI is shown
+        self.loading = True
+        self.view.set_loading(True)
+        loader = threading.Thread(target=self._load_data)
+        loader.daemon = True
+        loader.start()
+        self.healthMonitor.start()
         # This should be the last instruction in this function
         self.view.start()
 
+    def _load_data(self):
+        """
+        Read the configured database and start the portfolio. Executed in a
+        background thread, the view is updated through View.schedule
+        """
+        try:
+            # Read the configured database streaming the trades into the history table
+            self._read_trading_log(on_trades=lambda trades: self.view.schedule(
+                self.view.update_share_trading_history_log, list(trades), True))
+            # Watchlist prices are fetched along with the holdings
+            self.watchlist.load()
+            self.portfolio.set_watchlist(self.watchlist.get_symbols())
+            self.alerts.load()
+            self.alerts.start()
+            self.corporateActions.load()
+            # Start portfolio, holdings are shown with the cached prices until the live ones
+            self.portfolio.start(self.db_handler.get_trades_list(),
+                                 self.db_handler.get_trade_index())
+            self.view.schedule(self._on_data_loaded)
+        except Exception as e:
+            logger.error('TradingMate - unable to load data: {}'.format(e))
+            self.view.schedule(self._on_data_loaded)
+            self.view.schedule(self.view.show_warning, 'Warning', str(e))
+
+    def _on_data_loaded(self):
+        """
+        Complete the startup in the UI thread
+        """
+        self.loading = False
+        self.view.set_loading(False)
+        self._update_share_trading_view()
+        logger.info('TradingMate - data loaded')
+
+    def _check_not_loading(self):
+        """
+        Raise an exception if the data are still being loaded
+        """
+        if self.loading:
+            raise RuntimeError('Please wait, the trading log is loading')
+
+    def _check_loaded(self):
+        """
+        Raise an exception if the data are still being loaded or the trading
+        log could not be read, so that the trading log is not overwritten
+        """
+        self._check_not_loading()
+        if self.load_failed:
+            raise RuntimeError('The trading log could not be read, open a valid one')
+
+    def _read_trading_log(self, filepath=None, on_trades=None):
+        """
+        Read the trading log setting the load failed flag if it can't be read
+        """
+        try:
+            self.db_handler.read_data(filepath, on_trades)
+        except (IOError, ValueError):
+            self.load_failed = True
+            raise
+        self.load_failed = False
+
 # Functions
 
+    @metrics.timed('ui_update_share_trading_view')
     def _update_share_trading_view(self, updateHistory=False):
         """
         Collect data from the model and update the view
@@ -101,6 +263,8 @@ class TradingMate():
         self.view.reset_view(updateHistory)
         # Update history table if required
         if updateHistory:
+            # The history changed, the chart series are computed again
+            self.portfolioHistory.invalidate()
             logAsList = self.db_handler.get_trades_list()[
                 ::-1]  # Reverse order
             self.view.update_share_trading_history_log(logAsList)
@@ -120,6 +284,28 @@ class TradingMate():
             validity = validity and h.get_last_price_valid()
         self.view.update_share_trading_portfolio_balances(
             cash, holdingsValue, totalValue, pl, pl_perc, holdingPL, holdingPLPC, validity)
+        self.view.update_share_trading_price_history(self.portfolio.get_price_history())
+        self._update_watchlist_view()
+
+    def _update_watchlist_view(self):
+        """
+        Update the watchlist view, only the changed rows are redrawn
+        """
+        symbols = self.watchlist.get_symbols()
+        prices = self.portfolio.get_last_prices(symbols)
+        for symbol in symbols:
+            price, valid = prices[symbol]
+            self.view.update_watchlist_symbol(symbol, price,
+                                              self.portfolio.get_holding_quantity(symbol),
+                                              len(self.alerts.get_rules(symbol)), valid)
+        self.view.retain_watchlist_symbols(symbols)
+
+    def _on_price_alert(self, alert):
+        """
+        Show a triggered alert, called by the alerts dispatcher thread
+        """
+        self.view.schedule(self.view.show_price_alert, alert['message'])
+        self.view.schedule(self._update_watchlist_view)
 
 # EVENTS
 
@@ -127,10 +313,19 @@ class TradingMate():
         """
         Callback function to handle close event of the user interface
         """
-        logging.info('UserInterface main window closed')
-        self.portfolio.stop()
-        self.db_handler.write_data()
-        logging.info('TradingMate stop')
+        logger.info('UserInterface main window closed')
+        self.healthMonitor.stop()
+        # Do not overwrite the database if it has not been completely read,
+        # the background loading thread is stopped with the application
+        if not self.loading and not self.load_failed:
+            self.portfolio.stop()
+            self.db_handler.write_data()
+        self.alerts.stop()
+        if metrics.enabled:
+            metrics.dump(self.configurationManager.get_instrumentation_dump_filepath())
+            metrics.stop_http_server()
+        logger.info('TradingMate stop')
+        self.logPipeline.stop()
 
     def on_manual_refresh_event(self):
         """
@@ -148,45 +343,134 @@ class TradingMate():
         """
         Callback function to handle update of stock prices data
         """
-        self._update_share_trading_view()
+        # Called by the price getter thread
+        self.view.schedule(self._update_share_trading_view)
 
     def on_new_trade_event(self, new_trade):
         """
         Callback function to handle new trade event
         """
-        logging.info('TradingMate - new trade event {}'.format(new_trade))
+        self._check_loaded()
+        logger.info('TradingMate - new trade event {}'.format(new_trade))
+        self._set_trade_fx_rate(new_trade)
         # Validate trade
         if not self.portfolio.is_trade_valid(new_trade):
             raise RuntimeError('Trade is invalid')
         # Update databse
         self.db_handler.add_trade(new_trade)
-        # Reload portfolio
-        self.portfolio.reload(self.db_handler.get_trades_list())
+        # Update the portfolio with the new trade only
+        self.portfolio.apply_trade(new_trade, self.db_handler.get_trades_list(),
+                                   self.db_handler.get_trade_index())
         # Update the ui
         self._update_share_trading_view(updateHistory=True)
 
+    def _set_trade_fx_rate(self, trade):
+        """
+        Set the current exchange rate on a trade in foreign currency without one
+        """
+        if trade.currency != BASE_CURRENCY and trade.fx_rate == 1.0:
+            rate = self.portfolio.get_fx_rate(trade.currency)
+            if rate is None:
+                raise RuntimeError('Exchange rate of {} not available yet'.format(trade.currency))
+            trade.set_fx_rate(rate)
+
     def on_delete_last_trade_event(self):
         """
         Callback function to handle delete of last trade request
         """
-        logging.info('TradingMate - delete last trade request')
+        self._check_loaded()
+        logger.info('TradingMate - delete last trade request')
         # Remove trade from database
+        trades = self.db_handler.get_trades_list()
+        if len(trades) == 0:
+            raise RuntimeError('The trade history is empty')
+        old_trade = trades[-1]
         self.db_handler.remove_last_trade()
-        # Reload portfolio
-        self.portfolio.reload(self.db_handler.get_trades_list())
+        # Replay the history from the nearest checkpoint
+        self.portfolio.apply_history_change(len(trades), trades, self.db_handler.get_trade_index(),
+                                            [old_trade.symbol])
         # Update the UI
         self._update_share_trading_view(updateHistory=True)
 
+    def on_edit_trade_event(self, index, trade):
+        """
+        Callback function to handle the edit of the trade at the given position
+        of the history
+        """
+        self._check_loaded()
+        logger.info('TradingMate - edit trade {} request {}'.format(index, trade))
+        trades = self.db_handler.get_trades_list()
+        if index < 0 or index >= len(trades):
+            raise RuntimeError('Invalid trade position {}'.format(index))
+        self._set_trade_fx_rate(trade)
+        suffix = itertools.chain([trade], itertools.islice(trades, index + 1, None))
+        self._check_history_change(index, suffix)
+        old_trade = self.db_handler.update_trade(index, trade)
+        self.portfolio.apply_history_change(index, trades, self.db_handler.get_trade_index(),
+                                            [old_trade.symbol])
+        self._update_share_trading_view(updateHistory=True)
+
+    def on_insert_trade_event(self, index, trade):
+        """
+        Callback function to handle the insertion of a trade at the given
+        position of the history
+        """
+        self._check_loaded()
+        logger.info('TradingMate - insert trade {} request {}'.format(index, trade))
+        trades = self.db_handler.get_trades_list()
+        if index < 0 or index > len(trades):
+            raise RuntimeError('Invalid trade position {}'.format(index))
+        self._set_trade_fx_rate(trade)
+        suffix = itertools.chain([trade], itertools.islice(trades, index, None))
+        self._check_history_change(index, suffix)
+        self.db_handler.insert_trade(index, trade)
+        self.portfolio.apply_history_change(index, trades, self.db_handler.get_trade_index())
+        self._update_share_trading_view(updateHistory=True)
+
+    def on_delete_trade_event(self, index):
+        """
+        Callback function to handle the delete of the trade at the given
+        position of the history
+        """
+        self._check_loaded()
+        logger.info('TradingMate - delete trade {} request'.format(index))
+        trades = self.db_handler.get_trades_list()
+        if index < 0 or index >= len(trades):
+            raise RuntimeError('Invalid trade position {}'.format(index))
+        self._check_history_change(index, itertools.islice(trades, index + 1, None))
+        old_trade = self.db_handler.delete_trade(index)
+        self.portfolio.apply_history_change(index, trades, self.db_handler.get_trade_index(),
+                                            [old_trade.symbol])
+        self._update_share_trading_view(updateHistory=True)
+
+    def _check_history_change(self, index, suffix):
+        """
+        Raise an exception if the trade history changed from the given position
+        onwards to the suffix trades is not valid
+        """
+        violations = self.portfolio.validate_history_change(
+            index, self.db_handler.get_trades_list(), suffix)
+        if len(violations) > 0:
+            v = violations[0]
+            raise RuntimeError('{} (trade of {} {})'.format(
+                v['message'], v['trade'].date.strftime('%d/%m/%Y'), v['trade'].symbol))
+
     def on_open_portfolio_event(self, filepath):
         """
         Callback function to handle request to open a new portfolio file
         """
-        logging.info(
+        self._check_not_loading()
+        logger.info(
             'TradingMate - open portfolio request from {}'.format(filepath))
         # Read database from filepath
-        self.db_handler.read_data(filepath)
+        try:
+            self._read_trading_log(filepath)
+        except (IOError, ValueError) as e:
+            self.portfolio.reload(self.db_handler.get_trades_list(), self.db_handler.get_trade_index())
+            self._update_share_trading_view(updateHistory=True)
+            raise RuntimeError('Unable to read {}: {}'.format(filepath, e))
         # Reload portfolio
-        self.portfolio.reload(self.db_handler.get_trades_list())
+        self.portfolio.reload(self.db_handler.get_trades_list(), self.db_handler.get_trade_index())
         # Update the UI
         self.view.reset_view(resetHistory=True)
         self._update_share_trading_view(updateHistory=True)
@@ -195,11 +479,109 @@ class TradingMate():
         """
         Callback function to handle request to save/export the portfolio
         """
-        logging.info(
+        self._check_loaded()
+        logger.info(
             'TradingMate - save portfolio request to {}'.format(filepath))
         # Write data into the database
         self.db_handler.write_data(filepath=filepath)
 
+    def on_import_trades_event(self, filepath):
+        """
+        Callback function to handle request to import a broker statement.
+        The whole batch is validated, then committed to the database at once
+        """
+        self._check_loaded()
+        logger.info(
+            'TradingMate - import trades request from {}'.format(filepath))
+        importer = TradeImporter(self.configurationManager.get_import_columns(),
+                                 self.configurationManager.get_import_date_format(),
+                                 self.configurationManager.get_import_actions())
+        trades, lines, errors = importer.parse(filepath)
+        problems = ['Line {}: {}'.format(e['line'], e['message']) for e in errors]
+        if len(problems) == 0:
+            violations = self.portfolio.validate_trades(trades)
+            problems = ['Line {}: {}'.format(lines[v['index']], v['message']) for v in violations]
+        if len(problems) > 0:
+            summary = '\n'.join(problems[:10])
+            if len(problems) > 10:
+                summary += '\n... {} more errors'.format(len(problems) - 10)
+            raise RuntimeError('Unable to import trades:\n{}'.format(summary))
+        # Commit the whole batch
+        self.db_handler.add_trades(trades)
+        # Reload portfolio
+        self.portfolio.reload(self.db_handler.get_trades_list(), self.db_handler.get_trade_index())
+        # Update the UI
+        self._update_share_trading_view(updateHistory=True)
+        return len(trades)
+
+    def on_add_watchlist_symbol_event(self, symbol):
+        """
+        Callback function to handle the request to add a symbol to the watchlist
+        """
+        logger.info('TradingMate - add {} to the watchlist'.format(symbol))
+        try:
+            added = self.watchlist.add(symbol)
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        if added:
+            self.portfolio.set_watchlist(self.watchlist.get_symbols())
+            self._update_watchlist_view()
+
+    def on_remove_watchlist_symbol_event(self, symbol):
+        """
+        Callback function to handle the request to remove a symbol from the watchlist
+        """
+        logger.info('TradingMate - remove {} from the watchlist'.format(symbol))
+        if self.watchlist.remove(symbol):
+            self.portfolio.set_watchlist(self.watchlist.get_symbols())
+            self._update_watchlist_view()
+
+    def on_add_alert_event(self, symbol, kind, value):
+        """
+        Callback function to handle the request to add a price alert. Stop
+        loss alerts refer to the open price of the holding, move alerts to
+        the last price of the symbol
+        """
+        logger.info('TradingMate - add {} alert {} on {}'.format(kind, value, symbol))
+        reference = None
+        if kind == 'STOP_LOSS':
+            if self.portfolio.get_holding_quantity(symbol) == 0:
+                raise RuntimeError('{} is not held'.format(symbol))
+            reference = self.portfolio.get_holding_open_price(symbol)
+        elif kind == 'MOVE':
+            reference = self.portfolio.get_last_prices([symbol])[symbol][0]
+            if reference is None:
+                raise RuntimeError('The price of {} is not available yet'.format(symbol))
+        try:
+            self.alerts.add_rule(symbol, kind, value, reference)
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        self._update_watchlist_view()
+
+    def on_remove_alerts_event(self, symbol):
+        """
+        Callback function to handle the request to remove the alerts of a symbol
+        """
+        logger.info('TradingMate - remove alerts of {}'.format(symbol))
+        for rule in self.alerts.get_rules(symbol):
+            self.alerts.remove_rule(rule['id'])
+        self._update_watchlist_view()
+
+    def on_show_charts_event(self):
+        """
+        Callback function to handle the request of the chart series. Return
+        a dict {"name": (dates, values)}
+        """
+        self._check_not_loading()
+        self.portfolioHistory.update(self.db_handler.get_trades_list())
+        series = {
+            'Portfolio value [£]': (self.portfolioHistory.get_dates(), self.portfolioHistory.get_values()),
+            'Portfolio P/L [£]': (self.portfolioHistory.get_dates(), self.portfolioHistory.get_profit_loss())
+        }
+        for symbol in self.portfolioHistory.get_symbols():
+            series['{} value [£]'.format(symbol)] = self.portfolioHistory.get_holding_values(symbol)
+        return series
+
     def on_show_settings_event(self):
         """
         Callback to handle request to show the settings panel
@@ -208,10 +590,80 @@ class TradingMate():
 
     def on_save_settings_event(self, config):
         """
-        Callback to save edited settings
+        Callback to save edited settings, the subscribers of the changed
+        settings are notified by the ConfigurationManager
         """
+        self._check_not_loading()
         self.configurationManager.save_settings(config)
-        self.db_handler.read_data(self.configurationManager.get_trading_database_path())
-        self.portfolio.reload(self.db_handler.get_trades_list())
+
+    def on_price_settings_changed(self, changes):
+        """
+        Apply the changed settings of the live prices
+        """
+        self.portfolio.apply_price_configuration()
+        if 'general/bar_store_filepath' in changes:
+            self.portfolioHistory = PortfolioHistory(self.portfolio.get_bar_store(), self.corporateActions)
+
+    def on_watchlist_settings_changed(self, changes):
+        """
+        Load the watchlist from the new file
+        """
+        self.watchlist = Watchlist(self.configurationManager.get_watchlist_filepath())
+        self.watchlist.load()
+        self.portfolio.set_watchlist(self.watchlist.get_symbols())
+        self._update_watchlist_view()
+
+    def on_alerts_settings_changed(self, changes):
+        """
+        Load the alerts from the new file
+        """
+        self.alerts.stop()
+        self.alerts = AlertsEngine(self.configurationManager.get_alerts_filepath(),
+                                   notify=self._on_price_alert)
+        self.alerts.load()
+        self.alerts.start()
+        self.portfolio.set_alerts_engine(self.alerts)
+        self._update_watchlist_view()
+
+    def on_trading_log_settings_changed(self, changes):
+        """
+        Read the new trading log and reload the portfolio
+        """
+        try:
+            self._read_trading_log(self.configurationManager.get_trading_database_path())
+        finally:
+            # The history is empty if the new log can't be read
+            self.portfolio.reload(self.db_handler.get_trades_list(), self.db_handler.get_trade_index())
+            self._update_share_trading_view(updateHistory=True)
+        logger.info('TradingMate - trading log reloaded')
+
+    def on_corporate_actions_settings_changed(self, changes):
+        """
+        Load the corporate actions from the new file and replay the history
+        """
+        self.corporateActions = CorporateActions(
+            self.configurationManager.get_corporate_actions_filepath())
+        self.corporateActions.load()
+        self.portfolio.set_corporate_actions(self.corporateActions)
+        self.portfolioHistory = PortfolioHistory(self.portfolio.get_bar_store(), self.corporateActions)
+        self.portfolio.reload(self.db_handler.get_trades_list(), self.db_handler.get_trade_index())
         self._update_share_trading_view(updateHistory=True)
-        logging.info('TradingMate - application reloaded')
+        logger.info('TradingMate - corporate actions reloaded')
+
+    def on_health_settings_changed(self, changes):
+        """
+        Apply the new health checks settings, the status file is written
+        in the new path from the next check
+        """
+        config = self.configurationManager
+        self.healthMonitor.configure(config.get_health_status_filepath(),
+                                     config.get_health_period(),
+                                     config.get_health_stall_timeout())
+        logger.info('TradingMate - health settings applied')
+
+    def on_logging_settings_changed(self, changes):
+        """
+        Restart the logging with the new settings
+        """
+        self.setup_logging()
+        logger.info('TradingMate - logging settings applied')
@@ -0,0 +1,79 @@
+import os
+import sys
+import tkinter as tk
+from tkinter import ttk
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from Model.AlertsEngine import AlertsEngine
+from .WarningWindow import WarningWindow
+
+# Label of the value entry for each alert kind
+VALUE_LABELS = {
+    'ABOVE': "Price [p, $, €] :",
+    'BELOW': "Price [p, $, €] :",
+    'MOVE': "Move [%] :",
+    'STOP_LOSS': "Below open price [%] :"
+}
+
+class AddAlertDialogWindow(tk.Toplevel):
+
+    def __init__(self, master, symbol, confirmCallback):
+        tk.Toplevel.__init__(self)
+        self.master = master
+        self.symbol = symbol
+        self.confirmCallback = confirmCallback
+        self.transient(self.master)
+        self.title("Add Alert")
+        self.geometry("+%d+%d" % (self.master.winfo_rootx()+400, self.master.winfo_rooty()+100))
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.grab_set()
+        self.focus_set()
+
+        self.create_UI()
+
+    def create_UI(self):
+        ttk.Label(self, text="Symbol:").grid(row=0, sticky="w", padx=5, pady=5)
+        ttk.Label(self, text=self.symbol).grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(self, text="Alert:").grid(row=1, sticky="w", padx=5, pady=5)
+        self.valueLabel = ttk.Label(self, text=VALUE_LABELS[AlertsEngine.KINDS[0]])
+        self.valueLabel.grid(row=2, sticky="w", padx=5, pady=5)
+
+        self.kindSelected = tk.StringVar()
+        eKind = ttk.OptionMenu(self, self.kindSelected, AlertsEngine.KINDS[0], *AlertsEngine.KINDS,
+                               command=self.on_kind_selected)
+        eKind.grid(row=1, column=1, sticky="w", padx=5, pady=5)
+
+        self.valueSelected = tk.StringVar()
+        self.valueSelected.trace_add('write', self.check_data_validity)
+        eValue = ttk.Entry(self, textvariable=self.valueSelected)
+        eValue.grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        eValue.focus_set()
+
+        cancelButton = ttk.Button(self, text="Cancel", command=self.destroy)
+        cancelButton.grid(row=3, column=0, sticky="e", padx=5, pady=5)
+        self.addButton = ttk.Button(self, text="Add", command=self.add_alert)
+        self.addButton.grid(row=3, column=1, sticky="e", padx=5, pady=5)
+        self.addButton.config(state="disabled")
+
+        # Make the master thread block execution until this window is closed
+        self.master.wait_window(self)
+
+    def on_kind_selected(self, selection):
+        self.valueLabel.config(text=VALUE_LABELS[selection])
+
+    def add_alert(self):
+        result = self.confirmCallback(self.symbol, self.kindSelected.get(), float(self.valueSelected.get()))
+        if result["success"]:
+            self.destroy()
+        else:
+            WarningWindow(self, "Warning", result["message"])
+
+    def check_data_validity(self, *args):
+        try:
+            valid = float(self.valueSelected.get()) > 0
+        except ValueError:
+            valid = False
+        self.addButton.config(state="normal" if valid else "disabled")
@@ -1,11 +1,10 @@
 import os
 import sys
-import inspect
 import tkinter as tk
 from tkinter import ttk
 import datetime
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
@@ -16,12 +15,14 @@ from .Widgets import DatePicker
 
 class AddTradeDialogWindow(tk.Toplevel):
 
-    def __init__(self, master, confirmCallback):
+    def __init__(self, master, confirmCallback, trade=None):
         tk.Toplevel.__init__(self)
         self.master = master
         self.confirmCallback = confirmCallback
+        # Trade to edit, None to add a new one
+        self.trade = trade
         self.transient(self.master)
-        self.title("Add Trade")
+        self.title("Add Trade" if trade is None else "Edit Trade")
         self.geometry("+%d+%d" % (self.master.winfo_rootx()+400, self.master.winfo_rooty()+100))
         self.protocol("WM_DELETE_WINDOW", self.destroy)
         self.grab_set()
@@ -36,16 +37,16 @@ class AddTradeDialogWindow(tk.Toplevel):
         ttk.Label(self, text="Market:").grid(row=2, sticky="w", padx=5, pady=5)
         ttk.Label(self, text="Symbol:").grid(row=3, sticky="w", padx=5, pady=5)
         ttk.Label(self, text="Quantity:").grid(row=4, sticky="w", padx=5, pady=5)
-        ttk.Label(self, text="Price [p] :").grid(row=5, sticky="w", padx=5, pady=5)
+        ttk.Label(self, text="Price [p, $, €] :").grid(row=5, sticky="w", padx=5, pady=5)
         ttk.Label(self, text="Fee [£] :").grid(row=6, sticky="w", padx=5, pady=5)
         ttk.Label(self, text="Stamp Duty [%] :").grid(row=7, sticky="w", padx=5, pady=5)
 
         # Define the date entry widget
         self.dateSelected = tk.StringVar()
         self.dateSelected.trace_add('write', self.check_data_validity)
-        datePicker = DatePicker(self, self.dateSelected)
-        datePicker.grid(row=0, column=1, sticky="w", padx=5, pady=5)
-        datePicker.focus_set()
+        self.datePicker = DatePicker(self, self.dateSelected)
+        self.datePicker.grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        self.datePicker.focus_set()
 
         # Define an option menu for the action
         self.actionSelected = tk.StringVar()
@@ -86,13 +87,34 @@ class AddTradeDialogWindow(tk.Toplevel):
 
         cancelButton = ttk.Button(self, text="Cancel", command=self.destroy)
         cancelButton.grid(row=8, column=0, sticky="e", padx=5, pady=5)
-        self.addButton = ttk.Button(self, text="Add", command=self.add_new_trade)
+        self.addButton = ttk.Button(self, text="Add" if self.trade is None else "Save", command=self.add_new_trade)
         self.addButton.grid(row=8, column=1, sticky="e", padx=5, pady=5)
         self.addButton.config(state="disabled")
 
+        if self.trade is not None:
+            self.load_trade(self.trade)
+
         # Make the mas ter thread block execution until this window is closed
         self.master.wait_window(self)
 
+    def load_trade(self, trade):
+        # Fill the entries with the data of the trade to edit
+        self.actionSelected.set(trade.action.name)
+        self.on_action_selected(trade.action.name)
+        if ':' in trade.symbol:
+            market, symbol = trade.symbol.split(':', 1)
+            if market in Markets.__members__:
+                self.marketSelected.set(market)
+            self.symbolSelected.set(symbol)
+        self.quantity_selected.set(str(trade.quantity))
+        if str(self.ePrice.cget("state")) != tk.DISABLED:
+            self.priceSelected.set(str(trade.price))
+        if str(self.eFee.cget("state")) != tk.DISABLED:
+            self.feeSelected.set(str(trade.fee))
+        if str(self.eStampDuty.cget("state")) != tk.DISABLED:
+            self.stampDutySelected.set(str(trade.sdr))
+        self.datePicker.set_value(trade.date)
+
     def on_market_selected(self, selection):
         pass
 
@@ -152,6 +174,9 @@ class AddTradeDialogWindow(tk.Toplevel):
         item["fee"] = float(self.feeSelected.get()) if self.feeSelected.get() is not "" else 0
         item["stamp_duty"] = float(self.stampDutySelected.get()) if self.stampDutySelected.get() is not "" else 0
         newTrade = Trade.from_dict(item)
+        # An edited trade keeps its exchange rate if the currency is unchanged
+        if self.trade is not None and self.trade.currency == newTrade.currency:
+            newTrade.set_fx_rate(self.trade.fx_rate)
         result = self.confirmCallback(newTrade)
 
         if result["success"]:
@@ -0,0 +1,190 @@
+import os
+import sys
+import bisect
+import datetime
+import tkinter as tk
+from tkinter import ttk
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from Utils.Utils import Callbacks
+from Utils.Downsampling import lttb
+
+# Minimum number of points of the coarsest level of detail
+MIN_LEVEL_POINTS = 200
+# Minimum number of days shown when zooming in
+MIN_ZOOM_DAYS = 7
+ZOOM_FACTOR = 1.25
+PADDING = 40
+
+class ChartFrame(tk.Frame):
+    """
+    Chart of the portfolio daily series. Each series is downsampled once in
+    levels of detail, each one with half the points of the previous one, so
+    that zooming and panning only draw the coarsest level still having a
+    point per pixel in the visible range
+    """
+
+    def __init__(self, parent):
+        tk.Frame.__init__(self, parent)
+        self.parent = parent
+        self.callbacks = {}
+        # Series shown: {"name": (dates, values)}
+        self.series = {}
+        # Levels of detail of the selected series, the finest first: [(x, y)]
+        # where x are the dates ordinals
+        self.levels = []
+        # Visible range of dates ordinals
+        self.visible = None
+        self.panStart = None
+        self._create_UI()
+
+    def set_callback(self, id, callback):
+        self.callbacks[id] = callback
+
+    def _create_UI(self):
+        controlsFrame = ttk.Frame(self, relief="groove", borderwidth=1)
+        controlsFrame.pack(fill="x", anchor="n")
+        ttk.Label(controlsFrame, text="Series:").pack(side="left", padx=5, pady=5)
+        self.seriesSelected = tk.StringVar()
+        self.seriesMenu = ttk.OptionMenu(controlsFrame, self.seriesSelected, None)
+        self.seriesMenu.pack(side="left", padx=5, pady=5)
+        ttk.Button(controlsFrame, text="Refresh", command=self.refresh).pack(side="left", padx=5, pady=5)
+        ttk.Button(controlsFrame, text="Reset zoom", command=self._reset_zoom).pack(side="left", padx=5, pady=5)
+        ttk.Label(controlsFrame, text="Wheel to zoom, drag to pan").pack(side="right", padx=5, pady=5)
+
+        self.canvas = tk.Canvas(self, background='white')
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda event: self._redraw())
+        self.canvas.bind("<ButtonPress-1>", self._on_pan_start)
+        self.canvas.bind("<B1-Motion>", self._on_pan)
+        self.canvas.bind("<MouseWheel>", lambda event: self._zoom(event.x, event.delta < 0))
+        self.canvas.bind("<Button-4>", lambda event: self._zoom(event.x, False))
+        self.canvas.bind("<Button-5>", lambda event: self._zoom(event.x, True))
+
+    def refresh(self):
+        series = self.callbacks[Callbacks.ON_SHOW_CHARTS_EVENT]()
+        if series is not None:
+            self.set_series(series)
+
+    def set_series(self, series):
+        """
+        Show the given series {"name": (dates, values)}, the selected one is
+        kept if still available
+        """
+        self.series = {name: s for name, s in series.items() if len(s[0]) > 0}
+        menu = self.seriesMenu["menu"]
+        menu.delete(0, "end")
+        for name in self.series:
+            menu.add_command(label=name, command=lambda n=name: self._select(n))
+        selected = self.seriesSelected.get()
+        if selected not in self.series:
+            selected = next(iter(self.series), None)
+        self._select(selected)
+
+    def _select(self, name):
+        self.seriesSelected.set(name if name is not None else "")
+        self.levels = []
+        self.visible = None
+        if name is not None:
+            dates, values = self.series[name]
+            x = [d.toordinal() for d in dates]
+            y = list(values)
+            self.levels.append((x, y))
+            while len(x) > 2 * MIN_LEVEL_POINTS:
+                indices = lttb(x, y, len(x) // 2)
+                x = [x[i] for i in indices]
+                y = [y[i] for i in indices]
+                self.levels.append((x, y))
+            self.visible = (self.levels[0][0][0], self.levels[0][0][-1])
+        self._redraw()
+
+    def _reset_zoom(self):
+        if len(self.levels) > 0:
+            self.visible = (self.levels[0][0][0], self.levels[0][0][-1])
+            self._redraw()
+
+    def _get_visible_points(self, pixels):
+        """
+        Return the (x, y) points to draw in the visible range, at most one per pixel
+        """
+        x0, x1 = self.visible
+        # Coarsest level with at least a point per pixel, or the finest one
+        for x, y in reversed(self.levels):
+            start = max(bisect.bisect_left(x, x0) - 1, 0)
+            end = min(bisect.bisect_right(x, x1) + 1, len(x))
+            if end - start >= pixels:
+                break
+        x = x[start:end]
+        y = y[start:end]
+        if len(x) > pixels:
+            indices = lttb(x, y, pixels)
+            x = [x[i] for i in indices]
+            y = [y[i] for i in indices]
+        return x, y
+
+    def _redraw(self):
+        self.canvas.delete("all")
+        if self.visible is None:
+            return
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        plotWidth = width - 2 * PADDING
+        plotHeight = height - 2 * PADDING
+        if plotWidth < 10 or plotHeight < 10:
+            return
+        x, y = self._get_visible_points(plotWidth)
+        x0, x1 = self.visible
+        low = min(y)
+        high = max(y)
+        if high == low:
+            high = low + 1
+        scaleX = plotWidth / max(x1 - x0, 1)
+        scaleY = plotHeight / (high - low)
+        coords = []
+        for px, py in zip(x, y):
+            coords.append(PADDING + (px - x0) * scaleX)
+            coords.append(PADDING + (high - py) * scaleY)
+        if len(coords) >= 4:
+            self.canvas.create_line(*coords, fill='blue')
+        # Axes labels
+        self.canvas.create_rectangle(PADDING, PADDING, PADDING + plotWidth, PADDING + plotHeight, outline='grey')
+        self.canvas.create_text(PADDING, PADDING - 5, anchor='sw', text='{:.2f}'.format(high))
+        self.canvas.create_text(PADDING, PADDING + plotHeight + 5, anchor='nw', text='{:.2f}'.format(low))
+        self.canvas.create_text(PADDING, height - 5, anchor='sw',
+                                text=datetime.date.fromordinal(int(x0)).strftime('%d/%m/%Y'))
+        self.canvas.create_text(PADDING + plotWidth, height - 5, anchor='se',
+                                text=datetime.date.fromordinal(int(x1)).strftime('%d/%m/%Y'))
+        if low < 0 < high:
+            zeroY = PADDING + high * scaleY
+            self.canvas.create_line(PADDING, zeroY, PADDING + plotWidth, zeroY, fill='grey', dash=(2, 2))
+
+    def _zoom(self, pointerX, zoomOut):
+        if self.visible is None:
+            return
+        first, last = self.levels[0][0][0], self.levels[0][0][-1]
+        x0, x1 = self.visible
+        plotWidth = max(self.canvas.winfo_width() - 2 * PADDING, 1)
+        ratio = min(max((pointerX - PADDING) / plotWidth, 0), 1)
+        centre = x0 + ratio * (x1 - x0)
+        span = (x1 - x0) * (ZOOM_FACTOR if zoomOut else 1 / ZOOM_FACTOR)
+        span = min(max(span, MIN_ZOOM_DAYS), last - first)
+        x0 = min(max(centre - ratio * span, first), last - span)
+        self.visible = (x0, x0 + span)
+        self._redraw()
+
+    def _on_pan_start(self, event):
+        self.panStart = (event.x, self.visible)
+
+    def _on_pan(self, event):
+        if self.visible is None or self.panStart is None:
+            return
+        startX, (x0, x1) = self.panStart
+        first, last = self.levels[0][0][0], self.levels[0][0][-1]
+        plotWidth = max(self.canvas.winfo_width() - 2 * PADDING, 1)
+        shift = (startX - event.x) * (x1 - x0) / plotWidth
+        shift = min(max(shift, first - x0), last - x1)
+        self.visible = (x0 + shift, x1 + shift)
+        self._redraw()
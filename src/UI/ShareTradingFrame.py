@@ -1,18 +1,22 @@
 import os
 import sys
-import inspect
 import tkinter as tk
 from tkinter import ttk
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
 from Utils.Utils import Callbacks
 from .AddTradeDialogWindow import AddTradeDialogWindow
 from .ConfirmWindow import ConfirmWindow
+from .AddAlertDialogWindow import AddAlertDialogWindow
+from .Widgets import Sparkline, PriceChart
 
 INVALID_STRING = "-"
+# Number of prices drawn in the trend column and in the chart
+SPARKLINE_WIDTH = 20
+CHART_POINTS = 200
 
 class ShareTradingFrame(tk.Frame):
 
@@ -20,6 +24,14 @@ class ShareTradingFrame(tk.Frame):
         tk.Frame.__init__(self, parent)
         self.parent = parent
         self.callbacks = {}
+        # Trades shown in the history table: {"item id": Trade}
+        self.logTrades = {}
+        # Trend of the holdings: {"symbol": (Sparkline, count of prices read)}
+        self.sparklines = {}
+        # Intraday prices and the symbol shown in the chart
+        self.priceHistory = None
+        self.chartSymbol = None
+        self.chartCount = 0
         self._create_UI()
 
     def set_callback(self, id, callback):
@@ -51,6 +63,9 @@ class ShareTradingFrame(tk.Frame):
         self.autoRefreshCheckBox.pack(side="right", anchor="n", padx=5, pady=5)
         self.refreshButton = ttk.Button(buttonsFrame, text="Refresh", command=self._refresh_live_data)
         self.refreshButton.pack(side="right", anchor="n", padx=5, pady=5)
+        self.statusStringVar = tk.StringVar()
+        statusLabel = ttk.Label(buttonsFrame, textvariable=self.statusStringVar)
+        statusLabel.pack(side="right", anchor="center", padx=5, pady=5)
 
         # This frame is a container for smaller frames displaying balances
         balancesFrame = ttk.Frame(self)
@@ -131,7 +146,7 @@ class ShareTradingFrame(tk.Frame):
         # Create a table for the current data
         self.currentDataTreeView = ttk.Treeview(holdingsFrame)
         self.currentDataTreeView.pack(fill='x')
-        self.currentDataTreeView["columns"] = ('quantity','open','last','cost','value','pl','pl_pc')
+        self.currentDataTreeView["columns"] = ('quantity','open','last','cost','value','pl','pl_pc','trend')
         self.currentDataTreeView.heading("#0", text='Symbol', anchor='w')
         self.currentDataTreeView.heading("quantity", text='Quantity', anchor='w')
         self.currentDataTreeView.heading("open", text='Open [p]', anchor='w')
@@ -140,6 +155,7 @@ class ShareTradingFrame(tk.Frame):
         self.currentDataTreeView.heading("value", text='Value [£]', anchor='w')
         self.currentDataTreeView.heading("pl", text='P/L £', anchor='w')
         self.currentDataTreeView.heading("pl_pc", text='P/L %', anchor='w')
+        self.currentDataTreeView.heading("trend", text='Trend', anchor='w')
         self.currentDataTreeView.column("#0", width=100)
         self.currentDataTreeView.column("quantity", width=100)
         self.currentDataTreeView.column("open", width=100)
@@ -148,10 +164,21 @@ class ShareTradingFrame(tk.Frame):
         self.currentDataTreeView.column("value", width=100)
         self.currentDataTreeView.column("pl", width=100)
         self.currentDataTreeView.column("pl_pc", width=100)
+        self.currentDataTreeView.column("trend", width=150)
         # Treeview colour layout
         self.currentDataTreeView.tag_configure('profit', background='lightgreen')
         self.currentDataTreeView.tag_configure('loss', background='LightPink1')
         self.currentDataTreeView.tag_configure('invalid', background='yellow')
+        # Create popup menu for the holdings table
+        self.holdingsPopupMenu = tk.Menu(self.currentDataTreeView, tearoff=0)
+        self.holdingsPopupMenu.add_command(label="Add alert...", command=self._display_add_alert_panel)
+        self.currentDataTreeView.bind("<Button-3>", self._holdings_popup_menu_event)
+        self.currentDataTreeView.bind("<<TreeviewSelect>>", self._on_holding_selected)
+        # Chart of the intraday prices of the selected holding
+        self.chartStringVar = tk.StringVar()
+        ttk.Label(holdingsFrame, textvariable=self.chartStringVar).pack()
+        self.priceChart = PriceChart(holdingsFrame, CHART_POINTS)
+        self.priceChart.pack(pady=5)
 
         # Frame containing the trading history
         logFrame = ttk.Frame(self, relief="groove", borderwidth=1)
@@ -192,12 +219,78 @@ class ShareTradingFrame(tk.Frame):
         # Create popup menu for the trade history log
         self.logPopupMenu = tk.Menu(self.logTreeView, tearoff=0)
         self.logPopupMenu.add_command(label="Add trade...", command=self._display_add_trade_panel)
+        self.logPopupMenu.add_command(label="Edit trade...", command=self._display_edit_trade_panel)
+        self.logPopupMenu.add_command(label="Insert trade before...", command=self._display_insert_trade_panel)
+        self.logPopupMenu.add_command(label="Delete trade...", command=self._delete_selected_trade)
         self.logPopupMenu.add_command(label="Delete last...", command=self._delete_last_trade)
         self.logTreeView.bind("<Button-3>", self._trade_log_popup_menu_event)
 
     def _trade_log_popup_menu_event(self, event):
+        # Select the trade under the pointer
+        item = self.logTreeView.identify_row(event.y)
+        if item:
+            self.logTreeView.selection_set(item)
+        state = "normal" if item else "disabled"
+        for label in ("Edit trade...", "Insert trade before...", "Delete trade..."):
+            self.logPopupMenu.entryconfig(label, state=state)
         self.logPopupMenu.tk_popup(event.x_root, event.y_root)
 
+    def _get_selected_trade(self):
+        """
+        Return a tuple (position in the history, Trade) of the selected row.
+        The table shows the most recent trades on top
+        """
+        selection = self.logTreeView.selection()
+        if len(selection) == 0:
+            return None, None
+        children = self.logTreeView.get_children()
+        index = len(children) - 1 - children.index(selection[0])
+        return index, self.logTrades[selection[0]]
+
+    def _display_edit_trade_panel(self):
+        index, trade = self._get_selected_trade()
+        if trade is not None:
+            AddTradeDialogWindow(self.parent,
+                lambda t: self.callbacks[Callbacks.ON_EDIT_TRADE_EVENT](index, t), trade)
+
+    def _display_insert_trade_panel(self):
+        index, trade = self._get_selected_trade()
+        if trade is not None:
+            AddTradeDialogWindow(self.parent,
+                lambda t: self.callbacks[Callbacks.ON_INSERT_TRADE_EVENT](index, t))
+
+    def _delete_selected_trade(self):
+        index, trade = self._get_selected_trade()
+        if trade is not None:
+            ConfirmWindow(self.parent, "Confirm", "Delete {} {} of {}?".format(
+                trade.action.name, trade.symbol, trade.date.strftime('%d/%m/%Y')),
+                lambda: self.callbacks[Callbacks.ON_DELETE_TRADE_EVENT](index))
+
+    def _holdings_popup_menu_event(self, event):
+        item = self.currentDataTreeView.identify_row(event.y)
+        if item:
+            self.currentDataTreeView.selection_set(item)
+            self.holdingsPopupMenu.tk_popup(event.x_root, event.y_root)
+
+    def _on_holding_selected(self, event):
+        selection = self.currentDataTreeView.selection()
+        if len(selection) == 0:
+            return
+        symbol = self.currentDataTreeView.item(selection[0])['text']
+        if symbol == self.chartSymbol:
+            return
+        self.chartSymbol = symbol
+        self.chartStringVar.set("Intraday: {}".format(symbol))
+        values, self.chartCount = [], 0
+        if self.priceHistory is not None:
+            values, self.chartCount = self.priceHistory.get_values_since(symbol, 0)
+        self.priceChart.set_values(values)
+
+    def _display_add_alert_panel(self):
+        for item in self.currentDataTreeView.selection():
+            AddAlertDialogWindow(self.parent, self.currentDataTreeView.item(item)['text'],
+                                 self.callbacks[Callbacks.ON_ADD_ALERT_EVENT])
+
     def _display_add_trade_panel(self):
         AddTradeDialogWindow(self.parent, self._on_add_new_trade_event)
 
@@ -267,7 +360,10 @@ class ShareTradingFrame(tk.Frame):
         value = self.autoRefresh.get()
         self.callbacks[Callbacks.ON_SET_AUTO_REFRESH_EVENT](bool(value))
 
-    def add_entry_to_log_table(self, trade):
+    def set_status(self, message):
+        self.statusStringVar.set(message)
+
+    def add_entry_to_log_table(self, trade, onTop=False):
         v_date = self._check_string_value(trade.date.strftime('%d/%m/%Y'))
         v_act = self._check_string_value(trade.action.name)
         v_sym = self._check_string_value(trade.symbol)
@@ -277,19 +373,21 @@ class ShareTradingFrame(tk.Frame):
         v_sd = self._check_float_value(trade.sdr)
         v_tot = self._check_float_value(trade.total, canBeNegative=True)
         tag = "evenrow" if len(self.logTreeView.get_children()) % 2 == 0 else "oddrow"
-        self.logTreeView.insert('', 'end', text=v_date, values=(v_act,v_sym,v_am,v_pri,v_fee,v_sd,v_tot), tags=(tag,))
+        item = self.logTreeView.insert('', 0 if onTop else 'end', text=v_date, values=(v_act,v_sym,v_am,v_pri,v_fee,v_sd,v_tot), tags=(tag,))
+        self.logTrades[item] = trade
 
     def update_share_trading_holding(self, symbol, quantity, openPrice, lastPrice, cost, value, pl, plPc, validity):
         v_symbol=self._check_string_value(symbol)
         v_quantity=self._check_float_value(quantity)
         v_openPrice=self._check_float_value(openPrice)
-        v_lastPrice=self._check_float_value(lastPrice, valid=validity)
+        # Prices not valid (e.g. cached) are shown in a highlighted row
+        v_lastPrice=self._check_float_value(lastPrice)
         v_cost=self._check_float_value(cost)
-        v_value=self._check_float_value(value, valid=validity)
-        v_pl=self._check_float_value(pl, valid=validity, canBeNegative=True)
-        v_plPc=self._check_float_value(plPc, valid=validity, canBeNegative=True)
+        v_value=self._check_float_value(value)
+        v_pl=self._check_float_value(pl, canBeNegative=True)
+        v_plPc=self._check_float_value(plPc, canBeNegative=True)
         tag = "invalid"
-        if validity:
+        if validity and plPc is not None:
             tag = "profit" if plPc >= 0 else "loss"
         found = False
         for child in self.currentDataTreeView.get_children():
@@ -303,7 +401,8 @@ class ShareTradingFrame(tk.Frame):
                                                             v_cost,
                                                             v_value,
                                                             v_pl,
-                                                            v_plPc), tags=(tag,))
+                                                            v_plPc,
+                                                            self._get_trend(symbol)), tags=(tag,))
                 break
         if not found:
             #tag = "evenrow" if len(self.currentDataTreeView.get_children()) % 2 == 0 else "oddrow"
@@ -313,16 +412,52 @@ class ShareTradingFrame(tk.Frame):
                                                                                 v_cost,
                                                                                 v_value,
                                                                                 v_pl,
-                                                                                v_plPc), tags=(tag,))
+                                                                                v_plPc,
+                                                                                self._get_trend(symbol)), tags=(tag,))
+
+    def _get_trend(self, symbol):
+        return self.sparklines[symbol][0].text if symbol in self.sparklines else INVALID_STRING
+
+    def update_price_history(self, priceHistory):
+        """
+        Draw the prices fetched since the last update in the trend column
+        and in the chart of the selected holding
+        """
+        self.priceHistory = priceHistory
+        symbols = set()
+        for child in self.currentDataTreeView.get_children():
+            symbol = self.currentDataTreeView.item(child)['text']
+            symbols.add(symbol)
+            sparkline, count = self.sparklines.get(symbol, (None, 0))
+            values, total = priceHistory.get_values_since(symbol, count)
+            if sparkline is None or total < count:
+                # New symbol or history discarded in the meantime
+                sparkline = Sparkline(SPARKLINE_WIDTH)
+                values = priceHistory.get_values(symbol)
+            if len(values) > 0:
+                sparkline.append(values)
+                self.currentDataTreeView.set(child, 'trend', sparkline.text)
+            self.sparklines[symbol] = (sparkline, total)
+        for symbol in set(self.sparklines) - symbols:
+            del self.sparklines[symbol]
+        if self.chartSymbol is not None:
+            values, total = priceHistory.get_values_since(self.chartSymbol, self.chartCount)
+            if total < self.chartCount:
+                self.priceChart.set_values(priceHistory.get_values(self.chartSymbol))
+            elif len(values) > 0:
+                self.priceChart.append(values)
+            self.chartCount = total
 
     def update_portfolio_balances(self, cash, holdingsValue, totalValue, pl, plPerc, holdingPL, holdingPLPC, valid):
+        # Balances computed with not valid (e.g. cached) prices are still shown,
+        # the holdings involved are highlighted in the holdings table
         v_cash = self._check_float_value(cash)
-        v_holdVal = self._check_float_value(holdingsValue, valid=valid)
-        v_tot = self._check_float_value(totalValue, valid=valid)
-        v_pl = self._check_float_value(pl, valid=valid, canBeNegative=True)
-        v_plPerc = self._check_float_value(plPerc, valid=valid, canBeNegative=True)
-        v_holdPl = self._check_float_value(holdingPL, valid=valid, canBeNegative=True)
-        v_holdPlPc = self._check_float_value(holdingPLPC, valid=valid, canBeNegative=True)
+        v_holdVal = self._check_float_value(holdingsValue)
+        v_tot = self._check_float_value(totalValue)
+        v_pl = self._check_float_value(pl, canBeNegative=True)
+        v_plPerc = self._check_float_value(plPerc, canBeNegative=True)
+        v_holdPl = self._check_float_value(holdingPL, canBeNegative=True)
+        v_holdPlPc = self._check_float_value(holdingPLPC, canBeNegative=True)
 
         self.cashStringVar.set(str(v_cash))
         self.portfolioStringVar.set(str(v_holdVal))
@@ -344,3 +479,4 @@ class ShareTradingFrame(tk.Frame):
         self.currentDataTreeView.delete(*self.currentDataTreeView.get_children())
         if resetHistory:
             self.logTreeView.delete(*self.logTreeView.get_children())
+            self.logTrades.clear()
@@ -1,27 +1,36 @@
 import os
 import sys
-import inspect
+import queue
+import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import StringVar
 from tkinter import filedialog
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
 from Utils.Utils import Callbacks, Messages, Utils
 from .WarningWindow import WarningWindow
 from .ShareTradingFrame import ShareTradingFrame
+from .WatchlistFrame import WatchlistFrame
+from .ChartFrame import ChartFrame
 from .SettingsWindow import SettingsWindow
 
+logger = logging.getLogger(__name__)
+
 APP_NAME = "TradingMate"
+# Period in ms of the processing of the functions scheduled by other threads
+SCHEDULE_PERIOD_MS = 50
 
 class View():
 
     def __init__(self):
         # Local data initialisation
         self.callbacks = {}
+        # Functions scheduled by other threads to be run in the UI thread
+        self.scheduled = queue.Queue()
         self.create_UI()
 
 # GRAPHICAL DEFINITIONS
@@ -41,6 +50,11 @@ class View():
         self.noteBook.pack(expand=1, fill="both")
         # Create Share trading Tab
         self.create_share_trading_tab()
+        # Create the Watchlist Tab next to it
+        self.create_watchlist_tab()
+        # Create the Charts Tab, refreshed when selected
+        self.create_chart_tab()
+        self.noteBook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
     def create_menu(self):
         self.menubar = tk.Menu(self.mainWindow)
@@ -48,6 +62,7 @@ class View():
         filemenu = tk.Menu(self.menubar, tearoff=0)
         filemenu.add_command(label="Open...", command=self.on_open_portfolio_event)
         filemenu.add_command(label="Export...", command=self.on_save_portfolio_event)
+        filemenu.add_command(label="Import trades...", command=self.on_import_trades_event)
         filemenu.add_command(label="Settings...", command=self.on_show_settings)
         filemenu.add_command(label="Exit", command=self.on_close_event)
         self.menubar.add_cascade(label="File", menu=filemenu)
@@ -69,15 +84,73 @@ class View():
         self.shareTradingFrame.set_callback(Callbacks.ON_OPEN_LOG_FILE_EVENT, self.on_open_portfolio_event)
         self.shareTradingFrame.set_callback(Callbacks.ON_SAVE_LOG_FILE_EVENT, self.on_save_portfolio_event)
         self.shareTradingFrame.set_callback(Callbacks.ON_DELETE_LAST_TRADE_EVENT, self.on_delete_last_trade_event)
+        self.shareTradingFrame.set_callback(Callbacks.ON_EDIT_TRADE_EVENT, self.on_edit_trade_event)
+        self.shareTradingFrame.set_callback(Callbacks.ON_INSERT_TRADE_EVENT, self.on_insert_trade_event)
+        self.shareTradingFrame.set_callback(Callbacks.ON_DELETE_TRADE_EVENT, self.on_delete_trade_event)
+        self.shareTradingFrame.set_callback(Callbacks.ON_ADD_ALERT_EVENT, self.on_add_alert_event)
+
+    def create_watchlist_tab(self):
+        self.watchlistFrame = WatchlistFrame(self.noteBook)
+        self.watchlistFrame.pack(expand=True)
+        self.noteBook.add(self.watchlistFrame, text="Watchlist")
+        self.watchlistFrame.set_callback(Callbacks.ON_ADD_WATCHLIST_SYMBOL_EVENT, self.on_add_watchlist_symbol_event)
+        self.watchlistFrame.set_callback(Callbacks.ON_REMOVE_WATCHLIST_SYMBOL_EVENT, self.on_remove_watchlist_symbol_event)
+        self.watchlistFrame.set_callback(Callbacks.ON_ADD_ALERT_EVENT, self.on_add_alert_event)
+        self.watchlistFrame.set_callback(Callbacks.ON_REMOVE_ALERTS_EVENT, self.on_remove_alerts_event)
+
+    def create_chart_tab(self):
+        self.chartFrame = ChartFrame(self.noteBook)
+        self.chartFrame.pack(expand=True)
+        self.noteBook.add(self.chartFrame, text="Charts")
+        self.chartFrame.set_callback(Callbacks.ON_SHOW_CHARTS_EVENT, self.on_show_charts_event)
+
+    def _on_tab_changed(self, event):
+        if self.noteBook.select() == str(self.chartFrame):
+            self.chartFrame.refresh()
 
     def start(self):
         self.shareTradingFrame.set_auto_refresh()
+        self.mainWindow.after(SCHEDULE_PERIOD_MS, self._process_scheduled)
         # Start the view thread
         self.mainWindow.mainloop()
 
     def set_callback(self, id, callback):
         self.callbacks[id] = callback
 
+    def schedule(self, function, *args):
+        """
+        Schedule a function to be executed in the UI thread. Tkinter is not
+        thread safe, any other thread must update the view through this function
+        """
+        self.scheduled.put((function, args))
+
+    def get_scheduled_count(self):
+        """
+        Return the number of functions waiting to be executed in the UI thread
+        """
+        return self.scheduled.qsize()
+
+    def _process_scheduled(self):
+        try:
+            while True:
+                function, args = self.scheduled.get_nowait()
+                try:
+                    function(*args)
+                except Exception as e:
+                    # A failing update must not stop the processing of the queue
+                    logger.exception('View - scheduled function %s failed: %s',
+                                     getattr(function, '__name__', function), e)
+        except queue.Empty:
+            pass
+        finally:
+            self.mainWindow.after(SCHEDULE_PERIOD_MS, self._process_scheduled)
+
+    def set_loading(self, loading):
+        self.shareTradingFrame.set_status("Loading..." if loading else "")
+
+    def show_warning(self, title, message):
+        WarningWindow(self.mainWindow, title, message)
+
 # ******* MAIN WINDOW ***********
 
     def on_close_event(self):
@@ -98,6 +171,26 @@ class View():
         except RuntimeError as e:
             return {'success': False, 'message': e}
 
+    def on_edit_trade_event(self, index, trade):
+        try:
+            self.callbacks[Callbacks.ON_EDIT_TRADE_EVENT](index, trade)
+            return {'success': True, 'message': 'ok'}
+        except RuntimeError as e:
+            return {'success': False, 'message': e}
+
+    def on_insert_trade_event(self, index, trade):
+        try:
+            self.callbacks[Callbacks.ON_INSERT_TRADE_EVENT](index, trade)
+            return {'success': True, 'message': 'ok'}
+        except RuntimeError as e:
+            return {'success': False, 'message': e}
+
+    def on_delete_trade_event(self, index):
+        try:
+            self.callbacks[Callbacks.ON_DELETE_TRADE_EVENT](index)
+        except RuntimeError as e:
+            WarningWindow(self.mainWindow, "Warning", e)
+
     def on_manual_refresh_event(self):
         # Notify the Controller to request new data
         self.callbacks[Callbacks.ON_MANUAL_REFRESH_EVENT]()
@@ -105,9 +198,9 @@ class View():
     def reset_view(self, resetHistory=False):
         self.shareTradingFrame.reset_view(resetHistory)
 
-    def update_share_trading_history_log(self, logList):
+    def update_share_trading_history_log(self, logList, onTop=False):
         for entry in logList:
-            self.shareTradingFrame.add_entry_to_log_table(entry)
+            self.shareTradingFrame.add_entry_to_log_table(entry, onTop)
 
     def update_share_trading_portfolio_balances(self, cash, holdingsValue, totalValue, pl, pl_perc, holdingPL, holdingPLPC, validity):
         self.shareTradingFrame.update_portfolio_balances(cash, holdingsValue, totalValue, pl, pl_perc, holdingPL, holdingPLPC, validity)
@@ -115,6 +208,9 @@ class View():
     def update_share_trading_holding(self, symbol, quantity, openPrice, lastPrice, cost, value, pl, plPc, validity):
         self.shareTradingFrame.update_share_trading_holding(symbol, quantity, openPrice, lastPrice, cost, value, pl, plPc, validity)
 
+    def update_share_trading_price_history(self, priceHistory):
+        self.shareTradingFrame.update_price_history(priceHistory)
+
     def set_auto_refresh_event(self, value):
         self.callbacks[Callbacks.ON_SET_AUTO_REFRESH_EVENT](value)
 
@@ -136,6 +232,16 @@ class View():
         except RuntimeError as e:
             WarningWindow(self.parent, "Warning", e)
 
+    def on_import_trades_event(self):
+        try:
+            filename = filedialog.askopenfilename(initialdir=Utils.get_home_path(
+            ), title="Select file", filetypes=(("csv files", "*.csv"), ("json lines files", "*.jsonl"), ("all files", "*.*")))
+            if filename is not None and len(filename) > 0:
+                count = self.callbacks[Callbacks.ON_IMPORT_TRADES_EVENT](filename)
+                WarningWindow(self.mainWindow, "Import", "{} trades imported".format(count))
+        except (RuntimeError, IOError) as e:
+            WarningWindow(self.mainWindow, "Warning", e)
+
     def on_delete_last_trade_event(self):
         try:
             self.callbacks[Callbacks.ON_DELETE_LAST_TRADE_EVENT]()
@@ -143,6 +249,50 @@ class View():
         except RuntimeError as e:
             return {'success': False, 'message': e}
 
+# ******* WATCHLIST FRAME ************
+
+    def on_add_watchlist_symbol_event(self, symbol):
+        try:
+            self.callbacks[Callbacks.ON_ADD_WATCHLIST_SYMBOL_EVENT](symbol)
+            return {'success': True, 'message': 'ok'}
+        except RuntimeError as e:
+            return {'success': False, 'message': e}
+
+    def on_remove_watchlist_symbol_event(self, symbol):
+        try:
+            self.callbacks[Callbacks.ON_REMOVE_WATCHLIST_SYMBOL_EVENT](symbol)
+        except RuntimeError as e:
+            WarningWindow(self.mainWindow, "Warning", e)
+
+    def update_watchlist_symbol(self, symbol, lastPrice, quantity, alerts, validity):
+        self.watchlistFrame.update_symbol(symbol, lastPrice, quantity, alerts, validity)
+
+    def on_add_alert_event(self, symbol, kind, value):
+        try:
+            self.callbacks[Callbacks.ON_ADD_ALERT_EVENT](symbol, kind, value)
+            return {'success': True, 'message': 'ok'}
+        except RuntimeError as e:
+            return {'success': False, 'message': e}
+
+    def on_remove_alerts_event(self, symbol):
+        self.callbacks[Callbacks.ON_REMOVE_ALERTS_EVENT](symbol)
+
+    def on_show_charts_event(self):
+        try:
+            return self.callbacks[Callbacks.ON_SHOW_CHARTS_EVENT]()
+        except RuntimeError as e:
+            WarningWindow(self.mainWindow, "Warning", e)
+            return None
+
+    def show_price_alert(self, message):
+        # Alerts are shown without blocking the UI
+        self.watchlistFrame.add_alert(message)
+        self.shareTradingFrame.set_status(message)
+        self.mainWindow.bell()
+
+    def retain_watchlist_symbols(self, symbols):
+        self.watchlistFrame.retain_symbols(symbols)
+
     def on_show_settings(self):
         config = self.callbacks[Callbacks.ON_SHOW_SETTINGS_EVENT]()
         SettingsWindow(self.mainWindow, config, self.callbacks[Callbacks.ON_SAVE_SETTINGS_EVENT])
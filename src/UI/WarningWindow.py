@@ -1,10 +1,9 @@
 import os
 import sys
-import inspect
 import tkinter as tk
 from tkinter import ttk
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
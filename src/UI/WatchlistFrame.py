@@ -0,0 +1,133 @@
+import os
+import sys
+import datetime
+import tkinter as tk
+from tkinter import ttk
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from Utils.Utils import Callbacks, Markets
+from .WarningWindow import WarningWindow
+from .AddAlertDialogWindow import AddAlertDialogWindow
+
+INVALID_STRING = "-"
+# Number of triggered alerts shown
+ALERTS_LOG_SIZE = 50
+
+class WatchlistFrame(tk.Frame):
+
+    def __init__(self, parent):
+        tk.Frame.__init__(self, parent)
+        self.parent = parent
+        self.callbacks = {}
+        # Values shown in each row: {"symbol": (values, tag)}
+        self.rows = {}
+        self._create_UI()
+
+    def set_callback(self, id, callback):
+        self.callbacks[id] = callback
+
+    def _create_UI(self):
+        # Frame containing the inputs to add a symbol
+        inputFrame = ttk.Frame(self, relief="groove", borderwidth=1)
+        inputFrame.pack(fill="x", anchor="n")
+        ttk.Label(inputFrame, text="Market:").pack(side="left", padx=5, pady=5)
+        self.marketSelected = tk.StringVar()
+        marketList = [m.name for m in Markets]
+        ttk.OptionMenu(inputFrame, self.marketSelected, marketList[0], *marketList).pack(side="left", padx=5, pady=5)
+        ttk.Label(inputFrame, text="Symbol:").pack(side="left", padx=5, pady=5)
+        self.symbolSelected = tk.StringVar()
+        symbolEntry = ttk.Entry(inputFrame, textvariable=self.symbolSelected)
+        symbolEntry.pack(side="left", padx=5, pady=5)
+        symbolEntry.bind("<Return>", lambda event: self._add_symbol())
+        ttk.Button(inputFrame, text="Add", command=self._add_symbol).pack(side="left", padx=5, pady=5)
+
+        # Table of the watched symbols, each row has the symbol as id
+        tableFrame = ttk.Frame(self)
+        tableFrame.pack(fill="both", expand=True)
+        self.watchTreeView = ttk.Treeview(tableFrame)
+        self.watchTreeView.pack(fill="both", side="left", expand=True)
+        self.watchTreeView["columns"] = ('last', 'quantity', 'alerts')
+        self.watchTreeView.heading("#0", text='Symbol', anchor='w')
+        self.watchTreeView.heading("last", text='Last [p, $, €]', anchor='w')
+        self.watchTreeView.heading("quantity", text='Held', anchor='w')
+        self.watchTreeView.heading("alerts", text='Alerts', anchor='w')
+        self.watchTreeView.column("#0", width=100)
+        self.watchTreeView.column("last", width=100)
+        self.watchTreeView.column("quantity", width=100)
+        self.watchTreeView.column("alerts", width=100)
+        # Prices not valid (e.g. cached) are shown in a highlighted row
+        self.watchTreeView.tag_configure('invalid', background='yellow')
+        scrollBar = tk.Scrollbar(tableFrame, orient="vertical", command=self.watchTreeView.yview)
+        scrollBar.pack(side='right', fill='y')
+        self.watchTreeView.configure(yscrollcommand=scrollBar.set)
+        # Popup menu to remove the selected symbol
+        self.popupMenu = tk.Menu(self.watchTreeView, tearoff=0)
+        self.popupMenu.add_command(label="Add alert...", command=self._display_add_alert_panel)
+        self.popupMenu.add_command(label="Remove alerts", command=self._remove_selected_alerts)
+        self.popupMenu.add_command(label="Remove", command=self._remove_selected_symbol)
+        self.watchTreeView.bind("<Button-3>", self._popup_menu_event)
+
+        # Log of the last triggered alerts, most recent on top
+        alertsFrame = ttk.Frame(self, relief="groove", borderwidth=1)
+        alertsFrame.pack(fill="x", anchor="s")
+        ttk.Label(alertsFrame, text="Triggered Alerts").pack()
+        self.alertsListbox = tk.Listbox(alertsFrame, height=6)
+        self.alertsListbox.pack(fill="x")
+
+    def _popup_menu_event(self, event):
+        item = self.watchTreeView.identify_row(event.y)
+        if item:
+            self.watchTreeView.selection_set(item)
+            self.popupMenu.tk_popup(event.x_root, event.y_root)
+
+    def _add_symbol(self):
+        code = self.symbolSelected.get().strip().upper()
+        if len(code) == 0:
+            return
+        result = self.callbacks[Callbacks.ON_ADD_WATCHLIST_SYMBOL_EVENT](
+            '{}:{}'.format(self.marketSelected.get(), code))
+        if result["success"]:
+            self.symbolSelected.set("")
+        else:
+            WarningWindow(self.parent, "Warning", result["message"])
+
+    def _display_add_alert_panel(self):
+        for item in self.watchTreeView.selection():
+            AddAlertDialogWindow(self.parent, item, self.callbacks[Callbacks.ON_ADD_ALERT_EVENT])
+
+    def _remove_selected_alerts(self):
+        for item in self.watchTreeView.selection():
+            self.callbacks[Callbacks.ON_REMOVE_ALERTS_EVENT](item)
+
+    def _remove_selected_symbol(self):
+        for item in self.watchTreeView.selection():
+            self.callbacks[Callbacks.ON_REMOVE_WATCHLIST_SYMBOL_EVENT](item)
+
+    def update_symbol(self, symbol, lastPrice, quantity, alerts, validity):
+        values = (INVALID_STRING if lastPrice is None else '{:.2f}'.format(lastPrice),
+                  INVALID_STRING if quantity == 0 else str(quantity),
+                  INVALID_STRING if alerts == 0 else str(alerts))
+        tag = "" if validity else "invalid"
+        # Only the changed rows are updated
+        if self.rows.get(symbol) == (values, tag):
+            return
+        if symbol in self.rows:
+            self.watchTreeView.item(symbol, values=values, tags=(tag,))
+        else:
+            # Keep the rows sorted by symbol
+            index = sum(1 for s in self.rows if s < symbol)
+            self.watchTreeView.insert('', index, iid=symbol, text=symbol, values=values, tags=(tag,))
+        self.rows[symbol] = (values, tag)
+
+    def retain_symbols(self, symbols):
+        # Remove the rows of the symbols not in the list
+        for symbol in set(self.rows) - set(symbols):
+            self.watchTreeView.delete(symbol)
+            del self.rows[symbol]
+
+    def add_alert(self, message):
+        self.alertsListbox.insert(0, '{}  {}'.format(datetime.datetime.now().strftime('%H:%M:%S'), message))
+        self.alertsListbox.delete(ALERTS_LOG_SIZE, 'end')
@@ -1,10 +1,10 @@
 import os
 import sys
-import inspect
+import collections
 import tkinter as tk
 from tkinter import ttk
 
-currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir)
 
@@ -39,6 +39,12 @@ class DatePicker(tk.Frame):
         self.eYear = ttk.Entry(self, width=5, textvariable=self.year, validate="focusout", validatecommand=self.set_date)
         self.eYear.grid(row=1, column=4, sticky="w")
 
+    def set_value(self, date):
+        self.day.set(date.strftime('%d'))
+        self.month.set(date.strftime('%m'))
+        self.year.set(date.strftime('%Y'))
+        self.set_date()
+
     def set_date(self):
         self.dateSelected.set(self.build_date(self.day.get(), self.month.get(), self.year.get()))
 
@@ -70,3 +76,99 @@ class DatePicker(tk.Frame):
     def focus_set(self):
         tk.Frame.focus_set(self)
         self.eDay.focus_set()
+
+
+class Sparkline():
+    """
+    Text of block characters drawn from the last prices of a symbol. When a
+    new price falls within the drawn range the text is shifted by one
+    character, it's redrawn only when the range changes
+    """
+    CHARS = '▁▂▃▄▅▆▇█'
+
+    def __init__(self, width):
+        self.values = collections.deque(maxlen=width)
+        self.low = None
+        self.high = None
+        self.text = ''
+
+    def append(self, values):
+        for value in values:
+            dropped = self.values[0] if len(self.values) == self.values.maxlen else None
+            self.values.append(value)
+            if self.low is None or not self.low <= value <= self.high or dropped in (self.low, self.high):
+                self._redraw()
+            else:
+                self.text = self.text[len(self.text) + 1 - len(self.values):] + self._get_char(value)
+        return self.text
+
+    def _redraw(self):
+        self.low = min(self.values)
+        self.high = max(self.values)
+        self.text = ''.join(self._get_char(v) for v in self.values)
+
+    def _get_char(self, value):
+        if self.high == self.low:
+            return self.CHARS[len(self.CHARS) // 2]
+        return self.CHARS[round((value - self.low) / (self.high - self.low) * (len(self.CHARS) - 1))]
+
+
+class PriceChart(tk.Canvas):
+    """
+    Line chart of the last prices of a symbol. Each new price adds a line
+    segment and shifts the existing ones, the chart is redrawn only when the
+    price is out of the drawn range
+    """
+    PADDING = 5
+
+    def __init__(self, master, capacity, width=600, height=100):
+        tk.Canvas.__init__(self, master, width=width, height=height, background='white')
+        self.capacity = max(capacity, 2)
+        self.width = width
+        self.height = height
+        self.step = width / (self.capacity - 1)
+        self.values = collections.deque(maxlen=self.capacity)
+        self.segments = collections.deque()
+        self.low = None
+        self.high = None
+
+    def set_values(self, values):
+        self.values.clear()
+        self.values.extend(values)
+        self._redraw()
+
+    def append(self, values):
+        for value in values:
+            if len(self.values) == self.capacity:
+                if len(self.segments) > 0:
+                    self.delete(self.segments.popleft())
+                self.move('segment', -self.step, 0)
+            self.values.append(value)
+            if self.low is None or not self.low <= value <= self.high:
+                self._redraw()
+            elif len(self.values) > 1:
+                self._add_segment(len(self.values) - 2)
+
+    def _redraw(self):
+        self.delete('all')
+        self.segments.clear()
+        if len(self.values) == 0:
+            self.low = self.high = None
+            return
+        self.low = min(self.values)
+        self.high = max(self.values)
+        for i in range(len(self.values) - 1):
+            self._add_segment(i)
+        self.create_text(self.PADDING, self.PADDING, anchor='nw', text='{:.2f}'.format(self.high))
+        self.create_text(self.PADDING, self.height - self.PADDING, anchor='sw', text='{:.2f}'.format(self.low))
+
+    def _add_segment(self, index):
+        x = index * self.step
+        self.segments.append(self.create_line(x, self._get_y(self.values[index]),
+                                              x + self.step, self._get_y(self.values[index + 1]),
+                                              fill='blue', tags=('segment',)))
+
+    def _get_y(self, value):
+        if self.high == self.low:
+            return self.height / 2
+        return self.height - self.PADDING - (value - self.low) / (self.high - self.low) * (self.height - 2 * self.PADDING)
@@ -1,32 +1,38 @@
 import os
 import sys
-import inspect
+import copy
 import json
 import logging
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from Utils.Utils import Utils
 
+logger = logging.getLogger(__name__)
+
 class ConfigurationManager():
     """
     Class that loads the configuration and credentials json files exposing
-    static methods to provide the configurable parameters
+    static methods to provide the configurable parameters.
+    Components interested in some settings subscribe to their key paths
+    (e.g. "general/trading_log_path") and are notified only when a save
+    actually changes them
     """
 
     def __init__(self):
+        # Subscribers to the changes of the settings: [(key paths, callback)]
+        self._subscribers = []
         # Define the config filepath
         self.config_filepath = '{}/.TradingMate/config/config.json'.format(Utils.get_home_path())
         os.makedirs(os.path.dirname(self.config_filepath), exist_ok=True)
         self.config = Utils.load_json_file(self.config_filepath)
         if self.config is None:
-            logging.error("Please configure TradingMate: {}".format(self.config_filepath))
+            logger.error("Please configure TradingMate: {}".format(self.config_filepath))
             raise RuntimeError("Empty configuration file")
         self.load_credentials()
-        logging.info('ConfigurationManager initialised')
+        logger.info('ConfigurationManager initialised')
 
     def load_credentials(self):
         """
@@ -38,11 +44,11 @@ class ConfigurationManager():
         except:
             credentials_filepath = '{}/.TradingMate/config/.credentials'.format(Utils.get_home_path())
             os.makedirs(os.path.dirname(credentials_filepath), exist_ok=True)
-            logging.error("credentials filepath parameter not configured! Using default: {}".format(credentials_filepath))
+            logger.error("credentials filepath parameter not configured! Using default: {}".format(credentials_filepath))
 
         credentials_json = Utils.load_json_file(credentials_filepath)
         if credentials_json is None:
-            logging.warning('Credentials not configured: {}'.format(credentials_filepath))
+            logger.warning('Credentials not configured: {}'.format(credentials_filepath))
             credentials_json = {'av_api_key':''}
 
         self.config['credentials'] = credentials_json
@@ -78,21 +84,244 @@ class ConfigurationManager():
         """
         return self.config['alpha_vantage']['polling_period_sec']
 
+    def get_fx_ttl(self):
+        """
+        Get the time to live in seconds of the fetched exchange rates
+        """
+        return self.config['alpha_vantage'].get('fx_ttl_sec', 3600)
+
+    def get_intraday_history_size(self):
+        """
+        Get the number of fetched prices stored for each symbol
+        """
+        return self.config['alpha_vantage'].get('intraday_history_size', 500)
+
+    def get_price_cache_filepath(self):
+        """
+        Get the filepath of the cache storing the last known prices
+        """
+        return self.config['general'].get(
+            'price_cache_filepath', '{home}/.TradingMate/data/price_cache.json')
+
+    def get_watchlist_filepath(self):
+        """
+        Get the filepath of the watchlist
+        """
+        return self.config['general'].get(
+            'watchlist_filepath', '{home}/.TradingMate/data/watchlist.json')
+
+    def get_alerts_filepath(self):
+        """
+        Get the filepath of the price alert rules
+        """
+        return self.config['general'].get(
+            'alerts_filepath', '{home}/.TradingMate/data/alerts.json')
+
+    def get_bar_store_filepath(self):
+        """
+        Get the filepath of the database storing the daily bars
+        """
+        return self.config['general'].get(
+            'bar_store_filepath', '{home}/.TradingMate/data/bars.db')
+
+    def get_corporate_actions_filepath(self):
+        """
+        Get the filepath of the corporate actions of the held symbols
+        """
+        return self.config['general'].get(
+            'corporate_actions_filepath', '{home}/.TradingMate/data/corporate_actions.json')
+
+    def get_instrumentation_enabled(self):
+        """
+        Get the flag to enable the collection of runtime metrics
+        """
+        return self.config.get('instrumentation', {}).get('enabled', False)
+
+    def get_instrumentation_http_port(self):
+        """
+        Get the port where to expose the runtime metrics, 0 to disable
+        """
+        return self.config.get('instrumentation', {}).get('http_port', 0)
+
+    def get_instrumentation_dump_filepath(self):
+        """
+        Get the filepath where the runtime metrics are dumped on exit
+        """
+        return self.config.get('instrumentation', {}).get(
+            'dump_filepath', '{home}/.TradingMate/log/metrics.json')
+
+    def get_log_filepath(self):
+        """
+        Get the filepath of the log file, rotated by size
+        """
+        return self.config.get('logging', {}).get(
+            'filepath', '{home}/.TradingMate/log/trading_mate.log')
+
+    def get_log_max_bytes(self):
+        """
+        Get the size in bytes of the log file triggering its rotation
+        """
+        return self.config.get('logging', {}).get('max_bytes', 5242880)
+
+    def get_log_backup_count(self):
+        """
+        Get the number of rotated log files kept
+        """
+        return self.config.get('logging', {}).get('backup_count', 5)
+
+    def get_log_level(self):
+        """
+        Get the level of the application logs
+        """
+        return self.config.get('logging', {}).get('level', 'INFO')
+
+    def get_log_levels(self):
+        """
+        Get the levels of the single subsystems: {"logger name": "level"}
+        """
+        return self.config.get('logging', {}).get('levels', {})
+
+    def get_log_format(self):
+        """
+        Get the format of the log records: json or text
+        """
+        return self.config.get('logging', {}).get('format', 'json')
+
+    def get_health_status_filepath(self):
+        """
+        Get the filepath of the health status file written by the running application
+        """
+        return self.config.get('health', {}).get(
+            'status_filepath', '{home}/.TradingMate/log/status.json')
+
+    def get_health_period(self):
+        """
+        Get the period in seconds of the health checks
+        """
+        return self.config.get('health', {}).get('period_sec', 10)
+
+    def get_health_stall_timeout(self):
+        """
+        Get the seconds a background task can run without signs of life before being reported stalled
+        """
+        return self.config.get('health', {}).get('stall_timeout_sec', 120)
+
+    def get_health_stale_timeout(self):
+        """
+        Get the seconds after which the supervisor restarts an application not updating its status
+        """
+        return self.config.get('health', {}).get('stale_timeout_sec', 60)
+
+    def get_health_max_backoff(self):
+        """
+        Get the maximum seconds the supervisor waits between two restarts
+        """
+        return self.config.get('health', {}).get('max_backoff_sec', 300)
+
+    def get_import_columns(self):
+        """
+        Get the mapping between trade fields and columns of the imported files
+        """
+        return self.config.get('import', {}).get('columns', None)
+
+    def get_import_date_format(self):
+        """
+        Get the format of the dates in the imported files
+        """
+        return self.config.get('import', {}).get('date_format', '%d/%m/%Y')
+
+    def get_import_actions(self):
+        """
+        Get the mapping between action names of the imported files and trade actions
+        """
+        return self.config.get('import', {}).get('actions', None)
+
+    def get_gains_method(self):
+        """
+        Get the method used to match sold shares with the bought ones (FIFO, AVERAGE or UK)
+        """
+        return self.config.get('gains', {}).get('method', 'UK')
+
+    def get_rebalance_fee(self):
+        """
+        Get the fee in £ of each trade proposed by the rebalancing
+        """
+        return self.config.get('rebalance', {}).get('fee', 0.0)
+
+    def get_rebalance_stamp_duty(self):
+        """
+        Get the stamp duty % of the buys of each market: {"market": percentage}
+        """
+        return self.config.get('rebalance', {}).get('stamp_duty', {'LSE': 0.5})
+
     def get_editable_config(self):
         """
-        Get a dictionary containing the editable configuration parameters
+        Get a copy of the editable configuration parameters, to be passed to
+        save_settings once edited
+        """
+        config = copy.deepcopy(self.config)
+        config.pop('credentials', None)
+        return config
+
+    def subscribe(self, key_paths, callback):
+        """
+        Register a function to be called when the settings are saved with
+        changes in the given key paths
+
+            - **key_paths**: a key path or list of key paths, in the form
+              "section/key". A section (e.g. "alpha_vantage") matches all its keys
+            - **callback**: function called with the list of the changed key paths
+              matching the subscription
+        """
+        if isinstance(key_paths, str):
+            key_paths = [key_paths]
+        self._subscribers.append((list(key_paths), callback))
+
+    @staticmethod
+    def diff(old, new, prefix=''):
+        """
+        Return the sorted list of key paths whose values differ between the
+        old and new configuration dicts, including the added and removed keys
         """
-        return self.config
+        changes = []
+        for key in set(old) | set(new):
+            path = '{}{}'.format(prefix, key)
+            old_value = old.get(key)
+            new_value = new.get(key)
+            if isinstance(old_value, dict) and isinstance(new_value, dict):
+                changes.extend(ConfigurationManager.diff(old_value, new_value, path + '/'))
+            elif old_value != new_value or (key in old) != (key in new):
+                changes.append(path)
+        return sorted(changes)
 
     def save_settings(self, config):
         """
-        Save the edited configuration settings
+        Save the edited configuration settings and notify the subscribers of
+        the changed ones. Return the list of the changed key paths.
+        Raise RuntimeError if a subscriber fails to apply the changes, the
+        other subscribers are notified anyway
         """
+        old_config = self.config
         # Overwrite settings
-        self.config = config
+        self.config = copy.deepcopy(config)
         self.load_credentials()
-        # Remove credentials part
+        # Write into file without the credentials part
+        config = copy.deepcopy(self.config)
         del config['credentials']
-        # Write into file
         Utils.write_json_file(self.config_filepath, config)
-        logging.info('ConfigurationManater - settings have been saved')
+        changes = self.diff(old_config, self.config)
+        logger.info('ConfigurationManager - settings have been saved, changed: {}'.format(changes))
+        errors = []
+        for key_paths, callback in self._subscribers:
+            matching = [c for c in changes
+                        if any(c == k or c.startswith(k + '/') for k in key_paths)]
+            if len(matching) == 0:
+                continue
+            try:
+                callback(matching)
+            except Exception as e:
+                logger.error('ConfigurationManager - unable to apply {}: {}'.format(matching, e))
+                errors.append(str(e))
+        if len(errors) > 0:
+            raise RuntimeError('Unable to apply the settings: {}'.format(', '.join(errors)))
+        return changes
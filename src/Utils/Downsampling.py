@@ -0,0 +1,46 @@
+import os
+import sys
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm
+    and return the sorted indices of the points kept. The first and last
+    points are always kept, each bucket in between keeps the point forming
+    the largest triangle with the previous kept point and the average of
+    the next bucket, so that peaks and troughs are preserved
+
+        - **x**: the sorted x coordinates
+        - **y**: the y coordinates
+        - **threshold**: the number of points to keep
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+    every = (count - 2) / (threshold - 2)
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, count)
+        avg_x = sum(x[start:end]) / (end - start)
+        avg_y = sum(y[start:end]) / (end - start)
+        # Point of the current bucket with the largest triangle
+        ax = x[a]
+        ay = y[a]
+        best = int(i * every) + 1
+        best_area = -1
+        for j in range(best, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        indices.append(best)
+        a = best
+    indices.append(count - 1)
+    return indices
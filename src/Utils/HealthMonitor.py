@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import logging
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.TaskThread import TaskThread
+from Utils.Utils import Utils
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor(TaskThread):
+    """
+    Watchdog of the application threads. Periodically checks the heartbeat
+    of the watched TaskThreads and writes a status file with the health of
+    each thread, the values of the registered probes (e.g. queue depths)
+    and the memory in use. The file is rewritten atomically, so that an
+    external supervisor can read it at any time and restart the process if
+    the file is not updated anymore or reports a stalled thread.
+    """
+    OK = 'ok'
+    STALLED = 'stalled'
+    DEAD = 'dead'
+    STOPPED = 'stopped'
+
+    def __init__(self, filepath, period=10, stall_timeout=120):
+        """
+        Initialise
+
+            - **filepath**: the status file, supports the {home} placeholder
+            - **period**: seconds between two checks
+            - **stall_timeout**: seconds a task can run without signs of life
+        """
+        TaskThread.__init__(self)
+        self.name = 'HealthMonitor'
+        self.configure(filepath, period, stall_timeout)
+        self._start_time = time.time()
+        self._threads = {}
+        self._probes = {}
+        self._status = None
+
+    def configure(self, filepath, period, stall_timeout):
+        """
+        Apply new settings, used from the next check
+        """
+        self.filepath = filepath.replace('{home}', Utils.get_home_path())
+        self.stall_timeout = stall_timeout
+        self.setInterval(period)
+
+    def watch(self, name, thread):
+        """
+        Watch the heartbeat of a TaskThread, it's reported dead only once started
+        """
+        self._threads[name] = thread
+
+    def add_probe(self, name, function):
+        """
+        Report in the status the value returned by the function
+        """
+        self._probes[name] = function
+
+    def get_status(self):
+        """
+        Return the health status as a json serializable dict
+        """
+        threads = {}
+        status = self.OK
+        for name, thread in self._threads.items():
+            started = thread.ident is not None
+            alive = thread.is_alive()
+            stalled = alive and thread.is_stalled(self.stall_timeout)
+            threads[name] = {
+                'started': started,
+                'alive': alive,
+                'busy': thread.is_busy(),
+                'stalled': stalled,
+                'heartbeat_age': round(thread.get_heartbeat_age(), 3)
+            }
+            if started and not alive:
+                status = self.DEAD
+            elif stalled and status == self.OK:
+                status = self.STALLED
+        probes = {}
+        for name, function in self._probes.items():
+            try:
+                probes[name] = function()
+            except Exception as e:
+                logger.error('HealthMonitor - probe %s failed: %s', name, e)
+                probes[name] = None
+        now = time.time()
+        return {
+            'status': status,
+            'pid': os.getpid(),
+            'timestamp': now,
+            'uptime': round(now - self._start_time, 3),
+            'memory_rss': self.get_memory_rss(),
+            'threads': threads,
+            'probes': probes
+        }
+
+    def write_status(self, status=None):
+        """
+        Write the current status, or the given one, in the status file
+        """
+        status = self.get_status() if status is None else status
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        temp = '{}.tmp'.format(self.filepath)
+        with open(temp, 'w') as file:
+            json.dump(status, file, indent=4)
+        os.replace(temp, self.filepath)
+        return status
+
+    def task(self):
+        try:
+            status = self.write_status()
+        except (IOError, OSError) as e:
+            logger.error('HealthMonitor - unable to write %s: %s', self.filepath, e)
+            return
+        if status['status'] != self._status and status['status'] != self.OK:
+            logger.error('HealthMonitor - %s: %s', status['status'], status['threads'])
+        self._status = status['status']
+
+    def stop(self):
+        """
+        Stop the checks and record in the status file that the application
+        stopped on purpose
+        """
+        self.shutdown()
+        if self.is_alive():
+            self.join()
+        try:
+            status = self.get_status()
+            status['status'] = self.STOPPED
+            self.write_status(status)
+        except (IOError, OSError) as e:
+            logger.error('HealthMonitor - unable to write %s: %s', self.filepath, e)
+
+    @staticmethod
+    def get_memory_rss():
+        """
+        Return the resident memory of the process in bytes, the peak one
+        where the current one is not available, None if unknown
+        """
+        try:
+            with open('/proc/self/statm', 'r') as file:
+                return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (IOError, OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+        except ImportError:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+    @staticmethod
+    def read_status(filepath):
+        """
+        Return the status stored in the file, raise RuntimeError if it can't be read
+        """
+        filepath = filepath.replace('{home}', Utils.get_home_path())
+        try:
+            with open(filepath, 'r') as file:
+                return json.load(file)
+        except (IOError, OSError, ValueError) as e:
+            raise RuntimeError('Unable to read the status file {}: {}'.format(filepath, e))
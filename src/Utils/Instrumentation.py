@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+import functools
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram():
+    """
+    Distribution of observed values (seconds) over fixed buckets
+    """
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Last element counts the values greater than the biggest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """
+        Add a value to the distribution
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        """
+        Return the histogram as a dictionary of cumulative buckets
+        """
+        cumulative = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': cumulative
+        }
+
+
+class Instrumentation():
+    """
+    In memory registry of counters and timing histograms of the application
+    hot paths. When disabled the instrumented functions are called directly,
+    so the cost is limited to a single attribute check.
+    """
+    PREFIX = 'tradingmate'
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._server = None
+
+    def enable(self, enabled):
+        """
+        Enable or disable the collection of metrics
+        """
+        self.enabled = bool(enabled)
+
+    def reset(self):
+        """
+        Clear all the collected metrics
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def increment(self, name, value=1):
+        """
+        Increment the counter with the given name
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """
+        Add a timing measure to the histogram with the given name
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram()
+            self._histograms[name].observe(seconds)
+
+    def timed(self, name):
+        """
+        Decorator that records the execution time of the decorated function
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def get_snapshot(self):
+        """
+        Return a dictionary containing all the collected metrics
+        """
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'counters': dict(self._counters),
+                'timers': {k: h.to_dict() for k, h in self._histograms.items()}
+            }
+
+    def to_json(self):
+        """
+        Return the collected metrics as json formatted string
+        """
+        return json.dumps(self.get_snapshot(), indent=4)
+
+    def dump(self, filepath):
+        """
+        Write the collected metrics into a json file
+
+            - **filepath**: destination file, supports the {home} placeholder
+        """
+        path = filepath.replace('{home}', Utils.get_home_path())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return Utils.write_json_file(path, self.get_snapshot())
+
+    def to_prometheus(self):
+        """
+        Return the collected metrics in the Prometheus text exposition format
+        """
+        snapshot = self.get_snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = '{}_{}_total'.format(self.PREFIX, name)
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('{} {}'.format(metric, value))
+        for name, hist in sorted(snapshot['timers'].items()):
+            metric = '{}_{}_seconds'.format(self.PREFIX, name)
+            lines.append('# TYPE {} histogram'.format(metric))
+            for bound, count in hist['buckets'].items():
+                lines.append('{}_bucket{{le="{}"}} {}'.format(metric, bound, count))
+            lines.append('{}_sum {}'.format(metric, hist['sum']))
+            lines.append('{}_count {}'.format(metric, hist['count']))
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port, address='127.0.0.1'):
+        """
+        Expose the metrics over http: /metrics in Prometheus format and
+        /metrics.json in json format
+        """
+        if self._server is not None:
+            return
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        registry = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry.to_prometheus()
+                    content_type = 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body = registry.to_json()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = HTTPServer((address, port), MetricsRequestHandler)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        logger.info('Instrumentation - metrics served on {}:{}'.format(
+            address, self._server.server_port))
+
+    def stop_http_server(self):
+        """
+        Stop the http server if running
+        """
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+    def get_http_port(self):
+        """
+        Return the port of the running http server or None
+        """
+        return self._server.server_port if self._server is not None else None
+
+
+# Shared registry used by the application modules
+metrics = Instrumentation()
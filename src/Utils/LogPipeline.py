@@ -0,0 +1,150 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import datetime
+import threading
+import logging.handlers
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.Utils import Utils
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format each record as a single line json object with the fields time,
+    level, logger, thread, message and, if any, exception
+    """
+
+    def format(self, record):
+        timestamp = datetime.datetime.fromtimestamp(record.created).strftime('%Y-%m-%dT%H:%M:%S')
+        entry = {
+            'time': '{}.{:03d}'.format(timestamp, int(record.msecs)),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler keeping the traceback out of the message, so that it's
+    written in its own field of the json records
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline():
+    """
+    Asynchronous logging: the application threads only put the records in a
+    queue, a background listener formats them and writes them to a file
+    rotated by size. The level of each subsystem (e.g. "Model.Portfolio")
+    can be configured separately from the root level
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = RecordQueueHandler(self._queue)
+        self._listener = None
+        self._file_handler = None
+        # Subsystems whose level has been configured
+        self._levels = {}
+        self._atexit = False
+
+    def configure(self, filepath, max_bytes=5242880, backup_count=5, level='INFO',
+                  levels=None, json_format=True):
+        """
+        Start, or restart with the new settings, writing the records to the file
+
+            - **filepath**: the log file, supports the {home} placeholder
+            - **max_bytes**: size of the file triggering the rotation, 0 to disable
+            - **backup_count**: number of rotated files kept
+            - **level**: level name of the root logger
+            - **levels**: optional, {"logger name": "level name"} of the subsystems
+            - **json_format**: write json lines if True, plain text otherwise
+        """
+        filepath = filepath.replace('{home}', Utils.get_home_path())
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            filepath, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+        with self._lock:
+            self._stop_listener()
+            self._file_handler = handler
+            self._listener = logging.handlers.QueueListener(self._queue, handler)
+            self._listener.start()
+            root = logging.getLogger()
+            if self._queue_handler not in root.handlers:
+                root.addHandler(self._queue_handler)
+            root.setLevel(level)
+            self._set_levels(levels or {})
+            if not self._atexit:
+                atexit.register(self.stop)
+                self._atexit = True
+
+    def _set_levels(self, levels):
+        """
+        Set the level of the subsystems, the ones not configured anymore
+        inherit again the root level
+        """
+        for name in self._levels:
+            if name not in levels:
+                logging.getLogger(name).setLevel(logging.NOTSET)
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._levels = dict(levels)
+
+    def _stop_listener(self):
+        """
+        Write the queued records and close the file, called with the lock held
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._file_handler is not None:
+            self._file_handler.close()
+            self._file_handler = None
+
+    def stop(self):
+        """
+        Write the queued records, close the file and detach from the root logger
+        """
+        with self._lock:
+            logging.getLogger().removeHandler(self._queue_handler)
+            self._stop_listener()
+
+    def get_queue_size(self):
+        """
+        Return the number of records waiting to be written
+        """
+        return self._queue.qsize()
+
+    def get_filepath(self):
+        """
+        Return the path of the current log file or None if not started
+        """
+        with self._lock:
+            return None if self._file_handler is None else self._file_handler.baseFilename
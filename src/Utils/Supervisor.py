@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import subprocess
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from Utils.HealthMonitor import HealthMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class Supervisor():
+    """
+    Run the application in a child process and restart it when it crashes
+    or when its HealthMonitor status file reports a stalled or dead thread
+    or stops being updated. Restarts are delayed with an exponential
+    backoff, reset once the child has been running long enough. A child
+    exiting with code 0 (e.g. the main window was closed) is not restarted.
+    """
+    POLL_PERIOD = 1
+    # Seconds given to the child to exit before killing it
+    TERMINATE_TIMEOUT = 10
+
+    def __init__(self, command, status_filepath, stale_timeout=60, min_backoff=1,
+                 max_backoff=300, stable_run=600, max_restarts=None):
+        """
+        Initialise
+
+            - **command**: list of the arguments of the child process
+            - **status_filepath**: status file written by the child HealthMonitor
+            - **stale_timeout**: seconds after which a status not updated is a hang
+            - **min_backoff**: seconds before the first restart
+            - **max_backoff**: maximum seconds between two restarts
+            - **stable_run**: seconds of running that reset the backoff
+            - **max_restarts**: optional, give up after this number of restarts
+        """
+        self.command = command
+        self.status_filepath = status_filepath
+        self.stale_timeout = stale_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_run = stable_run
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._backoff = min_backoff
+        self._child = None
+        # Set by stop, interrupts the waits between polls and restarts
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Supervise the child until it exits cleanly, the supervisor is
+        stopped or the maximum number of restarts is reached. Return the
+        exit code of the last child
+        """
+        while True:
+            started = time.monotonic()
+            code = self._run_child()
+            if self._stopped.is_set() or code == 0:
+                logger.info('Supervisor - child exited with code %s', code)
+                return code
+            if self.max_restarts is not None and self.restarts >= self.max_restarts:
+                logger.error('Supervisor - giving up after %s restarts', self.restarts)
+                return code
+            if time.monotonic() - started >= self.stable_run:
+                self._backoff = self.min_backoff
+            logger.error('Supervisor - child exited with code %s, restarting in %s s',
+                         code, self._backoff)
+            if self._stopped.wait(self._backoff):
+                return code
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            self.restarts += 1
+
+    def _run_child(self):
+        """
+        Start the child and wait for it to exit, terminating it if it hangs.
+        Return its exit code
+        """
+        self._child = subprocess.Popen(self.command)
+        started = time.time()
+        logger.info('Supervisor - started child %s', self._child.pid)
+        while True:
+            code = self._child.poll()
+            if code is not None:
+                return code
+            reason = self.check_health(started)
+            if reason is not None:
+                logger.error('Supervisor - child %s %s, terminating it', self._child.pid, reason)
+                return self._terminate_child()
+            self._stopped.wait(self.POLL_PERIOD)
+
+    def check_health(self, started, now=None):
+        """
+        Return the reason the child is considered hung or None if healthy
+
+            - **started**: time in seconds since the epoch the child was started
+            - **now**: optional, the current time in seconds since the epoch
+        """
+        now = time.time() if now is None else now
+        try:
+            status = HealthMonitor.read_status(self.status_filepath)
+        except RuntimeError:
+            status = None
+        # Status files written before the child started are not its own
+        if status is None or status['timestamp'] < started:
+            if now - started > self.stale_timeout:
+                return 'did not report its status'
+            return None
+        if status['status'] in (HealthMonitor.STALLED, HealthMonitor.DEAD):
+            return 'reported a {} thread'.format(status['status'])
+        if status['status'] != HealthMonitor.STOPPED and now - status['timestamp'] > self.stale_timeout:
+            return 'did not update its status for {:.0f} s'.format(now - status['timestamp'])
+        return None
+
+    def _terminate_child(self):
+        self._child.terminate()
+        try:
+            return self._child.wait(self.TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._child.kill()
+            return self._child.wait()
+
+    def stop(self, *args):
+        """
+        Stop the child and the supervision, usable as signal handler
+        """
+        self._stopped.set()
+        if self._child is not None and self._child.poll() is None:
+            self._terminate_child()
+
+    def install_signal_handlers(self):
+        """
+        Stop the child when the supervisor is terminated
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
@@ -1,12 +1,11 @@
 # Source: http://code.activestate.com/recipes/65222-run-a-task-every-few-seconds/
 
 import threading
+import time
 import os
 import sys
-import inspect
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
@@ -22,6 +21,9 @@ class TaskThread(threading.Thread):
         self._enabled.set()
         self._interval = 1 # default value
         self._singleRun = False
+        # Time of the last sign of life, the task is running while busy
+        self._heartbeat = time.monotonic()
+        self._busy = False
 
     def setInterval(self, interval):
         """Set the number of seconds we sleep between executing our task"""
@@ -44,6 +46,22 @@ class TaskThread(threading.Thread):
         """Cancel the timeout and run the task"""
         self._timeout.set()
 
+    def beat(self):
+        """Record a sign of life, long tasks should call it at each step"""
+        self._heartbeat = time.monotonic()
+
+    def get_heartbeat_age(self):
+        """Return the seconds since the last sign of life"""
+        return time.monotonic() - self._heartbeat
+
+    def is_busy(self):
+        """Return True while the task is running"""
+        return self._busy
+
+    def is_stalled(self, timeout):
+        """Return True if the task is running without signs of life for longer than timeout seconds"""
+        return self._busy and self.get_heartbeat_age() > timeout
+
     def force_single_run(self):
         self._singleRun = True
         self.enable(True)
@@ -59,7 +77,13 @@ class TaskThread(threading.Thread):
             # sleep until enabled or return immediatly
             self._enabled.wait()
             # perform task
-            self.task()
+            self._busy = True
+            self.beat()
+            try:
+                self.task()
+            finally:
+                self._busy = False
+                self.beat()
             # Check if it was a single run
             if self._singleRun:
                 self.enable(False)
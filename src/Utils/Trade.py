@@ -1,20 +1,20 @@
 from enum import Enum
 import os
 import sys
-import inspect
 import logging
 import datetime
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
-from Utils.Utils import Actions
+from Utils.Utils import Actions, Utils
+
+logger = logging.getLogger(__name__)
 
 
 class Trade():
-    def __init__(self, date_string, action, quantity, symbol, price, fee, sdr):
+    def __init__(self, date_string, action, quantity, symbol, price, fee, sdr, fx_rate=1.0):
         try:
             self.date = datetime.datetime.strptime(date_string, '%d/%m/%Y')
             if not isinstance(action, Actions):
@@ -25,13 +25,24 @@ class Trade():
             self.price = price
             self.fee = fee
             self.sdr = sdr
+            # Price currency and units per currency unit
+            self.currency, self.scale = Utils.get_symbol_currency(symbol)
+            # Base currency units per unit of the price currency
+            self.fx_rate = float(fx_rate)
             self.total = self.__compute_total()
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
             raise ValueError("Invalid argument")
 
+    def set_fx_rate(self, fx_rate):
+        """
+        Set the exchange rate between the price currency and the base currency
+        """
+        self.fx_rate = float(fx_rate)
+        self.total = self.__compute_total()
+
     def to_dict(self):
-        return {
+        item = {
             'date': self.date.strftime('%d/%m/%Y'),
             'action': self.action.name,
             'quantity': self.quantity,
@@ -40,6 +51,10 @@ class Trade():
             'fee': self.fee,
             'stamp_duty': self.sdr
         }
+        # Stored only when needed so that logs in base currency don't change
+        if self.fx_rate != 1.0:
+            item['fx_rate'] = self.fx_rate
+        return item
 
     @staticmethod
     def from_dict(item):
@@ -47,16 +62,17 @@ class Trade():
             raise ValueError('item not well formatted')
 
         return Trade(item['date'], Actions[item['action']], item['quantity'],
-                     item['symbol'], float(item['price']), float(item['fee']), float(item['stamp_duty']))
+                     item['symbol'], float(item['price']), float(item['fee']), float(item['stamp_duty']),
+                     float(item.get('fx_rate', 1.0)))
 
     def __compute_total(self):
         if self.action in (Actions.DEPOSIT, Actions.WITHDRAW, Actions.DIVIDEND):
             return self.quantity
         elif self.action == Actions.BUY:
-            cost = (self.price / 100) * self.quantity
+            cost = (self.price / self.scale) * self.quantity * self.fx_rate
             return cost + self.fee + ((cost * self.sdr) / 100)
         elif self.action == Actions.SELL:
-            cost = (self.price / 100) * self.quantity
+            cost = (self.price / self.scale) * self.quantity * self.fx_rate
             total = cost + self.fee + ((cost * self.sdr) / 100)
             return total * -1
         return 0
@@ -1,13 +1,12 @@
 from enum import Enum
 import os
 import sys
-import inspect
 import json
 import logging
-from pathlib import Path
 
-currentdir = os.path.dirname(os.path.abspath(
-    inspect.getfile(inspect.currentframe())))
+logger = logging.getLogger(__name__)
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
@@ -26,6 +25,15 @@ class Callbacks(Enum):
     ON_STOP_AUTOTRADING = 10
     ON_SHOW_SETTINGS_EVENT = 11
     ON_SAVE_SETTINGS_EVENT = 12
+    ON_IMPORT_TRADES_EVENT = 13
+    ON_EDIT_TRADE_EVENT = 14
+    ON_INSERT_TRADE_EVENT = 15
+    ON_DELETE_TRADE_EVENT = 16
+    ON_ADD_WATCHLIST_SYMBOL_EVENT = 17
+    ON_REMOVE_WATCHLIST_SYMBOL_EVENT = 18
+    ON_ADD_ALERT_EVENT = 19
+    ON_REMOVE_ALERTS_EVENT = 20
+    ON_SHOW_CHARTS_EVENT = 21
 
 class Actions(Enum):
     BUY = 1
@@ -44,6 +52,23 @@ class Messages(Enum):
 
 class Markets(Enum):
     LSE = "LON"
+    NYSE = "NYSE"
+    NASDAQ = "NASDAQ"
+    XETRA = "ETR"
+    EURONEXT = "EPA"
+
+# Currency of the portfolio cash, fees and aggregates
+BASE_CURRENCY = "GBP"
+
+# Currency of the prices quoted by each market and number of price units
+# per currency unit (i.e. LSE prices are in pence)
+MARKET_CURRENCIES = {
+    Markets.LSE: ("GBP", 100),
+    Markets.NYSE: ("USD", 1),
+    Markets.NASDAQ: ("USD", 1),
+    Markets.XETRA: ("EUR", 1),
+    Markets.EURONEXT: ("EUR", 1),
+}
 
 class Utils():
     """
@@ -52,6 +77,20 @@ class Utils():
     def __init__(self):
         pass
 
+    @staticmethod
+    def get_symbol_currency(symbol):
+        """
+        Return a tuple (currency, price units per currency unit) of the prices
+        of the given symbol. Symbols without a known market prefix are quoted
+        in pence like the LSE ones
+
+            - **symbol** The symbol in the format "MARKET:TICKER"
+        """
+        market = str(symbol).split(':')[0]
+        if market in Markets.__members__:
+            return MARKET_CURRENCIES[Markets[market]]
+        return MARKET_CURRENCIES[Markets.LSE]
+
     @staticmethod
     def load_json_file(filepath):
         """
@@ -64,9 +103,71 @@ class Utils():
             with open(filepath, 'r') as file:
                 return json.load(file)
         except Exception as e:
-            logging.error("Unable to load JSON file {}".format(e))
+            logger.error("Unable to load JSON file {}".format(e))
         return None
 
+    @staticmethod
+    def iter_json_array(filepath, key, chunk_size=65536):
+        """
+        Yield one at a time the items of the array stored at the given top level
+        key of a JSON formatted file, reading the file in chunks so that the
+        whole file is never loaded in memory. Raise ValueError if the file is
+        not well formatted
+
+            - **filepath** The filepath including filename and extension
+            - **key** The key of the array in the top level json object
+            - **chunk_size** Number of characters read at a time
+        """
+        decoder = json.JSONDecoder()
+        pattern = '"{}"'.format(key)
+        with open(filepath, 'r') as file:
+            buffer = file.read(chunk_size)
+            start = buffer.find(pattern)
+            while start < 0:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise ValueError('Key {} not found in {}'.format(key, filepath))
+                # Keep the tail in case the key is split between two chunks
+                buffer = buffer[-len(pattern):] + chunk
+                start = buffer.find(pattern)
+            buffer = buffer[start + len(pattern):]
+            pos = 0
+            in_array = False
+            while True:
+                # Skip whitespaces and separators
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n:,':
+                    pos += 1
+                if pos == len(buffer):
+                    buffer = file.read(chunk_size)
+                    pos = 0
+                    if not buffer:
+                        raise ValueError('Unexpected end of file {}'.format(filepath))
+                    continue
+                if not in_array:
+                    if buffer[pos] != '[':
+                        raise ValueError('Key {} is not an array in {}'.format(key, filepath))
+                    in_array = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                    # An item ending with the buffer could be truncated
+                    complete = end < len(buffer)
+                except ValueError:
+                    complete = False
+                if not complete:
+                    chunk = file.read(chunk_size)
+                    if chunk:
+                        buffer = buffer[pos:] + chunk
+                        pos = 0
+                        continue
+                    # Nothing more to read, the item is complete or the file is broken
+                    item, end = decoder.raw_decode(buffer, pos)
+                pos = end
+                yield item
+
     @staticmethod
     def write_json_file(filepath, data):
         """
@@ -76,12 +177,18 @@ class Utils():
             -**data** The python dict to write
             - Return True if succed, False otherwise
         """
+        # Write a temporary file first and replace the destination, so that
+        # the existing file is never left partially written
+        tmp_filepath = '{}.tmp'.format(filepath)
         try:
-            with open(filepath, 'w') as file:
+            with open(tmp_filepath, 'w') as file:
                 json.dump(data, file, indent=4, separators=(',', ': '))
-                return True
+            os.replace(tmp_filepath, filepath)
+            return True
         except Exception as e:
-            logging.error("Unable to write JSON file: ".format(e))
+            logger.error("Unable to write JSON file: {}".format(e))
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
         return False
 
     @staticmethod
@@ -91,4 +198,5 @@ class Utils():
         """
         if sys.version_info < (3,5):
             return str(os.path.expanduser("~"))
+        from pathlib import Path
         return str(Path.home())
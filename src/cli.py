@@ -0,0 +1,492 @@
+###############################################################################
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE, TITLE AND
+# NON-INFRINGEMENT. IN NO EVENT SHALL THE COPYRIGHT HOLDERS OR ANYONE
+# DISTRIBUTING THE SOFTWARE BE LIABLE FOR ANY DAMAGES OR OTHER LIABILITY,
+# WHETHER IN CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###############################################################################
+"""
+Command line interface of TradingMate, to be used without a display
+(e.g. from cron jobs). The trading log is streamed and the live prices
+thread is never started.
+
+Usage:
+    python3 cli.py [--log FILE] [--prices FILE | --live]
+                   [--format table|json|csv] report
+    python3 cli.py [--log FILE] [--format table|json|csv]
+                   gains [--method FIFO|AVERAGE|UK] [--tax-year 2019/20] [--disposals]
+    python3 cli.py [--format table|json|csv]
+                   history SYMBOL [--from dd/mm/yyyy] [--to dd/mm/yyyy] [--adjusted]
+    python3 cli.py [--log FILE] [--prices FILE | --live] [--format table|json|csv]
+                   risk [--paths N] [--horizon DAYS] [--confidence 0.95]
+                   [--from dd/mm/yyyy] [--seed N] [--workers N]
+    python3 cli.py [--log FILE] [--prices FILE | --live] [--format table|json|csv]
+                   rebalance [SYMBOL=WEIGHT ...] [--targets FILE] [--fee FEE]
+                   [--tolerance 0.01] [--output FILE]
+    python3 cli.py [--format table|json|csv] status
+    python3 cli.py [--format table|json|csv]
+                   actions [--add dd/mm/yyyy SPLIT|CONSOLIDATION|SYMBOL_CHANGE SYMBOL RATIO|NEW_SYMBOL]
+"""
+import os
+import sys
+import csv
+import json
+import logging
+import argparse
+import datetime
+
+currentdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, currentdir)
+
+from Model.DatabaseHandler import DatabaseHandler
+from Model.Portfolio import Portfolio
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Model.PriceCache import PriceCache
+from Model.FxRates import FxRates
+from Model.RealizedGains import RealizedGains
+from Model.BarStore import BarStore
+from Model.Rebalancer import Rebalancer
+from Model.CorporateActions import CorporateActions
+from Utils.HealthMonitor import HealthMonitor
+from Utils.Utils import Callbacks, Utils
+
+logger = logging.getLogger('cli')
+
+FORMATS = ['table', 'json', 'csv']
+
+HOLDING_COLUMNS = ['symbol', 'currency', 'quantity', 'open_price', 'last_price', 'cost',
+                   'value', 'pl', 'pl_perc', 'valid']
+TAX_YEAR_COLUMNS = ['tax_year', 'disposals', 'proceeds', 'cost', 'gains', 'losses', 'net']
+DISPOSAL_COLUMNS = ['date', 'symbol', 'quantity', 'proceeds', 'cost', 'gain', 'rules']
+REBALANCE_COLUMNS = ['date', 'action', 'symbol', 'quantity', 'price', 'fee', 'stamp_duty', 'total']
+ACTION_COLUMNS = ['position', 'date', 'type', 'symbol', 'ratio', 'new_symbol']
+SUMMARY_FIELDS = ['cash_available', 'cash_deposited', 'holdings_value', 'total_value',
+                  'pl', 'pl_perc', 'open_positions_pl', 'open_positions_pl_perc']
+
+
+def load_prices(args, config):
+    """
+    Return a tuple (prices dict, source name) from the prices file given on
+    the command line or from the cache of the last live prices
+    """
+    if args.prices is not None:
+        prices = Utils.load_json_file(args.prices)
+        if prices is None:
+            raise RuntimeError('Unable to read prices file {}'.format(args.prices))
+        return prices, 'file'
+    return PriceCache(config.get_price_cache_filepath()).load(), 'cache'
+
+
+def load_corporate_actions(config):
+    """
+    Return the CorporateActions read from the configured file
+    """
+    actions = CorporateActions(config.get_corporate_actions_filepath())
+    actions.load()
+    return actions
+
+
+def load_portfolio(args, config):
+    """
+    Build the portfolio streaming the trading log. Return a tuple
+    (Portfolio, price source name)
+    """
+    if args.live:
+        # Build the default live price getter but fetch synchronously in this thread
+        portfolio = Portfolio('Portfolio1', config)
+        source = 'live'
+    else:
+        prices, source = load_prices(args, config)
+        # Exchange rates are stored along with the prices
+        fx_rates = {s[len(FxRates.CACHE_PREFIX):]: p for s, p in prices.items()
+                    if s.startswith(FxRates.CACHE_PREFIX)}
+        portfolio = Portfolio('Portfolio1', config, OfflinePriceGetter(prices, fx_rates))
+    portfolio.set_callback(Callbacks.UPDATE_LIVE_PRICES, lambda: None)
+    portfolio.set_corporate_actions(load_corporate_actions(config))
+    db_handler = DatabaseHandler(config)
+    portfolio.reload_stream(db_handler.iter_trades(args.log))
+    if args.live:
+        portfolio.price_getter.task()
+    return portfolio, source
+
+
+def build_report(portfolio, source):
+    """
+    Return a dict with the balances, the P/L and the holdings of the portfolio
+    """
+    holdings = []
+    for h in portfolio.get_holding_list():
+        holdings.append({
+            'symbol': h.get_symbol(),
+            'currency': h.get_currency(),
+            'quantity': h.get_quantity(),
+            'open_price': h.get_open_price(),
+            'last_price': h.get_last_price(),
+            'cost': h.get_cost(),
+            'value': h.get_value(),
+            'pl': h.get_profit_loss(),
+            'pl_perc': h.get_profit_loss_perc(),
+            'valid': h.get_last_price_valid()
+        })
+    return {
+        'portfolio': portfolio.get_name(),
+        'prices': source,
+        'summary': {
+            'cash_available': portfolio.get_cash_available(),
+            'cash_deposited': portfolio.get_cash_deposited(),
+            'holdings_value': portfolio.get_holdings_value(),
+            'total_value': portfolio.get_total_value(),
+            'pl': portfolio.get_portfolio_pl(),
+            'pl_perc': portfolio.get_portfolio_pl_perc(),
+            'open_positions_pl': portfolio.get_open_positions_pl(),
+            'open_positions_pl_perc': portfolio.get_open_positions_pl_perc()
+        },
+        'holdings': holdings
+    }
+
+
+def format_value(value):
+    """
+    Format a value for the text table
+    """
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return '{:.2f}'.format(value)
+    return str(value)
+
+
+def write_table(out, columns, rows):
+    """
+    Write the list of dict rows as a text table with aligned columns, the
+    first column is aligned to the left and the others to the right
+    """
+    cells = [columns] + [[format_value(row[c]) for c in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    for line in cells:
+        text = [line[0].ljust(widths[0])] + [cell.rjust(w) for cell, w in zip(line[1:], widths[1:])]
+        out.write('  '.join(text).rstrip() + '\n')
+
+
+def write_output(out, fmt, report, tables):
+    """
+    Write the report in the requested format. tables is a list of tuples
+    (title, columns, rows) used by the table and csv formats, the json
+    format writes the whole report
+    """
+    if fmt == 'json':
+        json.dump(report, out, indent=4)
+        out.write('\n')
+        return
+    for index, (title, columns, rows) in enumerate(tables):
+        if index > 0:
+            out.write('\n')
+        if fmt == 'csv':
+            writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore',
+                                    lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            out.write('{}\n'.format(title))
+            write_table(out, columns, rows)
+
+
+def command_report(args, config, out):
+    """
+    Print holdings, balances and profit/loss of the portfolio
+    """
+    portfolio, source = load_portfolio(args, config)
+    report = build_report(portfolio, source)
+    summary = [{'field': f, 'value': report['summary'][f]} for f in SUMMARY_FIELDS]
+    write_output(out, args.format, report, [
+        ('Holdings', HOLDING_COLUMNS, report['holdings']),
+        ('Summary ({} prices)'.format(source), ['field', 'value'], summary)
+    ])
+
+
+def command_gains(args, config, out):
+    """
+    Print the realized gains of each tax year and optionally each disposal
+    """
+    method = args.method if args.method is not None else config.get_gains_method()
+    engine = RealizedGains(method, load_corporate_actions(config))
+    engine.process(DatabaseHandler(config).iter_trades(args.log))
+    tax_years = [r for r in engine.get_tax_year_reports()
+                 if args.tax_year is None or r['tax_year'] == args.tax_year]
+    disposals = []
+    for d in engine.get_disposals():
+        if args.tax_year is not None and RealizedGains.get_tax_year(d['date']) != args.tax_year:
+            continue
+        disposal = dict(d)
+        disposal['date'] = d['date'].strftime('%d/%m/%Y')
+        disposal['rules'] = ' '.join(sorted(set(m['rule'] for m in d['matches'])))
+        disposal['matches'] = [dict(m, acquired=m['acquired'].strftime('%d/%m/%Y')
+                                    if m['acquired'] is not None else None)
+                               for m in d['matches']]
+        disposals.append(disposal)
+    report = {'method': method, 'tax_years': tax_years}
+    tables = [('Realized gains ({})'.format(method), TAX_YEAR_COLUMNS, tax_years)]
+    if args.disposals:
+        report['disposals'] = disposals
+        tables.append(('Disposals', DISPOSAL_COLUMNS, disposals))
+    write_output(out, args.format, report, tables)
+
+
+def parse_date(value):
+    """
+    Return the date of a dd/mm/yyyy string, used as argparse type
+    """
+    try:
+        return datetime.datetime.strptime(value, '%d/%m/%Y').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid date {}, expected dd/mm/yyyy'.format(value))
+
+
+def command_history(args, config, out):
+    """
+    Print the daily bars of a symbol stored by the previous live fetches,
+    optionally adjusted by the corporate actions
+    """
+    actions = load_corporate_actions(config) if args.adjusted else None
+    store = BarStore(config.get_bar_store_filepath())
+    try:
+        bars = [dict(zip(BarStore.COLUMNS, b)) for b in
+                store.get_bars(args.symbol, args.start, args.end, actions)]
+    finally:
+        store.close()
+    if len(bars) == 0:
+        raise RuntimeError('No daily bars stored for {}'.format(args.symbol))
+    for bar in bars:
+        bar['date'] = bar['date'].strftime('%d/%m/%Y')
+    write_output(out, args.format, {'symbol': args.symbol, 'bars': bars}, [
+        ('Daily bars of {}'.format(args.symbol), BarStore.COLUMNS, bars)
+    ])
+
+
+def command_risk(args, config, out):
+    """
+    Print value at risk and scenario distribution of the holdings, simulated
+    bootstrapping the returns of the stored daily bars
+    """
+    # numpy is an optional dependency only required by the risk simulation
+    try:
+        from Model.RiskSimulator import RiskSimulator
+    except ImportError as e:
+        raise RuntimeError('The risk command requires numpy, install requirements-risk.txt: {}'.format(e))
+    portfolio, source = load_portfolio(args, config)
+    store = BarStore(config.get_bar_store_filepath())
+    try:
+        simulator = RiskSimulator(store, max_workers=args.workers,
+                                  corporate_actions=load_corporate_actions(config))
+        result = simulator.simulate_portfolio(portfolio, paths=args.paths, horizon=args.horizon,
+                                              confidence=args.confidence, seed=args.seed,
+                                              start=args.start)
+    finally:
+        store.close()
+    result['prices'] = source
+    result['first_date'] = result['first_date'].strftime('%d/%m/%Y')
+    result['last_date'] = result['last_date'].strftime('%d/%m/%Y')
+    summary = [{'field': f, 'value': result[f]} for f in
+               ['value', 'var', 'cvar', 'mean', 'std', 'paths', 'horizon', 'observations',
+                'first_date', 'last_date']]
+    summary.append({'field': 'excluded', 'value': ' '.join(result['excluded'])})
+    percentiles = [{'percentile': p, 'pl': v} for p, v in sorted(result['percentiles'].items())]
+    write_output(out, args.format, result, [
+        ('Risk at {:.0%} confidence over {} days ({} prices)'.format(
+            args.confidence, args.horizon, source), ['field', 'value'], summary),
+        ('Profit/loss percentiles', ['percentile', 'pl'], percentiles)
+    ])
+
+
+def parse_targets(args):
+    """
+    Return the target weights {"symbol": weight} read from the targets file
+    and the SYMBOL=WEIGHT arguments, the latter take precedence
+    """
+    targets = {}
+    if args.targets is not None:
+        targets = Utils.load_json_file(args.targets)
+        if not isinstance(targets, dict):
+            raise RuntimeError('Unable to read targets file {}'.format(args.targets))
+    for target in args.weights:
+        symbol, _, weight = target.rpartition('=')
+        if len(symbol) == 0:
+            raise ValueError('Invalid target {}, expected SYMBOL=WEIGHT'.format(target))
+        targets[symbol] = weight
+    try:
+        return {s: float(w) for s, w in targets.items()}
+    except (TypeError, ValueError):
+        raise ValueError('Target weights must be numbers')
+
+
+def command_rebalance(args, config, out):
+    """
+    Print the trades rebalancing the holdings to the target weights,
+    optionally writing them in a json lines file that can be imported
+    """
+    targets = parse_targets(args)
+    if len(targets) == 0:
+        raise ValueError('No target weights given')
+    portfolio, source = load_portfolio(args, config)
+    fee = args.fee if args.fee is not None else config.get_rebalance_fee()
+    rebalancer = Rebalancer(portfolio, fee, config.get_rebalance_stamp_duty(), args.tolerance)
+    proposal = rebalancer.propose(targets)
+    trades = [dict(t.to_dict(), total=t.total) for t in proposal['trades']]
+    weights = [{'symbol': s, 'current': w[0], 'target': w[1], 'after': w[2]}
+               for s, w in sorted(proposal['weights'].items())]
+    violations = [{'index': v['index'], 'message': v['message']} for v in proposal['violations']]
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            for trade in proposal['trades']:
+                file.write(json.dumps(trade.to_dict()) + '\n')
+    report = {'prices': source, 'trades': trades, 'cash': proposal['cash'],
+              'weights': weights, 'violations': violations}
+    tables = [
+        ('Trades ({} prices)'.format(source), REBALANCE_COLUMNS, trades),
+        ('Weights (cash after {:.2f})'.format(proposal['cash']), ['symbol', 'current', 'target', 'after'],
+         weights)
+    ]
+    if len(violations) > 0:
+        tables.append(('Violations', ['index', 'message'], violations))
+    write_output(out, args.format, report, tables)
+    return 1 if len(violations) > 0 else 0
+
+
+def command_status(args, config, out):
+    """
+    Print the health status written by the running application. Return 1
+    if the application is not healthy or its status is not updated anymore
+    """
+    status = HealthMonitor.read_status(config.get_health_status_filepath())
+    age = datetime.datetime.now().timestamp() - status['timestamp']
+    if status['status'] == HealthMonitor.OK and age > config.get_health_stale_timeout():
+        status['status'] = 'stale'
+    status['age'] = age
+    last_fetch = status['probes'].get('last_fetch_time')
+    rows = [
+        {'field': 'status', 'value': status['status']},
+        {'field': 'pid', 'value': status['pid']},
+        {'field': 'updated_sec_ago', 'value': age},
+        {'field': 'uptime_sec', 'value': status['uptime']},
+        {'field': 'memory_rss_mb', 'value': status['memory_rss'] / 1048576
+         if status['memory_rss'] is not None else None},
+        {'field': 'last_fetch', 'value': datetime.datetime.fromtimestamp(last_fetch).strftime(
+            '%d/%m/%Y %H:%M:%S') if last_fetch is not None else None}
+    ]
+    rows.extend({'field': name, 'value': value} for name, value in sorted(status['probes'].items())
+                if name != 'last_fetch_time')
+    threads = [dict(t, name=name) for name, t in sorted(status['threads'].items())]
+    write_output(out, args.format, status, [
+        ('Status', ['field', 'value'], rows),
+        ('Threads', ['name', 'started', 'alive', 'busy', 'stalled', 'heartbeat_age'], threads)
+    ])
+    return 0 if status['status'] in (HealthMonitor.OK, HealthMonitor.STOPPED) else 1
+
+
+def command_actions(args, config, out):
+    """
+    Print the corporate actions, optionally adding a new one
+    """
+    actions = load_corporate_actions(config)
+    if args.add is not None:
+        date, kind, symbol, value = args.add
+        date = datetime.datetime.strptime(date, '%d/%m/%Y').date()
+        if kind == 'SYMBOL_CHANGE':
+            actions.add(date, kind, symbol, new_symbol=value)
+        else:
+            actions.add(date, kind, symbol, ratio=value)
+    rows = [{'position': i, 'date': a['date'].strftime('%d/%m/%Y'), 'type': a['type'],
+             'symbol': a['symbol'], 'ratio': a.get('ratio'), 'new_symbol': a.get('new_symbol')}
+            for i, a in enumerate(actions.get_actions())]
+    write_output(out, args.format, {'actions': rows}, [
+        ('Corporate actions', ACTION_COLUMNS, rows)
+    ])
+
+
+def build_parser():
+    """
+    Return the command line parser
+    """
+    parser = argparse.ArgumentParser(prog='cli.py', description='TradingMate command line interface')
+    parser.add_argument('--log', help='Trading log file, default is the configured one')
+    parser.add_argument('--format', choices=FORMATS, default='table', help='Output format')
+    prices = parser.add_mutually_exclusive_group()
+    prices.add_argument('--prices', help='Json file of prices {"symbol": price} and exchange rates '
+                        '{"FX:currency": rate}, default is the price cache')
+    prices.add_argument('--live', action='store_true', help='Fetch the live prices before reporting')
+    subparsers = parser.add_subparsers(dest='command')
+    report = subparsers.add_parser('report', help='Show holdings, balances and profit/loss')
+    report.set_defaults(function=command_report)
+    gains = subparsers.add_parser('gains', help='Show the realized gains of each tax year')
+    gains.add_argument('--method', choices=RealizedGains.METHODS,
+                       help='Matching method of sold shares, default is the configured one')
+    gains.add_argument('--tax-year', help='Show only the given tax year, e.g. 2019/20')
+    gains.add_argument('--disposals', action='store_true', help='Show each disposal')
+    gains.set_defaults(function=command_gains)
+    history = subparsers.add_parser('history', help='Show the stored daily bars of a symbol')
+    history.add_argument('symbol', help='Symbol in the form MARKET:SYMBOL')
+    history.add_argument('--from', dest='start', type=parse_date, help='First date, dd/mm/yyyy')
+    history.add_argument('--to', dest='end', type=parse_date, help='Last date, dd/mm/yyyy')
+    history.add_argument('--adjusted', action='store_true',
+                         help='Adjust the prices by the later splits and consolidations')
+    history.set_defaults(function=command_history)
+    risk = subparsers.add_parser('risk', help='Simulate value at risk of the holdings')
+    risk.add_argument('--paths', type=int, default=10000, help='Number of simulated paths')
+    risk.add_argument('--horizon', type=int, default=1, help='Days of each path')
+    risk.add_argument('--confidence', type=float, default=0.95, help='Confidence level of VaR and CVaR')
+    risk.add_argument('--from', dest='start', type=parse_date,
+                      help='First date of the daily bars bootstrapped, dd/mm/yyyy')
+    risk.add_argument('--seed', type=int, help='Seed of the random generator')
+    risk.add_argument('--workers', type=int, help='Worker processes, default is the number of cpus')
+    risk.set_defaults(function=command_risk)
+    rebalance = subparsers.add_parser('rebalance', help='Propose the trades reaching target weights')
+    rebalance.add_argument('weights', nargs='*', metavar='SYMBOL=WEIGHT',
+                           help='Target weight of a symbol, the weights not allocated are cash')
+    rebalance.add_argument('--targets', help='Json file of target weights {"symbol": weight}')
+    rebalance.add_argument('--fee', type=float, help='Fee of each trade, default is the configured one')
+    rebalance.add_argument('--tolerance', type=float, default=0.0,
+                           help='Symbols within this weight of the target are not traded')
+    rebalance.add_argument('--output', help='Write the trades in this json lines file, to be imported')
+    rebalance.set_defaults(function=command_rebalance)
+    status = subparsers.add_parser('status', help='Show the health status of the running application')
+    status.set_defaults(function=command_status)
+    actions = subparsers.add_parser('actions', help='Show or add the corporate actions')
+    actions.add_argument('--add', nargs=4, metavar=('DATE', 'TYPE', 'SYMBOL', 'VALUE'),
+                         help='Add an action effective from the date dd/mm/yyyy of type '
+                         'SPLIT or CONSOLIDATION with the new shares for each share (e.g. 10 or 0.1) '
+                         'or SYMBOL_CHANGE with the new symbol')
+    actions.set_defaults(function=command_actions)
+    return parser
+
+
+def main(argv=None, config=None, out=None):
+    """
+    Run the command line interface and return the exit code
+
+        - **argv**: optional, list of arguments, default are the process ones
+        - **config**: optional, configuration, default is the ConfigurationManager
+        - **out**: optional, output stream, default is stdout
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    try:
+        if config is None:
+            from Utils.ConfigurationManager import ConfigurationManager
+            config = ConfigurationManager()
+        code = args.function(args, config, out if out is not None else sys.stdout)
+    except (RuntimeError, IOError, ValueError) as e:
+        logger.error('cli - {}'.format(e))
+        sys.stderr.write('Error: {}\n'.format(e))
+        return 1
+    return code or 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    sys.exit(main())
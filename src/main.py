@@ -9,7 +9,29 @@
 # SOFTWARE.
 ###############################################################################
 
-from TradingMate import TradingMate
+import os
+import sys
+import logging
+
+
+def supervise():
+    """
+    Run TradingMate in a child process restarted when it crashes or hangs
+    """
+    from Utils.ConfigurationManager import ConfigurationManager
+    from Utils.Supervisor import Supervisor
+    config = ConfigurationManager()
+    supervisor = Supervisor([sys.executable, '-u', os.path.abspath(__file__)],
+                            config.get_health_status_filepath(),
+                            stale_timeout=config.get_health_stale_timeout(),
+                            max_backoff=config.get_health_max_backoff())
+    supervisor.install_signal_handlers()
+    return supervisor.run()
+
 
 if __name__ == "__main__":
+    if '--supervise' in sys.argv[1:]:
+        logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+        sys.exit(supervise())
+    from TradingMate import TradingMate
     TradingMate().start()
@@ -14,6 +14,21 @@ class MockConfigurationManager():
     def get_trading_database_path(self):
         return parentdir + "/test_data/trading_log.json"
 
+    def get_price_cache_filepath(self):
+        return "/tmp/mock_price_cache.json"
+
+    def get_watchlist_filepath(self):
+        return "/tmp/mock_watchlist.json"
+
+    def get_alerts_filepath(self):
+        return "/tmp/mock_alerts.json"
+
+    def get_bar_store_filepath(self):
+        return "/tmp/mock_bars.db"
+
+    def get_corporate_actions_filepath(self):
+        return "/tmp/mock_corporate_actions.json"
+
     def get_alpha_vantage_api_key(self):
         return "MOCK"
 
@@ -31,3 +46,66 @@ class MockConfigurationManager():
 
     def get_log_filepath(self):
         return "/tmp/mock_log.txt"
+
+    def get_log_max_bytes(self):
+        return 0
+
+    def get_log_backup_count(self):
+        return 0
+
+    def get_log_level(self):
+        return "INFO"
+
+    def get_log_levels(self):
+        return {}
+
+    def get_log_format(self):
+        return "json"
+
+    def get_health_status_filepath(self):
+        return "/tmp/mock_status.json"
+
+    def get_health_period(self):
+        return 1
+
+    def get_health_stall_timeout(self):
+        return 10
+
+    def get_health_stale_timeout(self):
+        return 10
+
+    def get_health_max_backoff(self):
+        return 1
+
+    def get_instrumentation_enabled(self):
+        return False
+
+    def get_instrumentation_http_port(self):
+        return 0
+
+    def get_instrumentation_dump_filepath(self):
+        return "/tmp/mock_metrics.json"
+
+    def get_rebalance_fee(self):
+        return 6.0
+
+    def get_rebalance_stamp_duty(self):
+        return {"LSE": 0.5}
+
+    def get_import_columns(self):
+        return None
+
+    def get_import_date_format(self):
+        return "%d/%m/%Y"
+
+    def get_import_actions(self):
+        return None
+
+    def get_fx_ttl(self):
+        return 3600
+
+    def get_intraday_history_size(self):
+        return 10
+
+    def get_gains_method(self):
+        return "UK"
@@ -0,0 +1,90 @@
+import os
+import sys
+import inspect
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.AlertsEngine import AlertsEngine
+
+@pytest.fixture
+def engine():
+    mock_path = '/tmp/test_alerts.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    return AlertsEngine(mock_path)
+
+def test_above_below(engine):
+    above = engine.add_rule('LSE:MOCK1', 'ABOVE', 110)
+    below = engine.add_rule('LSE:MOCK1', 'BELOW', 90)
+    engine.add_rule('LSE:MOCK1', 'ABOVE', 120)
+    # Prices of other symbols or within the levels do not trigger
+    assert engine.on_prices({'LSE:MOCK2': 200, 'LSE:MOCK1': 100}) == []
+    alerts = engine.on_prices({'LSE:MOCK1': 115})
+    assert [a['rule']['id'] for a in alerts] == [above]
+    assert alerts[0]['price'] == 115
+    # Triggered rules are removed, the others are not touched
+    assert len(engine.get_rules('LSE:MOCK1')) == 2
+    assert engine.on_prices({'LSE:MOCK1': 115}) == []
+    alerts = engine.on_prices({'LSE:MOCK1': 90})
+    assert [a['rule']['id'] for a in alerts] == [below]
+    assert [r['value'] for r in engine.get_rules()] == [120]
+
+def test_move(engine):
+    rule_id = engine.add_rule('LSE:MOCK1', 'MOVE', 10, reference=100)
+    assert engine.on_prices({'LSE:MOCK1': 105}) == []
+    alerts = engine.on_prices({'LSE:MOCK1': 111})
+    assert len(alerts) == 1
+    # The rule is armed again around the new price
+    rule = engine.get_rules()[0]
+    assert rule['id'] == rule_id
+    assert rule['reference'] == 111
+    assert rule['above'] == pytest.approx(122.1)
+    assert rule['below'] == pytest.approx(99.9)
+    assert engine.on_prices({'LSE:MOCK1': 100}) == []
+    assert len(engine.on_prices({'LSE:MOCK1': 99})) == 1
+
+def test_stop_loss(engine):
+    engine.add_rule('LSE:MOCK1', 'STOP_LOSS', 20, reference=100)
+    assert engine.on_prices({'LSE:MOCK1': 200}) == []
+    assert engine.on_prices({'LSE:MOCK1': 81}) == []
+    alerts = engine.on_prices({'LSE:MOCK1': 75})
+    assert len(alerts) == 1
+    assert 'stop loss' in alerts[0]['message']
+    assert engine.get_rules() == []
+
+def test_invalid_rules(engine):
+    for args in [('LSE:MOCK1', 'XXX', 10, None),
+                 ('LSE:MOCK1', 'ABOVE', -1, None),
+                 ('LSE:MOCK1', 'MOVE', 10, None),
+                 ('LSE:MOCK1', 'STOP_LOSS', 100, 10),
+                 ('', 'BELOW', 10, None)]:
+        with pytest.raises(ValueError):
+            engine.add_rule(*args)
+    assert engine.get_rules() == []
+
+def test_remove_rule(engine):
+    rule_id = engine.add_rule('LSE:MOCK1', 'MOVE', 10, reference=100)
+    assert engine.remove_rule(rule_id)
+    assert not engine.remove_rule(rule_id)
+    assert engine.on_prices({'LSE:MOCK1': 200}) == []
+
+def test_dispatcher_and_persistence(engine):
+    notified = []
+    engine.notify = notified.append
+    engine.start()
+    engine.add_rule('LSE:MOCK1', 'ABOVE', 110)
+    engine.add_rule('LSE:MOCK2', 'MOVE', 5, reference=100)
+    engine.on_prices({'LSE:MOCK1': 110})
+    engine.stop()
+    assert [a['rule']['symbol'] for a in notified] == ['LSE:MOCK1']
+    # The rules left have been saved by the dispatcher
+    other = AlertsEngine(engine.filepath)
+    other.load()
+    rules = other.get_rules()
+    assert len(rules) == 1
+    assert rules[0]['symbol'] == 'LSE:MOCK2'
+    assert rules[0]['reference'] == 100
@@ -0,0 +1,71 @@
+import os
+import sys
+import inspect
+import json
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.BarStore import BarStore
+
+@pytest.fixture
+def store():
+    mock_path = '/tmp/test_bar_store.db'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    store = BarStore(mock_path)
+    yield store
+    store.close()
+
+@pytest.fixture
+def bars():
+    with open('test/test_data/mock_av_daily.json', 'r') as file:
+        return BarStore.parse_daily_series(json.load(file))
+
+def test_parse_daily_series(bars):
+    assert len(bars) == 100
+    assert bars[-1] == (datetime.date(2019, 2, 8), 104.39, 105.78, 104.2603, 105.67, 21453355.0)
+    assert all(a[0] < b[0] for a, b in zip(bars, bars[1:]))
+
+def test_append(store, bars):
+    assert store.get_last_date('MOCK') is None
+    assert store.get_output_size('MOCK') == 'full'
+    assert store.append('MOCK', bars[:60]) == 60
+    assert store.get_last_date('MOCK') == bars[59][0]
+    # Only the newer bars and the last stored one are stored
+    assert store.append('MOCK', bars[::-1]) == 41
+    assert store.append('MOCK', bars) == 1
+    assert store.get_bars('MOCK') == bars
+    assert store.get_symbols() == ['MOCK']
+    assert store.get_output_size('MOCK', today=datetime.date(2019, 3, 1)) == 'compact'
+    assert store.get_output_size('MOCK', today=datetime.date(2020, 3, 1)) == 'full'
+
+def test_get_bars_between(store, bars):
+    store.append('MOCK', bars)
+    store.append('MOCK2', bars[:10])
+    closes = store.get_closes('MOCK', datetime.date(2019, 2, 1), datetime.date(2019, 2, 7))
+    assert closes == [(b[0], b[4]) for b in bars if datetime.date(2019, 2, 1) <= b[0] <= datetime.date(2019, 2, 7)]
+    assert len(closes) == 5
+    assert store.get_bars('MOCK3') == []
+
+def test_persistence(store, bars):
+    store.append('MOCK', bars)
+    store.close()
+    other = BarStore(store.filepath)
+    assert other.get_last_date('MOCK') == datetime.date(2019, 2, 8)
+    assert len(other.get_bars('MOCK')) == 100
+    other.close()
+
+def test_replace_partial_bar(store, bars):
+    date = datetime.date(2019, 2, 11)
+    store.append('MOCK', bars)
+    # The bar of the current session is updated by the later fetches of the day
+    assert store.append('MOCK', bars + [(date, 1.0, 1.0, 1.0, 1.0, 100)]) == 2
+    assert store.append('MOCK', bars + [(date, 1.0, 2.0, 1.0, 1.8, 300)]) == 1
+    assert store.get_closes('MOCK', start=date) == [(date, 1.8)]
+    assert store.get_last_date('MOCK') == date
+    assert store.get_bars('MOCK')[:-1] == bars
@@ -0,0 +1,146 @@
+import os
+import sys
+import inspect
+import io
+import csv
+import json
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+import cli
+from Model.BarStore import BarStore
+from Utils.HealthMonitor import HealthMonitor
+from common.MockConfigurationManager import MockConfigurationManager
+
+@pytest.fixture
+def prices_file():
+    mock_path = '/tmp/test_cli_prices.json'
+    with open(mock_path, 'w') as f:
+        json.dump({'MOCK13': 200.0, 'MOCK4': 600.0}, f)
+    return mock_path
+
+def run(argv):
+    out = io.StringIO()
+    assert cli.main(argv, MockConfigurationManager(), out) == 0
+    return out.getvalue()
+
+def test_report_json(prices_file):
+    report = json.loads(run(['--prices', prices_file, '--format', 'json', 'report']))
+    assert report['prices'] == 'file'
+    assert report['summary']['cash_available'] == 2379.3144236000016
+    assert report['summary']['cash_deposited'] == 7700
+    assert report['summary']['holdings_value'] == 1192 * 2 + 438 * 6
+    assert [h['symbol'] for h in report['holdings']] == ['MOCK13', 'MOCK4']
+    assert report['holdings'][0]['open_price'] == 166.984
+    assert report['holdings'][0]['value'] == 1192 * 2
+
+def test_report_csv(prices_file):
+    output = run(['--prices', prices_file, '--format', 'csv', 'report'])
+    holdings = output.split('\n\n')[0]
+    rows = list(csv.DictReader(io.StringIO(holdings)))
+    assert [r['symbol'] for r in rows] == ['MOCK13', 'MOCK4']
+    assert float(rows[1]['quantity']) == 438
+
+def test_report_table(prices_file):
+    output = run(['--prices', prices_file, 'report'])
+    assert output.startswith('Holdings\n')
+    assert 'MOCK13' in output
+    assert 'Summary (file prices)' in output
+
+def test_report_missing_log(prices_file):
+    out = io.StringIO()
+    argv = ['--log', '/tmp/missing_trading_log.json', '--prices', prices_file, 'report']
+    assert cli.main(argv, MockConfigurationManager(), out) == 1
+
+def test_gains():
+    report = json.loads(run(['--format', 'json', 'gains', '--method', 'FIFO', '--disposals']))
+    assert report['method'] == 'FIFO'
+    assert sum(r['disposals'] for r in report['tax_years']) == 19
+    assert len(report['disposals']) == 19
+    output = run(['gains', '--tax-year', '2017/18'])
+    assert output.startswith('Realized gains (UK)\ntax_year')
+    assert '2017/18' in output and '2018/19' not in output
+
+def test_history():
+    store = BarStore(MockConfigurationManager().get_bar_store_filepath())
+    with open('test/test_data/mock_av_daily.json', 'r') as file:
+        store.append('LSE:MOCK', BarStore.parse_daily_series(json.load(file)))
+    store.close()
+    report = json.loads(run(['--format', 'json', 'history', 'LSE:MOCK', '--from', '04/02/2019']))
+    assert [b['date'] for b in report['bars']] == ['04/02/2019', '05/02/2019', '06/02/2019',
+                                                   '07/02/2019', '08/02/2019']
+    assert report['bars'][-1]['close'] == 105.67
+    out = io.StringIO()
+    assert cli.main(['history', 'LSE:MISSING'], MockConfigurationManager(), out) == 1
+
+def test_actions():
+    config = MockConfigurationManager()
+    if os.path.exists(config.get_corporate_actions_filepath()):
+        os.remove(config.get_corporate_actions_filepath())
+    store = BarStore(config.get_bar_store_filepath())
+    with open('test/test_data/mock_av_daily.json', 'r') as file:
+        store.append('LSE:MOCK', BarStore.parse_daily_series(json.load(file)))
+    store.close()
+    try:
+        report = json.loads(run(['--format', 'json', 'actions', '--add', '06/02/2019', 'SPLIT', 'LSE:MOCK', '2']))
+        assert report['actions'] == [{'position': 0, 'date': '06/02/2019', 'type': 'SPLIT',
+                                      'symbol': 'LSE:MOCK', 'ratio': 2.0, 'new_symbol': None}]
+        argv = ['actions', '--add', '06/02/2019', 'SPLIT', 'LSE:MOCK', '0.5']
+        assert cli.main(argv, config, io.StringIO()) == 1
+        argv = ['--format', 'json', 'history', 'LSE:MOCK', '--from', '04/02/2019']
+        raw = [b['close'] for b in json.loads(run(argv))['bars']]
+        adjusted = [b['close'] for b in json.loads(run(argv + ['--adjusted']))['bars']]
+        assert adjusted == [raw[0] / 2, raw[1] / 2] + raw[2:]
+    finally:
+        os.remove(config.get_corporate_actions_filepath())
+
+def test_status():
+    config = MockConfigurationManager()
+    if os.path.exists(config.get_health_status_filepath()):
+        os.remove(config.get_health_status_filepath())
+    assert cli.main(['status'], config, io.StringIO()) == 1
+    monitor = HealthMonitor(config.get_health_status_filepath())
+    monitor.add_probe('last_fetch_time', lambda: None)
+    monitor.add_probe('ui_queue', lambda: 2)
+    monitor.write_status()
+    out = run(['status'])
+    rows = dict(line.split() for line in out.splitlines()[2:8])
+    assert rows['status'] == 'ok'
+    assert rows['last_fetch'] == '-'
+    assert 'ui_queue             2' in out
+    report = json.loads(run(['--format', 'json', 'status']))
+    assert report['probes']['ui_queue'] == 2
+
+def test_risk(prices_file):
+    pytest.importorskip('numpy')
+    store = BarStore(MockConfigurationManager().get_bar_store_filepath())
+    start = datetime.date(2019, 1, 1)
+    for symbol in ['MOCK13', 'MOCK4']:
+        store.append(symbol, [(start + datetime.timedelta(days=i), c, c, c, c, 0)
+                              for i, c in enumerate([100, 98] * 20)])
+    store.close()
+    report = json.loads(run(['--prices', prices_file, '--format', 'json', 'risk',
+                             '--paths', '2000', '--seed', '1', '--workers', '1']))
+    assert report['symbols'] == ['MOCK13', 'MOCK4']
+    assert report['value'] == 1192 * 2 + 438 * 6
+    assert report['var'] == pytest.approx(report['value'] * 0.02, rel=0.01)
+    out = run(['--prices', prices_file, 'risk', '--paths', '100', '--workers', '1'])
+    assert out.startswith('Risk at 95% confidence over 1 days (file prices)')
+
+def test_rebalance(prices_file, tmp_path):
+    output = str(tmp_path / 'trades.json')
+    report = json.loads(run(['--prices', prices_file, '--format', 'json', 'rebalance',
+                             'MOCK13=0.6', 'MOCK4=0.1', '--fee', '0', '--output', output]))
+    assert report['violations'] == []
+    assert [(t['action'], t['symbol']) for t in report['trades']] == [('SELL', 'MOCK4'), ('BUY', 'MOCK13')]
+    assert [w['target'] for w in report['weights']] == [0.6, 0.1]
+    with open(output, 'r') as file:
+        lines = [json.loads(line) for line in file]
+    assert lines == [{k: v for k, v in t.items() if k != 'total'} for t in report['trades']]
+    out = io.StringIO()
+    assert cli.main(['--prices', prices_file, 'rebalance'], MockConfigurationManager(), out) == 1
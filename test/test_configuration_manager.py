@@ -0,0 +1,74 @@
+import os
+import sys
+import inspect
+import json
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.ConfigurationManager import ConfigurationManager
+from Utils.Utils import Utils
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(Utils, 'get_home_path', staticmethod(lambda: str(tmp_path)))
+    os.makedirs(str(tmp_path / '.TradingMate' / 'config'))
+    with open('config/config.json', 'r') as file:
+        data = json.load(file)
+    with open(str(tmp_path / '.TradingMate' / 'config' / 'config.json'), 'w') as file:
+        json.dump(data, file)
+    with open(str(tmp_path / '.TradingMate' / 'config' / '.credentials'), 'w') as file:
+        json.dump({'av_api_key': 'KEY1'}, file)
+    return ConfigurationManager()
+
+def test_diff():
+    old = {'a': {'b': 1, 'c': 2}, 'd': 3, 'e': None}
+    new = {'a': {'b': 1, 'c': 5, 'f': 0}, 'd': {'g': 1}}
+    assert ConfigurationManager.diff(old, new) == ['a/c', 'a/f', 'd', 'e']
+    assert ConfigurationManager.diff(old, old) == []
+
+def test_save_settings_notifies_changes(config, tmp_path):
+    notified = {}
+    config.subscribe('general/trading_log_path', lambda c: notified.setdefault('log', c))
+    config.subscribe(['alpha_vantage', 'credentials'], lambda c: notified.setdefault('prices', c))
+    edited = config.get_editable_config()
+    assert 'credentials' not in edited
+    # Settings are edited on a copy
+    edited['alpha_vantage']['polling_period_sec'] = 60
+    assert config.get_alpha_vantage_polling_period() == 30
+    assert config.save_settings(edited) == ['alpha_vantage/polling_period_sec']
+    assert notified == {'prices': ['alpha_vantage/polling_period_sec']}
+    assert config.get_alpha_vantage_polling_period() == 60
+    assert config.get_alpha_vantage_api_key() == 'KEY1'
+    # Saving the same settings notifies nobody
+    notified.clear()
+    assert config.save_settings(config.get_editable_config()) == []
+    assert notified == {}
+    # A new credentials file changes the api key
+    credentials = str(tmp_path / 'credentials.json')
+    with open(credentials, 'w') as file:
+        json.dump({'av_api_key': 'KEY2'}, file)
+    edited = config.get_editable_config()
+    edited['general']['credentials_filepath'] = credentials
+    config.save_settings(edited)
+    assert notified == {'prices': ['credentials/av_api_key']}
+    assert config.get_alpha_vantage_api_key() == 'KEY2'
+    # The credentials are not written in the config file
+    saved = Utils.load_json_file(config.config_filepath)
+    assert 'credentials' not in saved
+    assert saved['general']['credentials_filepath'] == credentials
+
+def test_failing_subscriber(config):
+    notified = []
+    def fail(changes):
+        raise ValueError('failed')
+    config.subscribe('alpha_vantage', fail)
+    config.subscribe('alpha_vantage', notified.append)
+    edited = config.get_editable_config()
+    edited['alpha_vantage']['polling_period_sec'] = 60
+    with pytest.raises(RuntimeError):
+        config.save_settings(edited)
+    assert notified == [['alpha_vantage/polling_period_sec']]
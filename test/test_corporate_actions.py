@@ -0,0 +1,181 @@
+import os
+import sys
+import inspect
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.CorporateActions import CorporateActions
+from Model.Portfolio import Portfolio
+from Model.PortfolioHistory import PortfolioHistory
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Model.TradeIndex import TradeIndex
+from Model.BarStore import BarStore
+from Utils.Trade import Trade
+
+def trade(date, action, quantity, symbol='', price=0):
+    return Trade.from_dict({'date': date, 'action': action, 'quantity': quantity,
+                            'symbol': symbol, 'price': price, 'fee': 0, 'stamp_duty': 0})
+
+@pytest.fixture
+def actions():
+    mock_path = '/tmp/test_corporate_actions.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    return CorporateActions(mock_path)
+
+@pytest.fixture
+def history():
+    return [trade('01/01/2019', 'DEPOSIT', 100000),
+            trade('02/01/2019', 'BUY', 100, 'LSE:A', 200),
+            trade('03/01/2019', 'BUY', 100, 'LSE:A', 400),
+            trade('10/01/2019', 'BUY', 500, 'LSE:A', 25)]
+
+def build_portfolio(actions, trades):
+    portfolio = Portfolio('test', None, OfflinePriceGetter({'LSE:A': 30.0, 'LSE:B': 30.0}))
+    portfolio.set_corporate_actions(actions)
+    portfolio.reload(trades)
+    return portfolio
+
+def test_persistence(actions):
+    actions.add(datetime.date(2019, 2, 1), 'SYMBOL_CHANGE', 'LSE:A', new_symbol='LSE:B')
+    actions.add(datetime.date(2019, 1, 5), 'SPLIT', 'LSE:A', 10)
+    actions.add(datetime.date(2019, 1, 5), 'CONSOLIDATION', 'LSE:C', 0.5)
+    for args in [('SPLIT', 'LSE:A', 0.5), ('CONSOLIDATION', 'LSE:A', 2), ('MERGER', 'LSE:A', 1)]:
+        with pytest.raises(ValueError):
+            actions.add(datetime.date(2019, 1, 1), *args)
+    with pytest.raises(ValueError):
+        actions.add(datetime.date(2019, 1, 1), 'SYMBOL_CHANGE', 'LSE:A', new_symbol='LSE:A')
+    other = CorporateActions(actions.filepath)
+    other.load()
+    assert [(a['type'], a['symbol']) for a in other.get_actions()] == [
+        ('SPLIT', 'LSE:A'), ('CONSOLIDATION', 'LSE:C'), ('SYMBOL_CHANGE', 'LSE:A')]
+    assert other.get_position(datetime.date(2019, 1, 4)) == 0
+    assert other.get_position(datetime.datetime(2019, 1, 5, 10)) == 2
+    assert other.get_factor('LSE:A', datetime.date(2019, 1, 1)) == (10, 'LSE:B')
+    assert other.get_factor('LSE:A', datetime.date(2019, 1, 5)) == (1, 'LSE:B')
+    assert other.get_former_symbols('LSE:B') == ['LSE:A']
+    assert other.remove(0)['type'] == 'SPLIT'
+    other.load()
+    assert len(other) == 2
+
+def test_split_open_price(actions, history):
+    # 10:1 split between the second and the third BUY
+    actions.add(datetime.date(2019, 1, 5), 'SPLIT', 'LSE:A', 10)
+    portfolio = build_portfolio(actions, history)
+    assert portfolio.get_holding_quantity('LSE:A') == 2500
+    # (100 * 200 + 100 * 400 + 500 * 25) / 2500
+    assert portfolio.get_holding_open_price('LSE:A') == 29
+    # Prices in pence
+    assert portfolio.get_cash_available() == 100000 - 200 - 400 - 125
+    # Streamed history and TradeIndex scans give the same result
+    streamed = Portfolio('test', None, OfflinePriceGetter({'LSE:A': 30.0}))
+    streamed.set_corporate_actions(actions)
+    streamed.reload_stream(iter(history))
+    assert streamed.get_holding_quantity('LSE:A') == 2500
+    assert streamed.get_holding_open_price('LSE:A') == 29
+    indexed = Portfolio('test', None, OfflinePriceGetter({'LSE:A': 30.0}))
+    indexed.set_corporate_actions(actions)
+    indexed.reload(history, TradeIndex(history))
+    assert indexed.get_holding_open_price('LSE:A') == 29
+    # The held quantity is covered by the last BUY and the split adjusted one before
+    history.append(trade('11/01/2019', 'SELL', 1500, 'LSE:A', 30))
+    portfolio.apply_trade(history[-1], history)
+    assert portfolio.get_holding_quantity('LSE:A') == 1000
+    assert portfolio.get_holding_open_price('LSE:A') == (500 * 25 + 1000 * 40) / 1500
+
+def test_actions_after_history(actions, history):
+    actions.add(datetime.date(2019, 2, 1), 'CONSOLIDATION', 'LSE:A', 1 / 3)
+    actions.add(datetime.date(2019, 3, 1), 'SYMBOL_CHANGE', 'LSE:A', new_symbol='LSE:B')
+    actions.add(datetime.date.today() + datetime.timedelta(days=10), 'SPLIT', 'LSE:B', 2)
+    portfolio = build_portfolio(actions, history)
+    # 700 shares become 233, the fraction is dropped, the future split is not applied
+    assert portfolio.get_holding_symbols() == ['LSE:B']
+    assert portfolio.get_holding_quantity('LSE:B') == 233
+    assert portfolio.get_holding_open_price('LSE:B') == pytest.approx(72500 / 700 * 3, abs=1e-3)
+    # The validator projects the quantities after the actions
+    violations = portfolio.validate_trades([trade('01/04/2019', 'SELL', 234, 'LSE:B', 30)])
+    assert len(violations) == 1
+    assert portfolio.validate_trades([trade('01/04/2019', 'SELL', 233, 'LSE:B', 30)]) == []
+
+def test_trade_before_applied_action(actions):
+    actions.add(datetime.date(2019, 1, 5), 'SPLIT', 'LSE:A', 10)
+    history = [trade('01/01/2019', 'DEPOSIT', 100000), trade('02/01/2019', 'BUY', 10, 'LSE:A', 200)]
+    portfolio = build_portfolio(actions, history)
+    assert portfolio.get_holding_quantity('LSE:A') == 100
+    # The split between the trade date and today is already applied
+    history.append(trade('03/01/2019', 'BUY', 5, 'LSE:A', 400))
+    portfolio.apply_trade(history[-1], history)
+    expected = build_portfolio(actions, history)
+    assert portfolio.get_holding_quantity('LSE:A') == expected.get_holding_quantity('LSE:A') == 150
+    assert portfolio.get_holding_open_price('LSE:A') == expected.get_holding_open_price('LSE:A')
+    assert portfolio.get_cash_available() == expected.get_cash_available()
+    streamed = Portfolio('test', None, OfflinePriceGetter({'LSE:A': 30.0}))
+    streamed.set_corporate_actions(actions)
+    streamed.reload_stream(iter(history))
+    assert streamed.get_holding_quantity('LSE:A') == 150
+    assert streamed.get_holding_open_price('LSE:A') == expected.get_holding_open_price('LSE:A')
+    assert portfolio.is_trade_valid(trade('10/01/2019', 'SELL', 150, 'LSE:A', 30))
+    # 15 shares sold before the split are the 150 held now
+    assert portfolio.validate_trades([trade('03/01/2019', 'SELL', 15, 'LSE:A', 400)]) == []
+    assert len(portfolio.validate_trades([trade('03/01/2019', 'SELL', 16, 'LSE:A', 400)])) == 1
+
+def test_open_price_trades_out_of_order(actions):
+    actions.add(datetime.date(2019, 1, 5), 'SYMBOL_CHANGE', 'LSE:A', new_symbol='LSE:B')
+    history = [trade('01/01/2019', 'DEPOSIT', 100000),
+               trade('02/01/2019', 'BUY', 100, 'LSE:A', 200),
+               trade('10/01/2019', 'BUY', 100, 'LSE:B', 400),
+               trade('11/01/2019', 'SELL', 100, 'LSE:B', 400),
+               # Inserted after the later trades
+               trade('01/01/2019', 'BUY', 100, 'LSE:A', 300)]
+    portfolio = build_portfolio(actions, history)
+    assert portfolio.get_holding_quantity('LSE:B') == 200
+    # The most recent buys by date are the ones of 10/01 and 02/01
+    assert portfolio.compute_avg_holding_open_price('LSE:B', history) == 300
+    assert portfolio.compute_avg_holding_open_price('LSE:B', history, TradeIndex(history)) == 300
+
+def test_history_change_replays_actions(actions, history):
+    actions.add(datetime.date(2019, 1, 5), 'SPLIT', 'LSE:A', 10)
+    portfolio = build_portfolio(actions, history)
+    portfolio.CHECKPOINT_INTERVAL = 2
+    portfolio.reload(history)
+    history[1] = trade('02/01/2019', 'BUY', 50, 'LSE:A', 200)
+    portfolio.apply_history_change(1, history, symbols=['LSE:A'])
+    expected = build_portfolio(actions, history)
+    assert portfolio.get_holding_quantity('LSE:A') == expected.get_holding_quantity('LSE:A') == 2000
+    assert portfolio.get_holding_open_price('LSE:A') == expected.get_holding_open_price('LSE:A')
+    assert portfolio.get_cash_available() == expected.get_cash_available()
+    # Selling the shares held before the split is valid only after it
+    suffix = [trade('04/01/2019', 'SELL', 1000, 'LSE:A', 40)]
+    assert len(portfolio.validate_history_change(3, history, suffix)) == 1
+    suffix = [trade('05/01/2019', 'SELL', 1000, 'LSE:A', 40)]
+    assert portfolio.validate_history_change(3, history, suffix) == []
+
+def test_adjusted_bars(actions, history):
+    mock_path = '/tmp/test_corporate_actions.db'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    store = BarStore(mock_path)
+    try:
+        start = datetime.date(2019, 1, 1)
+        store.append('LSE:A', [(start + datetime.timedelta(days=i), c, c, c, c, 10)
+                               for i, c in enumerate([200, 200, 400, 400, 40, 40, 40, 40, 30, 25])])
+        actions.add(datetime.date(2019, 1, 5), 'SPLIT', 'LSE:A', 10)
+        # The stored bars are not changed, the adjusted ones are read
+        assert [c for _, c in store.get_closes('LSE:A')][3:5] == [400, 40]
+        bars = store.get_bars('LSE:A', corporate_actions=actions)
+        assert [b[4] for b in bars][:5] == [20, 20, 40, 40, 40]
+        assert bars[0][5] == 100 and bars[4][5] == 10
+        # The value of the holdings does not jump at the split
+        portfolio_history = PortfolioHistory(store, actions)
+        portfolio_history.update(history)
+        dates, values = portfolio_history.get_holding_values('LSE:A')
+        assert dates[3:5] == [datetime.date(2019, 1, 4), datetime.date(2019, 1, 5)]
+        assert values[3:5] == [800, 800]
+        assert values[-1] == 2500 * 25 / 100
+    finally:
+        store.close()
@@ -2,6 +2,8 @@ import os
 import sys
 import inspect
 import pytest
+import datetime
+import json
 
 currentdir = os.path.dirname(os.path.abspath(
     inspect.getfile(inspect.currentframe())))
@@ -18,7 +20,11 @@ def configuration():
 
 @pytest.fixture
 def dbh(configuration):
-    return DatabaseHandler(configuration)
+    dbh = DatabaseHandler(configuration)
+    yield dbh
+    # Discard the changes recorded on the test database
+    if os.path.isfile(dbh.get_journal_filepath(configuration.get_trading_database_path())):
+        os.remove(dbh.get_journal_filepath(configuration.get_trading_database_path()))
 
 def test_read_data(dbh):
     """
@@ -84,3 +90,146 @@ def test_remove_last_trade(dbh):
     assert len(dbh.trading_history) == 1
     dbh.remove_last_trade()
     assert len(dbh.trading_history) == 0
+
+def test_get_trades_by_symbol(dbh):
+    """
+    Test the trades of a symbol are returned from the index
+    """
+    dbh.read_data()
+    trades = dbh.get_trades_by_symbol('MOCK1')
+    assert len(trades) > 0
+    assert list(trades) == [t for t in dbh.get_trades_list() if t.symbol == 'MOCK1']
+    item = {'date':'01/01/2019','action':'BUY','quantity':1,'symbol':'MOCK1','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    dbh.add_trade(Trade.from_dict(item))
+    assert len(dbh.get_trades_by_symbol('MOCK1')) == len(trades) + 1
+    dbh.remove_last_trade()
+    assert len(dbh.get_trades_by_symbol('MOCK1')) == len(trades)
+
+def test_get_trades_by_date(dbh):
+    """
+    Test the trades in a date range are returned sorted by date
+    """
+    dbh.read_data()
+    start = datetime.datetime(2018, 1, 1)
+    end = datetime.datetime(2018, 12, 31)
+    trades = dbh.get_trades_by_date(start, end)
+    assert list(trades) == [t for t in dbh.get_trades_list() if start <= t.date <= end]
+    trades = dbh.get_trades_by_symbol('MOCK1', start, end)
+    assert all(t.symbol == 'MOCK1' and start <= t.date <= end for t in trades)
+
+def test_add_trades(dbh):
+    """
+    Test it adds and writes a batch of trades
+    """
+    mock_path = '/tmp/test_add_trades.json'
+    assert dbh.write_data(mock_path)
+    dbh.read_data(mock_path)
+    item = {'date':'01/01/2019','action':'BUY','quantity':1,'symbol':'MOCK','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    dbh.add_trades([Trade.from_dict(item), Trade.from_dict(item)])
+    assert len(dbh.trading_history) == 2
+    dbh.read_data(mock_path)
+    assert len(dbh.trading_history) == 2
+
+    # The batch is discarded if the database can't be written
+    dbh.db_filepath = '/tmp/not_existing_dir/test.json'
+    with pytest.raises(RuntimeError):
+        dbh.add_trades([Trade.from_dict(item)])
+    assert len(dbh.trading_history) == 2
+
+def test_read_data_chunks(dbh):
+    """
+    Test the trades are notified in chunks while parsed
+    """
+    chunks = []
+    dbh.READ_CHUNK_SIZE = 10
+    dbh.read_data(on_trades=lambda trades: chunks.append(list(trades)))
+    assert [len(c) for c in chunks] == [10, 10, 10, 10, 10, 6]
+    assert [t for c in chunks for t in c] == dbh.get_trades_list()
+
+def test_iter_trades(dbh):
+    """
+    Test the trades are yielded without being stored
+    """
+    trades = list(dbh.iter_trades())
+    assert len(trades) == 56
+    assert len(dbh.get_trades_list()) == 0
+
+def test_read_data_invalid(dbh):
+    """
+    Test an error is raised if the file can't be read and the history is
+    empty only if the file does not exist
+    """
+    mock_path = '/tmp/test_invalid.json'
+    with open(mock_path, 'w') as f:
+        f.write('{"trades": [{"date": "01/01/2019", "action": "DEPOSIT"')
+    with pytest.raises(ValueError):
+        dbh.read_data(mock_path)
+    assert len(dbh.get_trades_list()) == 0
+    item = {'action': 'DEPOSIT', 'quantity': 1, 'symbol': '', 'price': 0, 'fee': 0, 'stamp_duty': 0}
+    with open(mock_path, 'w') as f:
+        json.dump({'trades': [dict(item, date='01/02/2018'), dict(item, date='28/02/2018'),
+                              dict(item, date='31/02/2018')]}, f)
+    with pytest.raises(ValueError):
+        dbh.read_data(mock_path)
+    assert len(dbh.get_trades_list()) == 0
+    assert len(dbh.get_trade_index()) == 0
+    dbh.read_data('/tmp/not_existing_file.json')
+    assert len(dbh.get_trades_list()) == 0
+
+def test_edit_trades(dbh):
+    """
+    Test trades are edited, inserted and deleted at any position
+    """
+    mock_path = '/tmp/test_edit_trades.json'
+    dbh.read_data()
+    assert dbh.write_data(mock_path)
+    dbh.read_data(mock_path)
+    trades = list(dbh.get_trades_list())
+    item = {'date':'01/01/2018','action':'BUY','quantity':1,'symbol':'MOCK1','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    new_trade = Trade.from_dict(item)
+    old_trade = dbh.update_trade(5, new_trade)
+    assert old_trade is trades[5]
+    dbh.insert_trade(10, Trade.from_dict(dict(item, symbol='MOCK99')))
+    assert dbh.delete_trade(0) is trades[0]
+    expected = trades[1:5] + [new_trade] + trades[6:10] + [dbh.get_trades_list()[9]] + trades[10:]
+    assert dbh.get_trades_list() == expected
+    assert dbh.get_trades_list()[9].symbol == 'MOCK99'
+    # The index follows the changes
+    assert list(dbh.get_trades_by_symbol('MOCK99')) == [expected[9]]
+    assert list(dbh.get_trades_by_symbol('MOCK1')) == [t for t in expected if t.symbol == 'MOCK1']
+    with pytest.raises(RuntimeError):
+        dbh.delete_trade(len(expected))
+
+    # Only the changes are written in the journal
+    with open(dbh.get_journal_filepath(), 'r') as f:
+        assert len(f.readlines()) == 3
+    dbh.read_data(mock_path)
+    assert [t.to_dict() for t in dbh.get_trades_list()] == [t.to_dict() for t in expected]
+    assert [t.to_dict() for t in dbh.iter_trades()] == [t.to_dict() for t in expected]
+
+    # Writing the database merges the journal
+    assert dbh.write_data()
+    assert not os.path.isfile(dbh.get_journal_filepath())
+    dbh.read_data(mock_path)
+    assert [t.to_dict() for t in dbh.get_trades_list()] == [t.to_dict() for t in expected]
+
+def test_journal_compaction(dbh):
+    """
+    Test the database is rewritten when the journal is too long and a
+    truncated journal record is discarded
+    """
+    mock_path = '/tmp/test_journal.json'
+    assert dbh.write_data(mock_path)
+    dbh.read_data(mock_path)
+    dbh.JOURNAL_COMPACT_SIZE = 3
+    item = {'date':'01/01/2019','action':'DEPOSIT','quantity':1,'symbol':'','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    dbh.add_trade(Trade.from_dict(item))
+    dbh.add_trade(Trade.from_dict(item))
+    assert os.path.isfile(dbh.get_journal_filepath())
+    dbh.add_trade(Trade.from_dict(item))
+    assert not os.path.isfile(dbh.get_journal_filepath())
+    dbh.add_trade(Trade.from_dict(item))
+    with open(dbh.get_journal_filepath(), 'a') as f:
+        f.write('{"op": "insert", "index": 4, "tr')
+    dbh.read_data(mock_path)
+    assert len(dbh.get_trades_list()) == 4
@@ -0,0 +1,28 @@
+import os
+import sys
+import inspect
+import math
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.Downsampling import lttb
+
+def test_lttb_small_series():
+    assert lttb([0, 1, 2], [1, 2, 3], 10) == [0, 1, 2]
+    assert lttb([0, 1, 2, 3], [1, 2, 3, 4], 2) == [0, 1, 2, 3]
+
+@pytest.mark.parametrize('threshold', [3, 10, 100])
+def test_lttb(threshold):
+    x = list(range(1000))
+    y = [math.sin(i / 50) for i in x]
+    y[500] = 10
+    indices = lttb(x, y, threshold)
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == 999
+    assert indices == sorted(set(indices))
+    # Peaks are preserved
+    assert 500 in indices
@@ -0,0 +1,38 @@
+import os
+import sys
+import inspect
+import time
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.FxRates import FxRates
+
+@pytest.fixture
+def rates():
+    return FxRates(60)
+
+def test_get_rate(rates):
+    assert rates.get_rate('GBP') == 1.0
+    assert rates.get_rate('USD') is None
+    rates.set_rate('USD', 0.8)
+    assert rates.get_rate('USD') == 0.8
+    assert rates.get_rates() == {'GBP': 1.0, 'USD': 0.8}
+
+def test_get_expired(rates):
+    assert rates.get_expired(['GBP', 'USD', 'EUR', 'USD']) == ['EUR', 'USD']
+    rates.set_rate('USD', 0.8)
+    rates.set_rate('EUR', 0.9, time.time() - 60)
+    assert rates.get_expired(['GBP', 'USD', 'EUR']) == ['EUR']
+    # Expired rates are still available
+    assert rates.get_rate('EUR') == 0.9
+
+def test_cache_entries(rates):
+    rates.load_cache_entries({'MOCK': {'price': 1.0, 'timestamp': 0},
+                              'FX:USD': {'price': 0.8, 'timestamp': time.time()}})
+    assert rates.get_rates() == {'GBP': 1.0, 'USD': 0.8}
+    assert rates.get_expired(['USD']) == []
+    assert rates.to_cache_prices(['USD', 'EUR']) == {'FX:USD': 0.8}
@@ -0,0 +1,76 @@
+import os
+import sys
+import inspect
+import threading
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.TaskThread import TaskThread
+from Utils.HealthMonitor import HealthMonitor
+
+class BlockingTask(TaskThread):
+    """
+    Task blocking until released, as a request without timeout
+    """
+    def __init__(self):
+        TaskThread.__init__(self)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def task(self):
+        self.started.set()
+        self.release.wait()
+
+class FailingTask(TaskThread):
+    def task(self):
+        raise ValueError('boom')
+
+@pytest.fixture
+def monitor(tmp_path):
+    return HealthMonitor(str(tmp_path / 'status.json'), period=1, stall_timeout=0.05)
+
+def test_stalled_thread(monitor):
+    task = BlockingTask()
+    monitor.watch('task', task)
+    monitor.add_probe('queue', lambda: 3)
+    # Threads not started yet are not dead
+    assert monitor.get_status()['status'] == HealthMonitor.OK
+    task.start()
+    assert task.started.wait(5)
+    assert task.is_busy()
+    task.beat()
+    assert monitor.get_status()['status'] == HealthMonitor.OK
+    threading.Event().wait(0.1)
+    status = monitor.write_status()
+    assert status['status'] == HealthMonitor.STALLED
+    assert status['threads']['task']['stalled']
+    assert status['probes'] == {'queue': 3}
+    assert HealthMonitor.read_status(monitor.filepath) == status
+    task.shutdown()
+    task.release.set()
+    task.join()
+    assert not task.is_busy()
+
+def test_dead_thread(monitor):
+    task = FailingTask()
+    monitor.watch('task', task)
+    monitor.add_probe('broken', lambda: 1 / 0)
+    task.start()
+    task.join()
+    status = monitor.get_status()
+    assert status['status'] == HealthMonitor.DEAD
+    assert status['probes'] == {'broken': None}
+
+def test_stop(monitor):
+    monitor.start()
+    monitor.stop()
+    status = HealthMonitor.read_status(monitor.filepath)
+    assert status['status'] == HealthMonitor.STOPPED
+    assert status['pid'] == os.getpid()
+    assert status['memory_rss'] > 0
+    with pytest.raises(RuntimeError):
+        HealthMonitor.read_status(monitor.filepath + '.missing')
@@ -103,3 +103,8 @@ def test_set_last_price_invalid():
     assert h.get_last_price_valid()
     h.set_last_price_invalid()
     assert h.get_last_price_valid() == False
+
+def test_slots():
+    h = Holding('mock', 1, 100)
+    with pytest.raises(AttributeError):
+        h.mock = 1
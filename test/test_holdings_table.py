@@ -0,0 +1,142 @@
+import os
+import sys
+import inspect
+import threading
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.HoldingsTable import HoldingsTable
+
+@pytest.fixture
+def table():
+    t = HoldingsTable()
+    t.insert('MOCK2', 10, 200)
+    t.insert('MOCK3', 30)
+    t.insert('MOCK1', 20, 100)
+    return t
+
+def test_insert(table):
+    assert len(table) == 3
+    assert 'MOCK1' in table
+    assert 'MOCK' not in table
+    assert table.keys() == ['MOCK1', 'MOCK2', 'MOCK3']
+    assert [h.get_symbol() for h in table.values()] == ['MOCK1', 'MOCK2', 'MOCK3']
+    h = table['MOCK3']
+    assert h.get_quantity() == 30
+    assert h.get_open_price() is None
+    assert h.get_last_price() is None
+    with pytest.raises(ValueError):
+        table.insert('MOCK1', 1)
+
+def test_remove(table):
+    view = table['MOCK3']
+    del table['MOCK1']
+    assert len(table) == 2
+    assert 'MOCK1' not in table
+    assert table.keys() == ['MOCK2', 'MOCK3']
+    # Views are still valid after the rows are moved
+    assert view.get_quantity() == 30
+    view.add_quantity(5)
+    assert table['MOCK3'].get_quantity() == 35
+    with pytest.raises(KeyError):
+        table.remove('MOCK1')
+    table.clear()
+    assert len(table) == 0
+    assert table.keys() == []
+
+def test_get_total_value(table):
+    assert table.get_total_value() is None
+    table['MOCK1'].set_last_price(100)
+    table['MOCK2'].set_last_price(50)
+    assert table.get_total_value() is None
+    table['MOCK3'].set_last_price(10)
+    assert table.get_total_value() == 20 + 5 + 3
+    del table['MOCK3']
+    assert table.get_total_value() == 20 + 5
+
+def test_get_total_cost(table):
+    assert table.get_total_cost() is None
+    table['MOCK3'].set_open_price(10)
+    assert table.get_total_cost() == 20 + 20 + 3
+
+def test_get_valuations(table):
+    table['MOCK1'].set_last_price(200)
+    valuations = table.get_valuations()
+    assert valuations['MOCK1'] == (40, 20)
+    assert valuations['MOCK2'] == (None, 20)
+    assert valuations['MOCK3'] == (None, None)
+
+def test_set_last_prices(table):
+    updated = table.set_last_prices({'MOCK1': 100, 'MOCK3': 10, 'MOCK': 1})
+    assert sorted(updated) == ['MOCK1', 'MOCK3']
+    assert table['MOCK1'].get_last_price() == 100
+    assert table['MOCK1'].get_last_price_valid()
+    assert table.get_total_value() is None
+    table.set_last_prices({'MOCK2': 50})
+    assert table.get_total_value() == 20 + 5 + 3
+    with pytest.raises(ValueError):
+        table.set_last_prices({'MOCK2': -1})
+
+def test_fx_rates(table):
+    table.set_last_prices({'MOCK1': 200, 'MOCK2': 50, 'MOCK3': 10})
+    table.insert('NYSE:MOCK', 10, 2)
+    table.set_last_price('NYSE:MOCK', 3)
+    assert table.get_currency('NYSE:MOCK') == 'USD'
+    assert table.get_currency('MOCK1') == 'GBP'
+    # The value of the USD holding is not available without the rate
+    assert table.get_total_value() is None
+    assert table['NYSE:MOCK'].get_value() is None
+    assert table.get_valuations()['NYSE:MOCK'] == (None, None)
+    assert table.set_fx_rates({'USD': 0.5}) == ['NYSE:MOCK']
+    assert table.set_fx_rates({'USD': 0.5}) == []
+    assert table['NYSE:MOCK'].get_value() == 15
+    assert table['NYSE:MOCK'].get_cost() == 10
+    assert table.get_valuation('NYSE:MOCK') == (15, 10)
+    assert table.get_total_value() == 40 + 5 + 3 + 15
+    # Rates are kept when the table is cleared
+    table.clear()
+    table.insert('NYSE:MOCK', 10, 2)
+    assert table.get_divisor('NYSE:MOCK') == 2
+
+def test_quantities(table):
+    # Whole shares are returned as int, fractions of share are kept
+    assert isinstance(table.get_quantity('MOCK1'), int)
+    table['MOCK1'].add_quantity(5)
+    assert table.get_quantity('MOCK1') == 25
+    assert isinstance(table.get_quantity('MOCK1'), int)
+    table.insert('LSE:A', 10.5)
+    assert table.get_quantity('LSE:A') == 10.5
+    table['LSE:A'].add_quantity(0.5)
+    assert table.get_quantity('LSE:A') == 11
+    table.insert('LSE:B', 0.5, 100)
+    assert table.get_valuation('LSE:B') == (None, 0.5)
+
+def test_concurrent_updates(table):
+    # Rows moved by the removals must not receive the prices of other symbols
+    prices = {'MOCK{}'.format(i): i for i in range(1, 51)}
+    stop = threading.Event()
+
+    def update():
+        while not stop.is_set():
+            table.set_last_prices(prices)
+            table.set_fx_rates({'USD': 1.0})
+
+    thread = threading.Thread(target=update)
+    thread.start()
+    try:
+        for _ in range(20):
+            for symbol in prices:
+                if symbol in table:
+                    table.remove(symbol)
+                else:
+                    table.insert(symbol, 1)
+    finally:
+        stop.set()
+        thread.join()
+    assert all(table.get_last_price(s) in (None, prices[s]) for s in table.keys())
+    table.set_last_prices(prices)
+    assert table.get_total_value() == sum(prices[s] for s in table.keys()) / 100
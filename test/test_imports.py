@@ -0,0 +1,30 @@
+import os
+import sys
+import inspect
+import subprocess
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+def loaded_modules(module):
+    script = ('import sys; sys.path.insert(0, {!r}); import {}; '
+              'print(" ".join(sys.modules))').format('{}/src'.format(parentdir), module)
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    return output.split()
+
+@pytest.mark.parametrize('module', [
+    'Model.Portfolio',
+    'Model.DatabaseHandler',
+    'Model.StockPriceGetter',
+    'Model.PortfolioLoader',
+    'TradingMate'
+])
+def test_headless_imports(module):
+    modules = loaded_modules(module)
+    assert module in modules
+    assert 'tkinter' not in modules
+    assert 'requests' not in modules
+    assert 'numpy' not in modules
@@ -0,0 +1,97 @@
+import os
+import sys
+import inspect
+import pytest
+import json
+import urllib.request
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.Instrumentation import Instrumentation, Histogram
+
+@pytest.fixture
+def registry():
+    r = Instrumentation()
+    r.enable(True)
+    return r
+
+def test_histogram():
+    h = Histogram(buckets=(1, 10))
+    h.observe(0.5)
+    h.observe(5)
+    h.observe(50)
+    data = h.to_dict()
+    assert data['count'] == 3
+    assert data['sum'] == 55.5
+    assert data['min'] == 0.5
+    assert data['max'] == 50
+    assert data['buckets'] == {'1': 1, '10': 2, '+Inf': 3}
+
+def test_disabled(registry):
+    registry.enable(False)
+    @registry.timed('mock')
+    def func(value):
+        return value * 2
+    assert func(2) == 4
+    registry.increment('mock_counter')
+    snapshot = registry.get_snapshot()
+    assert len(snapshot['counters']) == 0
+    assert len(snapshot['timers']) == 0
+
+def test_timed(registry):
+    @registry.timed('mock')
+    def func(value):
+        return value * 2
+    assert func(2) == 4
+    assert func(3) == 6
+    snapshot = registry.get_snapshot()
+    assert snapshot['timers']['mock']['count'] == 2
+
+    @registry.timed('mock_error')
+    def fail():
+        raise ValueError()
+    with pytest.raises(ValueError):
+        fail()
+    assert registry.get_snapshot()['timers']['mock_error']['count'] == 1
+
+def test_increment(registry):
+    registry.increment('mock')
+    registry.increment('mock', 4)
+    assert registry.get_snapshot()['counters']['mock'] == 5
+    registry.reset()
+    assert len(registry.get_snapshot()['counters']) == 0
+
+def test_dump(registry):
+    mock_path = '/tmp/test_metrics.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    registry.increment('mock')
+    assert registry.dump(mock_path)
+    with open(mock_path, 'r') as f:
+        data = json.load(f)
+    assert data['counters']['mock'] == 1
+
+def test_to_prometheus(registry):
+    registry.increment('mock')
+    registry.observe('mock_time', 0.002)
+    text = registry.to_prometheus()
+    assert 'tradingmate_mock_total 1' in text
+    assert 'tradingmate_mock_time_seconds_bucket{le="0.005"} 1' in text
+    assert 'tradingmate_mock_time_seconds_count 1' in text
+
+def test_http_server(registry):
+    registry.increment('mock')
+    registry.start_http_server(0)
+    try:
+        port = registry.get_http_port()
+        url = 'http://127.0.0.1:{}'.format(port)
+        text = urllib.request.urlopen(url + '/metrics').read().decode('utf-8')
+        assert 'tradingmate_mock_total 1' in text
+        data = json.loads(urllib.request.urlopen(url + '/metrics.json').read().decode('utf-8'))
+        assert data['counters']['mock'] == 1
+    finally:
+        registry.stop_http_server()
+    assert registry.get_http_port() is None
@@ -0,0 +1,76 @@
+import os
+import sys
+import inspect
+import json
+import logging
+import time
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.LogPipeline import LogPipeline, JsonFormatter
+
+@pytest.fixture
+def pipeline():
+    pipeline = LogPipeline()
+    root = logging.getLogger()
+    level = root.level
+    yield pipeline
+    pipeline.stop()
+    root.setLevel(level)
+
+def read_records(filepath):
+    with open(filepath, 'r') as file:
+        return [json.loads(line) for line in file]
+
+def test_json_records(pipeline, tmp_path):
+    filepath = str(tmp_path / 'log' / 'test.log')
+    pipeline.configure(filepath)
+    assert pipeline.get_filepath() == filepath
+    logging.getLogger('Model.Test').info('value %s of %s', 1, 'A')
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        logging.getLogger('Model.Test').exception('failed')
+    pipeline.stop()
+    records = read_records(filepath)
+    assert len(records) == 2
+    assert records[0]['level'] == 'INFO'
+    assert records[0]['logger'] == 'Model.Test'
+    assert records[0]['message'] == 'value 1 of A'
+    assert 'exception' not in records[0]
+    assert 'ValueError: boom' in records[1]['exception']
+
+def test_subsystem_levels(pipeline, tmp_path):
+    filepath = str(tmp_path / 'test.log')
+    pipeline.configure(filepath, level='WARNING', levels={'Model.Debug': 'DEBUG'})
+    logging.getLogger('Model.Debug').debug('shown')
+    logging.getLogger('Model.Other').info('hidden')
+    # Levels not configured anymore are inherited from the root logger
+    pipeline.configure(filepath, level='WARNING', json_format=False)
+    logging.getLogger('Model.Debug').debug('hidden')
+    logging.getLogger('Model.Debug').warning('shown as text')
+    pipeline.stop()
+    with open(filepath, 'r') as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])['message'] == 'shown'
+    assert lines[1].endswith('WARNING Model.Debug: shown as text')
+
+def test_rotation(pipeline, tmp_path):
+    filepath = str(tmp_path / 'test.log')
+    pipeline.configure(filepath, max_bytes=1000, backup_count=2)
+    for i in range(100):
+        logging.getLogger('Model.Test').info('record %s', i)
+    pipeline.stop()
+    assert sorted(os.listdir(str(tmp_path))) == ['test.log', 'test.log.1', 'test.log.2']
+    assert read_records(filepath)[-1]['message'] == 'record 99'
+
+def test_json_time():
+    record = logging.LogRecord('Model.Test', logging.INFO, __file__, 1, 'message', None, None)
+    record.created = time.mktime((2019, 1, 2, 3, 4, 5, 0, 0, -1)) + 0.0078
+    record.msecs = 7.8
+    assert json.loads(JsonFormatter().format(record))['time'] == '2019-01-02T03:04:05.007'
@@ -13,8 +13,10 @@ sys.path.insert(0, '{}/src'.format(parentdir))
 
 from Model.Portfolio import Portfolio
 from common.MockConfigurationManager import MockConfigurationManager
-from Utils.Utils import Callbacks
+from Utils.Utils import Callbacks, Messages
 from Utils.Trade import Trade
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Model.AlertsEngine import AlertsEngine
 
 def mock_callback():
     pass
@@ -150,6 +152,15 @@ def test_reload(portfolio, trades):
     assert portfolio.get_holding_quantity('MOCK13') == 1192
     assert portfolio.get_holding_quantity('MOCK4') == 438
 
+def test_reload_stream(portfolio, trades):
+    portfolio.reload_stream(iter(trades))
+    assert portfolio.get_cash_available() == 2379.3144236000016
+    assert portfolio.get_cash_deposited() == 7700
+    assert portfolio.get_holding_symbols() == ['MOCK13', 'MOCK4']
+    assert portfolio.get_holding_quantity('MOCK13') == 1192
+    assert portfolio.get_holding_open_price('MOCK13') == 166.984
+    assert portfolio.get_holding_open_price('MOCK4') == 582.9117
+
 def test_compute_avg_holding_open_price(portfolio, trades):
     portfolio.start(trades)
     price = portfolio.compute_avg_holding_open_price('MOCK13', trades)
@@ -190,3 +201,200 @@ def test_is_trade_valid(portfolio, trades):
     item = {'date':'01/01/0001','action':'WITHDRAW','quantity':20000,'symbol':'MOCK13','price':1.0,'fee':1.0,'stamp_duty':1.0}
     with pytest.raises(RuntimeError):
         assert not portfolio.is_trade_valid(Trade.from_dict(item))
+
+def test_apply_trade(portfolio, trades):
+    # Applying the trades one by one must lead to the same state of a reload
+    portfolio.reload([])
+    history = []
+    for trade in trades:
+        history.append(trade)
+        portfolio.apply_trade(trade, history)
+    assert portfolio.get_cash_available() == 2379.3144236000016
+    assert portfolio.get_cash_deposited() == 7700
+    assert portfolio.get_holding_symbols() == ['MOCK13', 'MOCK4']
+    assert portfolio.get_holding_quantity('MOCK13') == 1192
+    assert portfolio.get_holding_open_price('MOCK13') == 166.984
+    assert portfolio.get_holding_open_price('MOCK4') == 582.9117
+
+    # Invalid sell
+    item = {'date':'01/01/0001','action':'SELL','quantity':1,'symbol':'MOCK','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    with pytest.raises(RuntimeError):
+        portfolio.apply_trade(Trade.from_dict(item), history)
+
+def test_aggregates(portfolio, trades):
+    portfolio.reload(trades)
+    assert portfolio.get_holdings_value() is None
+    assert portfolio.get_total_value() is None
+    assert portfolio.get_open_positions_pl() is None
+    assert portfolio.get_open_positions_pl_perc() is None
+
+    portfolio.price_getter.lastData = {'MOCK13': 200.0, 'MOCK4': 600.0}
+    portfolio.on_new_price_data()
+    value = 1192 * 2.0 + 438 * 6.0
+    cost = 1192 * 1.66984 + 438 * 5.829117
+    assert portfolio.get_holdings_value() == pytest.approx(value)
+    assert portfolio.get_total_value() == pytest.approx(value + 2379.3144236000016)
+    assert portfolio.get_portfolio_pl() == pytest.approx(value + 2379.3144236000016 - 7700)
+    assert portfolio.get_open_positions_pl() == pytest.approx(value - cost)
+    assert portfolio.get_open_positions_pl_perc() == pytest.approx(((value - cost) / cost) * 100)
+
+    # Only the updated symbol changes the aggregates
+    portfolio.price_getter.lastData = {'MOCK13': 100.0}
+    portfolio.on_new_price_data()
+    value = 1192 * 1.0 + 438 * 6.0
+    assert portfolio.get_holdings_value() == pytest.approx(value)
+
+    # A trade updates the aggregates of its symbol
+    item = {'date':'01/01/0001','action':'SELL','quantity':438,'symbol':'MOCK4','price':1.0,'fee':1.0,'stamp_duty':1.0}
+    trade = Trade.from_dict(item)
+    trades.append(trade)
+    portfolio.apply_trade(trade, trades)
+    assert portfolio.get_holdings_value() == pytest.approx(1192 * 1.0)
+    assert portfolio.get_open_positions_pl() == pytest.approx(1192 * 1.0 - 1192 * 1.66984)
+
+def test_validate_trades(portfolio, trades):
+    portfolio.reload(trades)
+    items = [
+        # Sell more than held
+        {'date':'01/01/0001','action':'SELL','quantity':2000,'symbol':'MOCK13','price':100.0,'fee':1.0,'stamp_duty':0.0},
+        # Valid sell, projected holdings decrease
+        {'date':'01/01/0001','action':'SELL','quantity':1000,'symbol':'MOCK13','price':100.0,'fee':1.0,'stamp_duty':0.0},
+        # Only 192 shares left
+        {'date':'01/01/0001','action':'SELL','quantity':193,'symbol':'MOCK13','price':100.0,'fee':1.0,'stamp_duty':0.0},
+        # Buy funded by the previous sell
+        {'date':'01/01/0001','action':'BUY','quantity':3000,'symbol':'MOCK','price':100.0,'fee':1.0,'stamp_duty':0.0},
+        # Sell of the projected new holding
+        {'date':'01/01/0001','action':'SELL','quantity':3000,'symbol':'MOCK','price':100.0,'fee':1.0,'stamp_duty':0.0},
+        # Withdraw more than available
+        {'date':'01/01/0001','action':'WITHDRAW','quantity':100000,'symbol':'','price':0.0,'fee':0.0,'stamp_duty':0.0},
+    ]
+    batch = [Trade.from_dict(i) for i in items]
+    violations = portfolio.validate_trades(batch)
+    assert [v['index'] for v in violations] == [0, 2, 5]
+    assert violations[0]['message'] == 'ERROR: Insufficient holdings available'
+    assert violations[2]['message'] == 'ERROR: Insufficient funding available'
+    assert violations[1]['trade'] is batch[2]
+    # The portfolio is not modified
+    assert portfolio.get_holding_quantity('MOCK13') == 1192
+    assert portfolio.get_cash_available() == 2379.3144236000016
+
+    validator = portfolio.get_trade_validator()
+    assert validator.validate(batch[1:2]) == []
+    assert validator.get_projected_quantity('MOCK13') == 192
+    assert validator.get_projected_cash() == pytest.approx(2379.3144236000016 + 999)
+
+def test_load_cached_prices(portfolio, trades):
+    portfolio.price_getter.price_cache.update({'MOCK13': 200.0, 'MOCK4': 600.0, 'MOCK': 1.0})
+    portfolio.reload(trades)
+    portfolio.load_cached_prices()
+    assert portfolio.get_holding_last_price('MOCK13') == 200.0
+    assert not portfolio.get_holding_list()[0].get_last_price_valid()
+    assert portfolio.get_holdings_value() == pytest.approx(1192 * 2.0 + 438 * 6.0)
+
+def test_fx_rates(trades):
+    items = [
+        {'date':'01/01/2019','action':'DEPOSIT','quantity':1000,'symbol':'','price':0.0,'fee':0.0,'stamp_duty':0.0},
+        {'date':'02/01/2019','action':'BUY','quantity':10,'symbol':'NYSE:MOCK','price':100.0,'fee':1.0,'stamp_duty':0.0,'fx_rate':0.8},
+    ]
+    usd_trades = [Trade.from_dict(i) for i in items]
+    portfolio = Portfolio('mock', None, OfflinePriceGetter({'NYSE:MOCK': 110.0}, {'USD': 0.5}))
+    portfolio.set_callback(Callbacks.UPDATE_LIVE_PRICES, mock_callback)
+    portfolio.reload(usd_trades)
+    # Cash is converted at the rate of the trade
+    assert portfolio.get_cash_available() == 1000 - 800 - 1
+    # Holdings are converted at the current rate
+    assert portfolio.get_holdings_value() == 550
+    assert portfolio.get_open_positions_pl() == 50
+    portfolio.price_getter.fxRates = {'USD': 1.0}
+    portfolio.on_new_price_data()
+    assert portfolio.get_holdings_value() == 1100
+    assert portfolio.get_fx_rate('USD') == 1.0
+    assert usd_trades[1].to_dict()['fx_rate'] == 0.8
+    assert 'fx_rate' not in trades[0].to_dict()
+
+def test_fetch_fx_rate(portfolio, requests_mock):
+    URL = 'https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency=USD&to_currency=GBP&apikey=MOCK'
+    requests_mock.get(URL, status_code=200, json={'Realtime Currency Exchange Rate': {'5. Exchange Rate': '0.7800'}})
+    assert portfolio.price_getter._fetch_fx_rate('USD') == 0.78
+    requests_mock.get(URL, status_code=500)
+    assert portfolio.price_getter._fetch_fx_rate('USD') is None
+
+def portfolio_state(portfolio):
+    return (portfolio.get_cash_available(), portfolio.get_cash_deposited(),
+            [(h.get_symbol(), h.get_quantity(), h.get_open_price()) for h in portfolio.get_holding_list()],
+            portfolio.get_holdings_value(), portfolio.get_open_positions_pl())
+
+def test_apply_history_change(portfolio, trades):
+    # Changes replayed from the checkpoints must lead to the same state of a reload
+    portfolio.CHECKPOINT_INTERVAL = 10
+    reference = Portfolio('reference', MockConfigurationManager(), portfolio.price_getter)
+    portfolio.reload(trades)
+    history = list(trades)
+    deleted = 0
+    for index in range(len(history)):
+        suffix = history[index + 1:]
+        if len(portfolio.validate_history_change(index, history, suffix)) > 0:
+            continue
+        # Delete the trade and insert it back
+        old_trade = history.pop(index)
+        portfolio.apply_history_change(index, history, symbols=[old_trade.symbol])
+        reference.reload(history)
+        assert portfolio_state(portfolio) == portfolio_state(reference)
+        history.insert(index, old_trade)
+        portfolio.apply_history_change(index, history)
+        reference.reload(history)
+        assert portfolio_state(portfolio) == portfolio_state(reference)
+        deleted += 1
+    assert deleted > 5
+
+    # Edit the price of the first BUY
+    index = next(i for i, t in enumerate(history) if t.symbol == 'MOCK13')
+    item = history[index].to_dict()
+    item['price'] = 100.0
+    history[index] = Trade.from_dict(item)
+    portfolio.apply_history_change(index, history, symbols=[item['symbol']])
+    reference.reload(history)
+    assert portfolio_state(portfolio) == portfolio_state(reference)
+
+    # Insert a deposit at the beginning
+    item = {'date':'01/01/2017','action':'DEPOSIT','quantity':1000,'symbol':'','price':0.0,'fee':0.0,'stamp_duty':0.0}
+    history.insert(0, Trade.from_dict(item))
+    portfolio.apply_history_change(0, history)
+    reference.reload(history)
+    assert portfolio_state(portfolio) == portfolio_state(reference)
+
+def test_validate_history_change(portfolio, trades):
+    portfolio.CHECKPOINT_INTERVAL = 10
+    portfolio.reload(trades)
+    # Removing the first deposit leaves no cash for the following trades
+    violations = portfolio.validate_history_change(0, trades, trades[1:])
+    assert len(violations) > 0
+    assert violations[0]['message'] == Messages.INSUF_FUNDING.value
+    assert trades[violations[0]['index'] + 1] is violations[0]['trade']
+    # Removing the last trade is always valid
+    assert portfolio.validate_history_change(len(trades) - 1, trades, []) == []
+
+def test_watchlist(portfolio, trades):
+    portfolio.reload(trades)
+    portfolio.set_watchlist(['MOCK13', 'LSE:MOCK99'])
+    # Held symbols are fetched only once
+    assert portfolio.price_getter.get_symbol_list() == ['MOCK13', 'MOCK4', 'LSE:MOCK99']
+    # The watchlist is kept across the reloads
+    portfolio.reload(trades)
+    assert portfolio.price_getter.get_symbol_list() == ['MOCK13', 'MOCK4', 'LSE:MOCK99']
+    portfolio.price_getter.lastData = {'MOCK13': 100.0}
+    portfolio.price_getter.price_cache.update({'LSE:MOCK99': 50.0})
+    portfolio.load_cached_prices()
+    assert portfolio.get_last_prices(['MOCK13', 'LSE:MOCK99', 'LSE:MOCK98']) == {
+        'MOCK13': (100.0, True), 'LSE:MOCK99': (50.0, False), 'LSE:MOCK98': (None, False)}
+
+def test_alerts(portfolio, trades):
+    portfolio.reload(trades)
+    engine = AlertsEngine('/tmp/test_portfolio_alerts.json')
+    engine.add_rule('MOCK13', 'ABOVE', 90)
+    engine.add_rule('LSE:MOCK99', 'BELOW', 40)
+    portfolio.set_alerts_engine(engine)
+    portfolio.price_getter.lastData = {'MOCK13': 100.0, 'LSE:MOCK99': 50.0}
+    portfolio.on_new_price_data()
+    # Only the crossed rule has been triggered
+    assert [r['symbol'] for r in engine.get_rules()] == ['LSE:MOCK99']
@@ -0,0 +1,69 @@
+import os
+import sys
+import inspect
+import json
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.PortfolioHistory import PortfolioHistory
+from Model.Portfolio import Portfolio
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Model.BarStore import BarStore
+from Utils.Trade import Trade
+from Utils.Utils import Actions
+
+@pytest.fixture
+def trades():
+    with open('test/test_data/trading_log.json', 'r') as file:
+        return [Trade.from_dict(item) for item in json.load(file)['trades']]
+
+@pytest.fixture
+def store():
+    mock_path = '/tmp/test_portfolio_history.db'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    store = BarStore(mock_path)
+    yield store
+    store.close()
+
+def bars(start, closes):
+    return [(start + datetime.timedelta(days=i), c, c, c, c, 0) for i, c in enumerate(closes)]
+
+def test_trades_only(trades):
+    history = PortfolioHistory()
+    assert history.update(trades)
+    assert not history.update(trades)
+    dates = history.get_dates()
+    assert dates == sorted(set(t.date.date() for t in trades))
+    # The last values match the portfolio valued at the prices of the last trades
+    prices = {t.symbol: t.price for t in trades if t.action in (Actions.BUY, Actions.SELL)}
+    portfolio = Portfolio('mock', None, OfflinePriceGetter(prices))
+    portfolio.reload(trades)
+    assert history.get_values()[-1] == pytest.approx(portfolio.get_total_value())
+    assert history.get_profit_loss()[-1] == pytest.approx(portfolio.get_portfolio_pl())
+    assert history.get_symbols() == sorted(set(prices))
+
+def test_closes(trades, store):
+    history = PortfolioHistory(store)
+    history.update(trades)
+    last_date = history.get_dates()[-1]
+    count = len(history.get_dates())
+    dates, values = history.get_holding_values('MOCK13')
+    quantity = 1192
+    # New closes only extend the series
+    store.append('MOCK13', bars(last_date + datetime.timedelta(days=1), [200.0, 300.0]))
+    assert history.update(trades)
+    dates, values = history.get_holding_values('MOCK13')
+    assert dates[-2:] == [last_date + datetime.timedelta(days=1), last_date + datetime.timedelta(days=2)]
+    assert values[-2:] == [quantity * 2.0, quantity * 3.0]
+    assert len(history.get_dates()) == count + 2
+    values = history.get_values()
+    assert values[-1] - values[-2] == pytest.approx(quantity)
+    # A change of the trades computes the series again
+    assert history.update(trades[:-1])
+    assert len(history.get_dates()) <= count + 2
@@ -0,0 +1,63 @@
+import os
+import sys
+import inspect
+import json
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.PortfolioLoader import PortfolioLoader, load_portfolio_summary
+
+LOG_PATH = currentdir + '/test_data/trading_log.json'
+
+def test_load_portfolio_summary():
+    summary = load_portfolio_summary(LOG_PATH)
+    assert summary['error'] is None
+    assert summary['trades'] == 56
+    assert summary['cash_available'] == 2379.3144236000016
+    assert summary['cash_deposited'] == 7700
+    assert sorted(summary['holdings'].keys()) == ['MOCK13', 'MOCK4']
+    assert summary['holdings']['MOCK13']['quantity'] == 1192
+    assert summary['holdings']['MOCK13']['open_price'] == 166.984
+
+    summary = load_portfolio_summary('/tmp/not_existing_log.json')
+    assert summary['error'] is not None
+
+def test_load():
+    loader = PortfolioLoader(max_workers=2)
+    summaries = loader.load([LOG_PATH, '/tmp/not_existing_log.json', LOG_PATH])
+    assert len(summaries) == 3
+    assert summaries[0] == summaries[2]
+    assert summaries[1]['error'] is not None
+
+def test_load_consolidated():
+    loader = PortfolioLoader(max_workers=2)
+    report = loader.load_consolidated([LOG_PATH, LOG_PATH, '/tmp/not_existing_log.json'])
+    assert len(report['files']) == 3
+    assert list(report['errors'].keys()) == ['/tmp/not_existing_log.json']
+    assert report['trades'] == 112
+    assert report['cash_deposited'] == 15400
+    assert report['cash_available'] == pytest.approx(2379.3144236000016 * 2)
+    assert report['holdings']['MOCK13']['quantity'] == 1192 * 2
+    assert report['holdings']['MOCK13']['open_price'] == 166.984
+
+def test_foreign_holdings():
+    mock_path = '/tmp/test_portfolio_loader_foreign.json'
+    with open(mock_path, 'w') as f:
+        json.dump({'trades': [
+            {'date': '01/01/2019', 'action': 'DEPOSIT', 'quantity': 10000, 'symbol': '',
+             'price': 0, 'fee': 0, 'stamp_duty': 0},
+            {'date': '02/01/2019', 'action': 'BUY', 'quantity': 10, 'symbol': 'NYSE:MOCK',
+             'price': 50, 'fee': 0, 'stamp_duty': 0, 'fx_rate': 0.8}]}, f)
+    summary = load_portfolio_summary(mock_path, {'USD': 0.8})
+    assert summary['holdings']['NYSE:MOCK']['cost'] == pytest.approx(400)
+    report = PortfolioLoader(max_workers=2, fx_rates={'USD': 0.8}).load_consolidated([mock_path, mock_path])
+    assert report['holdings']['NYSE:MOCK']['quantity'] == 20
+    assert report['holdings']['NYSE:MOCK']['open_price'] == 50
+    # Without the exchange rate the cost is not known
+    report = PortfolioLoader(max_workers=1).load_consolidated([mock_path])
+    assert report['holdings']['NYSE:MOCK']['cost'] is None
+    assert report['holdings']['NYSE:MOCK']['open_price'] is None
@@ -0,0 +1,27 @@
+import os
+import sys
+import inspect
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.PriceCache import PriceCache
+
+@pytest.fixture
+def cache():
+    mock_path = '/tmp/test_price_cache/prices.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    return PriceCache(mock_path)
+
+def test_load_empty(cache):
+    assert cache.load() == {}
+
+def test_update(cache):
+    assert cache.update({'MOCK1': 100.0, 'MOCK2': 200.0})
+    assert cache.update({'MOCK2': 250.0})
+    assert cache.load() == {'MOCK1': 100.0, 'MOCK2': 250.0}
+    assert cache.load_entries()['MOCK1']['timestamp'] > 0
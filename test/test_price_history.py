@@ -0,0 +1,54 @@
+import os
+import sys
+import inspect
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.PriceHistory import PriceHistory
+from Model.OfflinePriceGetter import OfflinePriceGetter
+
+def test_append():
+    history = PriceHistory(3)
+    assert history.get_values('MOCK1') == []
+    history.append('MOCK1', 1.0, timestamp=10)
+    history.append_prices({'MOCK1': 2.0, 'MOCK2': 5.0, 'MOCK3': None}, timestamp=20)
+    assert len(history) == 2
+    assert 'MOCK3' not in history
+    assert history.get_values('MOCK1') == [1.0, 2.0]
+    assert history.get_timestamps('MOCK1') == [10, 20]
+    assert history.get_count('MOCK2') == 1
+
+def test_ring_buffer():
+    history = PriceHistory(3)
+    for i in range(7):
+        history.append('MOCK1', float(i))
+    # Only the last prices are kept
+    assert history.get_values('MOCK1') == [4.0, 5.0, 6.0]
+    assert history.get_count('MOCK1') == 7
+    assert history.get_values_since('MOCK1', 5) == ([5.0, 6.0], 7)
+    assert history.get_values_since('MOCK1', 1) == ([4.0, 5.0, 6.0], 7)
+    assert history.get_values_since('MOCK1', 7) == ([], 7)
+    history.append('MOCK1', 7.0)
+    assert history.get_values('MOCK1') == [5.0, 6.0, 7.0]
+
+def test_retain():
+    history = PriceHistory(3)
+    history.append_prices({'MOCK1': 1.0, 'MOCK2': 2.0})
+    history.retain(['MOCK2'])
+    assert 'MOCK1' not in history
+    assert history.get_values_since('MOCK1', 0) == ([], 0)
+    assert history.get_values('MOCK2') == [2.0]
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        PriceHistory(0)
+
+def test_offline_price_getter():
+    getter = OfflinePriceGetter({'MOCK1': 1.0}, history_size=2)
+    getter.set_last_data({'MOCK1': 2.0})
+    getter.set_last_data({'MOCK1': 3.0})
+    assert getter.get_price_history().get_values('MOCK1') == [2.0, 3.0]
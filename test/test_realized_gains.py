@@ -0,0 +1,127 @@
+import os
+import sys
+import inspect
+import json
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.RealizedGains import RealizedGains
+from Model.CorporateActions import CorporateActions
+from Utils.Trade import Trade
+
+def trade(date, action, quantity, price, fee=0.0, symbol='MOCK'):
+    return Trade.from_dict({'date': date, 'action': action, 'quantity': quantity,
+                            'symbol': symbol, 'price': price, 'fee': fee, 'stamp_duty': 0.0})
+
+@pytest.fixture
+def trades():
+    return [
+        trade('01/03/2019', 'BUY', 100, 1000.0),
+        trade('05/03/2019', 'BUY', 100, 2000.0),
+        trade('10/03/2019', 'SELL', 50, 3000.0, fee=10.0),
+        trade('20/03/2019', 'BUY', 20, 1500.0),
+        trade('10/05/2019', 'BUY', 10, 4000.0),
+        trade('10/05/2019', 'SELL', 30, 5000.0),
+    ]
+
+@pytest.fixture
+def actions():
+    mock_path = '/tmp/test_realized_gains_actions.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    return CorporateActions(mock_path)
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        RealizedGains('LIFO')
+
+def test_fifo(trades):
+    disposals = RealizedGains('FIFO').process(trades)
+    assert len(disposals) == 2
+    assert disposals[0]['proceeds'] == 1490
+    assert disposals[0]['cost'] == 500
+    assert disposals[0]['gain'] == 990
+    assert disposals[0]['matches'][0]['acquired'] == datetime.datetime(2019, 3, 1)
+    assert disposals[1]['cost'] == 300
+
+def test_fifo_across_lots(trades):
+    disposals = RealizedGains('FIFO').process(trades[:2] + [trade('10/03/2019', 'SELL', 150, 3000.0)])
+    assert disposals[0]['cost'] == 1000 + 1000
+
+def test_average(trades):
+    disposals = RealizedGains('AVERAGE').process(trades)
+    assert disposals[0]['cost'] == 750
+    # Pool of 150 shares at 15 and 20 shares at 15
+    assert disposals[1]['cost'] == pytest.approx(30 * (2250 + 300 + 400) / 180)
+
+def test_uk(trades):
+    disposals = RealizedGains('UK').process(trades)
+    # 20 shares bought within 30 days, then 30 shares from the pool at 15
+    rules = [(m['rule'], m['quantity'], m['cost']) for m in disposals[0]['matches']]
+    assert rules == [('BED_AND_BREAKFAST', 20, 300), ('SECTION_104', 30, 450)]
+    # 10 shares bought on the same day, then 20 shares from the pool at 15
+    rules = [(m['rule'], m['quantity'], m['cost']) for m in disposals[1]['matches']]
+    assert rules == [('SAME_DAY', 10, 400), ('SECTION_104', 20, 300)]
+
+def test_split(actions):
+    actions.add(datetime.date(2019, 3, 5), 'SPLIT', 'MOCK', 10)
+    trades = [trade('01/03/2019', 'BUY', 100, 1000.0), trade('10/03/2019', 'SELL', 500, 150.0)]
+    for method in RealizedGains.METHODS:
+        disposals = RealizedGains(method, actions).process(trades)
+        assert [(d['quantity'], d['cost'], d['proceeds']) for d in disposals] == [(500, 500, 750)]
+    # The shares sold before the split are matched with the ones bought after it
+    trades = [trade('01/03/2019', 'BUY', 100, 1000.0), trade('02/03/2019', 'SELL', 50, 1000.0),
+              trade('10/03/2019', 'BUY', 100, 200.0)]
+    disposals = RealizedGains('UK', actions).process(trades)
+    rules = [(m['rule'], m['quantity'], m['cost']) for m in disposals[0]['matches']]
+    assert rules == [('BED_AND_BREAKFAST', 100, 200), ('SECTION_104', 400, 400)]
+    with pytest.raises(ValueError):
+        RealizedGains('FIFO').process(trades[:1] + [trade('10/03/2019', 'SELL', 500, 150.0)])
+
+def test_symbol_change(actions):
+    actions.add(datetime.date(2019, 3, 5), 'SYMBOL_CHANGE', 'MOCK', new_symbol='NEW')
+    trades = [trade('01/03/2019', 'BUY', 100, 1000.0), trade('06/03/2019', 'BUY', 100, 2000.0, symbol='NEW'),
+              trade('10/03/2019', 'SELL', 150, 3000.0, symbol='NEW')]
+    costs = {'FIFO': 2000, 'AVERAGE': 2250, 'UK': 2250}
+    for method in RealizedGains.METHODS:
+        disposals = RealizedGains(method, actions).process(trades)
+        assert [(d['symbol'], d['quantity'], d['cost']) for d in disposals] == [('NEW', 150, costs[method])]
+    # Lots of the new symbol bought before the change are sold first
+    trades.insert(0, trade('01/02/2019', 'BUY', 100, 500.0, symbol='NEW'))
+    disposals = RealizedGains('FIFO', actions).process(trades)
+    assert disposals[0]['cost'] == 500 + 500
+
+def test_not_enough_shares():
+    with pytest.raises(ValueError):
+        RealizedGains('FIFO').process([trade('01/03/2019', 'SELL', 10, 1000.0)])
+    with pytest.raises(ValueError):
+        RealizedGains('UK').process([trade('01/03/2019', 'SELL', 10, 1000.0)])
+
+def test_not_chronological(trades):
+    with pytest.raises(ValueError):
+        RealizedGains('UK').process(trades[::-1])
+
+def test_tax_years(trades):
+    engine = RealizedGains('UK')
+    engine.process(trades)
+    reports = engine.get_tax_year_reports()
+    assert [r['tax_year'] for r in reports] == ['2018/19', '2019/20']
+    assert reports[0]['gains'] == 1490 - 750
+    assert reports[1]['net'] == 1500 - 700
+
+def test_get_tax_year():
+    assert RealizedGains.get_tax_year(datetime.datetime(2019, 4, 5)) == '2018/19'
+    assert RealizedGains.get_tax_year(datetime.datetime(2019, 4, 6)) == '2019/20'
+    assert RealizedGains.get_tax_year(datetime.datetime(1999, 12, 31)) == '1999/00'
+
+def test_trading_log():
+    with open('test/test_data/trading_log.json', 'r') as file:
+        trades = [Trade.from_dict(item) for item in json.load(file)['trades']]
+    for method in RealizedGains.METHODS:
+        disposals = RealizedGains(method).process(trades)
+        assert len(disposals) == 19
@@ -0,0 +1,93 @@
+import os
+import sys
+import inspect
+import time
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.Rebalancer import Rebalancer
+from Model.Portfolio import Portfolio
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Utils.Trade import Trade
+from Utils.Utils import Actions
+
+PRICES = {'LSE:A': 1000.0, 'LSE:B': 2000.0, 'NYSE:C': 50.0}
+
+def trade(action, quantity, symbol='', price=0):
+    return Trade.from_dict({'date': '01/01/2019', 'action': action, 'quantity': quantity,
+                            'symbol': symbol, 'price': price, 'fee': 0, 'stamp_duty': 0})
+
+@pytest.fixture
+def history():
+    return [trade('DEPOSIT', 10000), trade('BUY', 100, 'LSE:A', 1000), trade('BUY', 50, 'LSE:B', 2000)]
+
+def build_portfolio(trades):
+    portfolio = Portfolio('test', None, OfflinePriceGetter(PRICES, {'USD': 0.8}))
+    portfolio.reload(trades)
+    return portfolio
+
+def test_cash_matches_portfolio(history):
+    portfolio = build_portfolio(history)
+    rebalancer = Rebalancer(portfolio, fee=6.0, stamp_duty={'LSE': 0.5})
+    proposal = rebalancer.propose({'LSE:A': 0.5, 'LSE:B': 0.5}, date=datetime.date(2019, 2, 1))
+    assert proposal['violations'] == []
+    assert [(t.action, t.symbol) for t in proposal['trades']] == [
+        (Actions.BUY, 'LSE:A'), (Actions.BUY, 'LSE:B')]
+    assert all(t.sdr == 0.5 and t.fee == 6.0 for t in proposal['trades'])
+    # Not enough cash for the fees and stamp duty of the whole allocation
+    assert sum(t.quantity for t in proposal['trades']) < 600
+    assert 0 <= proposal['cash'] < 20.1
+    # The projected cash is the one of the Portfolio after the trades
+    rebalanced = build_portfolio(history + proposal['trades'])
+    assert rebalanced.get_cash_available() == proposal['cash']
+    weights = proposal['weights']
+    assert weights['LSE:A'][0] == pytest.approx(0.1)
+    assert weights['LSE:A'][2] == pytest.approx(0.5, abs=0.01)
+
+def test_sells_fund_buys(history):
+    portfolio = build_portfolio(history[:2] + [trade('WITHDRAW', 9000)])
+    proposal = Rebalancer(portfolio, fee=6.0, stamp_duty={'LSE': 0.5}).propose({'NYSE:C': 0.9})
+    assert proposal['violations'] == []
+    sell, buy = proposal['trades']
+    assert (sell.action, sell.symbol, sell.quantity) == (Actions.SELL, 'LSE:A', 100)
+    assert (buy.action, buy.symbol, buy.sdr, buy.fx_rate) == (Actions.BUY, 'NYSE:C', 0.0, 0.8)
+    # 90% of the £1000 value at £40 each
+    assert buy.quantity == 22
+    assert proposal['cash'] == 1000 - 6 - 22 * 40 - 6
+
+def test_tolerance(history):
+    portfolio = build_portfolio(history)
+    proposal = Rebalancer(portfolio, tolerance=0.05).propose({'LSE:A': 0.12, 'LSE:B': 0.5})
+    assert [(t.symbol, t.quantity) for t in proposal['trades']] == [('LSE:B', 200)]
+    with pytest.raises(ValueError):
+        Rebalancer(portfolio).propose({'LSE:A': 0.6, 'LSE:B': 0.5})
+    with pytest.raises(RuntimeError):
+        Rebalancer(portfolio).propose({'LSE:MISSING': 0.5})
+
+def test_large_portfolio():
+    symbols = ['LSE:S{:04d}'.format(i) for i in range(2000)]
+    trades = [trade('DEPOSIT', 10000000)] + [trade('BUY', 10 + i % 7, s, 100 + i) for i, s in enumerate(symbols)]
+    portfolio = Portfolio('test', None, OfflinePriceGetter({s: 100.0 + i for i, s in enumerate(symbols)}))
+    portfolio.reload(trades)
+    targets = {s: 1 / len(symbols) for s in symbols}
+    start = time.perf_counter()
+    proposal = Rebalancer(portfolio, fee=6.0, stamp_duty={'LSE': 0.5}).propose(targets)
+    assert time.perf_counter() - start < 2
+    assert proposal['violations'] == []
+    assert len(proposal['trades']) == len(symbols)
+    assert 0 <= proposal['cash'] < 0.01 * 10000000
+
+def test_fractional_holding(history):
+    history[1] = trade('BUY', 100.5, 'LSE:A', 1000)
+    portfolio = build_portfolio(history)
+    # Whole shares are sold while the holding is kept, all of it when not a target
+    proposal = Rebalancer(portfolio).propose({'LSE:A': 0.05, 'LSE:B': 0.1})
+    assert [(t.action, t.symbol, t.quantity) for t in proposal['trades']] == [(Actions.SELL, 'LSE:A', 50)]
+    proposal = Rebalancer(portfolio).propose({'LSE:B': 0.1})
+    assert [(t.action, t.symbol, t.quantity) for t in proposal['trades']] == [(Actions.SELL, 'LSE:A', 100.5)]
+    assert proposal['violations'] == []
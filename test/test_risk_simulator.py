@@ -0,0 +1,92 @@
+import os
+import sys
+import inspect
+import json
+import math
+import datetime
+import pytest
+
+# numpy is an optional dependency required only by the risk simulation
+np = pytest.importorskip('numpy')
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.RiskSimulator import RiskSimulator
+from Model.Portfolio import Portfolio
+from Model.OfflinePriceGetter import OfflinePriceGetter
+from Model.BarStore import BarStore
+from Utils.Trade import Trade
+
+@pytest.fixture
+def store():
+    mock_path = '/tmp/test_risk_simulator.db'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    store = BarStore(mock_path)
+    yield store
+    store.close()
+
+def bars(start, closes):
+    return [(start + datetime.timedelta(days=i), c, c, c, c, 0) for i, c in enumerate(closes)]
+
+def test_constant_returns():
+    simulator = RiskSimulator(None, max_workers=1)
+    returns = np.full((30, 2), math.log(0.99))
+    result = simulator.simulate(returns, [1000, 3000], paths=100, horizon=2, seed=1)
+    loss = 4000 * (1 - 0.99 ** 2)
+    assert result['var'] == pytest.approx(loss)
+    assert result['cvar'] == pytest.approx(loss)
+    assert result['mean'] == pytest.approx(-loss)
+    assert result['value'] == 4000
+    assert sum(result['histogram']['counts']) == 100
+    with pytest.raises(ValueError):
+        simulator.simulate(returns, [1000], paths=100)
+    with pytest.raises(ValueError):
+        simulator.simulate(returns, [1000, 3000], confidence=1)
+
+def test_process_pool_matches_single_process():
+    rng = np.random.RandomState(0)
+    returns = rng.normal(0, 0.02, size=(250, 5))
+    values = [1000, 2000, 500, 300, 4000]
+    single = RiskSimulator(None, max_workers=1).simulate(returns, values, paths=50000, horizon=5, seed=7)
+    pool = RiskSimulator(None, max_workers=2).simulate(returns, values, paths=50000, horizon=5, seed=7)
+    assert pool == single
+    assert 0 < single['var'] < single['cvar']
+    assert single['percentiles'][5] == pytest.approx(-single['var'])
+
+def test_get_returns(store):
+    start = datetime.date(2019, 1, 1)
+    store.append('A', bars(start, [100 * 1.01 ** i for i in range(30)]))
+    # B misses the first day, C has not enough closes
+    store.append('B', bars(start + datetime.timedelta(days=1), [50] * 29))
+    store.append('C', bars(start, [10] * 5))
+    dates, symbols, returns = RiskSimulator(store).get_returns(['A', 'B', 'C'])
+    assert symbols == ['A', 'B']
+    assert dates[0] == start + datetime.timedelta(days=2)
+    assert returns.shape == (28, 2)
+    assert returns[:, 0] == pytest.approx(math.log(1.01))
+    assert returns[:, 1] == pytest.approx(0)
+
+def test_simulate_portfolio(store):
+    portfolio = Portfolio('test', None, OfflinePriceGetter({'LSE:A': 200.0}))
+    portfolio.reload([
+        Trade.from_dict({'date': '01/01/2019', 'action': 'DEPOSIT', 'quantity': 10000, 'symbol': '',
+                         'price': 0, 'fee': 0, 'stamp_duty': 0}),
+        Trade.from_dict({'date': '02/01/2019', 'action': 'BUY', 'quantity': 10, 'symbol': 'LSE:A',
+                         'price': 100, 'fee': 0, 'stamp_duty': 0}),
+        Trade.from_dict({'date': '02/01/2019', 'action': 'BUY', 'quantity': 10, 'symbol': 'LSE:B',
+                         'price': 100, 'fee': 0, 'stamp_duty': 0})
+    ])
+    simulator = RiskSimulator(store, max_workers=1)
+    with pytest.raises(RuntimeError):
+        simulator.simulate_portfolio(portfolio)
+    store.append('LSE:A', bars(datetime.date(2019, 1, 1), [100, 99] * 20))
+    result = simulator.simulate_portfolio(portfolio, paths=1000, seed=1)
+    assert result['symbols'] == ['LSE:A']
+    assert result['excluded'] == ['LSE:B']
+    assert result['value'] == 20
+    assert result['var'] == pytest.approx(20 * 0.01, rel=0.01)
+    json.dumps(result, default=str)
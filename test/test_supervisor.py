@@ -0,0 +1,69 @@
+import os
+import sys
+import inspect
+import json
+import time
+import threading
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Utils.Supervisor import Supervisor
+from Utils.HealthMonitor import HealthMonitor
+
+def build(tmp_path, code, **kwargs):
+    supervisor = Supervisor([sys.executable, '-c', code], str(tmp_path / 'status.json'), **kwargs)
+    supervisor.POLL_PERIOD = 0.05
+    return supervisor
+
+def write_status(tmp_path, status, timestamp):
+    with open(str(tmp_path / 'status.json'), 'w') as file:
+        json.dump({'status': status, 'timestamp': timestamp}, file)
+
+def test_restart_on_crash(tmp_path):
+    supervisor = build(tmp_path, 'import sys; sys.exit(3)', min_backoff=0.01, max_backoff=0.02,
+                       max_restarts=3)
+    assert supervisor.run() == 3
+    assert supervisor.restarts == 3
+    assert supervisor._backoff == 0.02
+
+def test_clean_exit(tmp_path):
+    supervisor = build(tmp_path, 'pass')
+    assert supervisor.run() == 0
+    assert supervisor.restarts == 0
+
+def test_terminate_stalled(tmp_path):
+    code = ('import json, time; json.dump({{"status": "stalled", "timestamp": time.time()}}, '
+            'open("{}", "w")); time.sleep(30)').format(str(tmp_path / 'status.json'))
+    supervisor = build(tmp_path, code, max_restarts=0)
+    start = time.monotonic()
+    assert supervisor.run() != 0
+    assert time.monotonic() - start < 10
+
+def test_stop_during_backoff(tmp_path):
+    supervisor = build(tmp_path, 'import sys; sys.exit(3)', min_backoff=300)
+    timer = threading.Timer(0.5, supervisor.stop)
+    timer.start()
+    start = time.monotonic()
+    assert supervisor.run() == 3
+    assert time.monotonic() - start < 10
+    assert supervisor.restarts == 0
+    timer.join()
+
+def test_check_health(tmp_path):
+    supervisor = build(tmp_path, 'pass', stale_timeout=60)
+    # Missing status or status of a previous run
+    assert supervisor.check_health(1000, now=1030) is None
+    assert supervisor.check_health(1000, now=1070) == 'did not report its status'
+    write_status(tmp_path, HealthMonitor.OK, 900)
+    assert supervisor.check_health(1000, now=1030) is None
+    write_status(tmp_path, HealthMonitor.OK, 1010)
+    assert supervisor.check_health(1000, now=1030) is None
+    assert supervisor.check_health(1000, now=1080) == 'did not update its status for 70 s'
+    write_status(tmp_path, HealthMonitor.STOPPED, 1010)
+    assert supervisor.check_health(1000, now=1080) is None
+    write_status(tmp_path, HealthMonitor.DEAD, 1010)
+    assert supervisor.check_health(1000, now=1020) == 'reported a dead thread'
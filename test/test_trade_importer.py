@@ -0,0 +1,49 @@
+import os
+import sys
+import inspect
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.TradeImporter import TradeImporter
+from Utils.Utils import Actions
+
+def test_parse_csv():
+    importer = TradeImporter(columns={'date': 'Trade Date', 'action': 'Type', 'symbol': 'Ticker',
+                                      'quantity': 'Shares', 'price': 'Price', 'fee': 'Commission'},
+                             date_format='%Y-%m-%d',
+                             actions={'Deposit': 'DEPOSIT', 'purchase': 'BUY', 'SALE': 'SELL'})
+    trades, lines, errors = importer.parse(currentdir + '/test_data/broker_statement.csv')
+    assert len(errors) == 0
+    assert lines == [2, 3, 4]
+    assert [t.action for t in trades] == [Actions.DEPOSIT, Actions.BUY, Actions.SELL]
+    assert trades[0].quantity == 1000
+    assert trades[1].symbol == 'LSE:MOCK'
+    assert trades[1].price == 1000
+    assert trades[1].fee == 5.95
+    assert trades[1].sdr == 0
+    assert trades[2].date.strftime('%d/%m/%Y') == '04/01/2019'
+
+def test_parse_json_lines():
+    importer = TradeImporter()
+    trades, lines, errors = importer.parse(currentdir + '/test_data/broker_statement.jsonl')
+    assert len(trades) == 3
+    assert lines == [1, 2, 4]
+    assert trades[1].sdr == 0.5
+    assert [e['line'] for e in errors] == [5, 6, 7]
+
+def test_iter_trades():
+    importer = TradeImporter()
+    records = importer.iter_trades(currentdir + '/test_data/broker_statement.jsonl')
+    line, trade, error = next(records)
+    assert line == 1
+    assert trade.action == Actions.DEPOSIT
+    assert error is None
+
+def test_missing_column():
+    importer = TradeImporter()
+    with pytest.raises(ValueError):
+        importer.to_trade({'date': '01/01/2019', 'action': 'BUY'})
@@ -0,0 +1,108 @@
+import os
+import sys
+import inspect
+import datetime
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.TradeIndex import TradeIndex
+from Utils.Trade import Trade
+
+def trade(date, symbol, action='BUY'):
+    return Trade.from_dict({'date': date, 'action': action, 'quantity': 1, 'symbol': symbol,
+                            'price': 1.0, 'fee': 0.0, 'stamp_duty': 0.0})
+
+@pytest.fixture
+def trades():
+    return [
+        trade('01/01/2018', 'MOCK1'),
+        trade('02/03/2018', 'MOCK2'),
+        trade('05/06/2018', 'MOCK1'),
+        trade('01/01/2019', 'MOCK1'),
+        trade('03/03/2018', 'MOCK2', 'SELL'),
+    ]
+
+@pytest.fixture
+def index(trades):
+    return TradeIndex(trades)
+
+def test_symbol_trades(index, trades):
+    result = index.get_symbol_trades('MOCK1')
+    assert len(result) == 3
+    assert list(result) == [trades[0], trades[2], trades[3]]
+    assert list(reversed(result)) == [trades[3], trades[2], trades[0]]
+    assert result[-1] is trades[3]
+    assert list(result[1:]) == [trades[2], trades[3]]
+    assert result.get_offsets() == [0, 2, 3]
+    assert len(index.get_symbol_trades('MOCK')) == 0
+    assert sorted(index.get_symbols()) == ['MOCK1', 'MOCK2']
+
+def test_trades_between(index, trades):
+    result = index.get_trades_between(datetime.datetime(2018, 1, 1), datetime.datetime(2018, 12, 31))
+    assert list(result) == [trades[0], trades[1], trades[4], trades[2]]
+    result = index.get_trades_between(datetime.datetime(2018, 3, 1), datetime.datetime(2018, 3, 3))
+    assert list(result) == [trades[1], trades[4]]
+    result = index.get_trades_between(start=datetime.datetime(2018, 6, 5), symbol='MOCK1')
+    assert list(result) == [trades[2], trades[3]]
+    result = index.get_trades_between(end=datetime.datetime(2017, 12, 31))
+    assert len(result) == 0
+
+def test_append_pop(index, trades):
+    # Build the date index before the updates
+    assert len(index.get_trades_between()) == 5
+    trades.append(trade('01/02/2018', 'MOCK3'))
+    index.append()
+    assert len(index) == 6
+    assert list(index.get_symbol_trades('MOCK3')) == [trades[5]]
+    result = index.get_trades_between(datetime.datetime(2018, 1, 1), datetime.datetime(2018, 2, 1))
+    assert list(result) == [trades[0], trades[5]]
+    index.pop()
+    trades.pop()
+    assert len(index) == 5
+    assert len(index.get_symbol_trades('MOCK3')) == 0
+    assert 'MOCK3' not in index.get_symbols()
+    assert len(index.get_trades_between()) == 5
+    index.pop()
+    trades.pop()
+    assert list(index.get_trades_between(symbol='MOCK2')) == [trades[1]]
+
+def test_pop_empty():
+    with pytest.raises(IndexError):
+        TradeIndex([]).pop()
+
+@pytest.mark.parametrize('build_dates', [False, True])
+def test_insert_remove_replace(index, trades, build_dates):
+    if build_dates:
+        assert len(index.get_trades_between()) == 5
+    # Every change must lead to the same index of a rebuild
+    def check():
+        expected = TradeIndex(list(trades))
+        assert len(index) == len(trades)
+        assert sorted(index.get_symbols()) == sorted(expected.get_symbols())
+        for symbol in expected.get_symbols():
+            assert index.get_symbol_trades(symbol).get_offsets() == \
+                expected.get_symbol_trades(symbol).get_offsets()
+            assert index.get_trades_between(symbol=symbol).get_offsets() == \
+                expected.get_trades_between(symbol=symbol).get_offsets()
+        assert index.get_trades_between().get_offsets() == expected.get_trades_between().get_offsets()
+    trades.insert(1, trade('01/01/2018', 'MOCK3'))
+    index.insert(1)
+    check()
+    trades.insert(0, trade('01/01/2018', 'MOCK1'))
+    index.insert(0)
+    check()
+    old_trade = trades[3]
+    trades[3] = trade('01/01/2017', 'MOCK3')
+    index.replace(3, old_trade)
+    check()
+    index.remove(2)
+    del trades[2]
+    check()
+    index.remove(0)
+    del trades[0]
+    check()
+    assert list(index.get_symbol_trades('MOCK3')) == [trades[1]]
@@ -0,0 +1,49 @@
+import os
+import sys
+import inspect
+import pytest
+
+currentdir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, '{}/src'.format(parentdir))
+
+from Model.Watchlist import Watchlist
+
+@pytest.fixture
+def watchlist():
+    mock_path = '/tmp/test_watchlist.json'
+    if os.path.exists(mock_path):
+        os.remove(mock_path)
+    return Watchlist(mock_path)
+
+def test_add_remove(watchlist):
+    watchlist.load()
+    assert len(watchlist) == 0
+    assert watchlist.add('NYSE:MOCK2')
+    assert watchlist.add('LSE:MOCK1')
+    assert not watchlist.add('LSE:MOCK1')
+    assert watchlist.get_symbols() == ['LSE:MOCK1', 'NYSE:MOCK2']
+    assert 'LSE:MOCK1' in watchlist
+    assert 'LSE:MOCK' not in watchlist
+    assert watchlist.remove('NYSE:MOCK2')
+    assert not watchlist.remove('NYSE:MOCK2')
+    assert watchlist.get_symbols() == ['LSE:MOCK1']
+
+def test_invalid_symbol(watchlist):
+    for symbol in ['MOCK1', 'XXX:MOCK1', 'LSE:', None]:
+        with pytest.raises(ValueError):
+            watchlist.add(symbol)
+    assert len(watchlist) == 0
+
+def test_persistence(watchlist):
+    watchlist.add('LSE:MOCK1')
+    watchlist.add('EURONEXT:MOCK3')
+    other = Watchlist(watchlist.filepath)
+    other.load()
+    assert other.get_symbols() == ['EURONEXT:MOCK3', 'LSE:MOCK1']
+    # An unreadable file leaves the watchlist empty
+    with open(watchlist.filepath, 'w') as f:
+        f.write('{"symbols": [')
+    other.load()
+    assert len(other) == 0